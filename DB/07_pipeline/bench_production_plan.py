@@ -0,0 +1,156 @@
+"""
+생산계획 벤치마크 — 공유 라인 LP/MIP (production_lp.py) vs 제품별 greedy 휴리스틱
+─────────────────────────────────────────
+합성 인스턴스 (DB 불필요): SKU 수 N, 라인 수 ≈ N / 40, SKU 당 1~2개 라인 생산 이력
+  - 수요 P50 = 이력 생산량 × 0.8~2.0 (일부 라인은 캐파 부족), P90 = P50 × 1.2~1.8
+  - greedy  : s7 greedy 규칙 — critical/high 는 P90, 그 외 P50 소요를 자체 캐파 (일평균 × 버퍼) 로 상한
+  - greedy* : greedy 결과를 라인 캐파 초과분만큼 비례 축소, 초과 라인이 없을 때까지 반복 (실행 가능해)
+  - lp / mip: 공유 라인 캐파 배분 (HiGHS)
+비교 지표는 모두 LP 목적함수 기준 (plan_cost) — 결품 P50/P90 수량, 보관 수량, 비용, 라인 초과
+─────────────────────────────────────────
+실행:
+  cd DB/07_pipeline && python bench_production_plan.py
+  python bench_production_plan.py --skus=1000,5000,20000 --mip
+"""
+
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from config import PRODUCTION_PLAN_DAYS, PRODUCTION_CAPACITY_BUFFER, PRODUCTION_LP_PRIORITY_WEIGHTS
+from production_lp import line_capacity, solve_plan, plan_cost
+
+PRIORITIES = np.array(list(PRODUCTION_LP_PRIORITY_WEIGHTS))
+
+
+def make_instance(n_skus: int, seed: int = 0) -> dict:
+    """합성 SKU·라인·생산 이력·수요 인스턴스"""
+    rng = np.random.default_rng(seed)
+    n_lines = max(n_skus // 40, 2)
+    products = pd.Index([f"P{i:06d}" for i in range(n_skus)])
+
+    # 생산 이력: SKU 당 1~2 라인, 최근 30 가동일
+    n_assign = rng.integers(1, 3, n_skus)
+    sku = np.repeat(np.arange(n_skus), n_assign)
+    line = rng.integers(0, n_lines, len(sku))
+    base = rng.gamma(2.0, 20.0, len(sku))
+    days = np.arange(30)
+    hist = pd.DataFrame({
+        "production_date": np.tile(days, len(sku)),
+        "product_id": products[np.repeat(sku, len(days))],
+        "line_id": np.repeat([f"L{l:04d}" for l in line], len(days)),
+        "produced_qty": np.repeat(base, len(days)) * rng.uniform(0.5, 1.5, len(sku) * len(days)),
+    })
+    caps, pairs = line_capacity(hist)
+    own_daily = hist.groupby(["product_id", "production_date"])["produced_qty"].sum() \
+                    .groupby(level="product_id").mean().reindex(products).fillna(0).to_numpy()
+
+    weekly = own_daily * PRODUCTION_PLAN_DAYS
+    p50 = weekly * rng.uniform(0.8, 2.0, n_skus)
+    p90 = p50 * rng.uniform(1.2, 1.8, n_skus)
+    inv = weekly * rng.uniform(0.0, 0.8, n_skus)
+    safety = weekly * rng.uniform(0.1, 0.4, n_skus)
+    priority = rng.choice(PRIORITIES, n_skus, p=[0.05, 0.15, 0.3, 0.5])
+    return {
+        "products": products,
+        "caps": caps,
+        "pairs": pairs,
+        "own_cap": own_daily * PRODUCTION_CAPACITY_BUFFER * PRODUCTION_PLAN_DAYS,
+        "r50": np.maximum(p50 + safety - inv, 0),
+        "r90": np.maximum(p90 + safety - inv, 0),
+        "stockout_w": np.array([PRODUCTION_LP_PRIORITY_WEIGHTS[p] for p in priority]),
+        "holding_w": 1 + rng.uniform(0, 100, n_skus) / 100,
+        "urgent": np.isin(priority, ["critical", "high"]),
+    }
+
+
+def line_loads(inst: dict, qty: np.ndarray) -> tuple:
+    """제품 생산량을 제품-라인 쌍에 균등 분할 → (쌍별 수량, 라인 부하 Series)"""
+    pairs = inst["pairs"]
+    pi = inst["products"].get_indexer(pairs["product_id"])
+    share = 1.0 / np.bincount(pi, minlength=len(inst["products"]))[pi]
+    pair_qty = qty[pi] * share
+    load = pd.Series(pair_qty).groupby(pairs["line_id"].to_numpy()).sum().reindex(inst["caps"].index)
+    return pair_qty, load.fillna(0)
+
+
+def greedy(inst: dict) -> np.ndarray:
+    """s7 greedy 규칙: 우선순위별 목표 소요를 제품 자체 캐파로 상한"""
+    need = np.where(inst["urgent"], inst["r90"], inst["r50"])
+    return np.where(inst["own_cap"] > 0, np.minimum(need, inst["own_cap"]), need)
+
+
+def scale_to_lines(inst: dict, qty: np.ndarray, max_rounds: int = 50) -> np.ndarray:
+    """라인 부하가 캐파를 넘는 라인의 생산량을 비례 축소 — 초과 라인이 없을 때까지 반복
+
+    제품 생산량은 라인에 균등 분할되므로 한 라인에서 줄인 몫이 재분할 시 다른 라인으로 옮겨가
+    초과가 다시 생김. max_rounds 안에 해소되지 않으면 제품별 최소 축소율로 마무리 (모든 라인 캐파 이하)
+    """
+    caps = inst["caps"]
+    pi = inst["products"].get_indexer(inst["pairs"]["product_id"])
+    line_ids = inst["pairs"]["line_id"]
+    for _ in range(max_rounds):
+        pair_qty, load = line_loads(inst, qty)
+        if (load <= caps).all():
+            return qty
+        factor = np.minimum(1.0, caps / load.where(load > 0, 1.0)).reindex(line_ids).to_numpy()
+        qty = np.bincount(pi, weights=pair_qty * factor, minlength=len(qty))
+
+    # 남은 (부동소수 수준 포함) 초과 — 제품 단위 축소는 재분할 후에도 모든 라인 부하를 캐파 이하로 유지
+    _, load = line_loads(inst, qty)
+    factor = np.minimum(1.0, caps / load.where(load > 0, 1.0)).reindex(line_ids).to_numpy()
+    product_factor = np.ones(len(qty))
+    np.minimum.at(product_factor, pi, factor)
+    return qty * product_factor
+
+
+def overload(inst: dict, qty: np.ndarray, load: pd.Series | None = None) -> float:
+    if load is None:
+        _, load = line_loads(inst, qty)
+    return float(np.maximum(load - inst["caps"], 0).sum())
+
+
+def bench(n_skus: int, mip: bool = False) -> list:
+    inst = make_instance(n_skus)
+    args = (inst["r50"], inst["r90"], inst["stockout_w"], inst["holding_w"])
+    rows = []
+
+    t0 = time.perf_counter()
+    g = greedy(inst)
+    t_g = time.perf_counter() - t0
+    rows.append(("greedy", t_g, plan_cost(g, *args), overload(inst, g)))
+
+    t0 = time.perf_counter()
+    gs = scale_to_lines(inst, g)
+    rows.append(("greedy*", t_g + time.perf_counter() - t0, plan_cost(gs, *args), overload(inst, gs)))
+
+    for name, integer in [("lp", False)] + ([("mip", True)] if mip else []):
+        t0 = time.perf_counter()
+        sol = solve_plan(inst["products"], inst["r50"], inst["r90"], inst["pairs"], inst["caps"],
+                         stockout_w=inst["stockout_w"], holding_w=inst["holding_w"], integer=integer)
+        rows.append((name, time.perf_counter() - t0, plan_cost(sol["qty"], *args),
+                     overload(inst, sol["qty"], sol["line_load"])))
+    return [(n_skus, len(inst["caps"]), *r) for r in rows]
+
+
+def main():
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    sizes = [int(s) for s in opts.get("skus", "1000,5000,20000").split(",")]
+    mip = "--mip" in sys.argv
+
+    print(f"{'SKU':>7} {'라인':>5} {'방식':>8} {'시간(s)':>8} {'비용':>12} "
+          f"{'P50미달':>11} {'P90미달':>11} {'초과생산':>11} {'라인초과':>11}")
+    for n in sizes:
+        for n_skus, n_lines, name, secs, cost, over in bench(n, mip):
+            print(f"{n_skus:>7,} {n_lines:>5,} {name:>8} {secs:>8.2f} {cost['cost']:>12,.0f} "
+                  f"{cost['short_p50']:>11,.0f} {cost['short_p90']:>11,.0f} "
+                  f"{cost['excess']:>11,.0f} {over:>11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
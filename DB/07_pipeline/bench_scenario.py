@@ -0,0 +1,82 @@
+"""
+재고정책 몬테카를로 시뮬레이션 벤치마크 — scenario_engine.py (SKU 청크 × 시나리오 × 일 벡터 전개)
+─────────────────────────────────────────
+합성 인스턴스 (DB 불필요): SKU 수 N
+  - 예측 분위: horizon 28일 누적 P50 = 감마 분포, P90 / P10 = P50 × (1.2~2.5) / (0.3~0.9)
+  - 리드타임 통계: 중앙값 3~30일, P90 = 중앙값 × 1.1~2.0, 최소 1일 / 최대 = P90 × 1.5
+  - 정책: 현행 ROP 규칙 (s9 current_policies, 서비스 수준 안전재고 일수) — (r, Q) / (s, S)
+측정: 소요 시간, 청크 크기, 최대 RSS (메모리 예산 준수 확인), 정책별 평균 충족률·기대 결품
+─────────────────────────────────────────
+실행:
+  cd DB/07_pipeline && python bench_scenario.py
+  python bench_scenario.py --skus=1000,10000 --scenarios=1000 --memory=256
+"""
+
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from config import SCENARIO_DAYS, SCENARIO_MEMORY_MB
+from frame_utils import format_rss
+from scenario_engine import fit_demand, fit_lead_time, simulate_policies, chunk_size
+from safety_stock import build_safety_stock
+from s9_policy_simulation import current_policies
+
+
+def make_instance(n_skus: int, seed: int = 0) -> dict:
+    """합성 예측 분위·리드타임 통계·재고 인스턴스"""
+    rng = np.random.default_rng(seed)
+    p50 = rng.gamma(1.5, 200.0, n_skus)
+    p50[rng.random(n_skus) < 0.05] = 0               # 수요 없는 SKU
+    med = rng.uniform(3, 30, n_skus)
+    p90 = med * rng.uniform(1.1, 2.0, n_skus)
+    demand = fit_demand(p50 * rng.uniform(0.3, 0.9, n_skus), p50,
+                        p50 * rng.uniform(1.2, 2.5, n_skus), np.full(n_skus, 28))
+    lead = fit_lead_time(med, p90, np.ones(n_skus), p90 * 1.5)
+    safety = build_safety_stock(
+        pd.RangeIndex(n_skus),
+        pd.DataFrame({"mean": demand["mean"], "std": demand["std"], "source": "forecast"}),
+        pd.DataFrame({"avg_lead_days": med * 1.1, "med_lead_days": med, "p90_lead_days": p90}),
+    )
+    return {
+        "demand": demand,
+        "lead": lead,
+        "lead_avg": med * 1.1,
+        "safety_days": safety["safety_days"].to_numpy(),
+        "on_hand": p50 * rng.uniform(0.0, 1.5, n_skus),
+    }
+
+
+def main():
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    sizes = [int(s) for s in opts.get("skus", "1000,10000").split(",")]
+    n_scenarios = int(opts.get("scenarios", 1000))
+    n_days = int(opts.get("days", SCENARIO_DAYS))
+    memory_mb = float(opts.get("memory", SCENARIO_MEMORY_MB))
+    step = chunk_size(n_scenarios, n_days, memory_mb)
+    print(f"시나리오 {n_scenarios:,} × {n_days}일, 메모리 예산 {memory_mb:,.0f} MB "
+          f"→ 청크 {step:,} SKU")
+
+    print(f"{'SKU':>7} {'정책':>4} {'시간(s)':>8} {'충족률':>7} {'결품확률':>8} "
+          f"{'기대결품':>12} {'평균재고':>12} {'최대RSS':>10}")
+    for n in sizes:
+        inst = make_instance(n)
+        pol = current_policies(inst["demand"], inst["lead_avg"], inst["safety_days"])
+        for name, kwargs in (("rop", {"Q": pol["Q"]}), ("ss", {"S": pol["S"]})):
+            t0 = time.perf_counter()
+            res = simulate_policies(inst["demand"], inst["lead"], inst["on_hand"], pol["r"],
+                                    n_scenarios=n_scenarios, n_days=n_days,
+                                    memory_mb=memory_mb, **kwargs)
+            secs = time.perf_counter() - t0
+            print(f"{n:>7,} {name:>4} {secs:>8.2f} {res['fill_rate'].mean():>7.3f} "
+                  f"{res['stockout_prob'].mean():>8.3f} {res['expected_stockout'].sum():>12,.0f} "
+                  f"{res['avg_inventory'].sum():>12,.0f} {format_rss():>10}")
+
+
+if __name__ == "__main__":
+    main()
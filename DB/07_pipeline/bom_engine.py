@@ -0,0 +1,164 @@
+"""
+다단계 BOM 전개 엔진 — bom 그래프 위상 정렬 + 전개 소요량 행렬 (CSR)
+s5_risk_score.py (BOM 원가) / s8_purchase_optimization.py (총소요량) 에서 사용
+
+  - 품목 인덱스: bom 의 parent ∪ component
+  - direct[p, c] = 1단계 사용량 (동일 부모-자재 중복 행은 합산)
+  - 높이(height) = 최하위 자재까지 최장 경로 길이 (자재 없는 품목 = 0)
+    out-degree 0 품목부터 부모 방향으로 한 단계씩 진행 (Kahn) — 끝까지 남는 품목이 있으면 순환
+    → 순환 구성 품목 (강연결 요소) 을 경고 출력 후 그 품목의 bom 행을 제외하고 전개
+  - total = direct + direct² + … : 높이 h 품목 행 = direct[h] @ (I + total)
+    (하위 높이 행은 이미 확정이므로 높이 순으로 1회씩 계산)
+  - 총소요량 = 계획수량 벡터 @ total  (희소 행렬-벡터 곱 1회)
+  - 원가 롤업 = 높이 순으로 자체 구매단가 우선, 없으면 하위 품목 원가 × 1단계 사용량 합
+
+구매 대상은 하위 자재가 없는 말단 품목(leaf) — 반제품(sub-assembly)은 전개만 하고 발주하지 않음.
+전개 결과는 bom 테이블 지문(행 수·최대 id)이 같으면 프로세스 내에서 재사용.
+"""
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+from cache_utils import sources_fingerprint
+from frame_utils import fetch_frame
+
+BOM_SOURCES = [("bom", None, "id")]
+BOM_SCHEMA = {"parent_product_id": "str", "component_product_id": "str", "usage_qty": "float64"}
+
+_memo: dict = {}        # bom 지문 → bom_matrices() 결과
+
+
+# ─────────────────────────────────────────────────────────────
+# 1) 그래프 → 행렬
+# ─────────────────────────────────────────────────────────────
+
+def bom_heights(n: int, parent: np.ndarray, comp: np.ndarray) -> np.ndarray:
+    """품목별 높이 (말단 = 0). 순환에 걸린 품목(및 그 상위 품목)은 -1"""
+    remaining = np.bincount(parent, minlength=n)
+    height = np.full(n, -1, dtype=np.int64)
+    frontier = np.flatnonzero(remaining == 0)
+    level = 0
+    while frontier.size:
+        height[frontier] = level
+        done = np.zeros(n, dtype=bool)
+        done[frontier] = True
+        remaining -= np.bincount(parent[done[comp]], minlength=n)
+        frontier = np.flatnonzero((remaining == 0) & (height < 0))
+        level += 1
+    return height
+
+
+def cycle_members(n: int, parent: np.ndarray, comp: np.ndarray) -> np.ndarray:
+    """순환 구성 품목 여부 (bool 배열) — 크기 2 이상 강연결 요소 + 자기 참조 품목"""
+    graph = sp.csr_matrix((np.ones(len(parent)), (parent, comp)), shape=(n, n))
+    _, label = connected_components(graph, directed=True, connection="strong")
+    member = np.bincount(label, minlength=n)[label] > 1
+    member[parent[parent == comp]] = True
+    return member
+
+
+def _keep_columns(mat: sp.csr_matrix, mask: np.ndarray) -> sp.csr_matrix:
+    """mask 열만 남긴 같은 크기의 CSR (나머지 열은 0)"""
+    out = (mat @ sp.diags(mask.astype(float))).tocsr()
+    out.eliminate_zeros()
+    return out
+
+
+def bom_matrices(edges: pd.DataFrame) -> dict:
+    """bom 행 (parent_product_id, component_product_id, usage_qty) → 전개 행렬
+
+    Returns:
+        {"items": pd.Index, "direct": csr, "total": csr, "leaf_total": csr (말단 열만),
+         "height": int 배열, "leaf": bool 배열}
+
+    순환 참조가 있으면 구성 품목을 경고 출력하고 그 품목이 부모·자재인 행을 제외 (상위 품목은 나머지 자재로 전개)
+    """
+    edges = edges.dropna(subset=["parent_product_id", "component_product_id"])
+    items = pd.Index(pd.unique(np.concatenate([
+        edges["parent_product_id"].to_numpy(dtype=object),
+        edges["component_product_id"].to_numpy(dtype=object),
+    ])))
+    n = len(items)
+    parent = items.get_indexer(edges["parent_product_id"])
+    comp = items.get_indexer(edges["component_product_id"])
+    usage = edges["usage_qty"].fillna(0).to_numpy(dtype=float)
+
+    direct = sp.csr_matrix((usage, (parent, comp)), shape=(n, n))     # 중복 (p, c) 합산
+    height = bom_heights(n, parent, comp)
+    if (height < 0).any():
+        cyclic = cycle_members(n, parent, comp)
+        print(f"    [!] BOM 순환 참조: {int(cyclic.sum())}개 품목 제외 (예: {list(items[cyclic][:10])})")
+        return bom_matrices(edges[~(cyclic[parent] | cyclic[comp])])
+
+    total = sp.csr_matrix((n, n))
+    eye = sp.identity(n, format="csr")
+    for h in range(1, int(height.max(initial=0)) + 1):
+        rows = sp.diags((height == h).astype(float))
+        total = total + rows @ direct @ (eye + total)
+    total = total.tocsr()
+    total.eliminate_zeros()
+    leaf = np.bincount(parent, minlength=n) == 0
+
+    return {
+        "items": items,
+        "direct": direct,
+        "total": total,
+        "leaf_total": _keep_columns(total, leaf),
+        "height": height,
+        "leaf": leaf,
+    }
+
+
+def load_bom(force: bool = False) -> dict:
+    """bom 테이블 → bom_matrices() (테이블 지문이 같으면 이전 결과 재사용)"""
+    fingerprint = sources_fingerprint(BOM_SOURCES)
+    if not force and fingerprint in _memo:
+        return _memo[fingerprint]
+
+    bom = bom_matrices(fetch_frame("bom", BOM_SCHEMA))
+    _memo.clear()
+    _memo[fingerprint] = bom
+    print(f"    BOM 전개: 품목 {len(bom['items']):,}, 1단계 {bom['direct'].nnz:,} → "
+          f"전개 {bom['total'].nnz:,} (최대 {int(bom['height'].max(initial=0))}단계)")
+    return bom
+
+
+# ─────────────────────────────────────────────────────────────
+# 2) 전개 / 원가 롤업
+# ─────────────────────────────────────────────────────────────
+
+def explode(bom: dict, qty: pd.Series, leaf_only: bool = True) -> pd.Series:
+    """{품목: 계획수량} → {자재: 총소요량} — 계획수량 벡터 @ 전개 행렬
+
+    BOM 에 없는 품목의 수량은 무시. leaf_only=False 면 반제품 소요량도 포함
+    """
+    idx = bom["items"].get_indexer(qty.index)
+    known = idx >= 0
+    vec = np.bincount(idx[known], weights=qty.to_numpy(dtype=float)[known],
+                      minlength=len(bom["items"]))
+    mat = bom["leaf_total"] if leaf_only else bom["total"]
+    gross = mat.T @ vec
+    nz = np.flatnonzero(gross)
+    return pd.Series(gross[nz], index=bom["items"][nz])
+
+
+def rollup_cost(bom: dict, unit_price: pd.Series) -> pd.Series:
+    """품목 단가 → 품목별 다단계 BOM 원가 (하위 자재 없는 품목 제외)
+
+    높이 순으로 자체 단가가 있으면 그 단가, 없으면 원가 있는 1단계 하위 품목의 (사용량 × 원가) 합
+    (구매 단가가 있는 반제품은 그 아래를 전개하지 않음). 원가 있는 하위 품목이 없으면 제외
+    """
+    price = unit_price.reindex(bom["items"]).to_numpy(dtype=float)
+    direct, height = bom["direct"], bom["height"]
+    cost = np.where(height == 0, price, np.nan)
+    for h in range(1, int(height.max(initial=0)) + 1):
+        rows = np.flatnonzero(height == h)
+        sub = direct[rows]
+        known = ~np.isnan(cost)
+        has = (sub.astype(bool) @ known) > 0
+        rolled = np.where(has, sub @ np.where(known, cost, 0.0), np.nan)
+        cost[rows] = np.where(np.isnan(price[rows]), rolled, price[rows])
+    keep = ~bom["leaf"] & ~np.isnan(cost)
+    return pd.Series(cost[keep], index=bom["items"][keep])
@@ -0,0 +1,291 @@
+"""
+파이프라인 캐시 유틸리티 — 소스 테이블 지문(fingerprint) + 산출물 메타 관리
+external_panel.py 등 사전 집계 산출물에서 공유
+
+지문 = 테이블별 (행 수, 최신 타임스탬프, 최대 id) → SHA-1 요약
+pipeline_artifact 테이블에 저장된 지문과 같으면 재생성 생략
+산출물 값 = 제품 단위 중간 산출물 행 (pipeline_artifact_value) — cached_values()로 조회/재생성
+워터마크 = 증분 스텝이 마지막으로 처리한 소스 테이블 최대 id (pipeline_watermark)
+실행 원장 = run_pipeline 스텝별 실행 이력 + 입력 지문 (pipeline_run_ledger) — 입력 불변 스텝 건너뜀
+"""
+
+import hashlib
+import json
+
+import pandas as pd
+
+from config import supabase, upsert_batch
+from frame_utils import ddl_schema, iter_json_rows
+
+ARTIFACT_TABLE = "pipeline_artifact"
+
+
+def _is_missing_table(e: Exception) -> bool:
+    return "PGRST205" in str(e) or "Could not find" in str(e)
+
+
+def table_fingerprint(table: str, ts_col: str | None = None,
+                      id_col: str | None = "id") -> dict:
+    """단일 테이블 지문: {table, count, max_ts, max_id}
+
+    행 수는 count="exact", 최신값은 desc 정렬 후 1행만 조회 (전체 스캔 없음)
+    """
+    cols = [c for c in (id_col, ts_col) if c]
+    select = ",".join(cols) if cols else "*"
+    try:
+        q = supabase.table(table).select(select, count="exact")
+        if ts_col:
+            q = q.order(ts_col, desc=True, nullsfirst=False)
+        elif id_col:
+            q = q.order(id_col, desc=True)
+        resp = q.limit(1).execute()
+    except Exception as e:
+        if _is_missing_table(e):
+            return {"table": table, "count": 0, "max_ts": None, "max_id": None}
+        raise
+
+    top = resp.data[0] if resp.data else {}
+    max_id = top.get(id_col) if id_col else None
+    if ts_col and id_col:
+        # 타임스탬프 정렬 결과의 id는 최대 id가 아닐 수 있어 별도 조회
+        id_resp = (supabase.table(table).select(id_col)
+                   .order(id_col, desc=True).limit(1).execute())
+        max_id = id_resp.data[0][id_col] if id_resp.data else None
+
+    return {
+        "table": table,
+        "count": resp.count or 0,
+        "max_ts": top.get(ts_col) if ts_col else None,
+        "max_id": max_id,
+    }
+
+
+def sources_fingerprint(sources: list[tuple], extra=None) -> str:
+    """여러 소스 테이블 지문 → 하나의 해시 문자열
+
+    Args:
+        sources: [(table, ts_col, id_col), ...]  (ts_col/id_col은 None 허용)
+        extra: 산출 결과를 좌우하는 소스 외 파라미터 (예: 기준일) — 지문에 포함
+    """
+    parts = [table_fingerprint(*src) for src in sources]
+    if extra is not None:
+        parts.append({"extra": extra})
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def get_artifact(key: str) -> dict | None:
+    """pipeline_artifact 조회 (테이블 미존재 시 None)"""
+    try:
+        resp = (supabase.table(ARTIFACT_TABLE).select("*")
+                .eq("artifact_key", key).limit(1).execute())
+    except Exception as e:
+        if _is_missing_table(e):
+            print(f"    [!] 테이블 '{ARTIFACT_TABLE}' 미존재 — 캐시 없이 진행")
+            return None
+        raise
+    return resp.data[0] if resp.data else None
+
+
+def is_fresh(key: str, fingerprint: str) -> bool:
+    """저장된 지문과 현재 지문이 같으면 True"""
+    art = get_artifact(key)
+    return bool(art and art.get("fingerprint") == fingerprint)
+
+
+def save_artifact(key: str, fingerprint: str, row_count: int):
+    """산출물 재생성 완료 후 지문 기록"""
+    from datetime import datetime, timezone
+
+    try:
+        supabase.table(ARTIFACT_TABLE).upsert({
+            "artifact_key": key,
+            "fingerprint": fingerprint,
+            "row_count": row_count,
+            "built_at": datetime.now(timezone.utc).isoformat(),
+        }, on_conflict="artifact_key").execute()
+    except Exception as e:
+        if _is_missing_table(e):
+            print(f"    [!] 테이블 '{ARTIFACT_TABLE}' 미존재 — 지문 저장 생략")
+            return
+        raise
+
+
+def invalidate_artifact(key: str):
+    """지문 제거 → 다음 조회 시 강제 재생성"""
+    try:
+        supabase.table(ARTIFACT_TABLE).update(
+            {"fingerprint": None}
+        ).eq("artifact_key", key).execute()
+    except Exception as e:
+        if not _is_missing_table(e):
+            raise
+
+
+# ─────────────────────────────────────────────────────────────
+# 산출물 값 (제품 단위 중간 산출물)
+# ─────────────────────────────────────────────────────────────
+
+ARTIFACT_VALUE_TABLE = "pipeline_artifact_value"
+VALUE_COLS = ["product_id", "ref_date", "metric_value"]
+
+
+def load_artifact_values(key: str) -> pd.DataFrame | None:
+    """pipeline_artifact_value 조회 → (product_id, ref_date, metric_value). 테이블 미존재 시 None"""
+    all_rows, offset, ps = [], 0, 1000
+    while True:
+        try:
+            resp = (supabase.table(ARTIFACT_VALUE_TABLE)
+                    .select(",".join(VALUE_COLS))
+                    .eq("artifact_key", key)
+                    .order("id")
+                    .range(offset, offset + ps - 1)
+                    .execute())
+        except Exception as e:
+            if _is_missing_table(e):
+                return None
+            raise
+        if not resp.data:
+            break
+        all_rows.extend(resp.data)
+        if len(resp.data) < ps:
+            break
+        offset += ps
+
+    df = pd.DataFrame(all_rows, columns=VALUE_COLS)
+    df["metric_value"] = pd.to_numeric(df["metric_value"], errors="coerce")
+    return df
+
+
+def save_artifact_values(key: str, fingerprint: str, df: pd.DataFrame):
+    """산출물 값 교체 (무효화 → 삭제 → 적재 → 지문 기록). 중간 실패 시 다음 실행에서 재생성"""
+    invalidate_artifact(key)
+    try:
+        supabase.table(ARTIFACT_VALUE_TABLE).delete().eq("artifact_key", key).execute()
+    except Exception as e:
+        if _is_missing_table(e):
+            print(f"    [!] 테이블 '{ARTIFACT_VALUE_TABLE}' 미존재 — 산출물 저장 생략")
+            return
+        raise
+
+    out = df[VALUE_COLS].copy()
+    out.insert(0, "artifact_key", key)
+    cnt = upsert_batch(ARTIFACT_VALUE_TABLE,
+                       iter_json_rows(out, ddl_schema("18_pipeline_cache_ddl.sql", ARTIFACT_VALUE_TABLE)))
+    save_artifact(key, fingerprint, cnt)
+
+
+def cached_values(key: str, sources: list[tuple], build, extra=None,
+                  force: bool = False) -> pd.DataFrame:
+    """소스 지문이 같으면 저장된 산출물 값, 아니면 build() 재계산 후 저장
+
+    지문은 행 수·최대 id·최신 타임스탬프 기준이라 기존 행의 in-place UPDATE는
+    감지하지 못함 → 필요 시 force=True 또는 invalidate_artifact(key)
+
+    Args:
+        build: () → DataFrame(product_id, [ref_date], metric_value)
+    Returns:
+        DataFrame(product_id, ref_date, metric_value) — ref_date는 'YYYY-MM-DD' 문자열 또는 None
+    """
+    fingerprint = sources_fingerprint(sources, extra)
+    if not force and is_fresh(key, fingerprint):
+        df = load_artifact_values(key)
+        if df is not None:
+            print(f"    {key}: 소스 변경 없음 — 캐시 {len(df):,}행 사용")
+            return df
+
+    df = build()
+    if "ref_date" not in df.columns:
+        df["ref_date"] = None
+    df = df[VALUE_COLS].reset_index(drop=True)
+    # 저장 정밀도 NUMERIC(18,6)와 동일하게 맞춰 캐시 적중/재계산 결과를 일치시킴
+    df["metric_value"] = pd.to_numeric(df["metric_value"], errors="coerce").astype(float).round(6)
+    save_artifact_values(key, fingerprint, df)
+    print(f"    {key}: 재계산 {len(df):,}행")
+    return df
+
+
+# ─────────────────────────────────────────────────────────────
+# 워터마크 (증분 처리 위치)
+# ─────────────────────────────────────────────────────────────
+
+WATERMARK_TABLE = "pipeline_watermark"
+
+
+def max_id(table: str, id_col: str = "id") -> int | None:
+    """테이블 최대 id (테이블 미존재·빈 테이블 시 None)"""
+    try:
+        resp = (supabase.table(table).select(id_col)
+                .order(id_col, desc=True).limit(1).execute())
+    except Exception as e:
+        if _is_missing_table(e):
+            return None
+        raise
+    return resp.data[0][id_col] if resp.data else None
+
+
+def get_watermarks(prefix: str) -> dict | None:
+    """prefix로 시작하는 워터마크 → {key: {"max_id", "max_value"}} (테이블 미존재 시 None)"""
+    try:
+        resp = (supabase.table(WATERMARK_TABLE)
+                .select("watermark_key,max_id,max_value")
+                .like("watermark_key", f"{prefix}%").execute())
+    except Exception as e:
+        if _is_missing_table(e):
+            print(f"    [!] 테이블 '{WATERMARK_TABLE}' 미존재 — 전체 재계산")
+            return None
+        raise
+    return {r["watermark_key"]: r for r in resp.data or []}
+
+
+def save_watermarks(marks: dict):
+    """{key: {"max_id": int | None, "max_value": str | None}} UPSERT"""
+    from datetime import datetime, timezone
+
+    now = datetime.now(timezone.utc).isoformat()
+    rows = [{"watermark_key": k, "max_id": v.get("max_id"),
+             "max_value": v.get("max_value"), "updated_at": now}
+            for k, v in marks.items()]
+    try:
+        supabase.table(WATERMARK_TABLE).upsert(rows, on_conflict="watermark_key").execute()
+    except Exception as e:
+        if _is_missing_table(e):
+            print(f"    [!] 테이블 '{WATERMARK_TABLE}' 미존재 — 워터마크 저장 생략")
+            return
+        raise
+
+
+# ─────────────────────────────────────────────────────────────
+# 스텝 실행 원장 (run_pipeline 입력 불변 스텝 건너뜀)
+# ─────────────────────────────────────────────────────────────
+
+LEDGER_TABLE = "pipeline_run_ledger"
+
+
+def last_success(step_keys: list) -> dict | None:
+    """step_keys 중 가장 최근 성공 (status='ok') 실행 행 (원장 미존재·이력 없음 시 None)"""
+    try:
+        resp = (supabase.table(LEDGER_TABLE)
+                .select("step_key,fingerprint,code_version,finished_at")
+                .in_("step_key", list(step_keys)).eq("status", "ok")
+                .order("id", desc=True).limit(1).execute())
+    except Exception as e:
+        if _is_missing_table(e):
+            return None
+        raise
+    return resp.data[0] if resp.data else None
+
+
+def record_run(row: dict):
+    """스텝 실행 1건 기록 {run_id, step_key, status, fingerprint, code_version, started_at, ...}"""
+    from datetime import datetime, timezone
+
+    try:
+        supabase.table(LEDGER_TABLE).insert(
+            {**row, "finished_at": datetime.now(timezone.utc).isoformat()}
+        ).execute()
+    except Exception as e:
+        if _is_missing_table(e):
+            print(f"    [!] 테이블 '{LEDGER_TABLE}' 미존재 — 실행 기록 생략 (입력 불변 스텝도 매번 실행)")
+            return
+        raise
@@ -0,0 +1,177 @@
+"""
+고객 집중도 (customer_concentration) — 제품×기간별 HHI, top1/3 거래처 비중
+weekly_customer_summary / monthly_customer_summary → (grain, product_id, period_key)
+
+제품×기간 그룹별 Python 루프 대신 정렬 + groupby().cumcount()/transform 으로 일괄 계산.
+S0 가 기록한 변경 기간·id 워터마크 초과 신규 행의 최초 기간부터만 소스 재조회·재계산,
+값이 바뀐 제품×기간만 UPSERT, 소스에서 사라진 제품×기간은 삭제. 변경 없으면 소스 조회 없이 캐시 사용.
+
+입력 테이블: weekly_customer_summary, monthly_customer_summary
+출력 테이블: customer_concentration
+
+실행: python DB/07_pipeline/concentration.py [--full]
+"""
+
+import numpy as np
+import pandas as pd
+
+from cache_utils import _is_missing_table, get_watermarks, save_watermarks, table_fingerprint
+from config import supabase, upsert_batch
+from frame_utils import changed_mask, ddl_schema, fetch_frame, fetch_schema, iter_json_rows
+
+CONC_TABLE = "customer_concentration"
+CONC_SCHEMA = ddl_schema("18_pipeline_cache_ddl.sql", CONC_TABLE)
+CONC_COLS = ["top1_customer_pct", "top3_customer_pct", "customer_hhi"]
+
+# grain → (소스 테이블, 기간 컬럼)
+CONC_SOURCES = {
+    "weekly": ("weekly_customer_summary", "year_week"),
+    "monthly": ("monthly_customer_summary", "year_month"),
+}
+
+
+# ─────────────────────────────────────────────────────────────
+# 1) 벡터화 계산
+# ─────────────────────────────────────────────────────────────
+
+def concentration_frame(df: pd.DataFrame, period_col: str) -> pd.DataFrame:
+    """거래처 행 (product_id, period_col, order_qty) → 제품×기간별 집중도
+
+    - share = 거래처 수주량 / 그룹 합계 (합계 ≤ 0 이면 0)
+    - 그룹 내 수주량 내림차순 순위(cumcount) 0 → top1, 0~2 → top3
+    - HHI = Σ share²
+    """
+    keys = ["product_id", period_col]
+    if df.empty:
+        return pd.DataFrame(columns=keys + CONC_COLS)
+
+    d = df[keys].copy()
+    qty = pd.to_numeric(df["order_qty"], errors="coerce").fillna(0)
+    d["order_qty"] = qty.astype(float).to_numpy()
+    d = d.sort_values(keys + ["order_qty"], ascending=[True, True, False], kind="mergesort")
+
+    g = d.groupby(keys, sort=False)
+    total = g["order_qty"].transform("sum").to_numpy()
+    qty = d["order_qty"].to_numpy()
+    share = np.divide(qty, total, out=np.zeros_like(qty), where=total > 0)
+    rank = g.cumcount().to_numpy()
+
+    d["top1_customer_pct"] = np.where(rank == 0, share, 0.0)
+    d["top3_customer_pct"] = np.where(rank < 3, share, 0.0)
+    d["customer_hhi"] = share ** 2
+
+    out = d.groupby(keys, sort=False)[CONC_COLS].sum().reset_index()
+    out["top1_customer_pct"] = (out["top1_customer_pct"] * 100).round(2)
+    out["top3_customer_pct"] = (out["top3_customer_pct"] * 100).round(2)
+    out["customer_hhi"] = out["customer_hhi"].round(4)
+    return out
+
+
+# ─────────────────────────────────────────────────────────────
+# 2) 증분 갱신 / 조회
+# ─────────────────────────────────────────────────────────────
+
+def changed_from_key(table: str) -> str:
+    """S0 가 기록하는 소스 변경 최초 기간 워터마크 키 (s0_aggregation.upsert_changed)"""
+    return f"s0.{table}.changed_from"
+
+
+def _fetch_source(table: str, period_col: str, since: str | None = None) -> pd.DataFrame:
+    """소스 거래처 집계 (product_id, period_col, order_qty) 조회 — since 지정 시 period_col >= since 만
+    (테이블 미존재 시 빈 데이터)"""
+    try:
+        return fetch_frame(table, {"product_id": "str", period_col: "str", "order_qty": "float64"},
+                           filters=[("gte", period_col, since)] if since else None)
+    except Exception as e:
+        if not _is_missing_table(e):
+            raise
+        print(f"    [!] 테이블 '{table}' 미존재 — 빈 데이터로 진행")
+        return pd.DataFrame(columns=["product_id", period_col, "order_qty"])
+
+
+def _changed_since(table: str, period_col: str, mark: dict, s0_mark: dict) -> tuple:
+    """증분 재계산 시작 기간 → (since, 전체 재계산 여부, 현재 지문)
+
+    - S0 기록 변경 기간 (제자리 UPSERT 정정 포함)
+    - id 워터마크 초과 신규 행의 최초 기간
+    - 행 수 = 저장 행 수 + 신규 행 수 가 아니면 (소스 행 삭제) 전체 재계산
+    """
+    fp = table_fingerprint(table)
+    after_id = int(mark.get("max_id") or 0)
+    new = (fetch_frame(table, {period_col: "str"}, filters=[("gt", "id", after_id)]) if fp["count"]
+           else pd.DataFrame(columns=[period_col]))
+    if fp["count"] != int(mark.get("max_value") or 0) + len(new):
+        return None, True, fp
+    firsts = [p for p in (s0_mark.get("max_value"), new[period_col].min() if len(new) else None) if p]
+    return (min(firsts) if firsts else None), False, fp
+
+
+def refresh_concentration(grain: str, full: bool = False) -> pd.DataFrame:
+    """변경된 기간부터 재계산 → 바뀐 제품×기간만 customer_concentration UPSERT, 사라진 제품×기간 삭제
+
+    - 변경 기준: S0 기록 변경 기간 ('s0.<table>.changed_from') + 소스 지문 (행 수·최대 id,
+      pipeline_watermark 'concentration.<grain>') — 변경 없으면 소스 조회 없이 캐시 반환
+    - 최초 변경 기간 이후 소스만 재조회·재계산, 그 기간 이후 캐시와 비교
+    - 소스 행 삭제 (행 수 불일치)·워터마크 없음·full=True 면 전체 기간 재계산
+    - 캐시 테이블 미존재 시 전체 계산 결과 반환 (적재 생략)
+
+    Returns: (product_id, year_week | year_month) × 집중도
+    """
+    table, period_col = CONC_SOURCES[grain]
+    try:
+        cached = fetch_frame(CONC_TABLE, fetch_schema(CONC_SCHEMA), filters=[("eq", "grain", grain)])
+    except Exception as e:
+        if not _is_missing_table(e):
+            raise
+        print(f"    [!] 테이블 '{CONC_TABLE}' 미존재 — 캐시 없이 전체 계산")
+        return concentration_frame(_fetch_source(table, period_col), period_col)
+
+    key, s0_key = f"concentration.{grain}", changed_from_key(table)
+    marks = get_watermarks(key) or {}
+    s0_mark = (get_watermarks(s0_key) or {}).get(s0_key) or {}
+    full = full or key not in marks
+    since, rebuild, fp = _changed_since(table, period_col, marks.get(key, {}), s0_mark)
+    full = full or rebuild
+    if not full and since is None:
+        print(f"    고객 집중도({grain}): 소스 변경 없음 — 캐시 {len(cached):,}건 사용")
+        return cached[["product_id", "period_key"] + CONC_COLS].rename(columns={"period_key": period_col})
+    since = None if full else since
+
+    df_src = _fetch_source(table, period_col, since)
+    conc = concentration_frame(df_src, period_col)
+    out = conc.rename(columns={period_col: "period_key"})
+    out.insert(0, "grain", grain)
+
+    keys = ["grain", "product_id", "period_key"]
+    scope = cached[cached["period_key"] >= since] if since else cached
+    writes = out[changed_mask(out, scope, keys, CONC_SCHEMA)]
+    stale = scope[~pd.MultiIndex.from_frame(scope[keys]).isin(pd.MultiIndex.from_frame(out[keys]))]
+    if not writes.empty:
+        upsert_batch(CONC_TABLE, iter_json_rows(writes, CONC_SCHEMA), on_conflict=",".join(keys))
+    for i in range(0, len(stale), 500):
+        ids = stale["id"].iloc[i:i + 500].astype(np.int64).tolist()
+        supabase.table(CONC_TABLE).delete().in_("id", ids).execute()
+    # 지문은 재조회 전 시점 값 — 그 사이 추가된 행은 다음 실행의 신규 행
+    save_watermarks({key: {"max_id": fp["max_id"], "max_value": str(fp["count"])},
+                     s0_key: {"max_id": None, "max_value": None}})
+
+    print(f"    고객 집중도({grain}): {f'{since} 이후' if since else '전체'} 소스 {len(df_src):,}행 → "
+          f"{len(conc):,}건 중 {len(writes):,}건 갱신, {len(stale):,}건 삭제")
+    keep = cached[cached["period_key"] < since] if since else cached.iloc[:0]
+    result = pd.concat([keep[["product_id", "period_key"] + CONC_COLS].rename(columns={"period_key": period_col}),
+                        conc], ignore_index=True)
+    return result
+
+
+def load_concentration(grain: str, full: bool = False) -> pd.DataFrame:
+    """증분 갱신 후 customer_concentration → (product_id, year_week | year_month) × 집중도"""
+    df = refresh_concentration(grain, full=full)
+    for c in CONC_COLS:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+    return df
+
+
+if __name__ == "__main__":
+    import sys
+    for g in CONC_SOURCES:
+        refresh_concentration(g, full="--full" in sys.argv)
@@ -6,8 +6,11 @@ import io
 import os
 import sys
 
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8", errors="replace")
+# 이미 UTF-8 로 감싼 경우 (DB/ 적재 스크립트가 import) 다시 감싸지 않음 — 이전 래퍼 GC 시 버퍼가 닫힘
+if (sys.stdout.encoding or "").lower() != "utf-8":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8", errors="replace")
+if (sys.stderr.encoding or "").lower() != "utf-8":
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8", errors="replace")
 
 from pathlib import Path
 
@@ -130,6 +133,15 @@ MONTHLY_CV_FOLDS = 2
 TUNING_METRIC = "pinball_p50"
 TUNE_SAMPLE_PRODUCTS = 30
 
+# ─── S1 일간 추정 재고 출력 ───
+# "dense": daily_inventory_estimated (제품 × 전체 일자)
+# "interval": daily_inventory_interval (값이 바뀌는 변화점 구간만)
+INVENTORY_OUTPUT_MODE = "dense"
+INVENTORY_PRODUCT_BATCH = 200       # dense 전개·적재 제품 배치 크기
+INVENTORY_INCREMENTAL = True        # 워터마크 이후 변경된 (제품, 월)만 재계산 (--full 로 전체)
+INVENTORY_WORKERS = 1               # 전체 재계산 병렬 프로세스 수 (1 = 단일 프로세스)
+INVENTORY_SHARD = "month"           # 병렬 샤드 기준: "month" | "product"
+
 # 리스크 가중치
 RISK_WEIGHTS = {
     "stockout": 0.35,
@@ -152,6 +164,20 @@ RISK_GRADE_BOUNDS = [
 PRODUCTION_PLAN_DAYS = 7            # 주간 생산계획 기간 (일)
 PRODUCTION_CAPACITY_BUFFER = 1.2    # 캐파시티 버퍼 (20%)
 PRODUCTION_LOOKBACK_DAYS = 90       # 캐파시티 산출 기준 기간 (일)
+PLAN_HORIZON_WEEKS = 4              # S7/S8 롤링 호라이즌 주차 수 (이번 주 포함, 지난 주차는 재계산하지 않음)
+
+# S7 계획 방식: "greedy" (제품별 자체 캐파 상한) | "lp" (공유 라인 캐파 LP/MIP 배분, production_lp.py)
+PRODUCTION_PLAN_MODE = "greedy"
+PRODUCTION_LP_COSTS = {             # 단위 수량당 비용 가중치
+    "stockout_p50": 1.0,            # P50 소요 미달
+    "stockout_p90": 0.15,           # P90 소요 미달 (P50~P90 꼬리)
+    "holding": 0.25,                # P50 소요 초과 생산 (보관)
+}
+PRODUCTION_LP_PRIORITY_WEIGHTS = {  # 결품 비용 배수 — critical/high 는 P90 까지, 그 외 P50 까지 생산
+    "critical": 4.0, "high": 2.0, "medium": 1.5, "low": 1.0,
+}
+PRODUCTION_LP_INTEGER = False       # True: 생산량 정수 (MIP), False: LP
+PRODUCTION_LP_TIME_LIMIT = 60       # 솔버 시간 제한 (초)
 
 ORDERING_COST = 50000               # 1회 발주 비용 (원)
 HOLDING_RATE = 0.20                 # 연간 재고 보관비율 (단가 대비)
@@ -161,6 +187,23 @@ SUPPLIER_WEIGHTS = {
     "reliability": 0.25,            # 납기 준수율 높을수록 우수
 }
 
+# S8 기간별 MRP (planned_order) — 리드타임 역산 계획 발주
+MRP_TIME_PHASED = True              # 주차별 추천 외 기간별 계획 발주도 산출 (--phased=0 로 끔)
+MRP_BUCKET = "week"                 # 버킷 단위: "day" | "week"
+
+# S9 재고정책 몬테카를로 시뮬레이션 (scenario_engine.py)
+SCENARIO_COUNT = 1000               # 수요·리드타임 시나리오 수
+SCENARIO_DAYS = 28                  # 시뮬레이션 기간 (일) — 주간 예측 최대 horizon
+SCENARIO_MEMORY_MB = 512            # (시나리오 × SKU × 일) 배열 메모리 예산 — 초과 시 SKU 청크 분할
+SCENARIO_SEED = 42
+
+# 안전재고 (safety_stock.py) — SS = z(서비스 수준) × √(L × σ_d² + d² × σ_L²), s5 가 갱신·s5/s7/s8 조회
+SAFETY_SERVICE_LEVEL = 0.95         # 목표 서비스 수준 (사이클 결품 없음 확률)
+SAFETY_DEFAULT_CV = 0.5             # 수요 통계 (피처·예측) 없는 SKU 의 일 수요 변동계수
+
+# 파이프라인 실행기 (run_pipeline.py) — 스텝 입출력 테이블 기반 DAG 스케줄링
+PIPELINE_JOBS = 3                   # 동시 실행 스텝 수 (의존 관계 없는 스텝만 병렬, 1 = 순차)
+
 
 def get_risk_grade(score: float) -> str:
     for grade, upper in RISK_GRADE_BOUNDS:
@@ -169,14 +212,21 @@ def get_risk_grade(score: float) -> str:
     return "F"
 
 
-def upsert_batch(table: str, rows: list, batch_size: int = BATCH_SIZE,
+def upsert_batch(table: str, rows, batch_size: int = BATCH_SIZE,
                   on_conflict: str | None = None) -> int:
-    """배치 UPSERT (ON CONFLICT 활용) — 재시도 포함"""
+    """배치 UPSERT (ON CONFLICT 활용) — 재시도 포함
+
+    rows: list 또는 행 제너레이터 (frame_utils.iter_json_rows 등 스트리밍 입력 허용)
+    """
     import time
+    from itertools import islice
 
     total = 0
-    for i in range(0, len(rows), batch_size):
-        batch = rows[i : i + batch_size]
+    it = iter(rows)
+    while True:
+        batch = list(islice(it, batch_size))
+        if not batch:
+            break
         for attempt in range(MAX_RETRIES):
             try:
                 q = supabase.table(table)
@@ -193,3 +243,26 @@ def upsert_batch(table: str, rows: list, batch_size: int = BATCH_SIZE,
                     raise
         time.sleep(BATCH_DELAY)
     return total
+
+
+def fetch_all(table: str, select: str = "*", page_size: int = 1000) -> list:
+    """Supabase 테이블 전체 행 페이징 조회 (테이블 미존재 시 빈 리스트 반환)"""
+    all_rows, offset = [], 0
+    while True:
+        try:
+            resp = (supabase.table(table)
+                    .select(select)
+                    .range(offset, offset + page_size - 1)
+                    .execute())
+        except Exception as e:
+            if "PGRST205" in str(e) or "Could not find" in str(e):
+                print(f"    [!] 테이블 '{table}' 미존재 — 빈 데이터로 진행")
+                return []
+            raise
+        if not resp.data:
+            break
+        all_rows.extend(resp.data)
+        if len(resp.data) < page_size:
+            break
+        offset += page_size
+    return all_rows
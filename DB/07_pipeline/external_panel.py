@@ -0,0 +1,336 @@
+"""
+외부지표 패널 (external_indicator_panel) — 주간/월간 공용 사전 집계
+economic_indicator + exchange_rate + trade_statistics → (grain, period_key) × 지표
+
+거시 지표는 제품과 무관하고 최대 일 단위로만 바뀌므로 한 번 리샘플해 저장하고,
+s3(주간) / s3m(월간)은 load_panel()로 조회만 수행.
+소스 테이블 지문이 바뀌었거나 적재 스크립트(04/10/11/12)가 무효화한 경우에만 재생성.
+
+입력 테이블: economic_indicator, exchange_rate, trade_statistics, calendar_week
+출력 테이블: external_indicator_panel, pipeline_artifact
+
+실행: python DB/07_pipeline/external_panel.py [--force]
+"""
+
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from config import upsert_batch, fetch_all
+from cache_utils import invalidate_artifact, sources_fingerprint, is_fresh, save_artifact
+from frame_utils import ddl_schema, fetch_frame, iter_json_rows
+
+ARTIFACT_KEY = "external_indicator_panel"
+PANEL_TABLE = "external_indicator_panel"
+
+# 지문 산출 대상: (table, ts_col, id_col)
+PANEL_SOURCES = [
+    ("economic_indicator", "fetched_at", "id"),
+    ("exchange_rate", "fetched_at", "id"),
+    ("trade_statistics", "fetched_at", "id"),
+    ("calendar_week", "created_at", None),
+]
+
+# ── 지표 매핑 ──
+DAILY_INDICATORS = {
+    "SOX": "sox_index",
+    "BALTIC_DRY": "baltic_dry_index",
+    "COPPER_LME": "copper_lme",
+}
+WEEKLY_INDICATORS = {
+    "DRAM_DDR4": "dram_price",
+    "NAND_TLC": "nand_price",
+    "WTI_WEEKLY": "wti_price",
+}
+MONTHLY_INDICATORS = {
+    "SILICON_WAFER": "silicon_wafer_price",
+    "FEDFUNDS": "fed_funds_rate",
+    "INDPRO": "indpro_index",
+    "IPMAN": "ipman_index",
+    "KR_BASE_RATE": "kr_base_rate",
+    "KR_IPI_MFG": "kr_ipi_mfg",
+    "KR_BSI_MFG": "kr_bsi_mfg",
+    "CN_PMI_MFG": "cn_pmi_mfg",
+}
+# 월간 패널: 모두 월 평균으로 집계 (BDI/구리 제외)
+MONTHLY_PANEL_INDICATORS = {
+    "SOX": "sox_index",
+    "DRAM_DDR4": "dram_price",
+    "NAND_TLC": "nand_price",
+    "SILICON_WAFER": "silicon_wafer_price",
+    "FEDFUNDS": "fed_funds_rate",
+    "WTI_WEEKLY": "wti_price",
+    "INDPRO": "indpro_index",
+    "IPMAN": "ipman_index",
+    "KR_BASE_RATE": "kr_base_rate",
+    "KR_IPI_MFG": "kr_ipi_mfg",
+    "KR_BSI_MFG": "kr_bsi_mfg",
+    "CN_PMI_MFG": "cn_pmi_mfg",
+}
+CURRENCY_MAP = {
+    "USD": "usd_krw",
+    "JPY": "jpy_krw",
+    "EUR": "eur_krw",
+    "CNY": "cny_krw",
+}
+TRADE_COLS = ["semi_export_amt", "semi_import_amt", "semi_trade_balance", "semi_export_roc"]
+
+WEEKLY_PANEL_COLS = (
+    list(DAILY_INDICATORS.values()) + list(WEEKLY_INDICATORS.values())
+    + list(MONTHLY_INDICATORS.values()) + list(CURRENCY_MAP.values()) + TRADE_COLS
+)
+MONTHLY_PANEL_COLS = (
+    list(MONTHLY_PANEL_INDICATORS.values()) + list(CURRENCY_MAP.values()) + TRADE_COLS
+)
+PANEL_COLS = {"weekly": WEEKLY_PANEL_COLS, "monthly": MONTHLY_PANEL_COLS}
+PERIOD_COL = {"weekly": "year_week", "monthly": "year_month"}
+
+
+# ─────────────────────────────────────────────────────────────
+# 1) 소스 로드
+# ─────────────────────────────────────────────────────────────
+
+def load_sources() -> tuple:
+    """경제지표 / 환율 / 무역통계 → (econ_df, exrate_df, trade_df)"""
+    econ_rows = fetch_all("economic_indicator", "source,indicator_code,date,value")
+    econ_df = pd.DataFrame(econ_rows) if econ_rows else pd.DataFrame(
+        columns=["source", "indicator_code", "date", "value"]
+    )
+    if not econ_df.empty:
+        econ_df["date"] = pd.to_datetime(econ_df["date"])
+        econ_df["value"] = pd.to_numeric(econ_df["value"], errors="coerce")
+
+    exrate_rows = fetch_all("exchange_rate", "base_currency,rate_date,rate")
+    exrate_df = pd.DataFrame(exrate_rows) if exrate_rows else pd.DataFrame(
+        columns=["base_currency", "rate_date", "rate"]
+    )
+    if not exrate_df.empty:
+        exrate_df["rate_date"] = pd.to_datetime(exrate_df["rate_date"])
+        exrate_df["rate"] = pd.to_numeric(exrate_df["rate"], errors="coerce")
+
+    trade_rows = fetch_all("trade_statistics", "hs_code,year_month,export_amount,import_amount")
+    trade_df = pd.DataFrame(trade_rows) if trade_rows else pd.DataFrame(
+        columns=["hs_code", "year_month", "export_amount", "import_amount"]
+    )
+    if not trade_df.empty:
+        trade_df["export_amount"] = pd.to_numeric(trade_df["export_amount"], errors="coerce").fillna(0)
+        trade_df["import_amount"] = pd.to_numeric(trade_df["import_amount"], errors="coerce").fillna(0)
+
+    return econ_df, exrate_df, trade_df
+
+
+def _monthly_trade(trade_df: pd.DataFrame) -> pd.DataFrame:
+    """무역통계 → 월별 합계 + 수지 + 수출 변화율"""
+    monthly_trade = trade_df.groupby("year_month").agg(
+        semi_export_amt=("export_amount", "sum"),
+        semi_import_amt=("import_amount", "sum"),
+    ).reset_index()
+    monthly_trade["semi_trade_balance"] = (
+        monthly_trade["semi_export_amt"] - monthly_trade["semi_import_amt"]
+    )
+    monthly_trade = monthly_trade.sort_values("year_month")
+    monthly_trade["semi_export_roc"] = monthly_trade["semi_export_amt"].pct_change()
+    return monthly_trade
+
+
+# ─────────────────────────────────────────────────────────────
+# 2) 주간 패널
+# ─────────────────────────────────────────────────────────────
+
+def build_weekly_panel(calendar_df: pd.DataFrame, econ_df: pd.DataFrame,
+                       exrate_df: pd.DataFrame, trade_df: pd.DataFrame) -> pd.DataFrame:
+    """year_week 기준 외부지표 패널 (일별→주평균, 주간→마지막값, 월별→월 매핑, ffill)"""
+    cal = calendar_df[["year_week", "week_start", "year_month"]].copy()
+    cal["week_start"] = pd.to_datetime(cal["week_start"])
+
+    # 날짜 → year_week 매핑 (주차당 7일 펼침)
+    days = cal.loc[cal.index.repeat(7), ["year_week", "week_start"]]
+    days["date"] = days["week_start"] + pd.to_timedelta(
+        np.tile(np.arange(7), len(cal)), unit="D"
+    )
+    date_to_week = pd.Series(days["year_week"].values, index=days["date"].values)
+    yw_ym = cal[["year_week", "year_month"]].drop_duplicates()
+
+    result = cal[["year_week"]].copy()
+
+    if not econ_df.empty:
+        econ = econ_df.copy()
+        econ["year_week"] = econ["date"].map(date_to_week)
+
+        # 일별 지표 → 주간 평균
+        for code, col_name in DAILY_INDICATORS.items():
+            subset = econ[econ["indicator_code"] == code].dropna(subset=["year_week"])
+            if not subset.empty:
+                weekly_avg = subset.groupby("year_week")["value"].mean().rename(col_name)
+                result = result.merge(weekly_avg.reset_index(), on="year_week", how="left")
+            else:
+                result[col_name] = np.nan
+
+        # 주간 지표 → 마지막 값
+        for code, col_name in WEEKLY_INDICATORS.items():
+            subset = econ[econ["indicator_code"] == code].dropna(subset=["year_week"])
+            if not subset.empty:
+                weekly_last = (subset.sort_values("date")
+                               .groupby("year_week")["value"].last().rename(col_name))
+                result = result.merge(weekly_last.reset_index(), on="year_week", how="left")
+            else:
+                result[col_name] = np.nan
+
+        # 월별 지표 → year_month 마지막 값을 주차에 매핑
+        for code, col_name in MONTHLY_INDICATORS.items():
+            subset = econ[econ["indicator_code"] == code]
+            if not subset.empty:
+                ym = subset["date"].dt.strftime("%Y-%m")
+                monthly_val = subset.groupby(ym)["value"].last().rename(col_name)
+                monthly_val.index.name = "year_month"
+                monthly_merged = yw_ym.merge(monthly_val.reset_index(), on="year_month", how="left")
+                result = result.merge(
+                    monthly_merged[["year_week", col_name]], on="year_week", how="left"
+                )
+            else:
+                result[col_name] = np.nan
+    else:
+        for indicators in [DAILY_INDICATORS, WEEKLY_INDICATORS, MONTHLY_INDICATORS]:
+            for col_name in indicators.values():
+                result[col_name] = np.nan
+
+    # 환율 → 주간 평균
+    if not exrate_df.empty:
+        exrate = exrate_df.copy()
+        exrate["year_week"] = exrate["rate_date"].map(date_to_week)
+        for currency, col_name in CURRENCY_MAP.items():
+            subset = exrate[exrate["base_currency"] == currency].dropna(subset=["year_week"])
+            if not subset.empty:
+                weekly_avg = subset.groupby("year_week")["rate"].mean().rename(col_name)
+                result = result.merge(weekly_avg.reset_index(), on="year_week", how="left")
+            else:
+                result[col_name] = np.nan
+    else:
+        for col_name in CURRENCY_MAP.values():
+            result[col_name] = np.nan
+
+    # 무역통계 → 월별 합계 → 주간 매핑
+    if not trade_df.empty:
+        trade_merged = yw_ym.merge(_monthly_trade(trade_df), on="year_month", how="left")
+        result = result.merge(trade_merged[["year_week"] + TRADE_COLS], on="year_week", how="left")
+    else:
+        for c in TRADE_COLS:
+            result[c] = np.nan
+
+    # forward-fill (주차 순서대로)
+    result = result.sort_values("year_week").reset_index(drop=True)
+    result[WEEKLY_PANEL_COLS] = result[WEEKLY_PANEL_COLS].ffill()
+    return result[["year_week"] + WEEKLY_PANEL_COLS]
+
+
+# ─────────────────────────────────────────────────────────────
+# 3) 월간 패널
+# ─────────────────────────────────────────────────────────────
+
+def build_monthly_panel(year_months: list[str], econ_df: pd.DataFrame,
+                        exrate_df: pd.DataFrame, trade_df: pd.DataFrame) -> pd.DataFrame:
+    """year_month 기준 외부지표 패널 (지표·환율 월평균, 무역 월합계, ffill)"""
+    result = pd.DataFrame({"year_month": sorted(set(year_months))})
+
+    if not econ_df.empty:
+        ym = econ_df["date"].dt.strftime("%Y-%m")
+        for code, col_name in MONTHLY_PANEL_INDICATORS.items():
+            mask = econ_df["indicator_code"] == code
+            if mask.any():
+                monthly_val = econ_df.loc[mask].groupby(ym[mask])["value"].mean().rename(col_name)
+                monthly_val.index.name = "year_month"
+                result = result.merge(monthly_val.reset_index(), on="year_month", how="left")
+            else:
+                result[col_name] = np.nan
+    else:
+        for col_name in MONTHLY_PANEL_INDICATORS.values():
+            result[col_name] = np.nan
+
+    if not exrate_df.empty:
+        ym = exrate_df["rate_date"].dt.strftime("%Y-%m")
+        for currency, col_name in CURRENCY_MAP.items():
+            mask = exrate_df["base_currency"] == currency
+            if mask.any():
+                monthly_avg = exrate_df.loc[mask].groupby(ym[mask])["rate"].mean().rename(col_name)
+                monthly_avg.index.name = "year_month"
+                result = result.merge(monthly_avg.reset_index(), on="year_month", how="left")
+            else:
+                result[col_name] = np.nan
+    else:
+        for col_name in CURRENCY_MAP.values():
+            result[col_name] = np.nan
+
+    if not trade_df.empty:
+        result = result.merge(_monthly_trade(trade_df)[["year_month"] + TRADE_COLS],
+                              on="year_month", how="left")
+    else:
+        for c in TRADE_COLS:
+            result[c] = np.nan
+
+    result = result.sort_values("year_month").reset_index(drop=True)
+    result[MONTHLY_PANEL_COLS] = result[MONTHLY_PANEL_COLS].ffill()
+    return result[["year_month"] + MONTHLY_PANEL_COLS]
+
+
+# ─────────────────────────────────────────────────────────────
+# 4) 재생성 / 조회
+# ─────────────────────────────────────────────────────────────
+
+def _to_rows(df: pd.DataFrame, grain: str):
+    """패널 DataFrame → external_indicator_panel 적재 행 제너레이터"""
+    out = df.rename(columns={PERIOD_COL[grain]: "period_key"})
+    out.insert(0, "grain", grain)
+    return iter_json_rows(out, ddl_schema("18_pipeline_cache_ddl.sql", PANEL_TABLE))
+
+
+def refresh_panel(force: bool = False) -> bool:
+    """소스 지문이 바뀐 경우에만 주간·월간 패널 재생성. 재생성 시 True"""
+    fingerprint = sources_fingerprint(PANEL_SOURCES)
+    if not force and is_fresh(ARTIFACT_KEY, fingerprint):
+        print("    외부지표 패널: 소스 변경 없음 — 캐시 사용")
+        return False
+
+    print("    외부지표 패널 재생성 중...")
+    cal_rows = fetch_all("calendar_week", "year_week,week_start,week_end,year_month")
+    if not cal_rows:
+        print("    [!] calendar_week 비어있음. s0 먼저 실행 필요")
+        return False
+    calendar_df = pd.DataFrame(cal_rows)
+
+    econ_df, exrate_df, trade_df = load_sources()
+    weekly = build_weekly_panel(calendar_df, econ_df, exrate_df, trade_df)
+    monthly = build_monthly_panel(calendar_df["year_month"].tolist(), econ_df, exrate_df, trade_df)
+
+    rows = chain(_to_rows(weekly, "weekly"), _to_rows(monthly, "monthly"))
+    cnt = upsert_batch(PANEL_TABLE, rows, on_conflict="grain,period_key")
+    save_artifact(ARTIFACT_KEY, fingerprint, cnt)
+    print(f"    외부지표 패널 적재: 주간 {len(weekly):,}행, 월간 {len(monthly):,}행")
+    return True
+
+
+def invalidate_panel():
+    """패널 캐시 무효화 → 다음 s3/s3m 실행 시 재생성 (적재 스크립트 04/10/11/12 공용, 실패해도 적재 결과 유지)"""
+    try:
+        invalidate_artifact(ARTIFACT_KEY)
+        print("외부지표 패널 캐시 무효화 (다음 피처 빌드 시 재생성)")
+    except Exception as e:
+        print(f"[!] 외부지표 패널 캐시 무효화 실패: {e}")
+
+
+def load_panel(grain: str) -> pd.DataFrame:
+    """external_indicator_panel 조회 → (year_week | year_month) × 지표 DataFrame
+
+    필요 시 refresh_panel()로 먼저 갱신
+    """
+    refresh_panel()
+
+    period_col = PERIOD_COL[grain]
+    schema = {"period_key": "str", **{c: "float64" for c in PANEL_COLS[grain]}}
+    df = fetch_frame(PANEL_TABLE, schema, order_col="period_key", filters=[("eq", "grain", grain)])
+    return df.rename(columns={"period_key": period_col})
+
+
+if __name__ == "__main__":
+    import sys
+    refresh_panel(force="--force" in sys.argv)
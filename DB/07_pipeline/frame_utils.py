@@ -0,0 +1,303 @@
+"""
+DataFrame 메모리 유틸리티 — 컴팩트 dtype 계획, 페이지 스트리밍 로더,
+컬럼 단위 JSON 직렬화, 변경분 판정, RSS 측정
+s3 / s3m / s4 피처·예측 스텝과 s5 / s7 서버 측 조건 조회에서 공유
+
+dtype 계획:
+  - product_id / year_week 등 반복 문자열 → category
+  - 캘린더 필드 (week_num, month, quarter) → int8, 카운트성 SMALLINT → int16
+  - 모델 입력 피처 → float32 (DB 적재용 수치는 NUMERIC(18,6) 정밀도 유지를 위해 float64)
+"""
+
+import re
+import sys
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from config import supabase, PROJECT_ROOT
+
+DDL_DIR = PROJECT_ROOT / "DB"
+
+CATEGORY_COLS = ("product_id", "year_week", "year_month")
+CALENDAR_INT_COLS = {
+    "week_num": "int8",
+    "month": "int8",
+    "quarter": "int8",
+}
+SMALL_INT_COLS = {
+    "order_qty_nonzero_4w": "int16",
+    "order_qty_nonzero_13w": "int16",
+    "order_qty_nonzero_3m": "int16",
+    "order_qty_nonzero_6m": "int16",
+}
+BOOL_COLS = ("is_holiday_week", "is_year_end")
+
+
+def peak_rss_mb() -> float | None:
+    """현재 프로세스 최대 RSS (MB). 측정 불가 환경이면 None"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux: KB, macOS: bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+def format_rss() -> str:
+    rss = peak_rss_mb()
+    return f"{rss:,.0f} MB" if rss is not None else "N/A"
+
+
+def feature_dtypes(feature_cols: list, float_dtype: str = "float32") -> dict:
+    """피처 컬럼 → dtype 계획 (캘린더 int8 / bool / 나머지 float32)"""
+    plan = {}
+    for c in feature_cols:
+        if c in CALENDAR_INT_COLS:
+            plan[c] = CALENDAR_INT_COLS[c]
+        elif c in BOOL_COLS:
+            plan[c] = "bool"
+        else:
+            plan[c] = float_dtype
+    return plan
+
+
+def compact_frame(df: pd.DataFrame, float_cols: list | None = None,
+                  float_dtype: str = "float32") -> pd.DataFrame:
+    """ID 컬럼 category, 캘린더/카운트 정수 다운캐스트, 지정 컬럼 float32 변환 (in-place)
+
+    ID 컬럼은 object·문자열 dtype 모두 category 로 변환 (pandas 3 기본 문자열 dtype 은 object 아님)
+    """
+    for c in CATEGORY_COLS:
+        if c in df.columns and (pd.api.types.is_object_dtype(df[c]) or pd.api.types.is_string_dtype(df[c])):
+            df[c] = df[c].astype("category")
+    for c, dt in {**CALENDAR_INT_COLS, **SMALL_INT_COLS}.items():
+        if c in df.columns and df[c].notna().all():
+            df[c] = df[c].astype(dt)
+    for c in BOOL_COLS:
+        if c in df.columns:
+            df[c] = df[c].astype(bool)
+    for c in float_cols or []:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype(float_dtype)
+    return df
+
+
+# ─────────────────────────────────────────────────────────────
+# 페이지 스트리밍 로더
+# ─────────────────────────────────────────────────────────────
+
+def _alloc(kind: str, n: int) -> np.ndarray:
+    if kind in ("category", "str"):
+        return np.empty(n, dtype=object)
+    if kind == "bool":
+        return np.zeros(n, dtype=bool)
+    if np.dtype(kind).kind in "iu":
+        # 정수는 NULL 여부 확인 후 최종 변환 → 채우는 동안은 float64
+        return np.full(n, np.nan, dtype=np.float64)
+    return np.full(n, np.nan, dtype=kind)
+
+
+def _fill(buf: np.ndarray, start: int, vals: list, kind: str):
+    end = start + len(vals)
+    if kind in ("category", "str"):
+        buf[start:end] = vals
+    elif kind == "bool":
+        buf[start:end] = [bool(v) for v in vals]
+    else:
+        try:
+            buf[start:end] = np.asarray(vals, dtype=np.float64)
+        except (TypeError, ValueError):
+            buf[start:end] = pd.to_numeric(pd.Series(vals), errors="coerce").to_numpy()
+
+
+def _finalize(buf: np.ndarray, kind: str):
+    if kind == "category":
+        return pd.Categorical(buf)
+    if kind in ("str", "bool"):
+        return buf
+    dt = np.dtype(kind)
+    if dt.kind in "iu":
+        return buf.astype(dt) if not np.isnan(buf).any() else buf.astype(np.float32)
+    return buf
+
+
+FILTER_OPS = ("eq", "neq", "gt", "gte", "lt", "lte", "in_", "is_")
+
+
+def apply_filters(q, filters: list | None):
+    """[(op, column, value), ...] → postgrest 쿼리에 서버 측 조건으로 추가"""
+    for op, col, val in filters or []:
+        if op not in FILTER_OPS:
+            raise ValueError(f"지원하지 않는 필터 연산: {op}")
+        q = getattr(q, op)(col, val)
+    return q
+
+
+def fetch_frame(table: str, schema: dict, page_size: int = 1000,
+                order_col: str | None = "id", filters: list | None = None) -> pd.DataFrame:
+    """Supabase 페이지 → 사전 할당 컬럼 배열에 바로 채워 DataFrame 생성
+
+    전체 행을 list[dict]로 모은 뒤 DataFrame을 만드는 방식 대비
+    dict 객체가 페이지(1000행) 단위로만 존재하므로 최대 메모리가 작음.
+    조회 컬럼은 schema 키로 한정 (projection), filters는 서버 측 WHERE 로 전달.
+
+    Args:
+        schema: {column: kind}  kind = "category" | "str" | "bool" | numpy dtype 문자열
+        order_col: 안정적 페이징을 위한 정렬 컬럼 (None이면 정렬 없음)
+        filters: [(op, column, value), ...]  op = FILTER_OPS (예: ("gte", "order_date", cutoff))
+    """
+    cols = list(schema)
+    select = ",".join(cols)
+
+    def _page(offset: int, with_count: bool = False):
+        q = (supabase.table(table).select(select, count="exact") if with_count
+             else supabase.table(table).select(select))
+        q = apply_filters(q, filters)
+        if order_col:
+            q = q.order(order_col)
+        return q.range(offset, offset + page_size - 1).execute()
+
+    resp = _page(0, with_count=True)
+    capacity = max(resp.count or 0, len(resp.data or []))
+    buffers = {c: _alloc(schema[c], capacity) for c in cols}
+
+    n = 0
+    offset = 0
+    while resp.data:
+        page = resp.data
+        if n + len(page) > capacity:
+            # 조회 중 행이 추가된 경우 → 버퍼 확장
+            grow = max(n + len(page) - capacity, page_size)
+            buffers = {c: np.concatenate([buf, _alloc(schema[c], grow)])
+                       for c, buf in buffers.items()}
+            capacity += grow
+        for c in cols:
+            _fill(buffers[c], n, [r.get(c) for r in page], schema[c])
+        n += len(page)
+        if len(page) < page_size:
+            break
+        offset += page_size
+        resp = _page(offset)
+
+    return pd.DataFrame({c: _finalize(buf[:n], schema[c]) for c, buf in buffers.items()})
+
+
+# ─────────────────────────────────────────────────────────────
+# 컬럼 단위 JSON 직렬화 (UPSERT 적재용)
+# ─────────────────────────────────────────────────────────────
+
+_COL_RE = re.compile(
+    r"^\s*(\w+)\s+(NUMERIC\s*\(\s*\d+\s*,\s*(\d+)\s*\)|SMALLINT|BIGINT|INT|BOOLEAN"
+    r"|DATE|TIMESTAMPTZ|TIMESTAMP|VARCHAR|TEXT|JSONB)",
+    re.IGNORECASE,
+)
+
+
+@lru_cache(maxsize=None)
+def ddl_schema(ddl_file: str, table: str) -> dict:
+    """DDL 파일의 CREATE TABLE 블록 → {column: ("numeric", scale) | ("int",) | ("bool",) | ("text",)}"""
+    sql = (DDL_DIR / ddl_file).read_text(encoding="utf-8")
+    m = re.search(rf"CREATE TABLE IF NOT EXISTS\s+{table}\s*\((.*?)\n\);", sql, re.S)
+    if not m:
+        raise ValueError(f"{ddl_file}: '{table}' 테이블 정의 없음")
+
+    schema = {}
+    for line in m.group(1).splitlines():
+        cm = _COL_RE.match(line)
+        if not cm or cm.group(1).upper() in ("UNIQUE", "PRIMARY", "CHECK"):
+            continue
+        col, sql_type, scale = cm.group(1), cm.group(2).upper(), cm.group(3)
+        if sql_type.startswith("NUMERIC"):
+            schema[col] = ("numeric", int(scale))
+        elif sql_type in ("SMALLINT", "INT", "BIGINT"):
+            schema[col] = ("int",)
+        elif sql_type == "BOOLEAN":
+            schema[col] = ("bool",)
+        else:
+            schema[col] = ("text",)
+    return schema
+
+
+def _column_to_json(s: pd.Series, col_type: tuple | None) -> list:
+    """Series 전체를 한 번에 JSON-safe 리스트로 변환 (NaN/±inf → None)"""
+    kind = col_type[0] if col_type else None
+
+    if kind is None:
+        # 스키마에 없는 컬럼: 수치형이면 소수 6자리, 아니면 텍스트
+        if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            kind, col_type = "numeric", ("numeric", 6)
+        elif pd.api.types.is_bool_dtype(s):
+            kind = "bool"
+        else:
+            kind = "text"
+
+    if kind in ("numeric", "int"):
+        arr = pd.to_numeric(s, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        mask = ~np.isfinite(arr)
+        if kind == "int":
+            out = np.where(mask, 0, arr).astype(np.int64).tolist()
+        else:
+            out = np.round(np.where(mask, 0, arr), col_type[1]).tolist()
+    elif kind == "bool":
+        mask = s.isna().to_numpy()
+        out = s.where(~mask, False).astype(bool).tolist()
+    else:
+        if pd.api.types.is_datetime64_any_dtype(s):
+            s = s.dt.strftime("%Y-%m-%d")
+        mask = s.isna().to_numpy()
+        out = s.astype(object).tolist()
+
+    for i in np.flatnonzero(mask):
+        out[i] = None
+    return out
+
+
+def iter_json_rows(df: pd.DataFrame, schema: dict, chunk_size: int = 5000):
+    """DataFrame → JSON-safe dict 행 제너레이터 (chunk_size 행 단위로 컬럼 일괄 변환)
+
+    schema: ddl_schema() 결과 — NUMERIC(p,s) 소수 s자리 반올림, INT/SMALLINT 정수 변환
+    upsert_batch()에 그대로 넘기면 전체 행 리스트를 만들지 않고 스트리밍 적재
+    """
+    cols = list(df.columns)
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        col_vals = [_column_to_json(chunk[c], schema.get(c)) for c in cols]
+        for vals in zip(*col_vals):
+            yield dict(zip(cols, vals))
+
+
+# ─────────────────────────────────────────────────────────────
+# 변경분 판정 (UPSERT 생략용)
+# ─────────────────────────────────────────────────────────────
+
+def fetch_schema(col_types: dict, exclude: tuple = ("created_at", "updated_at")) -> dict:
+    """ddl_schema() 결과 → fetch_frame() 스키마 (NUMERIC / INT → float64, 그 외 str)"""
+    return {c: "float64" if t[0] in ("numeric", "int") else "str"
+            for c, t in col_types.items() if c not in exclude}
+
+
+def changed_mask(new: pd.DataFrame, old: pd.DataFrame, keys: list, col_types: dict) -> np.ndarray:
+    """new 행 중 old (DB 기존 행) 에 키가 없거나 값이 하나라도 다른 행 여부 (bool 배열, new 순서)
+
+    비교는 적재 형식 (_column_to_json — NUMERIC 자릿수 반올림, NaN → None) 기준,
+    new 와 old 에 모두 있는 키 외 컬럼만 비교
+    """
+    cols = [c for c in new.columns if c not in keys and c in old.columns]
+    merged = new[keys].merge(old[keys + cols].drop_duplicates(keys), on=keys, how="left",
+                             indicator=True)
+    changed = merged["_merge"].to_numpy() != "both"
+    new = new.reset_index(drop=True)
+    for c in cols:
+        a = _column_to_json(new[c], col_types.get(c))
+        b = _column_to_json(merged[c], col_types.get(c))
+        changed |= np.fromiter((x != y for x, y in zip(a, b)), dtype=bool, count=len(a))
+    return changed
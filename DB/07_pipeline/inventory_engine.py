@@ -0,0 +1,300 @@
+"""
+일간 추정 재고 엔진 — 이벤트 기반 희소 계산 (s1_daily_inventory.py 에서 사용)
+
+제품 × 전체 일자 그리드를 만들어 merge 하는 대신,
+  1) 생산(+)·출하(-) 이벤트를 (제품, 일자)로 합산해 정렬된 배열로 보관
+  2) (제품, 월) 세그먼트별로 월초 스냅샷을 기준값으로 두고 세그먼트 내 누적합 계산
+  3) 값이 바뀌는 지점(세그먼트 시작일 + 이벤트 일자)만 변화점(change-point) 행으로 생성
+변화점 행은 [valid_from, valid_to] 구간 표현으로 그대로 적재하거나,
+제품 배치 단위로 일간 행으로 펼쳐(expand) 기존 daily_inventory_estimated 형식으로 적재.
+
+세그먼트 ID = 제품 인덱스 × 월 수 + 월 인덱스 → 정렬 순서가 (제품, 일자) 순서와 일치
+"""
+
+import numpy as np
+import pandas as pd
+
+VALUE_COLS = ["snapshot_base", "cumul_produced", "cumul_shipped", "estimated_qty"]
+INTERVAL_COLS = ["product_id", "valid_from", "valid_to"] + VALUE_COLS
+DAILY_COLS = ["product_id", "target_date"] + VALUE_COLS
+
+
+# ─────────────────────────────────────────────────────────────
+# 1) 이벤트 배열
+# ─────────────────────────────────────────────────────────────
+
+def build_events(prod_df: pd.DataFrame, ship_df: pd.DataFrame) -> pd.DataFrame:
+    """일별 생산/출하 → (product_id, target_date) 별 produced_qty, shipped_qty (정렬)"""
+    prod = prod_df[["product_id", "target_date", "produced_qty"]].assign(shipped_qty=0.0)
+    ship = ship_df[["product_id", "target_date", "shipped_qty"]].assign(produced_qty=0.0)
+    ev = pd.concat([prod, ship], ignore_index=True)
+    if ev.empty:
+        return pd.DataFrame(columns=["product_id", "target_date", "produced_qty", "shipped_qty"])
+
+    ev["target_date"] = pd.to_datetime(ev["target_date"]).values.astype("datetime64[D]")
+    ev[["produced_qty", "shipped_qty"]] = ev[["produced_qty", "shipped_qty"]].astype(float)
+    ev = ev.groupby(["product_id", "target_date"], as_index=False, sort=True)[
+        ["produced_qty", "shipped_qty"]
+    ].sum()
+    return ev
+
+
+def _segment_cumsum(x: np.ndarray, seg: np.ndarray) -> np.ndarray:
+    """seg 기준 정렬된 배열에서 세그먼트별 누적합 (세그먼트 경계에서 리셋)"""
+    cs = np.cumsum(x)
+    is_start = np.r_[True, seg[1:] != seg[:-1]]
+    start_idx = np.maximum.accumulate(np.where(is_start, np.arange(len(seg)), 0))
+    return cs - (cs - x)[start_idx]
+
+
+# ─────────────────────────────────────────────────────────────
+# 2) 변화점 계산
+# ─────────────────────────────────────────────────────────────
+
+def month_segments(start: np.datetime64, end: np.datetime64):
+    """[start, end] 범위의 월 목록 → (YYYYMM 키, 세그먼트 시작일, 종료일) 배열"""
+    months = np.arange(start.astype("datetime64[M]"), end.astype("datetime64[M]") + 1)
+    keys = np.array([str(m).replace("-", "") for m in months])
+    m_from = np.maximum(months.astype("datetime64[D]"), start)
+    m_to = np.minimum((months + 1).astype("datetime64[D]") - 1, end)
+    return keys, m_from, m_to
+
+
+def encode_inputs(inv_df: pd.DataFrame, events: pd.DataFrame, products: list) -> dict:
+    """스냅샷·이벤트 → 정수 코드 배열 (제품 인덱스, 월 번호, 일 번호) + 수량 배열
+
+    문자열 컬럼 없이 고정 dtype 배열만 남기므로 공유 메모리로 그대로 전달 가능
+    """
+    prod_index = pd.Index(products)
+    snap = inv_df["snapshot_date"].astype(str)
+    inv_month = pd.to_datetime(snap.str[:4] + "-" + snap.str[4:6], format="%Y-%m", errors="coerce")
+    ev_date = events["target_date"].to_numpy().astype("datetime64[D]")
+    return {
+        "inv_p": prod_index.get_indexer(inv_df["product_id"]).astype(np.int32),
+        "inv_m": inv_month.to_numpy().astype("datetime64[M]").astype(np.int64),
+        "inv_q": inv_df["inventory_qty"].to_numpy(dtype=np.float64),
+        "ev_p": prod_index.get_indexer(events["product_id"]).astype(np.int32),
+        "ev_d": ev_date.astype(np.int64),
+        "ev_prod": events["produced_qty"].to_numpy(dtype=np.float64),
+        "ev_ship": events["shipped_qty"].to_numpy(dtype=np.float64),
+    }
+
+
+def change_points_arrays(arr: dict, n_products: int, start: np.datetime64, end: np.datetime64,
+                         month_keys=None, prod_range: tuple | None = None) -> dict:
+    """encode_inputs() 배열 → 변화점 배열 {prod, valid_from, valid_to, base, cp, cs}
+
+    Args:
+        month_keys: 지정 시 해당 YYYYMM 세그먼트만 계산 (월 단위 샤드)
+        prod_range: (lo, hi) 지정 시 제품 인덱스 lo ≤ p < hi 만 계산 (제품 범위 샤드)
+    """
+    keys, m_from, m_to = month_segments(start, end)
+    sel = np.ones(len(keys), dtype=bool) if month_keys is None else np.isin(keys, list(month_keys))
+    # 전체 월 위치 → 선택된 세그먼트 월 인덱스 (-1 = 제외)
+    month_lookup = np.where(sel, np.cumsum(sel) - 1, -1)
+    m_from, m_to = m_from[sel], m_to[sel]
+    p_lo, p_hi = prod_range or (0, n_products)
+    n_prod, n_month = p_hi - p_lo, int(sel.sum())
+    if n_prod <= 0 or n_month == 0:
+        empty_d = np.array([], dtype="datetime64[D]")
+        return {"prod": np.array([], dtype=np.int32), "valid_from": empty_d, "valid_to": empty_d,
+                "base": np.array([]), "cp": np.array([]), "cs": np.array([])}
+
+    first_month = start.astype("datetime64[M]").astype(np.int64)
+
+    def _month_idx(month_no: np.ndarray) -> np.ndarray:
+        pos = month_no - first_month
+        valid = (pos >= 0) & (pos < len(month_lookup))
+        return np.where(valid, month_lookup[np.clip(pos, 0, len(month_lookup) - 1)], -1)
+
+    # 세그먼트 기준값 (월초 스냅샷, 없으면 0)
+    base = np.zeros(n_prod * n_month)
+    p = arr["inv_p"].astype(np.int64) - p_lo
+    m = _month_idx(arr["inv_m"])
+    ok = (p >= 0) & (p < n_prod) & (m >= 0)
+    base[p[ok] * n_month + m[ok]] = arr["inv_q"][ok]
+
+    # 이벤트 → 세그먼트
+    ed = arr["ev_d"].astype("datetime64[D]")
+    ep = arr["ev_p"].astype(np.int64) - p_lo
+    em = np.where((ed >= start) & (ed <= end), _month_idx(ed.astype("datetime64[M]").astype(np.int64)), -1)
+    ok = (ep >= 0) & (ep < n_prod) & (em >= 0)
+    eseg = (ep * n_month + em)[ok]
+    ed = ed[ok]
+    produced, shipped = arr["ev_prod"][ok], arr["ev_ship"][ok]
+
+    order = np.lexsort((ed, eseg))
+    eseg, ed, produced, shipped = eseg[order], ed[order], produced[order], shipped[order]
+    cum_prod = _segment_cumsum(produced, eseg)
+    cum_ship = _segment_cumsum(shipped, eseg)
+
+    # 세그먼트 시작일 행 (시작일에 이벤트가 없는 세그먼트만 추가)
+    all_seg = np.arange(n_prod * n_month)
+    seg_from = m_from[all_seg % n_month]
+    has_start_event = np.zeros(len(all_seg), dtype=bool)
+    has_start_event[eseg[ed == seg_from[eseg]]] = True
+    sseg = all_seg[~has_start_event]
+
+    seg = np.concatenate([eseg, sseg])
+    valid_from = np.concatenate([ed, seg_from[sseg]])
+    cp = np.concatenate([cum_prod, np.zeros(len(sseg))])
+    cs = np.concatenate([cum_ship, np.zeros(len(sseg))])
+
+    order = np.lexsort((valid_from, seg))
+    seg, valid_from, cp, cs = seg[order], valid_from[order], cp[order], cs[order]
+
+    # valid_to = 같은 세그먼트 다음 변화점 전날, 마지막이면 세그먼트 종료일
+    seg_to = m_to[seg % n_month]
+    same_next = np.r_[seg[1:] == seg[:-1], False]
+    next_from = np.r_[valid_from[1:], valid_from[-1:]]
+    valid_to = np.where(same_next, next_from - np.timedelta64(1, "D"), seg_to)
+
+    return {"prod": (seg // n_month + p_lo).astype(np.int32), "valid_from": valid_from,
+            "valid_to": valid_to, "base": base[seg], "cp": cp, "cs": cs}
+
+
+def to_frame(res: dict, products: list) -> pd.DataFrame:
+    """변화점 배열 → INTERVAL_COLS DataFrame"""
+    return pd.DataFrame({
+        "product_id": np.asarray(products, dtype=object)[res["prod"]],
+        "valid_from": res["valid_from"],
+        "valid_to": res["valid_to"],
+        "snapshot_base": res["base"],
+        "cumul_produced": res["cp"],
+        "cumul_shipped": res["cs"],
+        "estimated_qty": res["base"] + res["cp"] - res["cs"],
+    }, columns=INTERVAL_COLS)
+
+
+def change_points(inv_df: pd.DataFrame, events: pd.DataFrame, products: list,
+                  start: np.datetime64, end: np.datetime64,
+                  month_keys: set | None = None) -> pd.DataFrame:
+    """(제품, 월) 세그먼트별 변화점 행 → INTERVAL_COLS DataFrame
+
+    Args:
+        inv_df: (snapshot_date=YYYYMM, product_id, inventory_qty) — 제품·월별 합산 완료
+        events: build_events() 결과
+        products: 대상 제품 목록
+        start, end: 계산 기간 (datetime64[D])
+        month_keys: 지정 시 해당 YYYYMM 세그먼트만 계산
+    """
+    arr = encode_inputs(inv_df, events, products)
+    res = change_points_arrays(arr, len(products), start, end, month_keys=month_keys)
+    return to_frame(res, products)
+
+
+# ─────────────────────────────────────────────────────────────
+# 3) 일간 전개 (제품 배치 단위)
+# ─────────────────────────────────────────────────────────────
+
+def expand_daily(cp: pd.DataFrame) -> pd.DataFrame:
+    """변화점 구간 → 일간 행 (DAILY_COLS)"""
+    if cp.empty:
+        return pd.DataFrame(columns=DAILY_COLS)
+    vf = cp["valid_from"].to_numpy().astype("datetime64[D]")
+    vt = cp["valid_to"].to_numpy().astype("datetime64[D]")
+    n = (vt - vf).astype(int) + 1
+    rep = np.repeat(np.arange(len(cp)), n)
+    offset = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+
+    out = {"product_id": cp["product_id"].to_numpy()[rep],
+           "target_date": vf[rep] + offset.astype("timedelta64[D]")}
+    for c in VALUE_COLS:
+        out[c] = cp[c].to_numpy()[rep]
+    return pd.DataFrame(out)
+
+
+def iter_daily_batches(cp: pd.DataFrame, batch_size: int = 200):
+    """변화점 → 제품 batch_size개 단위 일간 DataFrame 제너레이터 (메모리 상한 = 배치 1개)"""
+    if cp.empty:
+        return
+    pids = cp["product_id"].to_numpy()
+    bounds = np.flatnonzero(np.r_[True, pids[1:] != pids[:-1]])
+    for i in range(0, len(bounds), batch_size):
+        lo = bounds[i]
+        hi = bounds[i + batch_size] if i + batch_size < len(bounds) else len(cp)
+        yield min(batch_size, len(bounds) - i), expand_daily(cp.iloc[lo:hi])
+
+
+# ─────────────────────────────────────────────────────────────
+# 4) 병렬 계산 (월 / 제품 범위 샤드 + 공유 메모리)
+# ─────────────────────────────────────────────────────────────
+
+# 워커 프로세스 전역 상태 (initializer에서 설정)
+_WORKER = {}
+
+
+def _to_shared(arr: dict) -> tuple:
+    """배열 dict → SharedMemory 블록 + 워커용 디스크립터 {name: (shm_name, shape, dtype)}"""
+    from multiprocessing import shared_memory
+
+    blocks, spec = [], {}
+    for name, a in arr.items():
+        a = np.ascontiguousarray(a)
+        shm = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+        np.ndarray(a.shape, dtype=a.dtype, buffer=shm.buf)[:] = a
+        blocks.append(shm)
+        spec[name] = (shm.name, a.shape, a.dtype.str)
+    return blocks, spec
+
+
+def _attach(spec: dict, n_products: int, start: str, end: str):
+    """워커 initializer — 공유 메모리 블록을 복사 없이 ndarray 뷰로 연결"""
+    from multiprocessing import shared_memory
+
+    blocks, arr = [], {}
+    for name, (shm_name, shape, dtype) in spec.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        blocks.append(shm)
+        arr[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    _WORKER.update(blocks=blocks, arr=arr, n_products=n_products,
+                   start=np.datetime64(start, "D"), end=np.datetime64(end, "D"))
+
+
+def _run_shard(shard: tuple) -> dict:
+    kind, value = shard
+    return change_points_arrays(
+        _WORKER["arr"], _WORKER["n_products"], _WORKER["start"], _WORKER["end"],
+        month_keys=value if kind == "month" else None,
+        prod_range=value if kind == "product" else None,
+    )
+
+
+def make_shards(products: list, start: np.datetime64, end: np.datetime64,
+                shard: str, n_shards: int) -> list:
+    """("month", {YYYYMM, ...}) 또는 ("product", (lo, hi)) 샤드 목록"""
+    if shard == "month":
+        keys = month_segments(start, end)[0]
+        return [("month", set(chunk)) for chunk in np.array_split(keys, min(n_shards, len(keys)))
+                if len(chunk)]
+    bounds = np.linspace(0, len(products), min(n_shards, len(products)) + 1).astype(int)
+    return [("product", (int(lo), int(hi))) for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+
+
+def parallel_change_points(inv_df: pd.DataFrame, events: pd.DataFrame, products: list,
+                           start: np.datetime64, end: np.datetime64,
+                           workers: int, shard: str = "month") -> pd.DataFrame:
+    """change_points() 병렬 버전 — 결과 동일
+
+    입력 배열은 한 번만 공유 메모리에 올리고 워커는 뷰로 참조 (DataFrame pickle 없음).
+    워커는 변화점 배열만 반환 → 부모가 (제품, 일자) 순으로 정렬·결합.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    arr = encode_inputs(inv_df, events, products)
+    shards = make_shards(products, start, end, shard, workers * 2)
+    blocks, spec = _to_shared(arr)
+    del arr
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(spec, len(products), str(start), str(end))) as ex:
+            parts = list(ex.map(_run_shard, shards))
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    res = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]} if parts else \
+        change_points_arrays({}, 0, start, end)
+    order = np.lexsort((res["valid_from"], res["prod"]))
+    return to_frame({k: v[order] for k, v in res.items()}, products)
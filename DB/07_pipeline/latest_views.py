@@ -0,0 +1,62 @@
+"""
+최신 행 머티리얼라이즈드 뷰 — 이력 테이블의 키별 최신 행 (DISTINCT ON) 조회 + 갱신
+생산 스텝이 적재 후 갱신 (s5 → risk_score_latest, s7 → production_plan_latest,
+s8 → purchase_recommendation_latest), 조회 측 (s6 / s7 / validate_risk) 은 키당 1행만 내려받음
+
+  - 갱신: RPC refresh_latest_view(view_name) → REFRESH MATERIALIZED VIEW CONCURRENTLY
+          (조회 중단 없음, 함수 미존재 시 경고 후 진행)
+  - 조회: 뷰 미존재 (27_latest_views_ddl.sql 미실행) 시 원본 이력 전체에서 키별 최신 행 선택
+  - 생산계획·발주추천 뷰는 미래 주차 제외 (plan_date ≤ 갱신 시점 이번 주 월요일)
+    — 기준 주가 갱신 시점에 고정되므로 조회 측 (s6) 은 이번 주 행을 원본에서 직접 조회한 뒤 없는 키만 보충
+
+DDL: 27_latest_views_ddl.sql
+"""
+
+import pandas as pd
+
+from config import supabase
+from frame_utils import fetch_frame
+
+# 뷰 → (원본 테이블, 키 컬럼, 최신 판정 컬럼)
+LATEST_VIEWS = {
+    "risk_score_latest": ("risk_score", ["product_id"], "eval_date"),
+    "production_plan_latest": ("production_plan", ["product_id"], "plan_date"),
+    "purchase_recommendation_latest": ("purchase_recommendation", ["component_product_id"], "plan_date"),
+}
+
+
+def _is_missing(e: Exception) -> bool:
+    return "PGRST20" in str(e) or "Could not find" in str(e)
+
+
+def refresh_latest(view: str) -> bool:
+    """생산 스텝 적재 후 최신 행 뷰 갱신 → 성공 여부"""
+    try:
+        supabase.rpc("refresh_latest_view", {"view_name": view}).execute()
+    except Exception as e:
+        if not _is_missing(e):
+            raise
+        print(f"    [!] '{view}' 갱신 함수 미존재 — 27_latest_views_ddl.sql 실행 필요 (조회 측은 원본 이력 사용)")
+        return False
+    print(f"    {view} 갱신")
+    return True
+
+
+def load_latest(view: str, schema: dict, until: str | None = None) -> pd.DataFrame:
+    """키별 최신 행 (뷰 조회, 뷰 미존재 시 원본 이력에서 선택)
+
+    schema: fetch_frame() 스키마 — 키 컬럼·최신 판정 컬럼 포함
+    until: 최신 판정 컬럼 상한 (이하만, 'YYYY-MM-DD') — 원본 이력 선택 시 적용, 뷰 결과도 상한 초과 행 제외
+    """
+    table, keys, order_col = LATEST_VIEWS[view]
+    try:
+        rows = fetch_frame(view, schema, order_col=keys[0])
+        return rows[rows[order_col] <= until].reset_index(drop=True) if until else rows
+    except Exception as e:
+        if not _is_missing(e):
+            raise
+        print(f"    [!] 뷰 '{view}' 미존재 — '{table}' 전체 이력에서 최신 행 선택")
+    filters = [("lte", order_col, until)] if until else None
+    rows = fetch_frame(table, schema, filters=filters)    # id 순 → 같은 날짜면 나중 행 우선
+    return (rows.sort_values(order_col, kind="mergesort")
+                .drop_duplicates(keys, keep="last").reset_index(drop=True))
@@ -0,0 +1,176 @@
+"""
+리드타임 통계 엔진 — purchase_order 완료건 → 제품(×공급사)별 리드타임 통계
+s2_lead_time.py 가 산출·적재하고, s3 / s3m / s5 / s7 / s8 은 lead_time_stats 조회만 수행
+(s7 / s8 은 load_lead_times 로 safety_stock 안전재고 일수까지 병합)
+
+리드타임 = receipt_date - po_date (status='F', 0일 이상)
+  - 날짜 차이는 datetime64 벡터 연산, 통계는 groupby 일괄 계산
+  - p90 = 그룹 내 오름차순 정렬 후 min(int(n × 0.9), n - 1)번째 값 (기존 산출식 유지)
+  - 윈도우: 전체 기간(0) + 최신 입고일 기준 최근 90/180/365일 입고분
+
+입력 테이블: purchase_order
+출력 테이블: lead_time_stats (s2_lead_time.py 에서 적재)
+"""
+
+import numpy as np
+import pandas as pd
+
+from config import supabase
+from frame_utils import fetch_frame
+
+LEAD_STATS_TABLE = "lead_time_stats"
+ALL_SUPPLIERS = "*"             # 제품 단위 (전체 공급사 합산) 행의 supplier_code
+WINDOWS = (0, 90, 180, 365)     # 0 = 전체 기간
+ON_TIME_DAYS = 30               # 납기 준수 판정 리드타임 상한 (일)
+
+STAT_COLS = [
+    "avg_lead_days", "med_lead_days", "p90_lead_days",
+    "min_lead_days", "max_lead_days", "on_time_rate", "sample_count",
+]
+
+
+# ─────────────────────────────────────────────────────────────
+# 1) 산출
+# ─────────────────────────────────────────────────────────────
+
+def po_leads(df: pd.DataFrame) -> tuple:
+    """완료 발주 (component_product_id, cd_partner, po_date, receipt_date)
+    → ((product_id, supplier_code, receipt_date, lead_days) DataFrame, 날짜 누락·오류로 건너뛴 건수)"""
+    po = pd.to_datetime(df["po_date"], format="%Y-%m-%d", errors="coerce")
+    rcpt = pd.to_datetime(df["receipt_date"], format="%Y-%m-%d", errors="coerce")
+    lead = (rcpt.to_numpy().astype("datetime64[D]") - po.to_numpy().astype("datetime64[D]"))
+
+    out = pd.DataFrame({
+        "product_id": df["component_product_id"].to_numpy(),
+        "supplier_code": df["cd_partner"].fillna("").to_numpy(),
+        "receipt_date": rcpt.to_numpy().astype("datetime64[D]"),
+        "lead_days": lead.astype("timedelta64[D]").astype(float),
+    })
+    valid = out["product_id"].notna() & po.notna().to_numpy() & rcpt.notna().to_numpy()
+    out = out[valid & (out["lead_days"] >= 0)].reset_index(drop=True)
+    return out, int((~valid).sum())
+
+
+def load_po_leads() -> tuple:
+    """purchase_order 완료건 → ((product_id, supplier_code, receipt_date, lead_days) DataFrame,
+    전체 발주 건수, 날짜 누락·오류로 건너뛴 건수)"""
+    schema = {
+        "component_product_id": "str", "cd_partner": "str",
+        "po_date": "str", "receipt_date": "str", "status": "str",
+    }
+    df = fetch_frame("purchase_order", schema)
+    leads, skipped = po_leads(df[df["status"] == "F"])
+    return leads, len(df), skipped
+
+
+def group_stats(df: pd.DataFrame, keys: list) -> pd.DataFrame:
+    """(keys..., lead_days) → keys별 평균/중앙값/p90/최소/최대/준수율/건수"""
+    if df.empty:
+        return pd.DataFrame(columns=keys + STAT_COLS)
+
+    d = df.sort_values(keys + ["lead_days"], kind="mergesort")
+    g = d.groupby(keys, sort=False)["lead_days"]
+    out = g.agg(avg_lead_days="mean", med_lead_days="median",
+                min_lead_days="min", max_lead_days="max", sample_count="size")
+
+    n = g.transform("size").to_numpy()
+    rank = g.cumcount().to_numpy()
+    p90_pos = np.minimum((n * 0.9).astype(int), n - 1)
+    out["p90_lead_days"] = d.loc[rank == p90_pos].set_index(keys)["lead_days"]
+
+    on_time = (d["lead_days"] <= ON_TIME_DAYS).astype(float)
+    out["on_time_rate"] = on_time.groupby([d[k] for k in keys], sort=False).mean()
+    return out.reset_index()[keys + STAT_COLS]
+
+
+def build_stats(leads: pd.DataFrame, windows=WINDOWS) -> pd.DataFrame:
+    """윈도우 × (제품 단위 + 제품×공급사 단위) 통계 → lead_time_stats 행 DataFrame"""
+    if leads.empty:
+        return pd.DataFrame()
+    window_end = leads["receipt_date"].max()
+
+    frames = []
+    for w in windows:
+        sub = leads if w == 0 else leads[leads["receipt_date"] > window_end - np.timedelta64(w, "D")]
+        prod = group_stats(sub, ["product_id"])
+        prod["supplier_code"] = ALL_SUPPLIERS
+        sup = group_stats(sub[sub["supplier_code"] != ""], ["product_id", "supplier_code"])
+        for part in (prod, sup):
+            part["window_days"] = w
+            frames.append(part)
+
+    out = pd.concat(frames, ignore_index=True)
+    out["window_end"] = window_end
+    return out
+
+
+# ─────────────────────────────────────────────────────────────
+# 2) 조회 (소비 스텝용)
+# ─────────────────────────────────────────────────────────────
+
+def load_lead_stats(window_days: int = 0, per_supplier: bool = False) -> pd.DataFrame:
+    """lead_time_stats 조회 — per_supplier=False 면 제품 단위('*') 행만"""
+    all_rows, offset, ps = [], 0, 1000
+    while True:
+        q = (supabase.table(LEAD_STATS_TABLE)
+             .select(",".join(["product_id", "supplier_code"] + STAT_COLS))
+             .eq("window_days", window_days))
+        q = q.neq("supplier_code", ALL_SUPPLIERS) if per_supplier else q.eq("supplier_code", ALL_SUPPLIERS)
+        try:
+            resp = q.order("id").range(offset, offset + ps - 1).execute()
+        except Exception as e:
+            if "PGRST205" in str(e) or "Could not find" in str(e):
+                print(f"    [!] 테이블 '{LEAD_STATS_TABLE}' 미존재 — s2 먼저 실행 필요")
+                break
+            raise
+        if not resp.data:
+            break
+        all_rows.extend(resp.data)
+        if len(resp.data) < ps:
+            break
+        offset += ps
+
+    df = pd.DataFrame(all_rows, columns=["product_id", "supplier_code"] + STAT_COLS)
+    for c in STAT_COLS:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+    return df
+
+
+def lead_time_map(window_days: int = 0) -> dict:
+    """제품 단위 리드타임: {product_id: {"avg", "med", "p90", "sample_count"}}"""
+    df = load_lead_stats(window_days).dropna(subset=["avg_lead_days", "p90_lead_days"])
+    return {
+        pid: {"avg": avg, "med": med, "p90": p90, "sample_count": int(n)}
+        for pid, avg, med, p90, n in zip(
+            df["product_id"], df["avg_lead_days"], df["med_lead_days"],
+            df["p90_lead_days"], df["sample_count"].fillna(0),
+        )
+    }
+
+
+def supplier_lead_map(window_days: int = 0) -> dict:
+    """제품×공급사 리드타임: {(product_id, supplier_code): {"avg", "on_time_rate", "sample_count"}}"""
+    df = load_lead_stats(window_days, per_supplier=True).dropna(subset=["avg_lead_days"])
+    return {
+        (pid, sup): {"avg": avg, "on_time_rate": rate, "sample_count": int(n)}
+        for pid, sup, avg, rate, n in zip(
+            df["product_id"], df["supplier_code"], df["avg_lead_days"],
+            df["on_time_rate"], df["sample_count"].fillna(0),
+        )
+    }
+
+
+def load_lead_times() -> dict:
+    """lead_time_stats (전체 기간·제품 단위) + safety_stock 안전재고 일수: {product_id: {avg, p90, safety}}
+
+    safety = None 이면 안전재고는 기존 규칙 (리드타임 P90 일수)
+    """
+    from safety_stock import safety_days_map    # safety_stock → lead_time 순환 import 회피
+
+    leads = {
+        pid: {"avg": float(v["avg"] or 7), "p90": float(v["p90"] or 14), "safety": None}
+        for pid, v in lead_time_map().items()
+    }
+    for pid, days in safety_days_map().items():
+        leads.setdefault(pid, {"avg": 7.0, "p90": 14.0})["safety"] = float(days)
+    return leads
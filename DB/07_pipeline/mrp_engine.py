@@ -0,0 +1,234 @@
+"""
+MRP 엔진 — (주차 × 제품) 생산계획 행렬 → (주차 × 자재) 총소요량 → 순소요·안전재고·ROP·EOQ 일괄 계산
+s8_purchase_optimization.py 에서 사용
+
+  - 총소요량 G = 계획행렬 (W × 품목, CSR) @ 말단 전개 행렬 (bom_engine)
+  - 소요 자재(열) 한정 후 W × K 밀집 배열로 netting — 주차·자재 루프 없음
+  - 발주량 결정 분기 (ROP 보충 / EOQ / lot-for-lot) 는 np.select 조건 순서로 표현
+  - 롤링 호라이즌: 주차 순으로 기초 재고를 이월하며 주차별 netting (확정 발주량은 그대로 이월,
+    발주량은 리드타임 주차만큼 뒤 주차에 입고)
+  - 기간별 MRP: 일/주 버킷 (버킷 × 자재) 배열로 예상 재고를 버킷 순으로 전개 (자재 방향은 벡터)
+    → 계획 입고 버킷에서 리드타임(버킷 올림)만큼 역산해 계획 발주일 산출
+"""
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from config import PRODUCTION_PLAN_DAYS, ORDERING_COST, HOLDING_RATE
+
+METHODS = np.array(["lot_for_lot", "eoq"])
+BUCKET_DAYS = {"day": 1, "week": 7}
+QTY_TOL = 1e-6                  # 수량 비교 허용오차 (NUMERIC(18,6) 해상도)
+
+
+# ─────────────────────────────────────────────────────────────
+# 1) 계획 행렬 → 총소요량
+# ─────────────────────────────────────────────────────────────
+
+def plan_matrix(plans: pd.DataFrame, periods: list, items: pd.Index) -> sp.csr_matrix:
+    """생산계획 (period, product_id, planned_qty) → (기간 × 품목) CSR
+
+    BOM 품목에 없는 제품·기간 밖 행·수량 ≤ 0 행은 제외 (동일 칸은 합산)
+    """
+    row = pd.Index(periods).get_indexer(plans["period"])
+    col = items.get_indexer(plans["product_id"])
+    qty = pd.to_numeric(plans["planned_qty"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    keep = (row >= 0) & (col >= 0) & (qty > 0)
+    return sp.csr_matrix((qty[keep], (row[keep], col[keep])), shape=(len(periods), len(items)))
+
+
+def gross_requirements(plan: sp.csr_matrix, bom: dict) -> tuple:
+    """(기간 × 품목) 계획 → (소요 자재 인덱스 배열, 기간 × 자재 총소요량 밀집 배열)"""
+    gross = (plan @ bom["leaf_total"]).tocsc()
+    gross.eliminate_zeros()
+    comps = np.flatnonzero(np.diff(gross.indptr) > 0)
+    return comps, gross[:, comps].toarray()
+
+
+def requirement_sources(plan: sp.csr_matrix, bom: dict, comps: np.ndarray,
+                        limit: int = 5) -> pd.DataFrame:
+    """기간·자재별 소요 원천 계획 품목 (품목코드 정렬 후 limit개)
+
+    Returns: DataFrame(period_idx, comp_pos, parents: list)
+    """
+    coo = plan.tocoo()
+    pairs = bom["leaf_total"][coo.col].tocoo()           # 행 = (기간, 품목) 쌍, 열 = 자재
+    comp_pos = pd.Index(comps).get_indexer(pairs.col)
+    df = pd.DataFrame({
+        "period_idx": coo.row[pairs.row],
+        "comp_pos": comp_pos,
+        "parent": bom["items"][coo.col[pairs.row]],
+    })
+    df = df[df["comp_pos"] >= 0].sort_values("parent")
+    return (df.groupby(["period_idx", "comp_pos"])["parent"]
+            .agg(lambda s: list(s[:limit])).rename("parents").reset_index())
+
+
+# ─────────────────────────────────────────────────────────────
+# 2) Netting / 로트 사이징
+# ─────────────────────────────────────────────────────────────
+
+def eoq_arrays(annual_demand: np.ndarray, unit_price: np.ndarray) -> tuple:
+    """경제적 주문량 배열 — (eoq, method 코드: 0 = lot_for_lot, 1 = eoq)
+
+    연수요·단가가 0 이하이면 0 / lot_for_lot, 보관비 0 이하이면 월수요 / lot_for_lot
+    """
+    holding = unit_price * HOLDING_RATE
+    valid = (annual_demand > 0) & (unit_price > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        eoq = np.sqrt(2 * annual_demand * ORDERING_COST / holding)
+    eoq = np.select([~valid, holding <= 0], [0.0, annual_demand / 12], default=eoq)
+    return eoq, (valid & (holding > 0)).astype(np.int8)
+
+
+def net_requirements(gross: np.ndarray, on_hand: np.ndarray, pending: np.ndarray,
+                     lead_avg: np.ndarray, safety_days: np.ndarray,
+                     unit_price: np.ndarray) -> dict:
+    """기간 × 자재 배열 일괄 netting
+
+    Args:
+        gross / on_hand / pending: (W × K)  — 재고·미입고는 기간별 보정값
+        lead_avg / safety_days / unit_price: (K,)  — safety_days = 안전재고 일수 (safety_stock, 없으면 P90 리드타임)
+    Returns:
+        {"net", "daily", "safety_stock", "rop", "recommended", "method", "order"} (W × K)
+        order = 발주 추천 대상 여부
+    """
+    net = np.maximum(0.0, gross - on_hand - pending)
+    daily = gross / PRODUCTION_PLAN_DAYS if PRODUCTION_PLAN_DAYS > 0 else np.zeros_like(gross)
+    safety = safety_days * daily
+    rop = daily * lead_avg + safety
+    eoq, eoq_method = eoq_arrays(daily * 365, np.broadcast_to(unit_price, gross.shape))
+
+    replenish = (net <= 0) & (on_hand + pending < rop)      # 순소요 없어도 ROP 미만 → 보충
+    use_eoq = (net > 0) & (eoq > 0) & (eoq > net)
+    recommended = np.maximum(0.0, np.select(
+        [replenish, use_eoq, net > 0],
+        [np.maximum(safety, eoq), eoq, net],
+        default=0.0,
+    ))
+    method = np.where(replenish | use_eoq, eoq_method, 0)
+
+    return {
+        "net": net,
+        "daily": daily,
+        "safety_stock": safety,
+        "rop": rop,
+        "recommended": recommended,
+        "method": METHODS[method],
+        "order": recommended > 0,
+    }
+
+
+def rolling_net_requirements(gross: np.ndarray, on_hand: np.ndarray, pending: np.ndarray,
+                             lead_avg: np.ndarray, safety_days: np.ndarray, unit_price: np.ndarray,
+                             fixed: np.ndarray | None = None, lead_weeks: np.ndarray | None = None) -> dict:
+    """롤링 호라이즌 netting — 기간 순으로 예상 재고를 이월하며 기간별 net_requirements() 적용
+
+    Args:
+        gross: (W × K), on_hand / pending: (K,) 첫 기간 기초 재고·미입고 (미입고는 첫 기간 입고 가정)
+        fixed: (W × K) 확정 발주량 (NaN = 미확정) — 확정 칸은 산출값 대신 이월에 사용
+        lead_weeks: (K,) 발주 → 입고 기간 수 (None = 0, 발주 기간에 입고)
+    Returns:
+        net_requirements() 결과 + "on_hand" / "pending" (W × K, 기간별 기초 재고·입고 예정)
+        - 기간 w 발주량 (추천·확정) 은 w + lead_weeks 기간에 입고 — 그 전까지 재고 이월에는 미반영
+        - netting 의 입고 예정 = 이번 기간 입고 + 이후 입고될 발주 잔량 (재고 포지션, 이중 발주 방지)
+        - 다음 기간 기초 재고 = max(기초 재고 + 이번 기간 입고 - 총소요량, 0)
+    """
+    n_periods, n_comps = gross.shape
+    lag = np.zeros(n_comps, dtype=np.int64) if lead_weeks is None else np.asarray(lead_weeks, dtype=np.int64)
+    cols = np.arange(n_comps)
+    inv = np.asarray(on_hand, dtype=float)
+    due = np.zeros((n_periods + int(lag.max(initial=0)) + 1, n_comps))
+    due[0] = np.asarray(pending, dtype=float)
+    parts = []
+    for w in range(n_periods):
+        pend = due[w] + due[w + 1:].sum(axis=0)
+        m = net_requirements(gross[w:w + 1], inv[None], pend[None], lead_avg, safety_days, unit_price)
+        if fixed is not None:
+            m["recommended"] = np.where(np.isnan(fixed[w:w + 1]), m["recommended"], fixed[w:w + 1])
+            m["order"] = m["recommended"] > 0
+        m["on_hand"], m["pending"] = inv[None], pend[None]
+        parts.append(m)
+        rec = m["recommended"][0]
+        due[w + lag, cols] += np.where(lag > 0, rec, 0.0)
+        inv = np.maximum(inv + due[w] + np.where(lag > 0, 0.0, rec) - gross[w], 0.0)
+    return {k: np.concatenate([m[k] for m in parts]) for k in parts[0]}
+
+
+# ─────────────────────────────────────────────────────────────
+# 3) 기간별 MRP (버킷 단위 예상 재고 · 리드타임 역산)
+# ─────────────────────────────────────────────────────────────
+
+def bucket_starts(today, last_day, bucket: str) -> np.ndarray:
+    """today ~ last_day 를 덮는 버킷 시작일 배열 (datetime64[D]) — 주 버킷은 월요일 시작"""
+    step = BUCKET_DAYS[bucket]
+    first = np.datetime64(today, "D")
+    if bucket == "week":
+        first = first - np.timedelta64(int(first.astype(object).weekday()), "D")
+    n = max(int((np.datetime64(last_day, "D") - first).astype(int)) // step + 1, 1)
+    return first + np.arange(n) * np.timedelta64(step, "D")
+
+
+def bucket_index(dates: np.ndarray, starts: np.ndarray, bucket: str) -> np.ndarray:
+    """날짜 (datetime64[D]) → 버킷 인덱스 (첫 버킷 이전 = 0 으로 당김, 마지막 버킷 이후 = -1)"""
+    step = BUCKET_DAYS[bucket]
+    idx = (dates - starts[0]).astype("timedelta64[D]").astype(np.int64) // step
+    idx = np.maximum(idx, 0)
+    return np.where(idx < len(starts), idx, -1)
+
+
+def daily_plan(plans: pd.DataFrame, today) -> pd.DataFrame:
+    """생산계획 (product_id, planned_qty, target_start, target_end) → 일별 (day, product_id, qty)
+
+    계획수량은 target_start ~ target_end 일수로 균등 분할, 기준일 이전 분량은 소진된 것으로 보고 제외
+    """
+    start = pd.to_datetime(plans["target_start"], errors="coerce").to_numpy().astype("datetime64[D]")
+    end = pd.to_datetime(plans["target_end"], errors="coerce").to_numpy().astype("datetime64[D]")
+    qty = pd.to_numeric(plans["planned_qty"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    valid = ~np.isnat(start) & ~np.isnat(end) & (qty > 0)
+    start, end, qty = start[valid], np.maximum(end[valid], start[valid]), qty[valid]
+    pids = plans["product_id"].to_numpy(dtype=object)[valid]
+
+    n_days = (end - start).astype(np.int64) + 1
+    offset = np.arange(n_days.sum()) - np.repeat(np.cumsum(n_days) - n_days, n_days)
+    out = pd.DataFrame({
+        "day": np.repeat(start, n_days) + offset.astype("timedelta64[D]"),
+        "product_id": np.repeat(pids, n_days),
+        "qty": np.repeat(qty / n_days, n_days),
+    })
+    return out[out["day"] >= np.datetime64(today, "D")].reset_index(drop=True)
+
+
+def time_phased(gross: np.ndarray, on_hand: np.ndarray, scheduled: np.ndarray,
+                safety: np.ndarray, lot: np.ndarray) -> tuple:
+    """버킷 × 자재 예상 재고 전개 — 버킷마다 (기초 + 예정 입고 - 총소요) < 안전재고 이면 계획 입고
+
+    계획 입고량 = max(안전재고 부족분, lot)   (lot = EOQ, lot-for-lot 자재는 0)
+    Args:
+        gross / scheduled: (T × K),  on_hand / safety / lot: (K,)
+    Returns:
+        (planned, projected)  — (T × K) 계획 입고량, 계획 입고 반영 후 버킷말 예상 재고
+    """
+    planned = np.zeros_like(gross)
+    projected = np.empty_like(gross)
+    proj = on_hand.astype(float)
+    for t in range(gross.shape[0]):
+        proj = proj + scheduled[t] - gross[t]
+        planned[t] = np.where(proj < safety - QTY_TOL, np.maximum(safety - proj, lot), 0.0)
+        proj = proj + planned[t]
+        projected[t] = proj
+    return planned, projected
+
+
+def release_schedule(starts: np.ndarray, t: np.ndarray, lead_days: np.ndarray,
+                     bucket: str, today) -> tuple:
+    """계획 입고 버킷 t → (계획 발주일, 발주 지연 여부)
+
+    발주 버킷 = t - ceil(리드타임 / 버킷 일수). 첫 버킷 이전이면 기준일 발주 + past_due
+    """
+    step = BUCKET_DAYS[bucket]
+    release_t = t - np.ceil(np.maximum(lead_days, 0) / step).astype(np.int64)
+    past_due = release_t < 0
+    release = starts[0] + release_t * np.timedelta64(step, "D")
+    return np.maximum(release, np.datetime64(today, "D")), past_due
@@ -0,0 +1,165 @@
+"""
+생산계획 최적화 엔진 (LP / MIP) — 공유 생산 라인 캐파시티를 전 제품에 한 번에 배분
+s7_production_plan.py (PRODUCTION_PLAN_MODE = "lp") / bench_production_plan.py 에서 사용
+
+원 문제 (제품 i, 제품이 생산 이력을 가진 라인 l):
+  min Σ_i  w_i · (c50 · (r50_i - q_i)⁺ + c90 · (r90_i - q_i)⁺) + v_i · c_h · (q_i - r50_i⁺)⁺
+  s.t. q_i = Σ_l x[i,l],   Σ_i x[i,l] ≤ cap[l],   x ≥ 0
+    r = 수요 + 안전재고 - 재고 (긴급수주 반영), w_i = 우선순위 가중치, v_i = 1 + 과잉 리스크/100
+    → P50 부족 + P50~P90 꼬리 부족 2구간 선형 기대 결품 비용 + P50 초과 생산 보관 비용
+
+목적함수가 q 에 대해 볼록 구간 선형이므로 q 를 한계이익 구간으로 분해해 부족·초과 변수 없이 풀이:
+  y1_i ∈ [0, r50⁺]          단위 이익 w·(c50 + c90)        (P50 까지 — 두 부족분 동시 감소)
+  y2_i ∈ [0, r90 - r50⁺]    단위 이익 w·c90 - v·c_h        (이익 ≤ 0 이면 상한 0 — P90 까지 생산 안 함)
+  Σ_l x[i,l] = y1_i + y2_i  (제품당 등식 1행) + 라인 캐파 (라인당 1행)
+  y1 이익 > y2 이익 이므로 최적해는 항상 y1 을 먼저 채움 — 원 문제와 동일한 해
+라인 이력 없는 제품은 가상 라인 1개 (제품 자체 캐파 max_qty 상한 — greedy 와 동일).
+확정 (동결) 제품은 확정 수량을 이력 라인에 균등 분할해 라인 캐파에서 선차감하고 배분에서 제외.
+제약 행렬은 (제품 × 제품-라인) / (라인 × 제품-라인) 결합 행렬을 scipy.sparse 로 일괄 구성,
+HiGHS (scipy.optimize.milp) 로 풀이 — integer=True 면 라인별 생산량 정수 (MIP)
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.optimize import Bounds, LinearConstraint, milp
+
+from config import (
+    PRODUCTION_PLAN_DAYS, PRODUCTION_CAPACITY_BUFFER,
+    PRODUCTION_LP_COSTS, PRODUCTION_LP_TIME_LIMIT,
+)
+
+
+# ─────────────────────────────────────────────────────────────
+# 1) 라인 캐파시티
+# ─────────────────────────────────────────────────────────────
+
+def line_capacity(prod: pd.DataFrame, days: int = PRODUCTION_PLAN_DAYS,
+                  buffer: float = PRODUCTION_CAPACITY_BUFFER) -> tuple:
+    """생산 실적 (production_date, product_id, line_id, produced_qty) → (라인 캐파, 제품-라인 쌍)
+
+    라인 캐파 = 가동일 일평균 총생산량 × buffer × days  (라인 내 제품 간 수량 단위 동일 가정)
+    Returns: (pd.Series {line_id: 계획기간 캐파}, DataFrame(product_id, line_id))
+    """
+    prod = prod[prod["line_id"].notna() & (prod["line_id"] != "") & prod["product_id"].notna()]
+    daily = prod.groupby(["line_id", "production_date"])["produced_qty"].sum()
+    caps = daily.groupby(level="line_id").mean() * buffer * days
+    pairs = prod[["product_id", "line_id"]].drop_duplicates().reset_index(drop=True)
+    return caps[caps > 0], pairs[pairs["line_id"].isin(caps[caps > 0].index)]
+
+
+# ─────────────────────────────────────────────────────────────
+# 2) LP / MIP
+# ─────────────────────────────────────────────────────────────
+
+def solve_plan(products: pd.Index, r50: np.ndarray, r90: np.ndarray,
+               pairs: pd.DataFrame, caps: pd.Series,
+               stockout_w: np.ndarray | None = None, holding_w: np.ndarray | None = None,
+               costs: dict = PRODUCTION_LP_COSTS, integer: bool = False,
+               time_limit: float = PRODUCTION_LP_TIME_LIMIT,
+               fixed_qty: np.ndarray | None = None, max_qty: np.ndarray | None = None) -> dict:
+    """제품별 소요·가중치 + 제품-라인 쌍·라인 캐파 → 최적 생산량
+
+    Args:
+        products: 제품 인덱스 (r50 / r90 / 가중치 배열 순서)
+        pairs: product_id, line_id — products 에 없는 제품·caps 에 없는 라인은 무시
+        fixed_qty: 확정 (동결) 생산량, NaN = 배분 대상 — 라인에 균등 분할해 캐파에서 선차감, 해는 확정 수량 그대로
+        max_qty: 라인 없는 제품 (가상 라인) 생산 상한 — greedy 의 자체 캐파 (max_cap) 와 같은 값, inf = 무제한
+    Returns:
+        {"qty", "short_p50", "short_p90", "excess" (제품 배열), "line_load" (caps 순서 Series),
+         "status", "message", "objective", "seconds"}
+    """
+    n = len(products)
+    r50 = np.asarray(r50, dtype=float)
+    r90 = np.maximum(np.asarray(r90, dtype=float), r50)
+    stockout_w = np.ones(n) if stockout_w is None else np.asarray(stockout_w, dtype=float)
+    holding_w = np.ones(n) if holding_w is None else np.asarray(holding_w, dtype=float)
+
+    # 제품-라인 쌍: 이력 라인 + 라인 없는 제품은 가상 라인
+    pi = products.get_indexer(pairs["product_id"])
+    li = caps.index.get_indexer(pairs["line_id"])
+    keep = (pi >= 0) & (li >= 0)
+    pi, li = pi[keep], li[keep]
+    lineless = np.setdiff1d(np.arange(n), pi)
+    pi = np.concatenate([pi, lineless])
+    li = np.concatenate([li, np.full(len(lineless), -1)])
+    n_pairs = len(pi)
+
+    # 확정 생산량 → 라인 부하 선차감 (제품 내 라인 균등 분할), 확정 제품의 쌍은 배분 제외
+    fixed = np.full(n, np.nan) if fixed_qty is None else np.asarray(fixed_qty, dtype=float)
+    frozen = ~np.isnan(fixed)
+    fq = np.where(frozen, fixed, 0.0)
+    real_pair = li >= 0
+    n_lines = np.bincount(pi[real_pair], minlength=n)
+    fixed_load = np.bincount(li[real_pair], weights=(fq / np.maximum(n_lines, 1))[pi[real_pair]],
+                             minlength=len(caps))
+    free_caps = np.maximum(caps.to_numpy(dtype=float) - fixed_load, 0.0)
+    max_qty = np.full(n, np.inf) if max_qty is None else np.asarray(max_qty, dtype=float)
+    x_ub = np.where(frozen[pi], 0.0, np.where(real_pair, np.inf, max_qty[pi]))
+
+    # 결합 행렬: B (제품 × 쌍), L (라인 × 쌍, 가상 라인 제외)
+    B = sp.csr_matrix((np.ones(n_pairs), (pi, np.arange(n_pairs))), shape=(n, n_pairs))
+    real = li >= 0
+    L = sp.csr_matrix((np.ones(real.sum()), (li[real], np.flatnonzero(real))),
+                      shape=(len(caps), n_pairs))
+    I = sp.identity(n, format="csr")
+    Z = sp.csr_matrix((len(caps), n))
+
+    # 한계이익 구간
+    r50p = np.maximum(r50, 0)
+    gain1 = stockout_w * (costs["stockout_p50"] + costs["stockout_p90"])
+    gain2 = stockout_w * costs["stockout_p90"] - holding_w * costs["holding"]
+    seg2 = np.where(gain2 > 0, r90 - r50p, 0.0)
+
+    #        x   y1  y2
+    A = sp.vstack([
+        sp.hstack([B, -I, -I]),       # Σx - y1 - y2 = 0
+        sp.hstack([L,  Z,  Z]),       # 라인 부하 ≤ cap
+    ], format="csr")
+    lb = np.concatenate([np.zeros(n), np.full(len(caps), -np.inf)])
+    ub = np.concatenate([np.zeros(n), free_caps])
+    c = np.concatenate([np.zeros(n_pairs), -gain1, -gain2])
+    bounds = Bounds(np.zeros(n_pairs + 2 * n),
+                    np.concatenate([x_ub, np.where(frozen, 0.0, r50p), np.where(frozen, 0.0, np.maximum(seg2, 0))]))
+    integrality = np.concatenate([np.full(n_pairs, int(integer)), np.zeros(2 * n)])
+
+    t0 = time.perf_counter()
+    res = milp(c, constraints=LinearConstraint(A, lb, ub), bounds=bounds,
+               integrality=integrality, options={"time_limit": time_limit})
+    seconds = time.perf_counter() - t0
+    if res.x is None:
+        raise RuntimeError(f"생산계획 LP 풀이 실패: {res.message}")
+
+    x = res.x[:n_pairs]
+    qty = np.where(frozen, fq, np.bincount(pi, weights=x, minlength=n))
+    return {
+        "qty": qty,
+        "short_p50": np.maximum(r50 - qty, 0),
+        "short_p90": np.maximum(r90 - qty, 0),
+        "excess": np.maximum(qty - r50p, 0),
+        "line_load": pd.Series(L @ x + fixed_load, index=caps.index),
+        "status": res.status,
+        "message": res.message,
+        "objective": plan_cost(qty, r50, r90, stockout_w, holding_w, costs)["cost"],
+        "seconds": seconds,
+    }
+
+
+def plan_cost(qty: np.ndarray, r50: np.ndarray, r90: np.ndarray,
+              stockout_w: np.ndarray, holding_w: np.ndarray,
+              costs: dict = PRODUCTION_LP_COSTS) -> dict:
+    """임의 생산량 (예: 휴리스틱 결과) 을 LP 목적함수 기준으로 평가 — 결품·보관 수량과 비용"""
+    r90 = np.maximum(r90, r50)
+    short50 = np.maximum(r50 - qty, 0)
+    short90 = np.maximum(r90 - qty, 0)
+    excess = np.maximum(qty - np.maximum(r50, 0), 0)
+    cost = (stockout_w * (costs["stockout_p50"] * short50 + costs["stockout_p90"] * short90)
+            + holding_w * costs["holding"] * excess)
+    return {
+        "short_p50": float(short50.sum()),
+        "short_p90": float(short90.sum()),
+        "excess": float(excess.sum()),
+        "cost": float(cost.sum()),
+    }
@@ -0,0 +1,178 @@
+"""
+리스크 스코어링 엔진 — 제품별 정렬된 NumPy 배열로 4개 리스크 요소 일괄 산출
+s5_risk_score.py 에서 사용
+
+제품 루프의 if/elif 분기 → np.select 조건 목록 (분기 순서 = 조건 우선순위)
+clamp(0~100)             → np.clip
+납기 리스크 건수         → (제품 인덱스, 납기일 datetime64) 배열 비교 후 np.bincount 집계
+"""
+
+import numpy as np
+import pandas as pd
+
+from config import RISK_WEIGHTS, RISK_GRADE_BOUNDS
+
+DEFAULT_LEAD_P90 = 14.0         # 리드타임 통계 없는 제품 기본값 (일)
+DEFAULT_LEAD_AVG = 7.0
+NO_DEMAND_DAYS = 999.0          # 수요 없는 제품의 재고일수 표기값
+
+
+def _clip(x: np.ndarray) -> np.ndarray:
+    return np.clip(x, 0.0, 100.0)
+
+
+# ─────────────────────────────────────────────────────────────
+# 1) 리스크 요소별 점수
+# ─────────────────────────────────────────────────────────────
+
+def stockout_score(inv_qty, avg_demand, inv_days, lt_p90, safety_stock) -> np.ndarray:
+    """결품 리스크: 재고일수 < P90 리드타임 → 80~100, 안전재고 미달 → 50~80, 2×리드타임 이내 → 0~30"""
+    return np.select(
+        [
+            avg_demand <= 0,
+            inv_qty <= 0,
+            inv_days < lt_p90,
+            inv_qty < safety_stock,
+            inv_days < lt_p90 * 2,
+        ],
+        [
+            0.0,
+            100.0,
+            _clip(80 + (lt_p90 - inv_days) / lt_p90 * 20),
+            _clip(50 + (safety_stock - inv_qty) / safety_stock * 30),
+            _clip(30 * (1 - (inv_days - lt_p90) / lt_p90)),
+        ],
+        default=0.0,
+    )
+
+
+def excess_score(inv_qty, avg_demand) -> np.ndarray:
+    """과잉 리스크: 재고 개월수 > 6 → 80~, > 3 → 40~, > 2 → 20~ (수요 없는 제품은 재고 있으면 30)"""
+    months_supply = inv_qty / (avg_demand * 30)
+    return np.select(
+        [
+            avg_demand <= 0,
+            months_supply > 6,
+            months_supply > 3,
+            months_supply > 2,
+        ],
+        [
+            np.where(inv_qty > 0, 30.0, 0.0),
+            _clip(80 + (months_supply - 6) * 5),
+            _clip(40 + (months_supply - 3) * 13.3),
+            _clip(20 + (months_supply - 2) * 20),
+        ],
+        default=0.0,
+    )
+
+
+def delivery_counts(order_idx: np.ndarray, delivery: np.ndarray, n_orders: np.ndarray,
+                    lt_mean: np.ndarray, today: np.datetime64) -> tuple:
+    """미처리 수주 (제품 인덱스, 납기일, 건수) → 제품별 (납기 초과 건수, 리드타임 내 긴급 건수)
+
+    order_idx: 제품 배열 기준 인덱스 (-1 = 스코어 대상 아닌 제품, 제외)
+    """
+    n = len(lt_mean)
+    keep = order_idx >= 0
+    idx, n_orders = order_idx[keep], n_orders[keep]
+    remaining = (delivery[keep] - today).astype("timedelta64[D]").astype(np.int64)
+
+    overdue = remaining < 0
+    urgent = ~overdue & (remaining < lt_mean[idx])
+    return (
+        np.bincount(idx[overdue], weights=n_orders[overdue], minlength=n),
+        np.bincount(idx[urgent], weights=n_orders[urgent], minlength=n),
+    )
+
+
+def delivery_score(overdue: np.ndarray, urgent: np.ndarray) -> np.ndarray:
+    """납기 리스크: 납기 초과 70점 + 건당 5, 리드타임 내 긴급 40점 + 건당 8"""
+    return np.select(
+        [overdue > 0, urgent > 0],
+        [_clip(70 + overdue * 5), _clip(40 + urgent * 8)],
+        default=0.0,
+    )
+
+
+def margin_score(bom_cost: np.ndarray, rev_price: np.ndarray) -> np.ndarray:
+    """마진 리스크: 마진율 < 5% → 80~, < 10% → 40~, < 20% → 10~ (원가·매출단가 모두 있는 제품만)"""
+    valid = ~np.isnan(bom_cost) & ~np.isnan(rev_price) & (rev_price > 0)
+    margin_pct = (rev_price - bom_cost) / rev_price * 100
+    return np.select(
+        [
+            valid & (margin_pct < 5),
+            valid & (margin_pct < 10),
+            valid & (margin_pct < 20),
+        ],
+        [
+            _clip(80 + (5 - margin_pct) * 4),
+            _clip(40 + (10 - margin_pct) * 8),
+            _clip(10 + (20 - margin_pct)),
+        ],
+        default=0.0,
+    )
+
+
+def risk_grade(total: np.ndarray) -> np.ndarray:
+    """종합 점수 → 등급 (config.RISK_GRADE_BOUNDS 상한 순서, 초과 시 F)"""
+    return np.select(
+        [total <= upper for _, upper in RISK_GRADE_BOUNDS],
+        [grade for grade, _ in RISK_GRADE_BOUNDS],
+        default="F",
+    )
+
+
+# ─────────────────────────────────────────────────────────────
+# 2) 일괄 스코어링
+# ─────────────────────────────────────────────────────────────
+
+def score_products(base: pd.DataFrame, open_orders: pd.DataFrame, today,
+                   weights: dict = RISK_WEIGHTS) -> pd.DataFrame:
+    """제품별 입력 → risk_score 행 DataFrame
+
+    Args:
+        base: product_id, inv_qty, avg_demand, lt_p90, lt_mean, demand_p90,
+              bom_cost, rev_price (값 없음 = NaN → 리드타임은 기본값, 그 외 0 / 마진 미산출)
+              safety_days (선택, safety_stock 테이블) — 안전재고 = 일수 × 일평균 수요, 없으면 리드타임 P90 일수
+        open_orders: product_id, ref_date('YYYY-MM-DD' 납기일), metric_value(건수)
+        today: 평가 기준일 (date)
+    """
+    inv_qty = base["inv_qty"].fillna(0).to_numpy(dtype=float)
+    avg_demand = base["avg_demand"].fillna(0).to_numpy(dtype=float)
+    lt_p90 = base["lt_p90"].fillna(DEFAULT_LEAD_P90).to_numpy(dtype=float)
+    lt_mean = base["lt_mean"].fillna(DEFAULT_LEAD_AVG).to_numpy(dtype=float)
+    safety_days = (base["safety_days"].to_numpy(dtype=float) if "safety_days" in base
+                   else np.full(len(base), np.nan))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inv_days = np.where(avg_demand > 0, inv_qty / avg_demand, NO_DEMAND_DAYS)
+        safety_stock = np.where(np.isnan(safety_days), lt_p90, safety_days) * avg_demand
+
+        order_idx = pd.Index(base["product_id"]).get_indexer(open_orders["product_id"])
+        overdue, urgent = delivery_counts(
+            order_idx,
+            pd.to_datetime(open_orders["ref_date"]).to_numpy().astype("datetime64[D]"),
+            open_orders["metric_value"].to_numpy(dtype=float),
+            lt_mean,
+            np.datetime64(today, "D"),
+        )
+
+        scores = {
+            "stockout_risk": stockout_score(inv_qty, avg_demand, inv_days, lt_p90, safety_stock),
+            "excess_risk": excess_score(inv_qty, avg_demand),
+            "delivery_risk": delivery_score(overdue, urgent),
+            "margin_risk": margin_score(base["bom_cost"].to_numpy(dtype=float),
+                                        base["rev_price"].to_numpy(dtype=float)),
+        }
+    total = sum(scores[f"{k}_risk"] * w for k, w in weights.items())
+
+    out = pd.DataFrame({"product_id": base["product_id"].to_numpy()})
+    for c, v in scores.items():
+        out[c] = np.round(v, 2)
+    out["total_risk"] = np.round(total, 2)
+    out["risk_grade"] = risk_grade(total)
+    out["inventory_days"] = np.where(inv_days < NO_DEMAND_DAYS, np.round(inv_days, 2), np.nan)
+    demand_p90 = base["demand_p90"].to_numpy(dtype=float)
+    out["demand_p90"] = np.where(np.isnan(demand_p90), avg_demand * 30, demand_p90)
+    out["safety_stock"] = safety_stock
+    return out
@@ -1,6 +1,24 @@
 """
 예측형 관제(Control Tower) 파이프라인 통합 실행기
 
+스텝별 입력·출력 테이블 선언 (STEP_TABLES) → 의존 그래프 (DAG):
+  - 스텝 B 의 입력 테이블을 같은 실행의 스텝 A 가 출력하면 A → B
+  - 의존 관계 없는 스텝은 동시 실행 (스텝당 별도 프로세스, 최대 PIPELINE_JOBS 개)
+  - 실패한 스텝에 (직·간접) 의존하는 스텝만 건너뜀, 나머지는 계속 실행
+  - 결과 요약에 임계 경로 (실제 소요 기준 가장 긴 의존 사슬) 표시
+
+변경 없는 스텝 건너뜀 (실행 원장 pipeline_run_ledger — 28_pipeline_run_ledger_ddl.sql):
+  - 입력 지문 = 입력 테이블별 (행 수, 최신 타임스탬프, 최대 키) + 코드 버전 (스텝·내부 모듈 소스)
+                + 입력 테이블을 출력하는 스텝의 최근 성공 시각 (같은 id 로 제자리 갱신하는 UPSERT 감지)
+                + 실행일 (산출 행이 실행일 기준인 스텝만 — 날짜가 바뀌면 재실행)
+  - 마지막 성공 실행과 지문이 같으면 건너뜀 (CACHED — 후속 스텝에는 성공으로 취급)
+  - 파이프라인 밖에서 원천 테이블 행을 제자리 수정한 경우는 감지하지 않음 → --force
+
+스텝 계측 (step_metrics.py — 29_pipeline_run_metrics_ddl.sql):
+  - 단계별 시간 (지문 비교 / fetch / compute / write), 읽기·쓰기 행 수, HTTP 왕복, 전송 바이트, 최대 RSS
+  - 결과 요약에 표시 (직전 성공 실행 대비 소요 시간 증감) + pipeline_run_metrics 테이블 + run_metrics/<실행 ID>.json
+  - --profile: 스텝별 cProfile (.prof + 누적 시간 상위 함수), --profile=pyinstrument: HTML (설치 시)
+
 실행:
   python DB/07_pipeline/run_pipeline.py              # 전체 실행 (주간)
   python DB/07_pipeline/run_pipeline.py --step=1,2   # 특정 스텝만
@@ -8,60 +26,393 @@
   python DB/07_pipeline/run_pipeline.py --step=3m,4m # 월간 피처+예측
   python DB/07_pipeline/run_pipeline.py --step=4 --tune   # 주간 예측 + Grid Search 튜닝
   python DB/07_pipeline/run_pipeline.py --step=4m --tune  # 월간 예측 + Grid Search 튜닝
+  python DB/07_pipeline/run_pipeline.py --step=9     # 재고정책 몬테카를로 시뮬레이션 (선택 스텝)
+  python DB/07_pipeline/run_pipeline.py --jobs=1     # 동시 실행 없이 의존 순서대로
+  python DB/07_pipeline/run_pipeline.py --force      # 입력 변경 여부와 관계없이 전체 실행
+  python DB/07_pipeline/run_pipeline.py --step=5 --profile   # 스텝별 cProfile 출력
 """
 
 import sys
 import os
+import ast
 import time
+import queue
+import hashlib
+import importlib
+import traceback
+import multiprocessing as mp
+from datetime import date, datetime, timezone
 
 # 모듈 경로 추가
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-import s0_aggregation
-import s1_daily_inventory
-import s2_lead_time
-import s3_feature_store
-import s4_forecast
-import s5_risk_score
-import s6_action_queue
-import s3m_feature_store_monthly
-import s4m_forecast_monthly
-import s7_production_plan
-import s8_purchase_optimization
-
-# 숫자 스텝 (주간 파이프라인)
+from config import PIPELINE_JOBS
+from cache_utils import sources_fingerprint, last_success, record_run
+import step_metrics
+
+# 숫자 스텝 (주간 파이프라인) — (이름, 모듈명): 스텝 프로세스에서 해당 모듈만 import
 STEPS = {
-    0: ("주별·월별 집계", s0_aggregation),
-    1: ("일간 추정 재고 계산", s1_daily_inventory),
-    2: ("리드타임 통계 산출", s2_lead_time),
-    3: ("피처 엔지니어링(주간)", s3_feature_store),
-    4: ("수요예측 모델(주간)", s4_forecast),
-    5: ("리스크 스코어링", s5_risk_score),
-    6: ("조치 큐 생성", s6_action_queue),
-    7: ("생산 최적화", s7_production_plan),
-    8: ("발주 최적화", s8_purchase_optimization),
+    0: ("주별·월별 집계", "s0_aggregation"),
+    1: ("일간 추정 재고 계산", "s1_daily_inventory"),
+    2: ("리드타임 통계 산출", "s2_lead_time"),
+    3: ("피처 엔지니어링(주간)", "s3_feature_store"),
+    4: ("수요예측 모델(주간)", "s4_forecast"),
+    5: ("리스크 스코어링", "s5_risk_score"),
+    6: ("조치 큐 생성", "s6_action_queue"),
+    7: ("생산 최적화", "s7_production_plan"),
+    8: ("발주 최적화", "s8_purchase_optimization"),
 }
 
 # 문자열 스텝 (월간 파이프라인)
 NAMED_STEPS = {
-    "3m": ("피처 엔지니어링(월간)", s3m_feature_store_monthly),
-    "4m": ("수요예측 모델(월간)", s4m_forecast_monthly),
+    "3m": ("피처 엔지니어링(월간)", "s3m_feature_store_monthly"),
+    "4m": ("수요예측 모델(월간)", "s4m_forecast_monthly"),
+    # 선택 스텝 (기본 실행 제외 — --step=9 로 지정)
+    "9": ("재고정책 시뮬레이션", "s9_policy_simulation"),
+}
+
+# 스텝별 (입력 테이블, 출력 테이블) — 의존 관계 판정 기준 (스텝 내부 캐시·워터마크 테이블 제외)
+EXTERNAL_SOURCES = ("economic_indicator", "exchange_rate", "trade_statistics")   # 외부지표 패널 소스
+STEP_TABLES = {
+    "0": (("daily_order", "daily_revenue", "daily_production", "supplier"),
+          ("calendar_week", "weekly_product_summary", "weekly_customer_summary",
+           "monthly_product_summary", "monthly_customer_summary")),
+    "1": (("inventory", "daily_production", "daily_revenue"),
+          ("daily_inventory_estimated", "daily_inventory_interval")),
+    "2": (("purchase_order",),
+          ("product_lead_time", "lead_time_stats")),
+    "3": (("weekly_product_summary", "weekly_customer_summary", "calendar_week", "inventory",
+           "lead_time_stats", "purchase_order", *EXTERNAL_SOURCES),
+          ("feature_store_weekly",)),
+    "3m": (("monthly_product_summary", "monthly_customer_summary", "calendar_week", "inventory",
+            "lead_time_stats", "purchase_order", *EXTERNAL_SOURCES),
+           ("feature_store_monthly",)),
+    "4": (("feature_store_weekly",),
+          ("forecast_result", "model_evaluation", "feature_importance", "tuning_result")),
+    "4m": (("feature_store_monthly",),
+           ("forecast_result", "model_evaluation", "feature_importance", "tuning_result")),
+    "5": (("forecast_result", "inventory", "lead_time_stats", "feature_store_weekly", "daily_order",
+           "daily_revenue", "purchase_order", "bom"),
+          ("risk_score", "safety_stock")),
+    "6": (("risk_score", "product_master", "production_plan", "purchase_recommendation"),
+          ("action_queue",)),
+    "7": (("forecast_result", "inventory", "daily_production", "daily_order", "risk_score",
+           "lead_time_stats", "safety_stock"),
+          ("production_plan",)),
+    "8": (("production_plan", "bom", "inventory", "purchase_order", "lead_time_stats", "safety_stock",
+           "supplier"),
+          ("purchase_recommendation", "planned_order", "supplier_scorecard")),
+    "9": (("forecast_result", "lead_time_stats", "safety_stock", "inventory"),
+          ("policy_simulation",)),
 }
 
 
 TUNE_STEPS = {"4", "4m"}  # --tune 플래그가 적용되는 스텝
+DATED_STEPS = {"2", "4", "4m", "5", "7", "8", "9"}  # 산출 행이 실행일 기준 (calc_date·eval_date·plan_date 등)
+OK_STATUSES = ("OK", "CACHED")  # 후속 스텝 실행 조건
+
+# 입력 지문 컬럼 (ts_col, id_col) — 기본 (None, "id") 외: 키가 id 가 아니거나 updated_at 트리거가 있는 테이블
+FINGERPRINT_COLS = {
+    "supplier": (None, "customer_code"),
+    "product_master": (None, "product_code"),
+    "calendar_week": (None, "year_week"),
+    "production_plan": ("updated_at", "id"),
+    "purchase_recommendation": ("updated_at", "id"),
+}
+
+
+def step_entry(key: str) -> tuple:
+    """스텝 키 → (이름, 모듈명)"""
+    return NAMED_STEPS[key] if key in NAMED_STEPS else STEPS[int(key)]
+
+
+# ─── 의존 그래프 ─────────────────────────────────────────────
+
+def build_dag(keys: list) -> dict:
+    """실행 스텝 → {스텝: 선행 스텝 집합} (입력 테이블을 출력하는 같은 실행의 다른 스텝)"""
+    deps = {}
+    for k in keys:
+        inputs = set(STEP_TABLES[k][0])
+        deps[k] = {d for d in keys if d != k and inputs & set(STEP_TABLES[d][1])}
+    return deps
+
+
+def topo_levels(deps: dict) -> list:
+    """위상 정렬 단계 [[스텝, ...], ...] — 같은 단계는 서로 독립 (순환 의존 시 ValueError)"""
+    remaining = {k: set(v) for k, v in deps.items()}
+    levels = []
+    while remaining:
+        ready = [k for k, v in remaining.items() if not v]
+        if not ready:
+            raise ValueError(f"스텝 순환 의존: {sorted(remaining)}")
+        levels.append(ready)
+        for k in ready:
+            del remaining[k]
+        for v in remaining.values():
+            v.difference_update(ready)
+    return levels
+
+
+def critical_path(deps: dict, times: dict) -> tuple:
+    """실행된 스텝의 소요 시간 기준 가장 긴 의존 사슬 → ([스텝, ...], 합계 초)"""
+    finish, prev = {}, {}
+    for level in topo_levels(deps):
+        for k in level:
+            if k not in times:
+                continue
+            before = max((d for d in deps[k] if d in finish), key=finish.get, default=None)
+            prev[k] = before
+            finish[k] = times[k] + (finish[before] if before else 0.0)
+    if not finish:
+        return [], 0.0
+    k = max(finish, key=finish.get)
+    total, path = finish[k], []
+    while k:
+        path.append(k)
+        k = prev[k]
+    return path[::-1], total
+
+
+# ─── 입력 지문 ───────────────────────────────────────────────
+
+def code_version(module_name: str) -> str:
+    """스텝 모듈 + 파이프라인 디렉터리 내부 import 모듈 (재귀) 소스 SHA-1"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    sources, todo = {}, [module_name]
+    while todo:
+        name = todo.pop()
+        path = os.path.join(here, f"{name}.py")
+        if name in sources or not os.path.isfile(path):
+            continue                        # 외부 패키지·이미 읽은 모듈
+        with open(path, "rb") as f:
+            sources[name] = f.read()
+        for node in ast.walk(ast.parse(sources[name])):
+            if isinstance(node, ast.Import):
+                todo += [a.name.split(".")[0] for a in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                todo.append(node.module.split(".")[0])
+    h = hashlib.sha1()
+    for name in sorted(sources):
+        h.update(name.encode() + b"\0" + sources[name])
+    return h.hexdigest()
+
+
+def step_fingerprint(key: str, tune: bool) -> tuple:
+    """스텝 입력 지문 → (fingerprint, code_version)"""
+    inputs = STEP_TABLES[key][0]
+    version = code_version(step_entry(key)[1])
+    producers = [k for k, (_, outputs) in STEP_TABLES.items() if k != key and set(inputs) & set(outputs)]
+    upstream = last_success(producers) if producers else None
+    extra = {
+        "code": version,
+        "upstream": upstream["finished_at"] if upstream else None,
+        "tune": key in TUNE_STEPS and tune,
+        "date": date.today().isoformat() if key in DATED_STEPS else None,
+    }
+    sources = [(t, *FINGERPRINT_COLS.get(t, (None, "id"))) for t in inputs]
+    return sources_fingerprint(sources, extra), version
+
+
+# ─── 스텝 실행 (자식 프로세스) ───────────────────────────────
+
+class _PrefixWriter:
+    """동시 실행 시 출력 줄 앞에 스텝 키 표시 — 줄 단위로 모아 한 번에 기록 (로그 섞임 방지)"""
+
+    def __init__(self, stream, prefix: str):
+        self.stream, self.prefix, self.buf = stream, prefix, ""
+
+    def write(self, s: str) -> int:
+        self.buf += s
+        *lines, self.buf = self.buf.split("\n")
+        if lines:
+            self.stream.write("".join(f"{self.prefix}{line}\n" for line in lines))
+            self.stream.flush()
+        return len(s)
+
+    def flush(self):
+        if self.buf:
+            self.stream.write(f"{self.prefix}{self.buf}\n")
+            self.buf = ""
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def _step_worker(key: str, tune: bool, force: bool, profile: str | None, run_id: str, prefix: bool, results):
+    """자식 프로세스: 입력 지문 비교 → 스텝 1개 실행 (또는 건너뜀) → 원장 기록,
+    results 큐에 {key, status, time, metrics}"""
+    if prefix:
+        sys.stdout = _PrefixWriter(sys.stdout, f"[{key:>2}] ")
+        sys.stderr = _PrefixWriter(sys.stderr, f"[{key:>2}] ")
+    name, module_name = step_entry(key)
+    print(f"\n{'─' * 60}\nStep {key}: {name}\n{'─' * 60}")
+    step_metrics.install()
+    start = time.perf_counter()
+    started_at = datetime.now(timezone.utc).isoformat()
+    status = "ERROR: 중단"
+    fingerprint = version = last = run_start = None
+    check_sec, profile_path = 0.0, None
+    try:
+        try:
+            fingerprint, version = step_fingerprint(key, tune)
+            last = None if force else last_success([key])
+        except Exception as e:
+            print(f"  [!] 입력 지문 산출 실패 — 지문 비교 없이 실행: {e}")
+        check_sec = time.perf_counter() - start
+
+        if last and fingerprint and last["fingerprint"] == fingerprint:
+            status = "CACHED"
+            print(f"  >> Step {key} 건너뜀 — 입력·코드 변경 없음 (마지막 성공 {last['finished_at']})")
+        else:
+            module = importlib.import_module(module_name)
+            step_metrics.reset()
+            run_start = time.perf_counter()
+            run = (lambda: module.run(tune=True)) if key in TUNE_STEPS and tune else module.run
+            _, profile_path = step_metrics.run_profiled(
+                run, profile, os.path.join(step_metrics.METRICS_DIR, run_id, f"step_{key}"))
+            status = "OK"
+            print(f"  >> Step {key} 완료 ({time.perf_counter() - start:.1f}s)")
+    except Exception as e:
+        status = f"ERROR: {e}"
+        print(f"  >> Step {key} 실패: {e}")
+        traceback.print_exc()
+    finally:
+        metrics = step_metrics.summary(time.perf_counter() - run_start if run_start else 0.0)
+        metrics.update(check_sec=round(check_sec, 3), profile_path=profile_path)
+        # 원장 기록 후 결과 전달 — 후속 스텝의 지문이 이번 성공 시각을 반영하도록
+        try:
+            record_run({
+                "run_id": run_id, "step_key": key,
+                "status": status.lower() if status in OK_STATUSES else "error",
+                "fingerprint": fingerprint, "code_version": version, "forced": force,
+                "started_at": started_at, "duration_sec": round(time.perf_counter() - start, 2),
+                "error_message": None if status in OK_STATUSES else status[len("ERROR: "):],
+            })
+        except Exception as e:
+            print(f"  [!] 실행 원장 기록 실패: {e}")
+        sys.stdout.flush()
+        sys.stderr.flush()
+        results.put({"key": key, "status": status, "time": time.perf_counter() - start, "metrics": metrics})
+
+
+def run_dag(keys: list, deps: dict, tune: bool, jobs: int, force: bool, run_id: str,
+            profile: str | None = None) -> dict:
+    """의존 순서·동시 실행 수 제한 내에서 스텝 실행 → {스텝: {status, time, start, metrics}}"""
+    ctx = mp.get_context("spawn")            # 부모의 HTTP 연결·스레드 상태를 물려받지 않도록
+    results = ctx.Queue()
+    order = {k: i for i, k in enumerate(keys)}
+    waiting = set(keys)
+    running = {}                            # key → Process
+    started = {}                            # key → 시작 시점 (실행 시작 기준 초)
+    done = {}
+    t0 = time.perf_counter()
+
+    while waiting or running:
+        # 선행 스텝이 모두 성공한 스텝 시작 / 실패한 선행 스텝이 있으면 건너뜀
+        for k in sorted(waiting, key=order.get):
+            failed = [d for d in deps[k] if d in done and done[d]["status"] not in OK_STATUSES]
+            if failed:
+                failed = sorted(failed, key=order.get)
+                waiting.discard(k)
+                done[k] = {"status": f"SKIP (← {', '.join(failed)})", "time": 0.0, "start": None, "metrics": {}}
+                print(f"  >> Step {k} 건너뜀 — 선행 스텝 {failed} 실패·건너뜀")
+            elif all(d in done for d in deps[k]) and len(running) < jobs:
+                waiting.discard(k)
+                p = ctx.Process(target=_step_worker, args=(k, tune, force, profile, run_id, jobs > 1, results), name=f"step-{k}")
+                started[k] = time.perf_counter() - t0
+                p.start()
+                running[k] = p
+
+        if not running:
+            continue
+        try:
+            msg = results.get(timeout=1.0)
+        except queue.Empty:
+            # 결과 없이 비정상 종료된 프로세스 (강제 종료·메모리 부족 등) 실패 처리
+            for k, p in list(running.items()):
+                if p.exitcode not in (None, 0):
+                    done[k] = {"status": f"ERROR: 프로세스 비정상 종료 (exit {p.exitcode})",
+                               "time": time.perf_counter() - t0 - started[k], "start": started[k],
+                               "metrics": {}}
+                    del running[k]
+                    try:
+                        record_run({"run_id": run_id, "step_key": k, "status": "error", "forced": force,
+                                    "duration_sec": round(done[k]["time"], 2),
+                                    "error_message": done[k]["status"][len("ERROR: "):]})
+                    except Exception as e:
+                        print(f"  [!] 실행 원장 기록 실패: {e}")
+            continue
+        if msg["key"] not in running:
+            continue
+        running.pop(msg["key"]).join()
+        done[msg["key"]] = {"status": msg["status"], "time": msg["time"], "start": started[msg["key"]],
+                            "metrics": msg["metrics"]}
+
+    return done
+
+
+def report_metrics(keys: list, levels: list, done: dict, run: dict):
+    """스텝 계측 요약 출력 (직전 성공 실행 대비 소요 시간) → 지표 테이블 + JSON 파일 저장"""
+    try:
+        prev = step_metrics.previous_totals(keys)
+    except Exception as e:
+        print(f"  [!] 이전 실행 지표 조회 실패: {e}")
+        prev = {}
+
+    print("\n스텝 계측 (초 / 행 / HTTP 요청 / 전송 MB / 최대 RSS MB)")
+    print(f"{'Step':>5} {'지문':>6} {'fetch':>7} {'compute':>8} {'write':>7} {'읽기행':>10} {'쓰기행':>10} "
+          f"{'HTTP':>6} {'MB':>7} {'RSS':>6} {'이전 대비':>9}")
+    print(f"{'─' * 96}")
+    steps = []
+    for k in (k for lv in levels for k in lv):
+        info = done[k]
+        status = info["status"]
+        steps.append({
+            "step_key": k,
+            "status": ("skipped" if status.startswith("SKIP")
+                       else status.lower() if status in OK_STATUSES else "error"),
+            "start_sec": None if info["start"] is None else round(info["start"], 2),
+            "total_sec": round(info["time"], 3),
+            **info["metrics"],
+        })
+        m = info["metrics"]
+        if "fetch_sec" not in m:
+            # 입력 불변·계측 미설치 — 지문 비교 시간만 / 건너뜀·비정상 종료 — 지표 없음
+            if "check_sec" in m:
+                print(f"{k:>5} {m['check_sec']:>6.1f}   (실행 구간 지표 없음 — {status})")
+            continue
+        mb = (m["bytes_sent"] + m["bytes_received"]) / 1e6
+        rss = f"{m['peak_rss_mb']:>6,.0f}" if m["peak_rss_mb"] is not None else f"{'N/A':>6}"
+        delta = (f"{(info['time'] / prev[k] - 1) * 100:>+8.0f}%"
+                 if status == "OK" and prev.get(k) else f"{'-':>9}")
+        print(f"{k:>5} {m['check_sec']:>6.1f} {m['fetch_sec']:>7.1f} {m['compute_sec']:>8.1f} {m['write_sec']:>7.1f} "
+              f"{m['rows_read']:>10,} {m['rows_written']:>10,} {m['fetch_calls'] + m['write_calls']:>6,} "
+              f"{mb:>7.1f} {rss} {delta}")
+        if m.get("profile_path"):
+            print(f"{'':>5} 프로파일: {m['profile_path']}")
+    print(f"{'─' * 96}")
+
+    try:
+        path = step_metrics.save_metrics(run, steps)
+        print(f"  지표 저장: {step_metrics.METRICS_TABLE} + {path}")
+    except Exception as e:
+        print(f"  [!] 지표 저장 실패: {e}")
 
 
 def main():
-    # --step 옵션 파싱
+    # --step / --jobs 옵션 파싱
     target_steps_raw = None
     tune_mode = "--tune" in sys.argv
-    for arg in sys.argv[1:]:
-        if arg.startswith("--step="):
-            target_steps_raw = arg.split("=", 1)[1].split(",")
+    force = "--force" in sys.argv
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    if "step" in opts:
+        target_steps_raw = opts["step"].split(",")
+    jobs = max(1, int(opts.get("jobs", PIPELINE_JOBS)))
+    profile = opts.get("profile", "cprofile" if "--profile" in sys.argv else None)
 
     # 실행할 스텝 결정
-    run_list = []  # [(key, name, module), ...]
+    run_list = []  # [(key, name, module_name), ...]
 
     if target_steps_raw:
         for s in target_steps_raw:
@@ -80,56 +431,60 @@ def main():
                 except ValueError:
                     print(f"[!] 알 수 없는 스텝: {s}")
     else:
-        # 기본: 숫자 스텝만 실행 (0~6)
+        # 기본: 숫자 스텝만 실행 (0~8)
         for num in sorted(STEPS.keys()):
             name, module = STEPS[num]
             run_list.append((str(num), name, module))
 
+    keys = list(dict.fromkeys(r[0] for r in run_list))
+    names = {r[0]: r[1] for r in run_list}
+    deps = build_dag(keys)
+    levels = topo_levels(deps)
+
     print("=" * 60)
     print("예측형 관제 파이프라인 실행")
-    print(f"실행 스텝: {[r[0] for r in run_list]}")
+    run_id = time.strftime("%Y%m%dT%H%M%S")
+    print(f"실행 스텝: {keys} (실행 ID {run_id})")
+    print(f"실행 계획: {' → '.join('[' + ', '.join(lv) + ']' for lv in levels)} (동시 실행 최대 {jobs}개)")
     if tune_mode:
         print(f"튜닝 모드: ON (Grid Search)")
+    if force:
+        print("강제 실행: ON (입력 지문 비교 없이 전체 실행)")
+    if profile:
+        print(f"프로파일: ON ({profile})")
     print("=" * 60)
 
+    started_at = datetime.now(timezone.utc).isoformat()
     total_start = time.time()
-    results = []
-
-    for step_key, name, module in run_list:
-        print(f"\n{'─' * 60}")
-        print(f"Step {step_key}: {name}")
-        print(f"{'─' * 60}")
-
-        start = time.time()
-        try:
-            if step_key in TUNE_STEPS and tune_mode:
-                module.run(tune=True)
-            else:
-                module.run()
-            elapsed = time.time() - start
-            results.append({"key": step_key, "name": name, "status": "OK", "time": elapsed})
-            print(f"  >> Step {step_key} 완료 ({elapsed:.1f}s)")
-        except Exception as e:
-            elapsed = time.time() - start
-            results.append({"key": step_key, "name": name, "status": f"ERROR: {e}", "time": elapsed})
-            print(f"  >> Step {step_key} 실패: {e}")
-            import traceback
-            traceback.print_exc()
-
+    done = run_dag(keys, deps, tune_mode, jobs, force, run_id, profile)
     total_time = time.time() - total_start
 
-    # 결과 요약
+    # 결과 요약 (실행 계획 순)
     print(f"\n{'=' * 60}")
     print("파이프라인 실행 결과")
     print(f"{'=' * 60}")
-    print(f"{'Step':>5} {'이름':<25} {'소요시간':>10} {'상태':<10}")
+    print(f"{'Step':>5} {'이름':<25} {'시작':>7} {'소요시간':>10} {'상태':<10}")
     print(f"{'─' * 60}")
-    for info in results:
-        print(f"{info['key']:>5} {info['name']:<25} {info['time']:>9.1f}s {info['status']}")
+    for k in (k for lv in levels for k in lv):
+        info = done[k]
+        start = f"{info['start']:>6.1f}s" if info["start"] is not None else f"{'-':>7}"
+        print(f"{k:>5} {names[k]:<25} {start} {info['time']:>9.1f}s {info['status']}")
     print(f"{'─' * 60}")
-    print(f"{'합계':>31} {total_time:>9.1f}s")
+    path, path_time = critical_path(deps, {k: v["time"] for k, v in done.items() if v["start"] is not None})
+    serial = sum(v["time"] for v in done.values())
+    print(f"  임계 경로: {' → '.join(path)} ({path_time:.1f}s)")
+    print(f"  스텝 소요 합계 {serial:.1f}s / 실제 경과 {total_time:.1f}s")
+    cached = [k for k in keys if done[k]["status"] == "CACHED"]
+    if cached:
+        print(f"  입력·코드 변경 없어 건너뜀 (CACHED): {', '.join(cached)} — --force 로 강제 실행")
     print(f"{'=' * 60}")
 
+    report_metrics(keys, levels, done, {
+        "run_id": run_id, "started_at": started_at, "elapsed_sec": round(total_time, 2),
+        "jobs": jobs, "force": force, "tune": tune_mode, "profile": profile,
+        "critical_path": path, "critical_path_sec": round(path_time, 2),
+    })
+
 
 if __name__ == "__main__":
     main()
@@ -8,13 +8,20 @@ Step 0: 주차 캘린더 생성 + 주별·월별 집계 데이터 생성
             monthly_product_summary, monthly_customer_summary
 
 매핑: daily_revenue.customer_id / daily_order.customer_id → supplier.customer_code
+
+거래처 집계 (weekly/monthly_customer_summary) 는 기존 행과 값이 다른 행만 UPSERT 하고,
+변경 행의 최초 기간을 pipeline_watermark 's0.<table>.changed_from' 에 기록
+→ concentration.py 가 그 기간부터만 고객 집중도 재계산 (소비 후 초기화)
 """
 
 from datetime import date, timedelta
 
 import pandas as pd
 
+from cache_utils import get_watermarks, save_watermarks
+from concentration import changed_from_key
 from config import supabase, upsert_batch
+from frame_utils import changed_mask, ddl_schema, fetch_frame, fetch_schema
 
 
 def build_calendar_weeks(min_date: date, max_date: date) -> list:
@@ -454,6 +461,30 @@ def build_monthly_customer(df_order, df_revenue, supplier_map: dict = None) -> l
     return rows
 
 
+# ─────────────────────────────────────────────────────────────
+# 변경분 적재 (거래처 집계)
+# ─────────────────────────────────────────────────────────────
+
+def upsert_changed(table: str, rows: list, keys: list, period_col: str) -> int:
+    """기존 행과 값이 다른 행만 UPSERT → 적재 행 수
+
+    변경 행이 있으면 최초 기간을 워터마크에 기록 (아직 소비되지 않은 이전 기록과 비교해 더 이른 기간 유지)
+    """
+    col_types = ddl_schema("08_aggregation_ddl.sql", table)
+    new = pd.DataFrame(rows)
+    old = fetch_frame(table, fetch_schema(col_types))
+    changed = changed_mask(new, old, keys, col_types)
+    if not changed.any():
+        return 0
+    cnt = upsert_batch(table, [r for r, c in zip(rows, changed) if c], on_conflict=",".join(keys))
+
+    key = changed_from_key(table)
+    prev = ((get_watermarks(key) or {}).get(key) or {}).get("max_value")
+    first = new.loc[changed, period_col].min()
+    save_watermarks({key: {"max_id": None, "max_value": min(first, prev) if prev else first}})
+    return cnt
+
+
 # ─────────────────────────────────────────────────────────────
 # 메인 실행
 # ─────────────────────────────────────────────────────────────
@@ -505,9 +536,9 @@ def run():
     print("  [주별 거래처 집계] 생성 중...")
     wc_rows = build_weekly_customer(df_order, df_revenue, supplier_map)
     if wc_rows:
-        cnt = upsert_batch("weekly_customer_summary", wc_rows,
-                           on_conflict="product_id,customer_id,year_week")
-        print(f"    weekly_customer_summary: {cnt:,}행 적재")
+        cnt = upsert_changed("weekly_customer_summary", wc_rows,
+                             ["product_id", "customer_id", "year_week"], "year_week")
+        print(f"    weekly_customer_summary: {cnt:,}행 적재 (변경 없음 {len(wc_rows) - cnt:,}행 생략)")
     else:
         print("    weekly_customer_summary: 데이터 없음")
 
@@ -525,9 +556,9 @@ def run():
     print("  [월별 거래처 집계] 생성 중...")
     mc_rows = build_monthly_customer(df_order, df_revenue, supplier_map)
     if mc_rows:
-        cnt = upsert_batch("monthly_customer_summary", mc_rows,
-                           on_conflict="product_id,customer_id,year_month")
-        print(f"    monthly_customer_summary: {cnt:,}행 적재")
+        cnt = upsert_changed("monthly_customer_summary", mc_rows,
+                             ["product_id", "customer_id", "year_month"], "year_month")
+        print(f"    monthly_customer_summary: {cnt:,}행 적재 (변경 없음 {len(mc_rows) - cnt:,}행 생략)")
     else:
         print("    monthly_customer_summary: 데이터 없음")
 
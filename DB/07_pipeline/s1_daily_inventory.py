@@ -1,29 +1,64 @@
 """
-Step 1: 일간 추정 재고 계산 (pandas 벡터화 버전)
+Step 1: 일간 추정 재고 계산 (이벤트 기반 희소 엔진 — inventory_engine.py)
 산출식: estimated_qty = 월초 스냅샷 + 월초부터 누적(생산) - 월초부터 누적(출하=매출)
 
-입력 테이블: inventory, daily_production, daily_revenue
-출력 테이블: daily_inventory_estimated
+입력 테이블: inventory, daily_production, daily_revenue, pipeline_watermark
+출력 테이블: daily_inventory_estimated (dense 모드) | daily_inventory_interval (interval 모드)
+
+증분 모드 (기본):
+  매월 월초 스냅샷으로 누적값이 리셋되므로 (제품, 월) 세그먼트는 서로 독립.
+  지난 실행 이후 새로 들어온 행(id > 워터마크)이 속한 (제품, 월)만 재계산하고,
+  데이터 종료일이 늘어난 경우 직전 종료월~신규 종료월은 전 제품 재계산,
+  직전 실행 출력에 없던 신규 제품은 데이터 범위 전 월 재계산.
+  워터마크가 없거나 시작일이 앞당겨지면 전체 재계산.
+
+병렬 모드 (INVENTORY_WORKERS > 1, 전체 재계산 시):
+  (제품, 월) 세그먼트가 독립이므로 월 또는 제품 범위로 샤딩해 프로세스 풀에서 계산.
+  이벤트 배열은 공유 메모리로 전달 (inventory_engine.parallel_change_points).
+
+실행: python DB/07_pipeline/s1_daily_inventory.py [--mode=dense|interval] [--full]
+                                                  [--workers=N] [--shard=month|product]
 """
 
+from collections import defaultdict
+
 import numpy as np
 import pandas as pd
 
-from config import supabase, upsert_batch
+from config import (supabase, upsert_batch, INVENTORY_OUTPUT_MODE,
+                    INVENTORY_PRODUCT_BATCH, INVENTORY_INCREMENTAL,
+                    INVENTORY_WORKERS, INVENTORY_SHARD)
+from cache_utils import max_id, get_watermarks, save_watermarks
+from frame_utils import ddl_schema, iter_json_rows
+from inventory_engine import (build_events, change_points, parallel_change_points,
+                              iter_daily_batches)
 
+# 소스 테이블 → 월 판정 컬럼
+SOURCES = {
+    "inventory": "snapshot_date",
+    "daily_production": "production_date",
+    "daily_revenue": "revenue_date",
+}
+OUTPUT_TABLES = {
+    "dense": "daily_inventory_estimated",
+    "interval": "daily_inventory_interval",
+}
+IN_CHUNK = 100  # in_() 필터 1회당 제품 수 (URL 길이 제한)
 
-def fetch_all_rows(table: str, select: str) -> list:
-    """Supabase 테이블 전체 행 조회 (1000행 페이징)"""
+
+def fetch_all_rows(table: str, select: str, filters: list | None = None) -> list:
+    """Supabase 테이블 전체 행 조회 (1000행 페이징)
+
+    filters: [(op, column, value), ...]  op = "gt" | "gte" | "lte" | "eq" | "in_"
+    """
     all_rows = []
     offset = 0
     page_size = 1000
     while True:
-        resp = (
-            supabase.table(table)
-            .select(select)
-            .range(offset, offset + page_size - 1)
-            .execute()
-        )
+        q = supabase.table(table).select(select)
+        for op, col, val in filters or []:
+            q = getattr(q, op)(col, val)
+        resp = q.range(offset, offset + page_size - 1).execute()
         rows = resp.data
         if not rows:
             break
@@ -34,135 +69,277 @@ def fetch_all_rows(table: str, select: str) -> list:
     return all_rows
 
 
-def run():
-    print("[S1] 일간 추정 재고 계산 시작 (pandas 벡터화)")
+def _fetch_by_products(table: str, select: str, products: list, filters: list) -> list:
+    rows = []
+    for i in range(0, len(products), IN_CHUNK):
+        rows.extend(fetch_all_rows(table, select,
+                                   filters + [("in_", "product_id", products[i:i + IN_CHUNK])]))
+    return rows
 
-    # ── 1) 재고 스냅샷 로드 ──────────────────────────────────
-    inv_rows = fetch_all_rows("inventory", "snapshot_date,product_id,inventory_qty")
-    if not inv_rows:
-        print("  [!] inventory 데이터 없음")
-        return
 
+# ─────────────────────────────────────────────────────────────
+# 1) 소스 로드
+# ─────────────────────────────────────────────────────────────
+
+def load_inventory(inv_rows: list) -> pd.DataFrame:
+    if not inv_rows:
+        return pd.DataFrame(columns=["snapshot_date", "product_id", "inventory_qty"])
     inv_df = pd.DataFrame(inv_rows)
     inv_df["inventory_qty"] = pd.to_numeric(inv_df["inventory_qty"], errors="coerce").fillna(0)
     # 같은 (snapshot_date, product_id)에 여러 창고 → 합산
-    inv_df = inv_df.groupby(["snapshot_date", "product_id"], as_index=False)["inventory_qty"].sum()
+    return inv_df.groupby(["snapshot_date", "product_id"], as_index=False)["inventory_qty"].sum()
+
+
+def load_production(prod_rows: list) -> pd.DataFrame:
+    if not prod_rows:
+        return pd.DataFrame(columns=["target_date", "product_id", "produced_qty"])
+    prod_df = pd.DataFrame(prod_rows)
+    prod_df["produced_qty"] = pd.to_numeric(prod_df["produced_qty"], errors="coerce").fillna(0)
+    prod_df = prod_df.groupby(["production_date", "product_id"], as_index=False)["produced_qty"].sum()
+    return prod_df.rename(columns={"production_date": "target_date"})
+
+
+def load_shipments(ship_rows: list) -> pd.DataFrame:
+    if not ship_rows:
+        return pd.DataFrame(columns=["target_date", "product_id", "shipped_qty"])
+    ship_df = pd.DataFrame(ship_rows)
+    ship_df["quantity"] = pd.to_numeric(ship_df["quantity"], errors="coerce").fillna(0)
+    ship_df = ship_df.groupby(["revenue_date", "product_id"], as_index=False)["quantity"].sum()
+    return ship_df.rename(columns={"revenue_date": "target_date", "quantity": "shipped_qty"})
+
+
+def data_range() -> tuple:
+    """생산/출하 일자 범위 (min, max) — 정렬 후 1행 조회"""
+    bounds = []
+    for table, col in (("daily_production", "production_date"), ("daily_revenue", "revenue_date")):
+        for desc in (False, True):
+            resp = (supabase.table(table).select(col)
+                    .not_.is_(col, "null")
+                    .order(col, desc=desc).limit(1).execute())
+            if resp.data:
+                bounds.append(np.datetime64(resp.data[0][col][:10], "D"))
+    if not bounds:
+        return None, None
+    return min(bounds), max(bounds)
+
+
+# ─────────────────────────────────────────────────────────────
+# 2) 적재
+# ─────────────────────────────────────────────────────────────
+
+def write_daily(cp: pd.DataFrame) -> int:
+    """변화점 → 제품 배치별 일간 전개 → daily_inventory_estimated UPSERT"""
+    schema = ddl_schema("06_analytics_ddl.sql", "daily_inventory_estimated")
+    total = 0
+    for i, (n_products, daily) in enumerate(iter_daily_batches(cp, INVENTORY_PRODUCT_BATCH), 1):
+        upserted = upsert_batch("daily_inventory_estimated", iter_json_rows(daily, schema),
+                                on_conflict="product_id,target_date")
+        total += upserted
+        print(f"    배치 {i}: 제품 {n_products}개, {upserted:,}행 적재")
+    return total
+
+
+def write_intervals(cp: pd.DataFrame, start: np.datetime64) -> int:
+    """변화점 구간 → daily_inventory_interval (계산 기간 기존 구간 삭제 후 적재)"""
+    supabase.table("daily_inventory_interval").delete().gte("valid_from", str(start)).execute()
+    schema = ddl_schema("19_inventory_interval_ddl.sql", "daily_inventory_interval")
+    total = upsert_batch("daily_inventory_interval", iter_json_rows(cp, schema),
+                         on_conflict="product_id,valid_from")
+    print(f"    구간 {total:,}행 적재")
+    return total
+
+
+def _clear_interval_segments(month_products: dict):
+    """재계산 대상 (제품, 월) 세그먼트의 기존 구간 삭제 (세그먼트 내 변화점 수가 바뀔 수 있음)"""
+    for ym, products in month_products.items():
+        first = np.datetime64(f"{ym[:4]}-{ym[4:]}", "M")
+        m_from, m_to = str(first.astype("datetime64[D]")), str((first + 1).astype("datetime64[D]") - 1)
+        prods = sorted(products)
+        for i in range(0, len(prods), IN_CHUNK):
+            (supabase.table("daily_inventory_interval").delete()
+             .in_("product_id", prods[i:i + IN_CHUNK])
+             .gte("valid_from", m_from).lte("valid_from", m_to).execute())
+
+
+# ─────────────────────────────────────────────────────────────
+# 3) 전체 / 증분 계산
+# ─────────────────────────────────────────────────────────────
+
+def run_full(mode: str, workers: int = 1, shard: str = "month") -> tuple | None:
+    """전체 재계산 → (start, end) | None"""
+    inv_df = load_inventory(fetch_all_rows("inventory", "snapshot_date,product_id,inventory_qty"))
+    if inv_df.empty:
+        print("  [!] inventory 데이터 없음")
+        return None
     print(f"  재고 스냅샷: {inv_df['snapshot_date'].nunique()}개월, 제품 {inv_df['product_id'].nunique():,}개")
 
-    # ── 2) 일별 생산 로드 ─────────────────────────────────────
-    prod_rows = fetch_all_rows("daily_production", "production_date,product_id,produced_qty")
-    if prod_rows:
-        prod_df = pd.DataFrame(prod_rows)
-        prod_df["produced_qty"] = pd.to_numeric(prod_df["produced_qty"], errors="coerce").fillna(0)
-        prod_df = prod_df.groupby(["production_date", "product_id"], as_index=False)["produced_qty"].sum()
-        prod_df.rename(columns={"production_date": "target_date"}, inplace=True)
-    else:
-        prod_df = pd.DataFrame(columns=["target_date", "product_id", "produced_qty"])
+    prod_df = load_production(fetch_all_rows("daily_production", "production_date,product_id,produced_qty"))
     print(f"  일별 생산: {len(prod_df):,}건")
-
-    # ── 3) 일별 출하(=매출) 로드 ──────────────────────────────
-    ship_rows = fetch_all_rows("daily_revenue", "revenue_date,product_id,quantity")
-    if ship_rows:
-        ship_df = pd.DataFrame(ship_rows)
-        ship_df["quantity"] = pd.to_numeric(ship_df["quantity"], errors="coerce").fillna(0)
-        ship_df = ship_df.groupby(["revenue_date", "product_id"], as_index=False)["quantity"].sum()
-        ship_df.rename(columns={"revenue_date": "target_date", "quantity": "shipped_qty"}, inplace=True)
-    else:
-        ship_df = pd.DataFrame(columns=["target_date", "product_id", "shipped_qty"])
+    ship_df = load_shipments(fetch_all_rows("daily_revenue", "revenue_date,product_id,quantity"))
     print(f"  일별 출하(매출): {len(ship_df):,}건")
 
-    # ── 4) 날짜 범위 & 제품 목록 결정 ────────────────────────
-    all_dates = set()
-    if len(prod_df) > 0:
-        all_dates.update(prod_df["target_date"].unique())
-    if len(ship_df) > 0:
-        all_dates.update(ship_df["target_date"].unique())
-    if not all_dates:
+    events = build_events(prod_df, ship_df)
+    if events.empty:
         print("  [!] 생산/출하 데이터 없음")
-        return
+        return None
 
-    date_range = pd.date_range(min(all_dates), max(all_dates), freq="D")
-    print(f"  데이터 범위: {date_range[0].date()} ~ {date_range[-1].date()} ({len(date_range)}일)")
+    start = events["target_date"].min().to_datetime64().astype("datetime64[D]")
+    end = events["target_date"].max().to_datetime64().astype("datetime64[D]")
+    n_days = int((end - start).astype(int)) + 1
+    print(f"  데이터 범위: {start} ~ {end} ({n_days}일)")
 
-    all_products = set(inv_df["product_id"].unique())
-    if len(prod_df) > 0:
-        all_products.update(prod_df["product_id"].unique())
-    if len(ship_df) > 0:
-        all_products.update(ship_df["product_id"].unique())
-    all_products = sorted(all_products)
+    all_products = sorted(set(inv_df["product_id"]) | set(events["product_id"]))
     print(f"  대상 제품 수: {len(all_products):,}")
 
-    # ── 5) 풀 그리드 생성 (product × date) ─────────────────
-    # 메모리 최적화: 제품을 배치로 처리
-    PRODUCT_BATCH = 200
-    total_upserted = 0
-
-    for batch_start in range(0, len(all_products), PRODUCT_BATCH):
-        batch_products = all_products[batch_start: batch_start + PRODUCT_BATCH]
-
-        # 제품 × 날짜 그리드
-        grid = pd.MultiIndex.from_product(
-            [batch_products, date_range],
-            names=["product_id", "target_date"],
-        ).to_frame(index=False)
-        grid["target_date"] = grid["target_date"].dt.strftime("%Y-%m-%d")
-        grid["ym"] = grid["target_date"].str[:7].str.replace("-", "")  # YYYYMM
-
-        # 생산 조인
-        if len(prod_df) > 0:
-            bp = prod_df[prod_df["product_id"].isin(batch_products)]
-            grid = grid.merge(bp, on=["target_date", "product_id"], how="left")
-        else:
-            grid["produced_qty"] = 0.0
-        grid["produced_qty"] = grid["produced_qty"].fillna(0.0)
-
-        # 출하 조인
-        if len(ship_df) > 0:
-            bs = ship_df[ship_df["product_id"].isin(batch_products)]
-            grid = grid.merge(bs, on=["target_date", "product_id"], how="left")
-        else:
-            grid["shipped_qty"] = 0.0
-        grid["shipped_qty"] = grid["shipped_qty"].fillna(0.0)
-
-        # 재고 스냅샷 조인
-        inv_sub = inv_df[inv_df["product_id"].isin(batch_products)].copy()
-        inv_sub.rename(columns={"snapshot_date": "ym"}, inplace=True)
-        grid = grid.merge(inv_sub, on=["ym", "product_id"], how="left")
-        grid["inventory_qty"] = grid["inventory_qty"].fillna(0.0)
-
-        # 월 내 일자 (day of month) → 월초 기준 누적 계산용
-        grid["day_of_month"] = pd.to_datetime(grid["target_date"]).dt.day
-        grid["month_key"] = grid["ym"]
-
-        # 월별 + 제품별 정렬 후 cumsum
-        grid = grid.sort_values(["product_id", "target_date"])
-        grid["month_group"] = grid["product_id"] + "_" + grid["month_key"]
-
-        grid["cumul_produced"] = grid.groupby("month_group")["produced_qty"].cumsum()
-        grid["cumul_shipped"] = grid.groupby("month_group")["shipped_qty"].cumsum()
-
-        # estimated_qty = snapshot_base + cumul_produced - cumul_shipped
-        grid["snapshot_base"] = grid["inventory_qty"]
-        grid["estimated_qty"] = grid["snapshot_base"] + grid["cumul_produced"] - grid["cumul_shipped"]
-
-        # 출력 컬럼 정리
-        out = grid[["product_id", "target_date", "snapshot_base", "cumul_produced", "cumul_shipped", "estimated_qty"]].copy()
-        out["snapshot_base"] = out["snapshot_base"].round(6)
-        out["cumul_produced"] = out["cumul_produced"].round(6)
-        out["cumul_shipped"] = out["cumul_shipped"].round(6)
-        out["estimated_qty"] = out["estimated_qty"].round(6)
-
-        # 적재
-        records = out.to_dict("records")
-        if records:
-            upserted = upsert_batch("daily_inventory_estimated", records, on_conflict="product_id,target_date")
-            total_upserted += upserted
-            print(f"    배치 {batch_start // PRODUCT_BATCH + 1}: 제품 {len(batch_products)}개, {upserted:,}행 적재")
+    # (제품, 월) 세그먼트별 누적합 → 변화점
+    if workers > 1:
+        print(f"  병렬 계산: {workers}개 프로세스, {shard} 샤드")
+        cp = parallel_change_points(inv_df, events, all_products, start, end, workers, shard)
+    else:
+        cp = change_points(inv_df, events, all_products, start, end)
+    print(f"  변화점: {len(cp):,}행 (dense 환산 {len(all_products) * n_days:,}행)")
+
+    if mode == "interval":
+        write_intervals(cp, start)
+    else:
+        write_daily(cp)
+    return start, end
+
+
+def changed_segments(marks: dict, prefix: str) -> dict:
+    """워터마크 이후 신규 행 → {YYYYMM: {product_id, ...}}"""
+    month_products = defaultdict(set)
+    for table, date_col in SOURCES.items():
+        wm = marks[f"{prefix}{table}"]["max_id"] or 0
+        rows = fetch_all_rows(table, f"product_id,{date_col}", [("gt", "id", wm)])
+        for r in rows:
+            d = r.get(date_col)
+            if not d or not r.get("product_id"):
+                continue
+            ym = d if table == "inventory" else d[:7].replace("-", "")
+            month_products[ym].add(r["product_id"])
+        print(f"    {table}: 신규 {len(rows):,}행")
+    return month_products
+
+
+def _products_at(mode: str, day: str) -> set:
+    """직전 실행 종료일에 출력 행이 있던 제품 (= 직전 제품 유니버스)"""
+    if mode == "interval":
+        rows = fetch_all_rows("daily_inventory_interval", "product_id", [("eq", "valid_to", day)])
+    else:
+        rows = fetch_all_rows("daily_inventory_estimated", "product_id", [("eq", "target_date", day)])
+    return {r["product_id"] for r in rows}
+
+
+def run_incremental(mode: str, marks: dict, prefix: str) -> tuple | None:
+    """변경된 (제품, 월) 세그먼트만 재계산 → (start, end). 전체 재계산 필요 시 None"""
+    prev_start = np.datetime64(marks[f"{prefix}range_start"]["max_value"], "D")
+    prev_end = np.datetime64(marks[f"{prefix}range_end"]["max_value"], "D")
+    start, end = data_range()
+    if start is None:
+        print("  [!] 생산/출하 데이터 없음")
+        return prev_start, prev_end
+    if start < prev_start:
+        print(f"  데이터 시작일 변경 ({prev_start} → {start}) — 전체 재계산")
+        return None
+
+    month_products = changed_segments(marks, prefix)
+    month_products = {ym: p for ym, p in month_products.items()
+                      if f"{start}"[:7].replace("-", "") <= ym <= f"{end}"[:7].replace("-", "")}
+
+    universe = _products_at(mode, str(prev_end)) if month_products or end > prev_end else set()
+
+    # 직전 유니버스에 없던 제품 → 범위 전 월 세그먼트 (전체 재계산처럼 신규 행 이전 월도 출력)
+    new_products = set().union(*month_products.values()) - universe
+    if new_products:
+        print(f"  신규 제품 {len(new_products):,}개 — 전 월 세그먼트 재계산")
+        for m in np.arange(start.astype("datetime64[M]"), end.astype("datetime64[M]") + 1):
+            month_products.setdefault(str(m).replace("-", ""), set()).update(new_products)
+
+    # 종료일 연장 → 직전 종료월부터 전 제품 세그먼트 연장
+    if end > prev_end:
+        for m in np.arange(prev_end.astype("datetime64[M]"), end.astype("datetime64[M]") + 1):
+            month_products.setdefault(str(m).replace("-", ""), set()).update(universe)
+
+    n_segments = sum(len(p) for p in month_products.values())
+    print(f"  데이터 범위: {start} ~ {end} | 재계산 세그먼트: {len(month_products)}개월, "
+          f"{n_segments:,}건")
+    if not month_products:
+        print("  변경 없음 — 적재 생략")
+        return start, end
+
+    # 대상 제품·월 범위만 로드
+    products = sorted(set().union(*month_products.values()))
+    months = sorted(month_products)
+    lo = str(max(np.datetime64(f"{months[0][:4]}-{months[0][4:]}", "M").astype("datetime64[D]"), start))
+    inv_df = load_inventory(_fetch_by_products(
+        "inventory", "snapshot_date,product_id,inventory_qty", products,
+        [("in_", "snapshot_date", months)]))
+    prod_df = load_production(_fetch_by_products(
+        "daily_production", "production_date,product_id,produced_qty", products,
+        [("gte", "production_date", lo), ("lte", "production_date", str(end))]))
+    ship_df = load_shipments(_fetch_by_products(
+        "daily_revenue", "revenue_date,product_id,quantity", products,
+        [("gte", "revenue_date", lo), ("lte", "revenue_date", str(end))]))
+    events = build_events(prod_df, ship_df)
+
+    cp = pd.concat([
+        change_points(inv_df, events, sorted(month_products[ym]), start, end, month_keys={ym})
+        for ym in months
+    ], ignore_index=True).sort_values(["product_id", "valid_from"], kind="mergesort")
+    print(f"  변화점: {len(cp):,}행")
+
+    if mode == "interval":
+        _clear_interval_segments(month_products)
+        schema = ddl_schema("19_inventory_interval_ddl.sql", "daily_inventory_interval")
+        cnt = upsert_batch("daily_inventory_interval", iter_json_rows(cp, schema),
+                           on_conflict="product_id,valid_from")
+        print(f"    구간 {cnt:,}행 적재")
+    else:
+        write_daily(cp)
+    return start, end
+
+
+def run(mode: str | None = None, full: bool | None = None,
+        workers: int | None = None, shard: str | None = None):
+    mode = mode or INVENTORY_OUTPUT_MODE
+    workers = workers or INVENTORY_WORKERS
+    shard = shard or INVENTORY_SHARD
+    incremental = INVENTORY_INCREMENTAL if full is None else not full
+    print(f"[S1] 일간 추정 재고 계산 시작 (이벤트 기반, {mode} 모드)")
+
+    # 처리 시작 전 소스 최대 id 확보 → 실행 중 유입 행은 다음 실행에서 처리
+    prefix = f"s1.{mode}."
+    cur_ids = {t: max_id(t) for t in SOURCES}
+
+    marks = get_watermarks(prefix) if incremental else None
+    required = [f"{prefix}{k}" for k in list(SOURCES) + ["range_start", "range_end"]]
+    if marks and all(k in marks for k in required):
+        print("  증분 모드: 워터마크 이후 변경 세그먼트만 재계산")
+        result = run_incremental(mode, marks, prefix)
+        if result is None:
+            result = run_full(mode, workers, shard)
+    else:
+        if incremental:
+            print("  워터마크 없음 — 전체 재계산")
+        result = run_full(mode, workers, shard)
+
+    if result is None:
+        return
+    start, end = result
+    new_marks = {f"{prefix}{t}": {"max_id": v} for t, v in cur_ids.items()}
+    new_marks[f"{prefix}range_start"] = {"max_value": str(start)}
+    new_marks[f"{prefix}range_end"] = {"max_value": str(end)}
+    save_watermarks(new_marks)
 
     # 결과 확인
-    count = supabase.table("daily_inventory_estimated").select("id", count="exact").execute()
-    print(f"[S1] 완료 — daily_inventory_estimated: {count.count:,}행 (총 {total_upserted:,}행 적재)")
+    table = OUTPUT_TABLES[mode]
+    count = supabase.table(table).select("id", count="exact").execute()
+    print(f"[S1] 완료 — {table}: {count.count:,}행")
 
 
 if __name__ == "__main__":
-    run()
+    import sys
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    run(mode=opts.get("mode"), full=True if "--full" in sys.argv else None,
+        workers=int(opts["workers"]) if "workers" in opts else None, shard=opts.get("shard"))
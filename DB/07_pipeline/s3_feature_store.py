@@ -2,9 +2,10 @@
 Step 3: 주간 피처 엔지니어링 (feature_store_weekly)
 weekly_product_summary + weekly_customer_summary + 외부지표 → feature_store_weekly
 
-입력 테이블: weekly_product_summary, weekly_customer_summary,
-            daily_inventory_estimated, product_lead_time, purchase_order,
-            economic_indicator, exchange_rate, trade_statistics, calendar_week
+입력 테이블: weekly_product_summary,
+            weekly_customer_summary → customer_concentration (concentration.py),
+            inventory, lead_time_stats, purchase_order,
+            external_indicator_panel (external_panel.py), calendar_week
 출력 테이블: feature_store_weekly
 """
 
@@ -14,60 +15,35 @@ from datetime import date, timedelta
 import numpy as np
 import pandas as pd
 
-from config import supabase, upsert_batch
+from config import supabase, upsert_batch, fetch_all
+from concentration import load_concentration
+from external_panel import load_panel
+from lead_time import lead_time_map
+from frame_utils import fetch_frame, compact_frame, format_rss, ddl_schema, iter_json_rows
 
 
 # ─────────────────────────────────────────────────────────────
 # 데이터 로드 유틸
 # ─────────────────────────────────────────────────────────────
 
-def fetch_all(table: str, select: str, order_col: str | None = None) -> list:
-    """Supabase 테이블 전체 행 페이징 조회 (테이블 미존재 시 빈 리스트 반환)"""
-    all_rows, offset, ps = [], 0, 1000
-    while True:
-        try:
-            q = supabase.table(table).select(select).range(offset, offset + ps - 1)
-            if order_col:
-                q = q.order(order_col)
-            resp = q.execute()
-        except Exception as e:
-            if "PGRST205" in str(e) or "Could not find" in str(e):
-                print(f"    [!] 테이블 '{table}' 미존재 — 빈 데이터로 진행")
-                return []
-            raise
-        if not resp.data:
-            break
-        all_rows.extend(resp.data)
-        if len(resp.data) < ps:
-            break
-        offset += ps
-    return all_rows
-
-
 # ─────────────────────────────────────────────────────────────
 # 1) 주간 제품 집계 로드 (기반 테이블)
 # ─────────────────────────────────────────────────────────────
 
 def load_weekly_product() -> pd.DataFrame:
-    """weekly_product_summary → DataFrame"""
-    rows = fetch_all(
-        "weekly_product_summary",
-        "product_id,year_week,week_start,week_end,"
-        "order_qty,order_amount,order_count,"
-        "revenue_qty,revenue_amount,revenue_count,"
-        "produced_qty,production_count,customer_count",
-    )
-    if not rows:
-        return pd.DataFrame()
-
-    df = pd.DataFrame(rows)
+    """weekly_product_summary → DataFrame (페이지 스트리밍 적재)"""
     num_cols = [
         "order_qty", "order_amount", "order_count",
         "revenue_qty", "revenue_amount", "revenue_count",
         "produced_qty", "production_count", "customer_count",
     ]
-    for c in num_cols:
-        df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0)
+    schema = {"product_id": "str", "year_week": "str", "week_start": "str", "week_end": "str"}
+    schema.update({c: "float64" for c in num_cols})
+    df = fetch_frame("weekly_product_summary", schema)
+    if df.empty:
+        return pd.DataFrame()
+
+    df[num_cols] = df[num_cols].fillna(0)
 
     df["week_start"] = pd.to_datetime(df["week_start"])
     df["week_end"] = pd.to_datetime(df["week_end"])
@@ -80,44 +56,11 @@ def load_weekly_product() -> pd.DataFrame:
 # ─────────────────────────────────────────────────────────────
 
 def load_customer_concentration() -> pd.DataFrame:
-    """weekly_customer_summary → (product_id, year_week) 별 HHI, top1/3 비중"""
-    rows = fetch_all(
-        "weekly_customer_summary",
-        "product_id,customer_id,year_week,order_qty",
-    )
-    if not rows:
-        return pd.DataFrame(columns=[
-            "product_id", "year_week",
-            "top1_customer_pct", "top3_customer_pct", "customer_hhi",
-        ])
-
-    df = pd.DataFrame(rows)
-    df["order_qty"] = pd.to_numeric(df["order_qty"], errors="coerce").fillna(0)
-
-    result = []
-    for (pid, yw), grp in df.groupby(["product_id", "year_week"]):
-        total = grp["order_qty"].sum()
-        if total <= 0:
-            result.append({
-                "product_id": pid, "year_week": yw,
-                "top1_customer_pct": 0.0, "top3_customer_pct": 0.0,
-                "customer_hhi": 0.0,
-            })
-            continue
-
-        shares = (grp["order_qty"] / total).sort_values(ascending=False)
-        top1 = float(shares.iloc[0]) * 100 if len(shares) >= 1 else 0.0
-        top3 = float(shares.iloc[:3].sum()) * 100 if len(shares) >= 1 else 0.0
-        hhi = float((shares ** 2).sum())
-
-        result.append({
-            "product_id": pid, "year_week": yw,
-            "top1_customer_pct": round(top1, 2),
-            "top3_customer_pct": round(top3, 2),
-            "customer_hhi": round(hhi, 4),
-        })
-
-    return pd.DataFrame(result)
+    """weekly_customer_summary → (product_id, year_week) 별 HHI, top1/3 비중
+
+    concentration.py 벡터화 계산 + customer_concentration 증분 캐시
+    """
+    return load_concentration("weekly")
 
 
 # ─────────────────────────────────────────────────────────────
@@ -159,33 +102,8 @@ def load_inventory_weekly(calendar_df: pd.DataFrame) -> pd.DataFrame:
 # ─────────────────────────────────────────────────────────────
 
 def load_lead_time() -> dict:
-    """purchase_order에서 직접 리드타임 계산 → {product_id: avg_lead_days}
-
-    리드타임 = receipt_date - po_date (완료건 status='F'만)
-    product_lead_time 테이블 불필요
-    """
-    rows = fetch_all(
-        "purchase_order",
-        "component_product_id,po_date,receipt_date,status",
-    )
-    if not rows:
-        return {}
-
-    df = pd.DataFrame(rows)
-    # 완료건만
-    df = df[df["status"] == "F"].copy()
-    df = df.dropna(subset=["po_date", "receipt_date"])
-    if df.empty:
-        return {}
-
-    df["po_date"] = pd.to_datetime(df["po_date"], errors="coerce")
-    df["receipt_date"] = pd.to_datetime(df["receipt_date"], errors="coerce")
-    df = df.dropna(subset=["po_date", "receipt_date"])
-    df["lead_days"] = (df["receipt_date"] - df["po_date"]).dt.days
-    df = df[df["lead_days"] >= 0]
-
-    avg_lead = df.groupby("component_product_id")["lead_days"].mean()
-    return avg_lead.to_dict()
+    """lead_time_stats (s2 산출, 전체 기간·제품 단위) → {product_id: avg_lead_days}"""
+    return {pid: v["avg"] for pid, v in lead_time_map().items()}
 
 
 # ─────────────────────────────────────────────────────────────
@@ -205,189 +123,7 @@ def load_avg_unit_price() -> dict:
 
 
 # ─────────────────────────────────────────────────────────────
-# 6) 외부지표 → 주간 시계열
-# ─────────────────────────────────────────────────────────────
-
-def load_external_weekly(calendar_df: pd.DataFrame) -> pd.DataFrame:
-    """경제지표 + 환율 + 무역통계 → year_week 기준 피처 DataFrame"""
-
-    # 6a) 주차 캘린더를 기반으로 날짜 → year_week 매핑 생성
-    cal = calendar_df[["year_week", "week_start", "week_end", "year_month"]].copy()
-    cal["week_start"] = pd.to_datetime(cal["week_start"])
-    cal["week_end"] = pd.to_datetime(cal["week_end"])
-
-    # 6b) 경제지표 로드
-    econ_rows = fetch_all("economic_indicator", "source,indicator_code,date,value")
-    econ_df = pd.DataFrame(econ_rows) if econ_rows else pd.DataFrame(
-        columns=["source", "indicator_code", "date", "value"]
-    )
-    if not econ_df.empty:
-        econ_df["date"] = pd.to_datetime(econ_df["date"])
-        econ_df["value"] = pd.to_numeric(econ_df["value"], errors="coerce")
-
-    # 6c) 환율 로드
-    exrate_rows = fetch_all("exchange_rate", "base_currency,rate_date,rate")
-    exrate_df = pd.DataFrame(exrate_rows) if exrate_rows else pd.DataFrame(
-        columns=["base_currency", "rate_date", "rate"]
-    )
-    if not exrate_df.empty:
-        exrate_df["rate_date"] = pd.to_datetime(exrate_df["rate_date"])
-        exrate_df["rate"] = pd.to_numeric(exrate_df["rate"], errors="coerce")
-
-    # 6d) 무역통계 로드
-    trade_rows = fetch_all("trade_statistics", "hs_code,year_month,export_amount,import_amount")
-    trade_df = pd.DataFrame(trade_rows) if trade_rows else pd.DataFrame(
-        columns=["hs_code", "year_month", "export_amount", "import_amount"]
-    )
-    if not trade_df.empty:
-        trade_df["export_amount"] = pd.to_numeric(trade_df["export_amount"], errors="coerce").fillna(0)
-        trade_df["import_amount"] = pd.to_numeric(trade_df["import_amount"], errors="coerce").fillna(0)
-
-    # ── 일별 지표 → 주간 평균 ──
-    DAILY_INDICATORS = {
-        "SOX": "sox_index",
-        "BALTIC_DRY": "baltic_dry_index",
-        "COPPER_LME": "copper_lme",
-    }
-    WEEKLY_INDICATORS = {
-        "DRAM_DDR4": "dram_price",
-        "NAND_TLC": "nand_price",
-        "WTI_WEEKLY": "wti_price",
-    }
-    MONTHLY_INDICATORS = {
-        "SILICON_WAFER": "silicon_wafer_price",
-        "FEDFUNDS": "fed_funds_rate",
-        "INDPRO": "indpro_index",
-        "IPMAN": "ipman_index",
-        "KR_BASE_RATE": "kr_base_rate",
-        "KR_IPI_MFG": "kr_ipi_mfg",
-        "KR_BSI_MFG": "kr_bsi_mfg",
-        "CN_PMI_MFG": "cn_pmi_mfg",
-    }
-
-    result = cal[["year_week"]].copy()
-
-    if not econ_df.empty:
-        # 날짜를 year_week에 매핑
-        date_to_week = {}
-        for _, row in cal.iterrows():
-            ws = row["week_start"]
-            for d in range(7):
-                dt = ws + pd.Timedelta(days=d)
-                date_to_week[dt] = row["year_week"]
-
-        econ_df["year_week"] = econ_df["date"].map(date_to_week)
-
-        # 일별 지표 → 주간 평균
-        for code, col_name in DAILY_INDICATORS.items():
-            subset = econ_df[econ_df["indicator_code"] == code].dropna(subset=["year_week"])
-            if not subset.empty:
-                weekly_avg = subset.groupby("year_week")["value"].mean().reset_index()
-                weekly_avg.columns = ["year_week", col_name]
-                result = result.merge(weekly_avg, on="year_week", how="left")
-            else:
-                result[col_name] = np.nan
-
-        # 주간 지표 → 마지막 값
-        for code, col_name in WEEKLY_INDICATORS.items():
-            subset = econ_df[econ_df["indicator_code"] == code].dropna(subset=["year_week"])
-            if not subset.empty:
-                weekly_last = subset.sort_values("date").groupby("year_week")["value"].last().reset_index()
-                weekly_last.columns = ["year_week", col_name]
-                result = result.merge(weekly_last, on="year_week", how="left")
-            else:
-                result[col_name] = np.nan
-
-        # 월별 지표 → year_month로 조인 후 주차에 forward-fill
-        for code, col_name in MONTHLY_INDICATORS.items():
-            subset = econ_df[econ_df["indicator_code"] == code]
-            if not subset.empty:
-                # 월별 → 마지막 값
-                subset = subset.copy()
-                subset["year_month"] = subset["date"].dt.strftime("%Y-%m")
-                monthly_val = subset.groupby("year_month")["value"].last().reset_index()
-                monthly_val.columns = ["year_month", col_name]
-                # year_week → year_month 매핑으로 조인
-                yw_ym = cal[["year_week", "year_month"]].drop_duplicates()
-                monthly_merged = yw_ym.merge(monthly_val, on="year_month", how="left")
-                result = result.merge(
-                    monthly_merged[["year_week", col_name]], on="year_week", how="left"
-                )
-            else:
-                result[col_name] = np.nan
-    else:
-        for indicators in [DAILY_INDICATORS, WEEKLY_INDICATORS, MONTHLY_INDICATORS]:
-            for col_name in indicators.values():
-                result[col_name] = np.nan
-
-    # ── 환율 → 주간 평균 ──
-    CURRENCY_MAP = {
-        "USD": "usd_krw",
-        "JPY": "jpy_krw",
-        "EUR": "eur_krw",
-        "CNY": "cny_krw",
-    }
-    if not exrate_df.empty:
-        # 날짜 → year_week 매핑 재사용
-        if not econ_df.empty:
-            exrate_df["year_week"] = exrate_df["rate_date"].map(date_to_week)
-        else:
-            date_to_week = {}
-            for _, row in cal.iterrows():
-                ws = row["week_start"]
-                for d in range(7):
-                    dt = ws + pd.Timedelta(days=d)
-                    date_to_week[dt] = row["year_week"]
-            exrate_df["year_week"] = exrate_df["rate_date"].map(date_to_week)
-
-        for currency, col_name in CURRENCY_MAP.items():
-            subset = exrate_df[exrate_df["base_currency"] == currency].dropna(subset=["year_week"])
-            if not subset.empty:
-                weekly_avg = subset.groupby("year_week")["rate"].mean().reset_index()
-                weekly_avg.columns = ["year_week", col_name]
-                result = result.merge(weekly_avg, on="year_week", how="left")
-            else:
-                result[col_name] = np.nan
-    else:
-        for col_name in CURRENCY_MAP.values():
-            result[col_name] = np.nan
-
-    # ── 무역통계 → 월별 합계 → 주간 매핑 ──
-    if not trade_df.empty:
-        monthly_trade = trade_df.groupby("year_month").agg(
-            semi_export_amt=("export_amount", "sum"),
-            semi_import_amt=("import_amount", "sum"),
-        ).reset_index()
-        monthly_trade["semi_trade_balance"] = (
-            monthly_trade["semi_export_amt"] - monthly_trade["semi_import_amt"]
-        )
-        # 수출 변화율
-        monthly_trade = monthly_trade.sort_values("year_month")
-        monthly_trade["semi_export_roc"] = (
-            monthly_trade["semi_export_amt"].pct_change()
-        )
-
-        yw_ym = cal[["year_week", "year_month"]].drop_duplicates()
-        trade_merged = yw_ym.merge(monthly_trade, on="year_month", how="left")
-        result = result.merge(
-            trade_merged[["year_week", "semi_export_amt", "semi_import_amt",
-                          "semi_trade_balance", "semi_export_roc"]],
-            on="year_week", how="left",
-        )
-    else:
-        for c in ["semi_export_amt", "semi_import_amt", "semi_trade_balance", "semi_export_roc"]:
-            result[c] = np.nan
-
-    # forward-fill 모든 외부지표 (주차 순서대로)
-    result = result.sort_values("year_week")
-    fill_cols = [c for c in result.columns if c != "year_week"]
-    result[fill_cols] = result[fill_cols].ffill()
-
-    return result
-
-
-# ─────────────────────────────────────────────────────────────
-# 7) 피처 엔지니어링 메인 로직
+# 6) 피처 엔지니어링 메인 로직
 # ─────────────────────────────────────────────────────────────
 
 def build_features(df_wps: pd.DataFrame, df_conc: pd.DataFrame,
@@ -558,9 +294,9 @@ def build_features(df_wps: pd.DataFrame, df_conc: pd.DataFrame,
         df["usd_krw_roc_4w"] = np.nan
 
     # ── K: 시간 피처 ──
-    df["week_num"] = df["week_start"].dt.isocalendar().week.astype(int)
-    df["month"] = df["week_start"].dt.month
-    df["quarter"] = (df["month"] - 1) // 3 + 1
+    df["week_num"] = df["week_start"].dt.isocalendar().week.astype("int8")
+    df["month"] = df["week_start"].dt.month.astype("int8")
+    df["quarter"] = ((df["month"] - 1) // 3 + 1).astype("int8")
 
     # 설/추석/연말 (대략적 주차 기반)
     df["is_holiday_week"] = df["week_num"].isin([1, 2, 5, 6, 38, 39, 40])
@@ -659,12 +395,17 @@ def run():
 
     # 외부지표
     print("  외부지표 로드 중...")
-    df_ext = load_external_weekly(calendar_df)
+    df_ext = load_panel("weekly")
     print(f"    외부지표: {len(df_ext):,}주 × {len(df_ext.columns)-1}개 지표")
 
     # 2) 피처 빌드
     print("\n  피처 생성 중...")
     df_features = build_features(df_wps, df_conc, df_inv, df_ext, lead_map, price_map)
+    del df_wps, df_conc, df_inv, df_ext
+
+    # product_id/year_week → category, 캘린더·카운트 정수 다운캐스트
+    # (적재 수치는 NUMERIC(18,6) 정밀도 유지를 위해 float64 그대로)
+    df_features = compact_frame(df_features)
 
     # 래그 피처 최소 요건: order_qty_lag1이 존재하는 행만 (첫 주 제외)
     df_features = df_features.dropna(subset=["order_qty_lag1"])
@@ -684,7 +425,7 @@ def run():
     print(f"    결과: {len(df_out):,}행 × {len(existing_cols)}열")
 
     # 제품별 최소 26주 이력 필터
-    prod_counts = df_out.groupby("product_id").size()
+    prod_counts = df_out.groupby("product_id", observed=True).size()
     valid_products = prod_counts[prod_counts >= 26].index
     df_out = df_out[df_out["product_id"].isin(valid_products)]
     print(f"    26주 이상 제품 필터 후: {len(df_out):,}행, "
@@ -693,37 +434,16 @@ def run():
     # 3) Supabase 적재
     print("\n  feature_store_weekly 적재 중...")
 
-    # INT 컬럼 목록 (DB에서 INT/SMALLINT로 정의된 컬럼)
-    INT_COLS = {
-        "order_count_lag1", "customer_count_lag1",
-        "order_qty_nonzero_4w", "order_qty_nonzero_13w",
-        "week_num", "month", "quarter",
-    }
-
-    # NaN → None, numpy 타입 → Python 타입 변환
-    rows = df_out.replace({np.nan: None, np.inf: None, -np.inf: None}).to_dict("records")
-    for row in rows:
-        for k, v in row.items():
-            if v is None:
-                continue
-            if isinstance(v, (np.integer,)):
-                row[k] = int(v)
-            elif isinstance(v, (np.floating,)):
-                if k in INT_COLS:
-                    row[k] = int(v)
-                else:
-                    row[k] = round(float(v), 6)
-            elif isinstance(v, (np.bool_, bool)):
-                row[k] = bool(v)
-            elif isinstance(v, float) and k in INT_COLS:
-                row[k] = int(v)
-
-    cnt = upsert_batch("feature_store_weekly", rows, on_conflict="product_id,year_week")
+    # DDL 기반 컬럼 단위 직렬화 (NUMERIC 소수 자리 반올림 / INT 변환 / NaN → None)
+    # → 행 제너레이터를 upsert_batch에 바로 전달 (전체 행 리스트 미생성)
+    schema = ddl_schema("13_feature_store_weekly_ddl.sql", "feature_store_weekly")
+    cnt = upsert_batch("feature_store_weekly", iter_json_rows(df_out, schema),
+                       on_conflict="product_id,year_week")
     print(f"    적재 완료: {cnt:,}행")
 
     # 4) 결과 요약
     count = supabase.table("feature_store_weekly").select("id", count="exact").execute()
-    print(f"\n[S3] 완료 — feature_store_weekly: {count.count:,}행")
+    print(f"\n[S3] 완료 — feature_store_weekly: {count.count:,}행 (peak RSS: {format_rss()})")
 
     # 타겟 통계
     target_notnull = df_out["target_1w"].notna().sum()
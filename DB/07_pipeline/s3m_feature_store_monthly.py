@@ -2,8 +2,10 @@
 Step 3m: 월간 피처 엔지니어링 (feature_store_monthly)
 monthly_product_summary + monthly_customer_summary + 외부지표 → feature_store_monthly
 
-입력 테이블: monthly_product_summary, monthly_customer_summary,
-            inventory, purchase_order, economic_indicator, exchange_rate, trade_statistics
+입력 테이블: monthly_product_summary,
+            monthly_customer_summary → customer_concentration (concentration.py),
+            inventory, lead_time_stats, purchase_order,
+            external_indicator_panel (external_panel.py)
 출력 테이블: feature_store_monthly
 """
 
@@ -12,34 +14,17 @@ from collections import defaultdict
 import numpy as np
 import pandas as pd
 
-from config import supabase, upsert_batch
+from config import supabase, upsert_batch, fetch_all
+from concentration import load_concentration
+from external_panel import load_panel
+from lead_time import lead_time_map
+from frame_utils import ddl_schema, iter_json_rows
 
 
 # ─────────────────────────────────────────────────────────────
 # 데이터 로드 유틸
 # ─────────────────────────────────────────────────────────────
 
-def fetch_all(table: str, select: str) -> list:
-    """Supabase 테이블 전체 행 페이징 조회 (테이블 미존재 시 빈 리스트 반환)"""
-    all_rows, offset, ps = [], 0, 1000
-    while True:
-        try:
-            q = supabase.table(table).select(select).range(offset, offset + ps - 1)
-            resp = q.execute()
-        except Exception as e:
-            if "PGRST205" in str(e) or "Could not find" in str(e):
-                print(f"    [!] 테이블 '{table}' 미존재 — 빈 데이터로 진행")
-                return []
-            raise
-        if not resp.data:
-            break
-        all_rows.extend(resp.data)
-        if len(resp.data) < ps:
-            break
-        offset += ps
-    return all_rows
-
-
 # ─────────────────────────────────────────────────────────────
 # 1) 월간 제품 집계 로드
 # ─────────────────────────────────────────────────────────────
@@ -75,43 +60,11 @@ def load_monthly_product() -> pd.DataFrame:
 # ─────────────────────────────────────────────────────────────
 
 def load_customer_concentration() -> pd.DataFrame:
-    rows = fetch_all(
-        "monthly_customer_summary",
-        "product_id,customer_id,year_month,order_qty",
-    )
-    if not rows:
-        return pd.DataFrame(columns=[
-            "product_id", "year_month",
-            "top1_customer_pct", "top3_customer_pct", "customer_hhi",
-        ])
+    """monthly_customer_summary → (product_id, year_month) 별 HHI, top1/3 비중
 
-    df = pd.DataFrame(rows)
-    df["order_qty"] = pd.to_numeric(df["order_qty"], errors="coerce").fillna(0)
-
-    result = []
-    for (pid, ym), grp in df.groupby(["product_id", "year_month"]):
-        total = grp["order_qty"].sum()
-        if total <= 0:
-            result.append({
-                "product_id": pid, "year_month": ym,
-                "top1_customer_pct": 0.0, "top3_customer_pct": 0.0,
-                "customer_hhi": 0.0,
-            })
-            continue
-
-        shares = (grp["order_qty"] / total).sort_values(ascending=False)
-        top1 = float(shares.iloc[0]) * 100 if len(shares) >= 1 else 0.0
-        top3 = float(shares.iloc[:3].sum()) * 100 if len(shares) >= 1 else 0.0
-        hhi = float((shares ** 2).sum())
-
-        result.append({
-            "product_id": pid, "year_month": ym,
-            "top1_customer_pct": round(top1, 2),
-            "top3_customer_pct": round(top3, 2),
-            "customer_hhi": round(hhi, 4),
-        })
-
-    return pd.DataFrame(result)
+    concentration.py 벡터화 계산 + customer_concentration 증분 캐시
+    """
+    return load_concentration("monthly")
 
 
 # ─────────────────────────────────────────────────────────────
@@ -138,27 +91,8 @@ def load_inventory_monthly() -> pd.DataFrame:
 # ─────────────────────────────────────────────────────────────
 
 def load_lead_time() -> dict:
-    rows = fetch_all(
-        "purchase_order",
-        "component_product_id,po_date,receipt_date,status",
-    )
-    if not rows:
-        return {}
-
-    df = pd.DataFrame(rows)
-    df = df[df["status"] == "F"].copy()
-    df = df.dropna(subset=["po_date", "receipt_date"])
-    if df.empty:
-        return {}
-
-    df["po_date"] = pd.to_datetime(df["po_date"], errors="coerce")
-    df["receipt_date"] = pd.to_datetime(df["receipt_date"], errors="coerce")
-    df = df.dropna(subset=["po_date", "receipt_date"])
-    df["lead_days"] = (df["receipt_date"] - df["po_date"]).dt.days
-    df = df[df["lead_days"] >= 0]
-
-    avg_lead = df.groupby("component_product_id")["lead_days"].mean()
-    return avg_lead.to_dict()
+    """lead_time_stats (s2 산출, 전체 기간·제품 단위) → {product_id: avg_lead_days}"""
+    return {pid: v["avg"] for pid, v in lead_time_map().items()}
 
 
 # ─────────────────────────────────────────────────────────────
@@ -177,119 +111,7 @@ def load_avg_unit_price() -> dict:
 
 
 # ─────────────────────────────────────────────────────────────
-# 6) 외부지표 → 월간 시계열 (이미 월별이므로 간단)
-# ─────────────────────────────────────────────────────────────
-
-def load_external_monthly(year_months: list[str]) -> pd.DataFrame:
-    """경제지표 + 환율 + 무역통계 → year_month 기준 피처 DataFrame"""
-
-    result = pd.DataFrame({"year_month": sorted(set(year_months))})
-
-    # 경제지표
-    econ_rows = fetch_all("economic_indicator", "source,indicator_code,date,value")
-    econ_df = pd.DataFrame(econ_rows) if econ_rows else pd.DataFrame(
-        columns=["source", "indicator_code", "date", "value"]
-    )
-    if not econ_df.empty:
-        econ_df["date"] = pd.to_datetime(econ_df["date"])
-        econ_df["value"] = pd.to_numeric(econ_df["value"], errors="coerce")
-        econ_df["year_month"] = econ_df["date"].dt.strftime("%Y-%m")
-
-    # 지표 매핑 (모두 월간 평균/마지막 값으로 집계)
-    INDICATOR_MAP = {
-        "SOX": "sox_index",
-        "DRAM_DDR4": "dram_price",
-        "NAND_TLC": "nand_price",
-        "SILICON_WAFER": "silicon_wafer_price",
-        "FEDFUNDS": "fed_funds_rate",
-        "WTI_WEEKLY": "wti_price",
-        "INDPRO": "indpro_index",
-        "IPMAN": "ipman_index",
-        "KR_BASE_RATE": "kr_base_rate",
-        "KR_IPI_MFG": "kr_ipi_mfg",
-        "KR_BSI_MFG": "kr_bsi_mfg",
-        "CN_PMI_MFG": "cn_pmi_mfg",
-    }
-
-    if not econ_df.empty:
-        for code, col_name in INDICATOR_MAP.items():
-            subset = econ_df[econ_df["indicator_code"] == code]
-            if not subset.empty:
-                monthly_val = subset.groupby("year_month")["value"].mean().reset_index()
-                monthly_val.columns = ["year_month", col_name]
-                result = result.merge(monthly_val, on="year_month", how="left")
-            else:
-                result[col_name] = np.nan
-    else:
-        for col_name in INDICATOR_MAP.values():
-            result[col_name] = np.nan
-
-    # 환율 → 월간 평균
-    CURRENCY_MAP = {
-        "USD": "usd_krw",
-        "JPY": "jpy_krw",
-        "EUR": "eur_krw",
-        "CNY": "cny_krw",
-    }
-    exrate_rows = fetch_all("exchange_rate", "base_currency,rate_date,rate")
-    exrate_df = pd.DataFrame(exrate_rows) if exrate_rows else pd.DataFrame(
-        columns=["base_currency", "rate_date", "rate"]
-    )
-    if not exrate_df.empty:
-        exrate_df["rate_date"] = pd.to_datetime(exrate_df["rate_date"])
-        exrate_df["rate"] = pd.to_numeric(exrate_df["rate"], errors="coerce")
-        exrate_df["year_month"] = exrate_df["rate_date"].dt.strftime("%Y-%m")
-
-        for currency, col_name in CURRENCY_MAP.items():
-            subset = exrate_df[exrate_df["base_currency"] == currency]
-            if not subset.empty:
-                monthly_avg = subset.groupby("year_month")["rate"].mean().reset_index()
-                monthly_avg.columns = ["year_month", col_name]
-                result = result.merge(monthly_avg, on="year_month", how="left")
-            else:
-                result[col_name] = np.nan
-    else:
-        for col_name in CURRENCY_MAP.values():
-            result[col_name] = np.nan
-
-    # 무역통계 → 이미 월별
-    trade_rows = fetch_all("trade_statistics", "hs_code,year_month,export_amount,import_amount")
-    trade_df = pd.DataFrame(trade_rows) if trade_rows else pd.DataFrame(
-        columns=["hs_code", "year_month", "export_amount", "import_amount"]
-    )
-    if not trade_df.empty:
-        trade_df["export_amount"] = pd.to_numeric(trade_df["export_amount"], errors="coerce").fillna(0)
-        trade_df["import_amount"] = pd.to_numeric(trade_df["import_amount"], errors="coerce").fillna(0)
-
-        monthly_trade = trade_df.groupby("year_month").agg(
-            semi_export_amt=("export_amount", "sum"),
-            semi_import_amt=("import_amount", "sum"),
-        ).reset_index()
-        monthly_trade["semi_trade_balance"] = (
-            monthly_trade["semi_export_amt"] - monthly_trade["semi_import_amt"]
-        )
-        monthly_trade = monthly_trade.sort_values("year_month")
-        monthly_trade["semi_export_roc"] = monthly_trade["semi_export_amt"].pct_change()
-
-        result = result.merge(
-            monthly_trade[["year_month", "semi_export_amt", "semi_import_amt",
-                           "semi_trade_balance", "semi_export_roc"]],
-            on="year_month", how="left",
-        )
-    else:
-        for c in ["semi_export_amt", "semi_import_amt", "semi_trade_balance", "semi_export_roc"]:
-            result[c] = np.nan
-
-    # forward-fill
-    result = result.sort_values("year_month")
-    fill_cols = [c for c in result.columns if c != "year_month"]
-    result[fill_cols] = result[fill_cols].ffill()
-
-    return result
-
-
-# ─────────────────────────────────────────────────────────────
-# 7) 피처 엔지니어링 메인 로직
+# 6) 피처 엔지니어링 메인 로직
 # ─────────────────────────────────────────────────────────────
 
 def build_features(df_mps: pd.DataFrame, df_conc: pd.DataFrame,
@@ -529,8 +351,7 @@ def run():
 
     # 외부지표
     print("  외부지표 로드 중...")
-    year_months = df_mps["year_month"].unique().tolist()
-    df_ext = load_external_monthly(year_months)
+    df_ext = load_panel("monthly")
     print(f"    외부지표: {len(df_ext):,}월 × {len(df_ext.columns)-1}개 지표")
 
     # 2) 피처 빌드
@@ -563,30 +384,11 @@ def run():
     # 3) Supabase 적재
     print("\n  feature_store_monthly 적재 중...")
 
-    INT_COLS = {
-        "order_count_lag1", "customer_count_lag1",
-        "order_qty_nonzero_3m", "order_qty_nonzero_6m",
-        "month", "quarter",
-    }
-
-    rows = df_out.replace({np.nan: None, np.inf: None, -np.inf: None}).to_dict("records")
-    for row in rows:
-        for k, v in row.items():
-            if v is None:
-                continue
-            if isinstance(v, (np.integer,)):
-                row[k] = int(v)
-            elif isinstance(v, (np.floating,)):
-                if k in INT_COLS:
-                    row[k] = int(v)
-                else:
-                    row[k] = round(float(v), 6)
-            elif isinstance(v, (np.bool_, bool)):
-                row[k] = bool(v)
-            elif isinstance(v, float) and k in INT_COLS:
-                row[k] = int(v)
-
-    cnt = upsert_batch("feature_store_monthly", rows, on_conflict="product_id,year_month")
+    # DDL 기반 컬럼 단위 직렬화 (NUMERIC 소수 자리 반올림 / INT 변환 / NaN → None)
+    # → 행 제너레이터를 upsert_batch에 바로 전달 (전체 행 리스트 미생성)
+    schema = ddl_schema("14_feature_store_monthly_ddl.sql", "feature_store_monthly")
+    cnt = upsert_batch("feature_store_monthly", iter_json_rows(df_out, schema),
+                       on_conflict="product_id,year_month")
     print(f"    적재 완료: {cnt:,}행")
 
     # 4) 결과 요약
@@ -19,6 +19,7 @@ from config import (
     WEEKLY_PARAM_GRID, WEEKLY_CV_FOLDS, TUNING_METRIC, TUNE_SAMPLE_PRODUCTS,
 )
 from ml_utils import compute_metrics, walk_forward_cv, grid_search_horizon
+from frame_utils import fetch_frame, feature_dtypes, format_rss
 
 MODEL_ID = "lgbm_q_v2"
 HORIZONS = {"target_1w": 7, "target_2w": 14, "target_4w": 28}
@@ -41,19 +42,6 @@ LGB_PARAMS = {
 }
 
 
-def fetch_all(table: str, select: str) -> list:
-    all_rows, offset, ps = [], 0, 1000
-    while True:
-        resp = supabase.table(table).select(select).range(offset, offset + ps - 1).execute()
-        if not resp.data:
-            break
-        all_rows.extend(resp.data)
-        if len(resp.data) < ps:
-            break
-        offset += ps
-    return all_rows
-
-
 def run(tune: bool = False):
     print("[S4] 수요예측 모델 학습/추론 시작")
 
@@ -64,26 +52,20 @@ def run(tune: bool = False):
         print("  [!] lightgbm 없이 단순 이동평균 fallback 사용")
         lgb = None
 
-    # 1) feature_store_weekly 로드
-    rows = fetch_all("feature_store_weekly", "*")
-    if not rows:
+    # 1) feature_store_weekly 로드 — 페이지 단위로 컴팩트 dtype 컬럼에 바로 적재
+    #    (product_id/year_week: category, 캘린더: int8, 피처: float32, 타겟: float64)
+    schema = {"product_id": "category", "year_week": "category", "week_start": "str"}
+    schema.update(feature_dtypes(WEEKLY_FEATURE_COLS))
+    schema.update({t: "float64" for t in HORIZONS})
+    df = fetch_frame("feature_store_weekly", schema)
+    if df.empty:
         print("  [!] feature_store_weekly 비어있음. s3 먼저 실행 필요")
         return
 
-    df = pd.DataFrame(rows)
     df = df.sort_values(["product_id", "year_week"])
-
-    if "week_start" in df.columns:
-        week_to_date = dict(zip(df["year_week"], df["week_start"]))
-    else:
-        week_to_date = {}
-
-    # 수치형 변환
-    feature_cols = [c for c in WEEKLY_FEATURE_COLS if c in df.columns]
-    for col in feature_cols:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-    for t in HORIZONS:
-        df[t] = pd.to_numeric(df[t], errors="coerce")
+    week_to_date = dict(zip(df["year_week"], df["week_start"]))
+    feature_cols = list(WEEKLY_FEATURE_COLS)
+    print(f"  메모리: DataFrame {df.memory_usage(deep=True).sum() / 1024**2:,.1f} MB")
 
     products = df["product_id"].unique()
     print(f"  feature_store_weekly: {len(df):,}행, 제품: {len(products):,}개")
@@ -152,9 +134,7 @@ def run(tune: bool = False):
     trained_count = 0
     skipped_count = 0
 
-    for pid in products:
-        pdf = df[df["product_id"] == pid].copy()
-
+    for pid, pdf in df.groupby("product_id", observed=True):
         for target_col, horizon_days in HORIZONS.items():
             valid = pdf.dropna(subset=[target_col])
             if len(valid) < MIN_SAMPLES:
@@ -322,7 +302,7 @@ def run(tune: bool = False):
                 print(f"    {row['rank_gain']:>2}. {row['feature_name']:<30} gain={row['importance_gain']:.2f}")
 
     count = supabase.table("forecast_result").select("id", count="exact").execute()
-    print(f"\n[S4] 완료 — forecast_result: {count.count:,}행")
+    print(f"\n[S4] 완료 — forecast_result: {count.count:,}행 (peak RSS: {format_rss()})")
 
 
 if __name__ == "__main__":
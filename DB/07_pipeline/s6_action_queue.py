@@ -1,224 +1,249 @@
 """
 Step 6: 조치 큐 생성
 리스크 등급 C 이상(total_risk > 40) 제품에 대해 권장 조치 자동 생성
-S7/S8 결과가 존재하면 suggested_qty를 정교하게 산출
-
-입력 테이블: risk_score, product_master, (optional) production_plan, purchase_recommendation
+S7/S8 결과가 존재하면 suggested_qty를 정교하게 산출 (이번 주 계획 기준 — 이번 주 행 없으면 오늘 이전 최신 계획)
+
+조치 산출: 제품별 최신 리스크 (risk_score_latest 뷰) 전체를 DataFrame 으로 받아 규칙별 마스크로 일괄 생성
+적재: 자연키 (product_id, risk_type, action_type, eval_date) 기준 기존 큐와 비교해 변경분만 반영
+  - 신규 키                 → INSERT (status 기본값 pending)
+  - pending 이고 내용 변경  → UPDATE (severity / description / suggested_qty)
+  - 담당자 처리 중·완료·기각 → 변경하지 않음 (재실행에도 사용자 처리 상태 유지)
+  - 이번 산출에 없는 pending → 종료 (status = 'dismissed', resolved_at 기록)
+
+입력 테이블: risk_score_latest, product_master,
+            (optional) production_plan / purchase_recommendation (plan_date = 이번 주 월요일)
+                       + production_plan_latest / purchase_recommendation_latest (이번 주 행 없는 키 보충)
+            (최신 행 뷰 — latest_views.py, 뷰 미존재 시 원본 이력)
 출력 테이블: action_queue
 """
 
-from datetime import date
-from collections import defaultdict
-
-from config import supabase, upsert_batch
-
+from datetime import date, datetime, timedelta, timezone
 
-def fetch_all(table: str, select: str) -> list:
-    all_rows, offset, ps = [], 0, 1000
-    while True:
-        resp = supabase.table(table).select(select).range(offset, offset + ps - 1).execute()
-        if not resp.data:
-            break
-        all_rows.extend(resp.data)
-        if len(resp.data) < ps:
-            break
-        offset += ps
-    return all_rows
+import numpy as np
+import pandas as pd
 
-
-def get_severity(individual_score: float, total_risk: float) -> str:
-    """개별 리스크 점수 + 종합 리스크를 조합하여 심각도 산정.
+from config import supabase, upsert_batch
+from frame_utils import fetch_frame, ddl_schema, iter_json_rows, changed_mask
+from latest_views import LATEST_VIEWS, load_latest
+
+QUEUE_TABLE = "action_queue"
+QUEUE_COLS = ddl_schema("06_analytics_ddl.sql", QUEUE_TABLE)
+QUEUE_KEYS = ["product_id", "risk_type", "action_type", "eval_date"]
+QUEUE_FIELDS = ["severity", "description", "suggested_qty"]     # 재실행 시 갱신 대상 컬럼
+RISK_SCHEMA = {
+    "product_id": "str", "eval_date": "str",
+    "stockout_risk": "float64", "excess_risk": "float64",
+    "delivery_risk": "float64", "margin_risk": "float64", "total_risk": "float64",
+    "inventory_days": "float64", "safety_stock": "float64",
+}
+CLOSE_CHUNK = 500                        # 종료 UPDATE 1회당 id 수 (URL 길이 제한)
+
+
+def get_severity(score: np.ndarray, total_risk: np.ndarray) -> np.ndarray:
+    """개별 리스크 점수 + 종합 리스크를 조합하여 심각도 산정 (제품 배열 단위).
     - critical: 개별 90+ AND 종합 D등급(61+)
     - high:     개별 80+ OR (개별 60+ AND 종합 61+)
     - medium:   개별 40+
     - low:      나머지
     """
-    if individual_score >= 90 and total_risk > 60:
-        return "critical"
-    elif individual_score >= 80 or (individual_score >= 60 and total_risk > 60):
-        return "high"
-    elif individual_score > 40:
-        return "medium"
-    return "low"
-
-
-def _load_optimization_data() -> tuple:
-    """S7/S8 결과 로드 (테이블 미존재 시 빈 dict 반환)
-    Returns: (pp_map, pr_map)
-        pp_map: {product_id: {planned_qty, daily_capacity, ...}}
-        pr_map: {component_product_id: {recommended_qty, ...}}
+    return np.select(
+        [(score >= 90) & (total_risk > 60),
+         (score >= 80) | ((score >= 60) & (total_risk > 60)),
+         score > 40],
+        ["critical", "high", "medium"], default="low").astype(object)
+
+
+# ─── 데이터 로드 ─────────────────────────────────────────────
+
+def _current_plan(view: str, schema: dict, today: date) -> pd.DataFrame:
+    """이번 주 (plan_date = 이번 주 월요일) 계획 행 + 이번 주 행 없는 키는 오늘 이전 최신 plan_date 행
+
+    S7/S8 은 롤링 호라이즌 (이번 주 + 이후 주차) 을 적재 — 키별 최신 행은 미래 주차이므로 이번 주를 직접 조회
+    """
+    table, keys, _ = LATEST_VIEWS[view]
+    monday = (today - timedelta(days=today.weekday())).isoformat()
+    current = fetch_frame(table, schema, filters=[("eq", "plan_date", monday)])
+    past = load_latest(view, schema, until=today.isoformat())
+    past = past[~past[keys[0]].isin(current[keys[0]])]
+    return pd.concat([current, past], ignore_index=True).drop_duplicates(keys, keep="first")
+
+
+def _load_optimization_data(today: date | None = None) -> tuple:
+    """S7/S8 결과 로드 (테이블 미존재 시 빈 프레임 반환)
+    Returns: (pp, pr)
+        pp: product_id 인덱스, planned_qty / daily_capacity (제품별 이번 주 계획)
+        pr: component_product_id 인덱스 recommended_qty Series (자재별 이번 주 추천)
     """
-    pp_map, pr_map = {}, {}
+    today = today or date.today()
+    pp = pd.DataFrame(columns=["planned_qty", "daily_capacity"], dtype=float)
+    pr = pd.Series(dtype=float)
     try:
-        pp_rows = fetch_all("production_plan",
-                            "product_id,plan_date,planned_qty,daily_capacity,plan_type")
-        if pp_rows:
-            latest_date = max(r["plan_date"] for r in pp_rows)
-            for r in pp_rows:
-                if r["plan_date"] == latest_date:
-                    pp_map[r["product_id"]] = r
-            print(f"  S7 생산계획 연동: {len(pp_map):,}개 제품")
+        rows = _current_plan("production_plan_latest", {"product_id": "str", "plan_date": "str",
+                                                        "planned_qty": "float64", "daily_capacity": "float64"},
+                             today)
+        if not rows.empty:
+            pp = rows.set_index("product_id")
+            print(f"  S7 생산계획 연동: {len(pp):,}개 제품")
     except Exception:
         pass
 
     try:
-        pr_rows = fetch_all("purchase_recommendation",
-                            "component_product_id,plan_date,recommended_qty")
-        if pr_rows:
-            latest_date = max(r["plan_date"] for r in pr_rows)
-            for r in pr_rows:
-                if r["plan_date"] == latest_date:
-                    pr_map[r["component_product_id"]] = r
-            print(f"  S8 발주추천 연동: {len(pr_map):,}개 자재")
+        rows = _current_plan("purchase_recommendation_latest", {"component_product_id": "str", "plan_date": "str",
+                                                                "recommended_qty": "float64"},
+                             today)
+        if not rows.empty:
+            pr = rows.set_index("component_product_id")["recommended_qty"]
+            print(f"  S8 발주추천 연동: {len(pr):,}개 자재")
     except Exception:
         pass
 
-    return pp_map, pr_map
+    return pp, pr
+
+
+def load_queue(eval_dates: list) -> pd.DataFrame:
+    """비교 대상 기존 조치: 이번 산출 eval_date 의 전체 상태 행 + 모든 pending 행"""
+    schema = {"id": "float64", **{c: "float64" if c == "suggested_qty" else "str"
+                                  for c in QUEUE_KEYS + QUEUE_FIELDS + ["status"]}}
+    frames = [fetch_frame(QUEUE_TABLE, schema, filters=[("eq", "status", "pending")])]
+    if eval_dates:
+        frames.append(fetch_frame(QUEUE_TABLE, schema, filters=[("in_", "eval_date", eval_dates)]))
+    return pd.concat(frames, ignore_index=True).drop_duplicates("id")
+
+
+# ─── 조치 산출 ───────────────────────────────────────────────
+
+def build_actions(risk: pd.DataFrame, names: pd.Series, pp: pd.DataFrame, pr: pd.Series) -> pd.DataFrame:
+    """C등급 이상 제품의 리스크 유형별 조치 행 (QUEUE_KEYS + QUEUE_FIELDS)"""
+    r = risk[risk["total_risk"].fillna(0) > 40].reset_index(drop=True)
+    pid = r["product_id"].to_numpy(dtype=object)
+    pname = r["product_id"].map(names).fillna(r["product_id"]).to_numpy(dtype=object)
+    eval_date = r["eval_date"].to_numpy(dtype=object)
+    inv_days = r["inventory_days"]
+    inv_days_str = np.where(inv_days.fillna(0) != 0, inv_days.map("{:.0f}일".format), "N/A").astype(object)
+    total = r["total_risk"].fillna(0).to_numpy()
+    score = {c: r[f"{c}_risk"].fillna(0).to_numpy() for c in ("stockout", "excess", "delivery", "margin")}
+
+    # S7/S8 데이터 참조
+    planned = pp["planned_qty"].reindex(pid).fillna(0).to_numpy()
+    daily_cap = pp["daily_capacity"].reindex(pid).fillna(0).to_numpy()
+    recent_avg = np.where(daily_cap > 0, daily_cap / 1.2 * 7, 0)    # 버퍼 제거 후 주간 환산
+    rec_qty = pr.reindex(pid).fillna(0).to_numpy()
+    safety = r["safety_stock"].fillna(0).to_numpy()
+
+    def positive(q):
+        return np.where(q > 0, q, np.nan)
+
+    def label(s):
+        return np.array([f"{v:.0f}" for v in s], dtype=object)
+
+    # (리스크 유형, 조치 유형, 대상 마스크, 제안 수량, 설명 뒷부분)
+    rules = [
+        # 결품 60 초과: 긴급 발주 — S8 발주추천 > 기존 안전재고
+        ("stockout", "expedite_po", score["stockout"] > 60,
+         positive(np.where(rec_qty > 0, rec_qty, safety)),
+         "재고일수 " + inv_days_str + ", 결품 위험 " + label(score["stockout"])
+         + "점. 긴급 발주 또는 기존 발주 납기 단축 필요."),
+        # 결품 40~60: 생산 증대 — S7 계획량 - 최근 평균
+        ("stockout", "increase_production", (score["stockout"] > 40) & (score["stockout"] <= 60),
+         positive(np.maximum(0, planned - recent_avg)),
+         "재고일수 " + inv_days_str + ", 결품 주의 " + label(score["stockout"]) + "점. 생산량 증대 검토."),
+        # 과잉: 생산 축소 — 최근 평균 - S7 계획량
+        ("excess", "reduce_production", score["excess"] > 40,
+         positive(np.where(recent_avg > 0, np.maximum(0, recent_avg - planned), 0)),
+         "재고일수 " + inv_days_str + ", 과잉 재고 " + label(score["excess"]) + "점. 생산 축소 또는 판촉 검토."),
+        # 납기: 생산 우선순위 — S7 계획량
+        ("delivery", "expedite_production", score["delivery"] > 40,
+         positive(planned),
+         "납기 리스크 " + label(score["delivery"]) + "점. 생산 우선순위 조정 또는 부분 납품 검토."),
+        # 마진: 단가 조정
+        ("margin", "adjust_price", score["margin"] > 40,
+         np.full(len(r), np.nan),
+         "마진 리스크 " + label(score["margin"]) + "점. 단가 재협상 또는 대체 공급사 검토."),
+    ]
+
+    frames = []
+    for risk_type, action_type, mask, qty, text in rules:
+        frames.append(pd.DataFrame({
+            "product_id": pid[mask],
+            "risk_type": risk_type,
+            "action_type": action_type,
+            "eval_date": eval_date[mask],
+            "severity": get_severity(score[risk_type][mask], total[mask]),
+            "description": "[" + pname[mask] + "] " + text[mask],
+            "suggested_qty": qty[mask],
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+# ─── 변경분 반영 ─────────────────────────────────────────────
+
+def sync_queue(actions: pd.DataFrame, existing: pd.DataFrame) -> dict:
+    """자연키 기준 INSERT / UPDATE / 종료 → {"insert", "update", "close", "kept"} 건수"""
+    keyed = actions.merge(existing[QUEUE_KEYS + ["status"]], on=QUEUE_KEYS, how="left")
+    status = keyed["status"].to_numpy(dtype=object)
+    is_new = pd.isna(status)
+    is_pending = status == "pending"
+
+    pending = existing[existing["status"] == "pending"]
+    candidates = actions[is_new | is_pending].reset_index(drop=True)
+    writes = candidates[changed_mask(candidates, pending, QUEUE_KEYS, QUEUE_COLS)]
+    if not writes.empty:
+        # status 미포함: 신규 행은 기본값 pending, 기존 행은 상태 유지
+        upsert_batch(QUEUE_TABLE, iter_json_rows(writes, QUEUE_COLS), on_conflict=",".join(QUEUE_KEYS))
+
+    stale = pending.merge(actions[QUEUE_KEYS], on=QUEUE_KEYS, how="left", indicator=True)
+    close_ids = stale.loc[stale["_merge"] == "left_only", "id"].astype(int).tolist()
+    resolved_at = datetime.now(timezone.utc).isoformat()
+    for i in range(0, len(close_ids), CLOSE_CHUNK):
+        (supabase.table(QUEUE_TABLE)
+         .update({"status": "dismissed", "resolved_at": resolved_at})
+         .in_("id", close_ids[i:i + CLOSE_CHUNK])
+         .eq("status", "pending")
+         .execute())
+
+    return {
+        "insert": int(is_new.sum()),
+        "update": len(writes) - int(is_new.sum()),
+        "close": len(close_ids),
+        "kept": int((~is_new & ~is_pending).sum()),
+    }
 
 
 def run():
     print("[S6] 조치 큐 생성 시작")
-    today_str = date.today().isoformat()
-
-    # 1) 리스크 스코어 로드 (최신 eval_date만)
-    risk_rows = fetch_all("risk_score", "*")
-    # 최신 eval_date별 필터
-    latest = {}
-    for r in risk_rows:
-        pid = r["product_id"]
-        if pid not in latest or r["eval_date"] > latest[pid]["eval_date"]:
-            latest[pid] = r
-    print(f"  리스크 스코어: {len(latest):,}개 제품")
+
+    # 1) 리스크 스코어 로드 (제품별 최신 eval_date)
+    risk = load_latest("risk_score_latest", RISK_SCHEMA)
+    print(f"  리스크 스코어: {len(risk):,}개 제품")
+    if risk.empty:
+        print("  [!] 리스크 스코어 없음 — s5 먼저 실행 필요 (기존 조치 큐 유지)")
+        return
 
     # 2) 제품명 매핑
-    pm_rows = fetch_all("product_master", "product_code,product_name")
-    name_map = {r["product_code"]: r["product_name"] or r["product_code"] for r in pm_rows}
+    pm = fetch_frame("product_master", {"product_code": "str", "product_name": "str"},
+                     order_col="product_code")
+    names = pm.set_index("product_code")["product_name"].dropna()
 
     # 2-1) S7/S8 결과 로드 (optional)
-    pp_map, pr_map = _load_optimization_data()
-
-    # 3) C등급 이상 필터 (total_risk > 40)
-    high_risk = {pid: r for pid, r in latest.items() if float(r["total_risk"] or 0) > 40}
-    print(f"  C등급 이상 (조치 대상): {len(high_risk):,}개 제품")
-
-    # 4) 조치 생성
-    actions = []
-
-    for pid, r in high_risk.items():
-        pname = name_map.get(pid, pid)
-        eval_dt = r["eval_date"]
-        inv_days = r.get("inventory_days")
-        inv_days_str = f"{float(inv_days):.0f}일" if inv_days else "N/A"
-        total_risk = float(r.get("total_risk") or 0)
-
-        stockout = float(r.get("stockout_risk") or 0)
-        excess = float(r.get("excess_risk") or 0)
-        delivery = float(r.get("delivery_risk") or 0)
-        margin = float(r.get("margin_risk") or 0)
-
-        # S7/S8 데이터 참조
-        pp = pp_map.get(pid, {})
-        planned_qty = float(pp.get("planned_qty") or 0)
-        daily_cap = float(pp.get("daily_capacity") or 0)
-        recent_avg = daily_cap / 1.2 * 7 if daily_cap > 0 else 0  # 버퍼 제거 후 주간 환산
-        pr = pr_map.get(pid, {})
-        rec_qty = float(pr.get("recommended_qty") or 0)
-
-        # 결품 리스크 조치
-        if stockout > 40:
-            sev = get_severity(stockout, total_risk)
-            if stockout > 60:
-                # expedite_po: S8 발주추천 > 기존 안전재고 > fallback
-                sq = rec_qty if rec_qty > 0 else float(r.get("safety_stock") or 0)
-                actions.append({
-                    "product_id": pid,
-                    "eval_date": eval_dt,
-                    "risk_type": "stockout",
-                    "severity": sev,
-                    "action_type": "expedite_po",
-                    "description": f"[{pname}] 재고일수 {inv_days_str}, 결품 위험 {stockout:.0f}점. 긴급 발주 또는 기존 발주 납기 단축 필요.",
-                    "suggested_qty": sq if sq > 0 else None,
-                    "status": "pending",
-                })
-            else:
-                # increase_production: S7 계획량 - 최근 평균
-                sq = max(0, planned_qty - recent_avg) if planned_qty > 0 else None
-                actions.append({
-                    "product_id": pid,
-                    "eval_date": eval_dt,
-                    "risk_type": "stockout",
-                    "severity": sev,
-                    "action_type": "increase_production",
-                    "description": f"[{pname}] 재고일수 {inv_days_str}, 결품 주의 {stockout:.0f}점. 생산량 증대 검토.",
-                    "suggested_qty": sq if sq and sq > 0 else None,
-                    "status": "pending",
-                })
-
-        # 과잉 리스크 조치
-        if excess > 40:
-            sev = get_severity(excess, total_risk)
-            # reduce_production: 최근 평균 - S7 계획량
-            sq = max(0, recent_avg - planned_qty) if recent_avg > 0 and planned_qty >= 0 else None
-            actions.append({
-                "product_id": pid,
-                "eval_date": eval_dt,
-                "risk_type": "excess",
-                "severity": sev,
-                "action_type": "reduce_production",
-                "description": f"[{pname}] 재고일수 {inv_days_str}, 과잉 재고 {excess:.0f}점. 생산 축소 또는 판촉 검토.",
-                "suggested_qty": sq if sq and sq > 0 else None,
-                "status": "pending",
-            })
-
-        # 납기 리스크 조치
-        if delivery > 40:
-            sev = get_severity(delivery, total_risk)
-            # expedite_production: S7 계획량 활용
-            sq = planned_qty if planned_qty > 0 else None
-            actions.append({
-                "product_id": pid,
-                "eval_date": eval_dt,
-                "risk_type": "delivery",
-                "severity": sev,
-                "action_type": "expedite_production",
-                "description": f"[{pname}] 납기 리스크 {delivery:.0f}점. 생산 우선순위 조정 또는 부분 납품 검토.",
-                "suggested_qty": sq,
-                "status": "pending",
-            })
-
-        # 마진 리스크 조치
-        if margin > 40:
-            sev = get_severity(margin, total_risk)
-            actions.append({
-                "product_id": pid,
-                "eval_date": eval_dt,
-                "risk_type": "margin",
-                "severity": sev,
-                "action_type": "adjust_price",
-                "description": f"[{pname}] 마진 리스크 {margin:.0f}점. 단가 재협상 또는 대체 공급사 검토.",
-                "suggested_qty": None,
-                "status": "pending",
-            })
+    pp, pr = _load_optimization_data()
 
+    # 3) C등급 이상 (total_risk > 40) 조치 생성
+    print(f"  C등급 이상 (조치 대상): {int((risk['total_risk'].fillna(0) > 40).sum()):,}개 제품")
+    actions = build_actions(risk, names, pp, pr)
     print(f"  생성된 조치: {len(actions):,}건")
 
     # 심각도 분포
-    sev_dist = defaultdict(int)
-    for a in actions:
-        sev_dist[a["severity"]] += 1
-    print(f"  심각도 분포: {dict(sorted(sev_dist.items()))}")
-
-    if actions:
-        # 같은 eval_date의 기존 pending 조치 삭제 후 재생성
-        supabase.table("action_queue").delete().eq(
-            "eval_date", today_str
-        ).eq("status", "pending").execute()
-        for i in range(0, len(actions), 500):
-            batch = actions[i:i + 500]
-            supabase.table("action_queue").insert(batch).execute()
-
-    count = supabase.table("action_queue").select("id", count="exact").execute()
-    print(f"[S6] 완료 — action_queue: {count.count:,}행")
+    print(f"  심각도 분포: {dict(sorted(actions['severity'].value_counts().items()))}")
+
+    # 4) 기존 큐와 비교 → 변경분만 반영
+    existing = load_queue(sorted(actions["eval_date"].unique()))
+    n = sync_queue(actions, existing)
+    print(f"  적재: 신규 {n['insert']:,}건, 갱신 {n['update']:,}건, 종료 {n['close']:,}건 "
+          f"(변경 없음 {len(actions) - n['insert'] - n['update'] - n['kept']:,}건·"
+          f"담당자 처리 {n['kept']:,}건 유지)")
+
+    count = supabase.table(QUEUE_TABLE).select("id", count="exact").execute()
+    print(f"[S6] 완료 — {QUEUE_TABLE}: {count.count:,}행")
 
 
 if __name__ == "__main__":
@@ -1,69 +1,109 @@
 """
 Step 7: 생산 최적화 (Production Plan)
 수요예측 + 현재재고 + 생산캐파 + 리스크 기반으로 제품별 최적 생산량 산출
+계획 산식은 제품 정렬 배열 (plan_inputs) 위에서 주차 단위로 일괄 계산 (plan_week)
+  - greedy: 제품별 자체 캐파 (일평균 생산 × 버퍼) 상한
+  - lp: 공유 생산 라인 캐파를 전 제품에 LP/MIP 로 배분 (production_lp.py, HiGHS)
+롤링 호라이즌: 이번 주 ~ PLAN_HORIZON_WEEKS 주차만 계산, 예상 재고를 주차 순으로 이월
+  - 지난 주차·확정 계획 (status != 'draft') 은 다시 쓰지 않음, 값이 바뀐 계획만 적재
+  - 대상 제품 (예측·최근 수요) 에서 빠진 제품의 호라이즌 주차 초안은 삭제 (S8 MRP 소요량에서 제외)
 
 입력 테이블: forecast_result, inventory, daily_production,
-            risk_score, product_lead_time, daily_order
-출력 테이블: production_plan
+            risk_score_latest, lead_time_stats, safety_stock, daily_order
+출력 테이블: production_plan (+ production_plan_latest 갱신)
 """
 
 from datetime import date, timedelta
 from collections import defaultdict
 
+import numpy as np
+import pandas as pd
+
 from config import (
-    supabase, upsert_batch,
-    PRODUCTION_PLAN_DAYS, PRODUCTION_CAPACITY_BUFFER, PRODUCTION_LOOKBACK_DAYS,
+    supabase, upsert_batch, fetch_all,
+    PRODUCTION_PLAN_DAYS, PRODUCTION_CAPACITY_BUFFER, PRODUCTION_LOOKBACK_DAYS, PLAN_HORIZON_WEEKS,
+    PRODUCTION_PLAN_MODE, PRODUCTION_LP_PRIORITY_WEIGHTS, PRODUCTION_LP_INTEGER,
 )
+from frame_utils import fetch_frame, ddl_schema, fetch_schema, iter_json_rows, changed_mask
+from lead_time import load_lead_times
+from latest_views import load_latest, refresh_latest
+from production_lp import line_capacity, solve_plan
+
+PLAN_COLS = ddl_schema("16_optimization_ddl.sql", "production_plan")
+WEEKLY_HORIZONS = (7, 14, 28)       # 주간 모델 누적 예측 horizon (일) — 없으면 월간 (30일) 사용
 
 
 # ─── 데이터 로드 ─────────────────────────────────────────────
 
-def fetch_all(table: str, select: str = "*") -> list:
-    """Supabase 페이징 조회"""
-    all_rows, offset, ps = [], 0, 1000
-    while True:
-        try:
-            resp = (supabase.table(table)
-                    .select(select)
-                    .range(offset, offset + ps - 1)
-                    .execute())
-        except Exception as e:
-            if "PGRST" in str(e) or "Could not find" in str(e):
-                print(f"    [!] 테이블 '{table}' 조회 실패 -- 빈 데이터로 진행")
-                return []
-            raise
-        if not resp.data:
-            break
-        all_rows.extend(resp.data)
-        if len(resp.data) < ps:
-            break
-        offset += ps
-    return all_rows
-
-
-def load_forecast_data() -> dict:
-    """forecast_result에서 제품별 최신 예측 로드
-    Returns: {product_id: {horizon_days: {p10, p50, p90}}}
+def load_forecast_data() -> pd.DataFrame:
+    """forecast_result에서 (제품, horizon)별 최신 forecast_date 예측 로드
+    Returns: DataFrame(product_id, horizon_days, p50, p90)
     """
-    rows = fetch_all("forecast_result",
-                     "product_id,p10,p50,p90,horizon_days,forecast_date")
-    # 최신 forecast_date만 유지
-    latest = {}
-    for r in rows:
-        pid = r["product_id"]
-        h = r["horizon_days"]
-        key = (pid, h)
-        if key not in latest or r["forecast_date"] > latest[key]["forecast_date"]:
-            latest[key] = r
+    fc = fetch_frame("forecast_result",
+                     {"product_id": "str", "horizon_days": "float64", "forecast_date": "str",
+                      "p50": "float64", "p90": "float64"})
+    fc = fc[fc["product_id"].notna() & fc["horizon_days"].notna()]
+    fc = (fc.sort_values("forecast_date", ascending=False, kind="mergesort")
+            .drop_duplicates(["product_id", "horizon_days"]))
+    return fc.assign(p50=fc["p50"].fillna(0), p90=fc["p90"].fillna(0)).drop(columns="forecast_date")
+
 
-    fc_map = defaultdict(dict)
-    for (pid, h), r in latest.items():
-        fc_map[pid][h] = {
-            "p10": float(r["p10"] or 0),
-            "p50": float(r["p50"] or 0),
-            "p90": float(r["p90"] or 0),
-        }
-    return dict(fc_map)
+def forecast_matrix(fc: pd.DataFrame, products: pd.Index) -> tuple:
+    """최신 예측 → (horizon 배열 (H,), {"p50", "p90": (제품 × H) 누적 예측, 사용 안 하는 칸 NaN})
+
+    주간 horizon (WEEKLY_HORIZONS) 이 하나라도 있는 제품은 주간 horizon 만, 없으면 전체 horizon 사용
+    """
+    xs = np.sort(fc["horizon_days"].unique()).astype(float)
+    ri = products.get_indexer(fc["product_id"])
+    ci = np.searchsorted(xs, fc["horizon_days"].to_numpy(dtype=float))
+    keep = ri >= 0
+    out = {}
+    for q in ("p50", "p90"):
+        m = np.full((len(products), len(xs)), np.nan)
+        m[ri[keep], ci[keep]] = fc[q].to_numpy(dtype=float)[keep]
+        out[q] = m
+    weekly = np.isin(xs, WEEKLY_HORIZONS)
+    has_weekly = ~np.isnan(out["p50"][:, weekly]).all(axis=1)
+    for q in out:
+        out[q][np.ix_(has_weekly, ~weekly)] = np.nan
+    return xs, out
+
+
+def cumulative_at(xs: np.ndarray, ys: np.ndarray, t: float) -> np.ndarray:
+    """(0일, 0) 과 각 행의 가용 horizon 점을 잇는 누적 곡선 값 C(t) (행별 선형 보간)
+
+    누적 예측은 horizon 순으로 단조 증가하도록 보정, 마지막 가용 점 이후는 마지막 구간 기울기로 연장
+    """
+    X = np.concatenate([[0.0], xs])
+    Y = np.column_stack([np.zeros(len(ys)), ys])
+    avail = ~np.isnan(Y)
+    Y = np.where(avail, np.fmax.accumulate(Y, axis=1), np.nan)
+    rows = np.arange(len(Y))
+    pos = np.arange(len(X))
+
+    def last(mask):     # 행별 mask 가 참인 마지막 열
+        return len(X) - 1 - np.argmax(mask[:, ::-1], axis=1)
+
+    li = last(avail & (X <= t))
+    right = avail & (X > t)
+    ri = np.argmax(right, axis=1)
+    prev = avail & (pos < li[:, None])
+    pi = np.where(prev.any(axis=1), last(prev), li)  # 연장 구간 시작점 (예측 없는 행 = 기울기 0)
+    j = np.where(right.any(axis=1), ri, pi)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = (Y[rows, j] - Y[rows, li]) / (X[j] - X[li])
+    slope = np.where(j == li, 0.0, slope)
+    return slope * (t - X[li]) + Y[rows, li]
+
+
+def weekly_forecast(xs: np.ndarray, ys: dict, week: int,
+                    days: int = PRODUCTION_PLAN_DAYS) -> tuple:
+    """누적 예측 행렬 → week 번째 계획 기간 (0 = 이번 주) 제품별 수요 (p50, p90) 배열
+
+    누적 곡선의 [week·days, (week+1)·days] 구간 증분 (예측 없는 제품은 0)
+    """
+    t0, t1 = week * days, (week + 1) * days
+    return tuple(cumulative_at(xs, ys[q], t1) - cumulative_at(xs, ys[q], t0) for q in ("p50", "p90"))
 
 
 def load_inventory_data() -> dict:
@@ -109,91 +149,230 @@ def load_production_capacity() -> dict:
     return capacity
 
 
-def load_risk_data() -> dict:
-    """risk_score 최신: {product_id: row}"""
-    rows = fetch_all("risk_score", "*")
-    latest = {}
-    for r in rows:
-        pid = r["product_id"]
-        if pid not in latest or r["eval_date"] > latest[pid]["eval_date"]:
-            latest[pid] = r
-    return latest
+def load_line_capacity() -> tuple:
+    """daily_production 최근 N일 → (라인별 계획기간 캐파, 제품-라인 쌍) — production_lp.line_capacity()"""
+    cutoff = (date.today() - timedelta(days=PRODUCTION_LOOKBACK_DAYS)).isoformat()
+    df = fetch_frame("daily_production",
+                     {"production_date": "str", "product_id": "str", "line_id": "str",
+                      "produced_qty": "float64"},
+                     filters=[("gte", "production_date", cutoff)])
+    return line_capacity(df.assign(produced_qty=df["produced_qty"].fillna(0)))
 
 
-def load_lead_times() -> dict:
-    """product_lead_time: {product_id: {avg, p90}}"""
-    rows = fetch_all("product_lead_time",
-                     "product_id,avg_lead_days,p90_lead_days,calc_date")
-    latest = {}
-    for r in rows:
-        pid = r["product_id"]
-        if pid not in latest or r["calc_date"] > latest[pid]["calc_date"]:
-            latest[pid] = r
-    return {
-        pid: {
-            "avg": float(r["avg_lead_days"] or 7),
-            "p90": float(r["p90_lead_days"] or 14),
-        }
-        for pid, r in latest.items()
-    }
+def load_risk_data() -> dict:
+    """risk_score 최신 (risk_score_latest): {product_id: row}"""
+    df = load_latest("risk_score_latest", {"product_id": "str", "eval_date": "str", "risk_grade": "str",
+                                           "stockout_risk": "float64", "excess_risk": "float64"})
+    return df.set_index("product_id").to_dict("index")
 
 
-def load_open_orders() -> dict:
-    """미처리 수주(status='R'): {product_id: [{delivery, qty}]}"""
-    rows = fetch_all("daily_order",
-                     "product_id,expected_delivery_date,order_qty,status")
-    open_orders = defaultdict(list)
-    for r in rows:
-        if r.get("status") == "R" and r.get("expected_delivery_date"):
-            open_orders[r["product_id"]].append({
-                "delivery": r["expected_delivery_date"],
-                "qty": float(r["order_qty"] or 0),
-            })
-    return dict(open_orders)
+def load_open_orders() -> pd.DataFrame:
+    """미처리 수주(status='R', 납기 있는 건): DataFrame(product_id, delivery (datetime64[D]), qty)"""
+    df = fetch_frame("daily_order",
+                     {"product_id": "str", "expected_delivery_date": "str", "order_qty": "float64"},
+                     filters=[("eq", "status", "R")])
+    delivery = pd.to_datetime(df["expected_delivery_date"], format="%Y-%m-%d", errors="coerce")
+    df = pd.DataFrame({"product_id": df["product_id"], "delivery": delivery.to_numpy().astype("datetime64[D]"),
+                       "qty": df["order_qty"].fillna(0).to_numpy()})
+    return df[delivery.notna().to_numpy()].reset_index(drop=True)
 
 
 def load_daily_demand() -> dict:
-    """최근 N일 일평균 수요: {product_id: daily_avg}"""
-    rows = fetch_all("daily_order", "product_id,order_date,order_qty")
+    """최근 N일 일평균 수요: {product_id: daily_avg} (order_date >= cutoff 행만 조회)"""
     cutoff = (date.today() - timedelta(days=PRODUCTION_LOOKBACK_DAYS)).isoformat()
-    demand_sum = defaultdict(float)
-    demand_days = defaultdict(set)
-    for r in rows:
-        if r.get("order_date") and r["order_date"] >= cutoff:
-            pid = r["product_id"]
-            demand_sum[pid] += float(r["order_qty"] or 0)
-            demand_days[pid].add(r["order_date"])
+    df = fetch_frame("daily_order",
+                     {"product_id": "str", "order_date": "str", "order_qty": "float64"},
+                     filters=[("gte", "order_date", cutoff)])
+    df = df[df["order_date"].notna()]
+    g = df.assign(order_qty=df["order_qty"].fillna(0)).groupby("product_id")
+    return (g["order_qty"].sum() / g["order_date"].nunique()).to_dict()
+
+
+def load_published_plans(since: str) -> pd.DataFrame:
+    """plan_date >= since 인 기존 생산계획 (확정 계획 동결·변경분 판정용)"""
+    return fetch_frame("production_plan", fetch_schema(PLAN_COLS),
+                       filters=[("gte", "plan_date", since)])
+
+
+# ─── 판정 함수 (제품 배열 단위) ─────────────────────────────
+
+def round6(x: np.ndarray) -> np.ndarray:
+    """적재 자릿수 (NUMERIC(18,6)) 반올림 — Python round() 기준 (np.round 는 반올림 경계에서 1e-6 차이)
+    예상 재고 이월도 이 값으로 계산해 적재 값과 일치시킴"""
+    return np.fromiter((round(v, 6) for v in np.asarray(x, dtype=float).tolist()), dtype=float, count=len(x))
+
+
+def determine_priority(risk_grade: np.ndarray,
+                       stockout_risk: np.ndarray,
+                       excess_risk: np.ndarray) -> np.ndarray:
+    """리스크 기반 우선순위 결정"""
+    return np.select(
+        [(risk_grade == "F") | (stockout_risk >= 80),
+         (risk_grade == "D") | (stockout_risk >= 60) | (excess_risk >= 80),
+         (risk_grade == "C") | (stockout_risk >= 40) | (excess_risk >= 60)],
+        ["critical", "high", "medium"],
+        default="low",
+    ).astype(object)
+
+
+def determine_plan_type(planned_qty: np.ndarray, recent_avg: np.ndarray) -> np.ndarray:
+    """계획 유형 결정 (최근 생산 실적 대비 비율)"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = planned_qty / recent_avg
+    return np.select(
+        [(recent_avg <= 0) & (planned_qty > 0), recent_avg <= 0, ratio > 1.15, ratio < 0.85],
+        ["new", "maintain", "increase", "decrease"],
+        default="maintain",
+    ).astype(object)
+
+
+def build_description(stockout_risk: float, excess_risk: float, urgent_qty: float,
+                      cap_note: str | None) -> str | None:
+    """계획 설명 (결품·과잉 위험, 긴급수주, 캐파 메모)"""
+    desc_parts = []
+    if stockout_risk > 60:
+        desc_parts.append(f"결품위험 {stockout_risk:.0f}점")
+    if excess_risk > 60:
+        desc_parts.append(f"과잉위험 {excess_risk:.0f}점")
+    if urgent_qty > 0:
+        desc_parts.append(f"긴급수주 {urgent_qty:.0f}개")
+    if cap_note:
+        desc_parts.append(cap_note)
+    return ", ".join(desc_parts) if desc_parts else None
+
+
+def plan_inputs(products: pd.Index, fc: pd.DataFrame, inv_map: dict, capacity: dict,
+                risk_data: dict, lead_times: dict, open_orders: pd.DataFrame,
+                daily_demand: dict) -> dict:
+    """로드 결과 → 제품 순서로 정렬된 주차 공통 배열"""
+    def col(mapping: dict, key=None, default=0.0) -> np.ndarray:
+        s = pd.Series({k: (v if key is None else v.get(key)) for k, v in mapping.items()}, dtype=object)
+        return pd.to_numeric(s.reindex(products), errors="coerce").fillna(default).to_numpy(dtype=float)
+
+    has_risk = products.isin(list(risk_data))
+    grade = pd.Series({k: v.get("risk_grade") for k, v in risk_data.items()}, dtype=object).reindex(products)
+    xs, ys = forecast_matrix(fc, products)
+    avg_d = col(daily_demand)
+    safety_days = col(lead_times, "safety", np.nan)
+    daily_avg = col(capacity, "daily_avg")
+    daily_cap = daily_avg * PRODUCTION_CAPACITY_BUFFER
     return {
-        pid: demand_sum[pid] / len(demand_days[pid])
-        for pid in demand_sum if demand_days[pid]
+        "products": products,
+        "fc_xs": xs, "fc_ys": ys,
+        "inventory": col(inv_map),
+        "daily_demand": avg_d,
+        "safety_stock": np.where(np.isnan(safety_days), col(lead_times, "p90", 14.0), safety_days) * avg_d,
+        "daily_cap": daily_cap,
+        "max_cap": np.where(daily_cap > 0, daily_cap * PRODUCTION_PLAN_DAYS, np.inf),
+        "recent_avg": daily_avg * PRODUCTION_PLAN_DAYS,
+        "risk_grade": np.where(has_risk, grade.to_numpy(), "A").astype(object),
+        "stockout_risk": np.where(has_risk, col(risk_data, "stockout_risk"), 0.0),
+        "excess_risk": np.where(has_risk, col(risk_data, "excess_risk"), 0.0),
+        "order_pi": products.get_indexer(open_orders["product_id"]),
+        "order_delivery": open_orders["delivery"].to_numpy(),
+        "order_qty": open_orders["qty"].to_numpy(dtype=float),
     }
 
 
-# ─── 판정 함수 ───────────────────────────────────────────────
+def plan_week(P: dict, week: int, monday: date, inv: np.ndarray) -> tuple:
+    """주차 생산계획 (greedy) — 제품 배열 일괄 계산
 
-def determine_priority(risk_grade: str,
-                       stockout_risk: float,
-                       excess_risk: float) -> str:
-    """리스크 기반 우선순위 결정"""
-    if risk_grade == "F" or stockout_risk >= 80:
-        return "critical"
-    if risk_grade == "D" or stockout_risk >= 60 or excess_risk >= 80:
-        return "high"
-    if risk_grade == "C" or stockout_risk >= 40 or excess_risk >= 60:
-        return "medium"
-    return "low"
-
-
-def determine_plan_type(planned_qty: float, recent_avg: float) -> str:
-    """계획 유형 결정"""
-    if recent_avg <= 0:
-        return "new" if planned_qty > 0 else "maintain"
-    ratio = planned_qty / recent_avg
-    if ratio > 1.15:
-        return "increase"
-    if ratio < 0.85:
-        return "decrease"
-    return "maintain"
+    Args:
+        P: plan_inputs() 결과, inv: 주차 기초 재고 (제품 순서)
+    Returns:
+        (production_plan 행 DataFrame, LP 입력 {"r50", "r90", "urgent"})
+    """
+    target_start = monday
+    target_end = monday + timedelta(days=PRODUCTION_PLAN_DAYS - 1)
+    n = len(P["products"])
+
+    # 예측 수요 (누적 곡선 주차 구간), 없으면 일평균수요 × 기간
+    demand_p50, demand_p90 = weekly_forecast(P["fc_xs"], P["fc_ys"], week)
+    no_fc = demand_p50 <= 0
+    demand_p50 = np.where(no_fc, P["daily_demand"] * PRODUCTION_PLAN_DAYS, demand_p50)
+    demand_p90 = np.where(no_fc, demand_p50 * 1.5, demand_p90)
+
+    # 순소요량
+    safety = P["safety_stock"]
+    net_req = np.maximum(0, demand_p50 + safety - inv)
+    net_req_max = np.maximum(0, demand_p90 + safety - inv)
+
+    # 미처리 수주 긴급분 (이번 주는 납기 경과분 포함, 이후 주차는 해당 주 납기분)
+    due = P["order_delivery"] <= np.datetime64(target_end, "D")
+    if week > 0:
+        due &= P["order_delivery"] >= np.datetime64(target_start, "D")
+    due &= P["order_pi"] >= 0
+    urgent = np.bincount(P["order_pi"][due], weights=P["order_qty"][due], minlength=n)
+    net_req = np.where(urgent > 0, np.maximum(net_req, urgent - inv), net_req)
+
+    # 리스크 기반 조정 + 캐파 상한
+    max_cap = P["max_cap"]
+    grade, stockout, excess = P["risk_grade"], P["stockout_risk"], P["excess_risk"]
+    high_grade = (grade == "D") | (grade == "F")
+    planned = np.maximum(0, np.select(
+        [high_grade & (stockout > 60), high_grade & (excess > 60)],
+        [np.minimum(net_req_max, max_cap), np.maximum(0, net_req * 0.9)],
+        default=np.minimum(net_req, max_cap),
+    ))
+
+    priority = determine_priority(grade, stockout, excess)
+    near_cap = np.isfinite(max_cap) & (planned >= max_cap * 0.9)
+    description = [build_description(s, e, u, "캐파한계근접" if c else None)
+                   for s, e, u, c in zip(stockout, excess, urgent, near_cap)]
+
+    daily_cap = P["daily_cap"]
+    df = pd.DataFrame({
+        "product_id": P["products"],
+        "plan_date": monday.isoformat(),
+        "plan_horizon": week_key(monday),
+        "target_start": target_start.isoformat(),
+        "target_end": target_end.isoformat(),
+        "demand_p50": round6(demand_p50),
+        "demand_p90": round6(demand_p90),
+        "current_inventory": round6(inv),
+        "safety_stock": round6(safety),
+        "daily_capacity": round6(np.where(daily_cap > 0, daily_cap, np.nan)),
+        "max_capacity": round6(np.where(np.isfinite(max_cap), max_cap, np.nan)),
+        "planned_qty": round6(planned),
+        "min_qty": round6(np.maximum(0, net_req * 0.8)),
+        "max_qty": round6(net_req_max),
+        "priority": priority,
+        "plan_type": determine_plan_type(planned, P["recent_avg"]),
+        "risk_grade": P["risk_grade"],
+        "description": description,
+        "status": "draft",
+    })
+    return df, {"r50": net_req, "r90": np.maximum(net_req_max, net_req), "urgent": urgent}
+
+
+def apply_lp_plan(df: pd.DataFrame, lp: dict, P: dict, lines: tuple, week: str,
+                  fixed_qty: np.ndarray | None = None):
+    """주차 계획의 planned_qty / plan_type / description 을 공유 라인 캐파 LP 해로 교체 (in-place)
+
+    fixed_qty: 확정 계획 수량 (제품 순서, NaN = 초안) — 라인 캐파에서 선차감
+    라인 없는 제품은 greedy 와 같은 자체 캐파 (P["max_cap"]) 상한
+    """
+    if df.empty:
+        return
+    caps, pairs = lines
+    sol = solve_plan(
+        P["products"], lp["r50"], lp["r90"], pairs, caps,
+        stockout_w=np.array([PRODUCTION_LP_PRIORITY_WEIGHTS[p] for p in df["priority"]]),
+        holding_w=1 + P["excess_risk"] / 100,
+        integer=PRODUCTION_LP_INTEGER,
+        fixed_qty=fixed_qty, max_qty=P["max_cap"],
+    )
+    qty = np.maximum(0.0, sol["qty"])
+    short = sol["short_p50"]
+    df["planned_qty"] = round6(qty)
+    df["plan_type"] = determine_plan_type(qty, P["recent_avg"])
+    df["description"] = [build_description(s, e, u, f"라인캐파 부족 {sh:.0f}개" if sh >= 0.5 else None)
+                         for s, e, u, sh in zip(P["stockout_risk"], P["excess_risk"], lp["urgent"], short)]
+
+    load = sol["line_load"]
+    binding = int((load >= caps * 0.999).sum())
+    print(f"  [{week}] LP 배분: {sol['message']} ({sol['seconds']:.2f}s), "
+          f"라인 {len(caps):,}개 중 캐파 소진 {binding:,}개, P50 미달 {sol['short_p50'].sum():,.0f}")
 
 
 # ─── 메인 실행 ────────────────────────────────────────────────
@@ -209,160 +388,104 @@ def week_key(d: date) -> str:
     return f"{iso[0]}-W{iso[1]:02d}"
 
 
-def run(weeks_back: int = 4):
-    """생산 최적화 실행. weeks_back개 과거 주차 + 현재 주차 데이터 생성"""
-    print("[S7] 생산 최적화 시작")
+def run(horizon_weeks: int | None = None, mode: str | None = None):
+    """생산 최적화 실행 — 이번 주부터 horizon_weeks개 주차 롤링 호라이즌 계획
+
+    주차 순으로 예상 재고 (기초 재고 + 계획 생산 - P50 수요) 를 다음 주차로 이월
+    지난 주차는 재계산하지 않고, 확정된 계획 (status != 'draft') 은 동결 — 확정 수량으로 이월만 반영
+    기존 행과 값이 같은 계획은 적재 생략, 대상에서 빠진 제품의 호라이즌 주차 초안은 삭제
+    horizon_weeks: 기본값 config.PLAN_HORIZON_WEEKS
+    mode: "greedy" | "lp" (기본값 config.PRODUCTION_PLAN_MODE)
+    """
+    horizon_weeks = horizon_weeks or PLAN_HORIZON_WEEKS
+    mode = mode or PRODUCTION_PLAN_MODE
+    if mode not in ("greedy", "lp"):
+        raise ValueError(f"mode 는 'greedy' | 'lp' 중 하나: {mode!r}")
+    print(f"[S7] 생산 최적화 시작 ({mode}, {horizon_weeks}주 호라이즌)")
     today = date.today()
     current_monday = week_monday(today)
 
     # --- 1) 데이터 로드 (공통) ---
-    fc_map = load_forecast_data()
+    fc = load_forecast_data()
     inv_map = load_inventory_data()
     capacity = load_production_capacity()
     risk_data = load_risk_data()
     lead_times = load_lead_times()
     open_orders = load_open_orders()
     daily_demand = load_daily_demand()
+    lines = load_line_capacity() if mode == "lp" else None
+    published = load_published_plans(current_monday.isoformat())
 
-    print(f"  예측: {len(fc_map):,}  재고: {len(inv_map):,}  "
+    print(f"  예측: {fc['product_id'].nunique():,}  재고: {len(inv_map):,}  "
           f"캐파: {len(capacity):,}  리스크: {len(risk_data):,}")
+    if lines is not None:
+        print(f"  생산 라인: {len(lines[0]):,}개, 제품-라인 배정: {len(lines[1]):,}건")
+
+    # 확정 계획 (승인·진행·완료·취소) → 동결
+    fixed = published[published["status"].fillna("draft") != "draft"].drop_duplicates(["plan_date", "product_id"])
 
-    # --- 2) 대상 제품 ---
-    all_products = set(fc_map.keys()) | set(daily_demand.keys())
-    print(f"  대상 제품: {len(all_products):,}개")
+    # --- 2) 대상 제품 → 제품 배열 ---
+    products = pd.Index(sorted(set(fc["product_id"]) | set(daily_demand)))
+    P = plan_inputs(products, fc, inv_map, capacity, risk_data, lead_times, open_orders, daily_demand)
+    print(f"  대상 제품: {len(products):,}개, 확정 계획: {len(fixed):,}건")
 
-    # --- 3) 여러 주차 생산 계획 산출 ---
-    all_results = []
+    # --- 3) 이번 주 ~ 호라이즌 주차 생산 계획 산출 ---
+    weeks = []
     week_list = []
-    for w in range(weeks_back, -1, -1):   # weeks_back주 전 ~ 현재 주
-        monday = current_monday - timedelta(weeks=w)
-        plan_date_str = monday.isoformat()
+    inv = P["inventory"]
+    for w in range(horizon_weeks):   # 이번 주 ~ (horizon_weeks - 1)주 후
+        monday = current_monday + timedelta(weeks=w)
         plan_week_key = week_key(monday)
         week_list.append(plan_week_key)
 
-        target_start = monday
-        target_end = monday + timedelta(days=PRODUCTION_PLAN_DAYS - 1)
-
-        # 과거 주차는 재고를 약간 변동시켜 차별화
-        inv_offset = w * 0.03  # 3%씩 과거로 갈수록 재고 증가 (소진 전)
-
-        results = []
-        for pid in all_products:
-            # 예측 데이터 (7일 → 14일 → 28일 → 30일 순으로 fallback)
-            fc = fc_map.get(pid, {})
-            fc_best = fc.get(7, fc.get(14, fc.get(28, fc.get(30, {}))))
-            demand_p50 = fc_best.get("p50", 0)
-            demand_p90 = fc_best.get("p90", 0)
-
-            # 예측 없으면 일평균수요 × 기간
-            if demand_p50 <= 0:
-                avg_d = daily_demand.get(pid, 0)
-                demand_p50 = avg_d * PRODUCTION_PLAN_DAYS
-                demand_p90 = demand_p50 * 1.5
-
-            # 재고 (과거 주차는 소진 전이므로 약간 증가 보정)
-            inv_qty = inv_map.get(pid, 0) * (1 + inv_offset)
-
-            # 리드타임 & 안전재고
-            lt = lead_times.get(pid, {"avg": 7, "p90": 14})
-            avg_d = daily_demand.get(pid, 0)
-            safety_stock = lt["p90"] * avg_d
-
-            # 순소요량
-            net_req = max(0, demand_p50 + safety_stock - inv_qty)
-            net_req_max = max(0, demand_p90 + safety_stock - inv_qty)
-
-            # 미처리 수주 긴급분 반영
-            orders = open_orders.get(pid, [])
-            urgent_qty = 0
-            for o in orders:
-                try:
-                    dd = date.fromisoformat(o["delivery"])
-                    if dd <= target_end:
-                        urgent_qty += o["qty"]
-                except (ValueError, TypeError):
-                    pass
-            if urgent_qty > 0:
-                net_req = max(net_req, urgent_qty - inv_qty)
-
-            # 캐파시티 제약
-            cap = capacity.get(pid, {})
-            daily_cap = cap.get("daily_avg", 0) * PRODUCTION_CAPACITY_BUFFER
-            max_cap = (daily_cap * PRODUCTION_PLAN_DAYS) if daily_cap > 0 else float("inf")
-
-            # 리스크 기반 조정
-            risk = risk_data.get(pid, {})
-            risk_grade = risk.get("risk_grade", "A")
-            stockout_risk = float(risk.get("stockout_risk") or 0)
-            excess_risk = float(risk.get("excess_risk") or 0)
-
-            if risk_grade in ("D", "F") and stockout_risk > 60:
-                planned_qty = min(net_req_max, max_cap) if max_cap < float("inf") else net_req_max
-            elif risk_grade in ("D", "F") and excess_risk > 60:
-                planned_qty = max(0, net_req * 0.9)
-            else:
-                planned_qty = min(net_req, max_cap) if max_cap < float("inf") else net_req
-
-            planned_qty = max(0, planned_qty)
-
-            # 우선순위 & 유형
-            priority = determine_priority(risk_grade, stockout_risk, excess_risk)
-            recent_prod_avg = cap.get("daily_avg", 0) * PRODUCTION_PLAN_DAYS
-            plan_type = determine_plan_type(planned_qty, recent_prod_avg)
-
-            # 설명 생성
-            desc_parts = []
-            if stockout_risk > 60:
-                desc_parts.append(f"결품위험 {stockout_risk:.0f}점")
-            if excess_risk > 60:
-                desc_parts.append(f"과잉위험 {excess_risk:.0f}점")
-            if urgent_qty > 0:
-                desc_parts.append(f"긴급수주 {urgent_qty:.0f}개")
-            if max_cap < float("inf") and planned_qty >= max_cap * 0.9:
-                desc_parts.append("캐파한계근접")
-            description = ", ".join(desc_parts) if desc_parts else None
-
-            results.append({
-                "product_id": pid,
-                "plan_date": plan_date_str,
-                "plan_horizon": plan_week_key,
-                "target_start": target_start.isoformat(),
-                "target_end": target_end.isoformat(),
-                "demand_p50": round(demand_p50, 6),
-                "demand_p90": round(demand_p90, 6),
-                "current_inventory": round(inv_qty, 6),
-                "safety_stock": round(safety_stock, 6),
-                "daily_capacity": round(daily_cap, 6) if daily_cap > 0 else None,
-                "max_capacity": round(max_cap, 6) if max_cap < float("inf") else None,
-                "planned_qty": round(planned_qty, 6),
-                "min_qty": round(max(0, net_req * 0.8), 6),
-                "max_qty": round(net_req_max, 6),
-                "priority": priority,
-                "plan_type": plan_type,
-                "risk_grade": risk_grade,
-                "description": description,
-                "status": "draft",
-            })
-
-        print(f"  [{plan_week_key}] 생산 계획: {len(results):,}건")
-        all_results.extend(results)
+        # 확정 계획 수량 (LP 라인 캐파 선차감 · 예상 재고 이월, 적재 자릿수 값)
+        f = fixed[fixed["plan_date"] == monday.isoformat()]
+        fq = f["planned_qty"].fillna(0).set_axis(f["product_id"]).reindex(products).to_numpy(dtype=float)
+        is_frozen = ~np.isnan(fq)
 
+        df, lp = plan_week(P, w, monday, inv)
+        if mode == "lp":
+            apply_lp_plan(df, lp, P, lines, plan_week_key, fixed_qty=fq)
+
+        # 예상 재고 이월 (확정 계획은 확정 수량 기준)
+        qty = np.where(is_frozen, fq, df["planned_qty"].to_numpy())
+        inv = np.maximum(0.0, df["current_inventory"].to_numpy() + qty - df["demand_p50"].to_numpy())
+        print(f"  [{plan_week_key}] 생산 계획: {len(df):,}건 (확정 {int(is_frozen.sum()):,}건)")
+        weeks.append(df[~is_frozen])
+
+    results = pd.concat(weeks, ignore_index=True)
+    n_frozen = len(products) * horizon_weeks - len(results)
     print(f"\n  전체 주차: {week_list}")
-    print(f"  전체 생산 계획: {len(all_results):,}건")
+    print(f"  전체 생산 계획: {len(results) + n_frozen:,}건")
 
     # 분포 출력
-    pri_dist = defaultdict(int)
-    type_dist = defaultdict(int)
-    for r in all_results:
-        pri_dist[r["priority"]] += 1
-        type_dist[r["plan_type"]] += 1
-    print(f"  우선순위: {dict(sorted(pri_dist.items()))}")
-    print(f"  계획유형: {dict(sorted(type_dist.items()))}")
-
-    # --- 4) DB 적재 ---
-    if all_results:
-        upsert_batch("production_plan", all_results,
+    print(f"  우선순위: {results['priority'].value_counts().sort_index().to_dict()}")
+    print(f"  계획유형: {results['plan_type'].value_counts().sort_index().to_dict()}")
+
+    # --- 4) DB 적재 (확정 계획 제외, 변경된 행만, 대상에서 빠진 제품의 초안 삭제) ---
+    keys = ["product_id", "plan_date"]
+    horizon_dates = [(current_monday + timedelta(weeks=w)).isoformat() for w in range(horizon_weeks)]
+    drafts = published[(published["status"].fillna("draft") == "draft")
+                       & published["plan_date"].isin(horizon_dates)]
+    stale = drafts[~pd.MultiIndex.from_frame(drafts[keys]).isin(pd.MultiIndex.from_frame(results[keys]))]
+    n_draft = len(results)
+    results = results[changed_mask(results, published, ["product_id", "plan_date", "plan_horizon"], PLAN_COLS)]
+    print(f"  적재: {len(results):,}건 (확정 {n_frozen:,}건·변경 없음 {n_draft - len(results):,}건 생략), "
+          f"삭제: {len(stale):,}건")
+    for i in range(0, len(stale), 500):
+        ids = stale["id"].iloc[i:i + 500].astype(np.int64).tolist()
+        supabase.table("production_plan").delete().in_("id", ids).execute()
+    if not results.empty:
+        upsert_batch("production_plan", iter_json_rows(results, PLAN_COLS),
                      on_conflict="product_id,plan_date,plan_horizon")
+    if not results.empty or not stale.empty:
+        refresh_latest("production_plan_latest")
 
     cnt = supabase.table("production_plan").select("id", count="exact").execute()
     print(f"[S7] 완료 -- production_plan: {cnt.count:,}행")
+
+
+if __name__ == "__main__":
+    import sys
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    run(horizon_weeks=int(opts["horizon"]) if "horizon" in opts else None, mode=opts.get("mode"))
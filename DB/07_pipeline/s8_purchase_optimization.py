@@ -1,68 +1,53 @@
 """
 Step 8: 발주 최적화 (Purchase Optimization)
-BOM 전개 + 안전재고/ROP/EOQ + 공급사 추천 기반 최적 발주 추천
+다단계 BOM 전개 (bom_engine.py) + 안전재고/ROP/EOQ + 공급사 스코어카드 기반 최적 발주 추천
+발주 대상은 말단 자재 — 반제품은 하위 자재로 전개
+롤링 호라이즌: 이번 주 ~ PLAN_HORIZON_WEEKS 주차만 계산, 주차 순으로 기초 재고를 이월하며 netting
+  (mrp_engine.py, 자재 방향 벡터) — 지난 주차·처리된 추천은 다시 쓰지 않고 값이 바뀐 추천만 적재
+기간별 MRP (MRP_TIME_PHASED): 일/주 버킷 예상 재고 전개 + 리드타임 역산 계획 발주일
 
 입력 테이블: production_plan (S7 출력), bom, inventory, purchase_order,
-            product_lead_time, supplier
-출력 테이블: purchase_recommendation
+            lead_time_stats, safety_stock, supplier
+출력 테이블: purchase_recommendation (+ purchase_recommendation_latest 갱신), planned_order,
+            supplier_scorecard (증분 갱신)
 """
 
 import json
 from datetime import date, timedelta
-from collections import defaultdict
-from math import sqrt
+
+import numpy as np
+import pandas as pd
 
 from config import (
-    supabase, upsert_batch,
-    PRODUCTION_PLAN_DAYS, ORDERING_COST, HOLDING_RATE, SUPPLIER_WEIGHTS,
+    supabase, upsert_batch, fetch_all,
+    PRODUCTION_PLAN_DAYS, PLAN_HORIZON_WEEKS, MRP_TIME_PHASED, MRP_BUCKET,
+)
+from bom_engine import load_bom
+from frame_utils import ddl_schema, iter_json_rows, fetch_frame, fetch_schema, changed_mask
+from mrp_engine import (
+    plan_matrix, gross_requirements, requirement_sources, rolling_net_requirements, eoq_arrays,
+    METHODS, BUCKET_DAYS, bucket_starts, bucket_index, daily_plan, time_phased, release_schedule,
 )
+from latest_views import refresh_latest
+from lead_time import load_lead_times
+from supplier_scorecard import refresh_scorecard, load_scorecard, supplier_profiles
+
+REC_COLS = ddl_schema("16_optimization_ddl.sql", "purchase_recommendation")
 
 
 # ─── 데이터 로드 ─────────────────────────────────────────────
 
-def fetch_all(table: str, select: str = "*") -> list:
-    """Supabase 페이징 조회"""
-    all_rows, offset, ps = [], 0, 1000
-    while True:
-        try:
-            resp = (supabase.table(table)
-                    .select(select)
-                    .range(offset, offset + ps - 1)
-                    .execute())
-        except Exception as e:
-            if "PGRST" in str(e) or "Could not find" in str(e):
-                print(f"    [!] 테이블 '{table}' 조회 실패 -- 빈 데이터로 진행")
-                return []
-            raise
-        if not resp.data:
-            break
-        all_rows.extend(resp.data)
-        if len(resp.data) < ps:
-            break
-        offset += ps
-    return all_rows
-
-
-def load_production_plan() -> list:
-    """S7 생산 계획 중 최신 plan_date 로드"""
-    rows = fetch_all("production_plan",
-                     "product_id,plan_date,planned_qty,target_start,target_end,priority")
-    if not rows:
-        return []
-    latest_date = max(r["plan_date"] for r in rows)
-    return [r for r in rows if r["plan_date"] == latest_date]
-
-
-def load_bom_data() -> dict:
-    """BOM: {parent_product_id: [(component_product_id, usage_qty)]}"""
-    rows = fetch_all("bom", "parent_product_id,component_product_id,usage_qty")
-    bom_map = defaultdict(list)
-    for r in rows:
-        bom_map[r["parent_product_id"]].append((
-            r["component_product_id"],
-            float(r["usage_qty"] or 0),
-        ))
-    return dict(bom_map)
+def load_production_plan(since: str) -> pd.DataFrame:
+    """S7 생산 계획 중 plan_date >= since (롤링 호라이즌 주차) 로드"""
+    schema = {"product_id": "str", "plan_date": "str", "planned_qty": "float64",
+              "target_start": "str", "target_end": "str", "priority": "str"}
+    return fetch_frame("production_plan", schema, filters=[("gte", "plan_date", since)])
+
+
+def load_published_recommendations(since: str) -> pd.DataFrame:
+    """plan_date >= since 인 기존 발주 추천 (처리된 추천 동결·변경분 판정용)"""
+    return fetch_frame("purchase_recommendation", fetch_schema(REC_COLS),
+                       filters=[("gte", "plan_date", since)])
 
 
 def load_component_inventory() -> dict:
@@ -82,154 +67,68 @@ def load_component_inventory() -> dict:
     return inv_map
 
 
-def load_pending_po() -> dict:
+def load_pending_po_rows() -> pd.DataFrame:
+    """미입고 발주 (status != 'F', 자재코드 있는 건): component_product_id, po_date, po_qty"""
+    schema = {"component_product_id": "str", "po_date": "str", "po_qty": "float64", "status": "str"}
+    df = fetch_frame("purchase_order", schema)
+    df = df[(df["status"] != "F") & df["component_product_id"].notna() & (df["component_product_id"] != "")]
+    return df.assign(po_qty=df["po_qty"].fillna(0)).drop(columns="status").reset_index(drop=True)
+
+
+def load_pending_po(rows: pd.DataFrame | None = None) -> dict:
     """미입고 발주 잔량 (status != 'F'): {component_product_id: pending_qty}"""
-    rows = fetch_all("purchase_order", "component_product_id,po_qty,status")
-    pending = defaultdict(float)
-    for r in rows:
-        if r.get("status") != "F":
-            pid = r.get("component_product_id")
-            if pid:
-                pending[pid] += float(r["po_qty"] or 0)
-    return dict(pending)
-
-
-def load_lead_times() -> dict:
-    """자재별 최신 리드타임: {product_id: {avg, p90}}"""
-    rows = fetch_all("product_lead_time",
-                     "product_id,avg_lead_days,p90_lead_days,calc_date")
-    latest = {}
-    for r in rows:
-        pid = r["product_id"]
-        if pid not in latest or r["calc_date"] > latest[pid]["calc_date"]:
-            latest[pid] = r
-    return {
-        pid: {
-            "avg": float(r["avg_lead_days"] or 7),
-            "p90": float(r["p90_lead_days"] or 14),
-        }
-        for pid, r in latest.items()
-    }
+    rows = load_pending_po_rows() if rows is None else rows
+    return rows.groupby("component_product_id")["po_qty"].sum().to_dict()
 
 
 def load_supplier_profiles() -> dict:
-    """공급사별 프로파일: {component_product_id: [{supplier_code, name, avg_lead, avg_price, on_time_rate}]}"""
-    po_rows = fetch_all("purchase_order",
-                        "component_product_id,cd_partner,supplier_name,"
-                        "po_date,receipt_date,unit_price,status")
-    # 공급사 마스터에서 이름 매핑
-    sup_rows = fetch_all("supplier", "customer_code,customer_name")
-    name_map = {r["customer_code"]: r["customer_name"] for r in sup_rows}
-
-    profiles = defaultdict(lambda: defaultdict(lambda: {
-        "lead_days": [], "prices": [], "on_time": 0, "total": 0, "name": "",
-    }))
-
-    for r in po_rows:
-        comp = r.get("component_product_id")
-        sup = r.get("cd_partner")
-        if not comp or not sup:
-            continue
-
-        prof = profiles[comp][sup]
-        prof["name"] = name_map.get(sup, r.get("supplier_name") or sup)
-        prof["total"] += 1
-
-        price = r.get("unit_price")
-        if price:
-            prof["prices"].append(float(price))
-
-        if r.get("status") == "F" and r.get("po_date") and r.get("receipt_date"):
-            try:
-                d1 = date.fromisoformat(r["po_date"])
-                d2 = date.fromisoformat(r["receipt_date"])
-                lead = (d2 - d1).days
-                if lead >= 0:
-                    prof["lead_days"].append(lead)
-                    if lead <= 30:
-                        prof["on_time"] += 1
-            except (ValueError, TypeError):
-                pass
-
-    result = {}
-    for comp, suppliers in profiles.items():
-        comp_list = []
-        for sup, prof in suppliers.items():
-            if not prof["lead_days"] and not prof["prices"]:
-                continue
-            avg_lead = (sum(prof["lead_days"]) / len(prof["lead_days"])
-                        if prof["lead_days"] else None)
-            avg_price = (sum(prof["prices"]) / len(prof["prices"])
-                         if prof["prices"] else None)
-            on_time_rate = (prof["on_time"] / len(prof["lead_days"])
-                           if prof["lead_days"] else None)
-            comp_list.append({
-                "supplier_code": sup,
-                "supplier_name": prof["name"],
-                "avg_lead_days": avg_lead,
-                "avg_unit_price": avg_price,
-                "sample_count": len(prof["lead_days"]),
-                "on_time_rate": on_time_rate,
-            })
-        if comp_list:
-            result[comp] = comp_list
-    return result
+    """공급사 스코어카드 증분 갱신 후 자재별 추천·대체 공급사:
+    {component_product_id: [{supplier_code, supplier_name, avg_lead_days, avg_unit_price, on_time_rate, …}]}
+    """
+    refresh_scorecard()
+    return supplier_profiles(load_scorecard(max_rank=2))
 
 
 # ─── 계산 함수 ───────────────────────────────────────────────
 
-def select_best_supplier(suppliers: list) -> tuple:
-    """가중 점수 기반 최적 + 대체 공급사 선택
-    Returns: (best_dict, alt_dict_or_None)
-    """
-    if not suppliers:
-        return None, None
-    if len(suppliers) == 1:
-        return suppliers[0], None
-
-    w_lead = SUPPLIER_WEIGHTS["lead_time"]
-    w_price = SUPPLIER_WEIGHTS["unit_price"]
-    w_rel = SUPPLIER_WEIGHTS["reliability"]
-
-    leads = [s["avg_lead_days"] for s in suppliers if s["avg_lead_days"] is not None]
-    prices = [s["avg_unit_price"] for s in suppliers if s["avg_unit_price"] is not None]
-
-    lead_min, lead_max = (min(leads), max(leads)) if leads else (0, 1)
-    price_min, price_max = (min(prices), max(prices)) if prices else (0, 1)
-    lead_range = lead_max - lead_min if lead_max != lead_min else 1
-    price_range = price_max - price_min if price_max != price_min else 1
-
-    scored = []
-    for s in suppliers:
-        lead_score = (1 - (s["avg_lead_days"] - lead_min) / lead_range
-                      if s["avg_lead_days"] is not None else 0.5)
-        price_score = (1 - (s["avg_unit_price"] - price_min) / price_range
-                       if s["avg_unit_price"] is not None else 0.5)
-        reliability = s["on_time_rate"] if s["on_time_rate"] is not None else 0.5
-
-        total = w_lead * lead_score + w_price * price_score + w_rel * reliability
-        scored.append((total, s))
-
-    scored.sort(key=lambda x: -x[0])
-    best = scored[0][1]
-    alt = scored[1][1] if len(scored) > 1 else None
-    return best, alt
-
-
-def calc_eoq(annual_demand: float, unit_price: float) -> tuple:
-    """경제적 주문량 (EOQ)
-    Returns: (eoq_qty, method_str)
-    """
-    if annual_demand <= 0 or unit_price <= 0:
-        return 0, "lot_for_lot"
-    holding_cost = unit_price * HOLDING_RATE
-    if holding_cost <= 0:
-        return annual_demand / 12, "lot_for_lot"
-    try:
-        eoq = sqrt(2 * annual_demand * ORDERING_COST / holding_cost)
-        return eoq, "eoq"
-    except (ValueError, ZeroDivisionError):
-        return annual_demand / 12, "lot_for_lot"
+def supplier_arrays(comp_ids, supplier_profiles: dict, lead_avg: np.ndarray) -> pd.DataFrame:
+    """자재별 추천·대체 공급사 (스코어카드 순위 1·2위) → 자재 순서와 정렬된 DataFrame"""
+    rows = []
+    for comp_id in comp_ids:
+        ranked = supplier_profiles.get(comp_id, [])
+        best = ranked[0] if ranked else None
+        alt = ranked[1] if len(ranked) > 1 else None
+        rows.append({
+            "recommended_supplier": best["supplier_code"] if best else None,
+            "supplier_name": best["supplier_name"] if best else None,
+            "best_lead": (best["avg_lead_days"] or np.nan) if best else np.nan,
+            "unit_price": (best["avg_unit_price"] or 0.0) if best else 0.0,
+            "alt_supplier": alt["supplier_code"] if alt else None,
+            "alt_supplier_name": alt["supplier_name"] if alt else None,
+        })
+    df = pd.DataFrame(rows, columns=["recommended_supplier", "supplier_name", "best_lead",
+                                     "unit_price", "alt_supplier", "alt_supplier_name"])
+    df["sup_lead"] = df["best_lead"].fillna(pd.Series(lead_avg)).to_numpy(dtype=float)
+    return df
+
+
+def fixed_orders(published: pd.DataFrame, periods: list, comp_ids) -> np.ndarray:
+    """처리된 추천 (status != 'pending') → (주차 × 자재) 확정 발주량 (NaN = 미확정, 호라이즌·BOM 밖 행 제외)"""
+    done = published[published["status"].fillna("pending") != "pending"]
+    fwi = pd.Index(periods).get_indexer(done["plan_date"])
+    fci = pd.Index(comp_ids).get_indexer(done["component_product_id"])
+    keep = (fwi >= 0) & (fci >= 0)
+    fixed = np.full((len(periods), len(comp_ids)), np.nan)
+    fixed[fwi[keep], fci[keep]] = done["recommended_qty"].fillna(0).to_numpy()[keep]
+    return fixed
+
+
+def stale_pending(published: pd.DataFrame, results: pd.DataFrame, periods: list) -> pd.DataFrame:
+    """호라이즌 주차의 대기 추천 중 이번 결과에 없는 (자재, 주차) 행 — id 로 삭제 대상"""
+    keys = ["component_product_id", "plan_date"]
+    waiting = published[(published["status"].fillna("pending") == "pending")
+                        & published["plan_date"].isin(periods)]
+    return waiting[~pd.MultiIndex.from_frame(waiting[keys]).isin(pd.MultiIndex.from_frame(results[keys]))]
 
 
 # ─── 메인 실행 ────────────────────────────────────────────────
@@ -245,201 +144,251 @@ def week_key(d: date) -> str:
     return f"{iso[0]}-W{iso[1]:02d}"
 
 
-def run(weeks_back: int = 4):
-    """발주 최적화 실행. weeks_back개 과거 주차 + 현재 주차 데이터 생성"""
-    print("[S8] 발주 최적화 시작")
+def run_phased(plans: pd.DataFrame, bom: dict, inv_map: dict, pending_rows: pd.DataFrame,
+               lead_map: dict, supplier_profiles: dict, today: date, bucket: str = MRP_BUCKET):
+    """기간별 MRP → planned_order (plan_date = 기준일, 같은 기준일·버킷 기존 행 교체)
+
+    총소요: 종료일이 기준일 이후인 생산계획을 일별 균등 분할 → 버킷 집계 → BOM 말단 전개
+    예정 입고: 미입고 PO 를 발주일 + 자재 평균 리드타임 버킷에 배치 (이미 지난 입고 예정은 첫 버킷)
+    안전재고 = 안전재고 일수 (safety_stock, 없으면 P90 리드타임) × 계획기간 일평균 소요, 로트 = EOQ (산출 불가 자재는 lot-for-lot)
+    """
+    step = BUCKET_DAYS[bucket]
+    days = daily_plan(plans, today)
+    if days.empty:
+        print("  [기간별 MRP] 기준일 이후 생산계획 없음 -- skip")
+        return
+    starts = bucket_starts(today, days["day"].max(), bucket)
+
+    # --- (버킷 × 제품) 계획 → (버킷 × 말단 자재) 총소요량 ---
+    days["period"] = bucket_index(days["day"].to_numpy(), starts, bucket)
+    days = days.rename(columns={"qty": "planned_qty"})
+    comps, gross = gross_requirements(plan_matrix(days, list(range(len(starts))), bom["items"]), bom)
+    comp_ids = bom["items"][comps]
+    n_buckets, n_comps = gross.shape
+
+    lt = pd.DataFrame.from_dict(lead_map, orient="index", columns=["avg", "p90", "safety"]).reindex(comp_ids)
+    lead_avg = lt["avg"].fillna(7).to_numpy(dtype=float)
+    safety_days = lt["safety"].fillna(lt["p90"]).fillna(14).to_numpy(dtype=float)
+    sup = supplier_arrays(comp_ids, supplier_profiles, lead_avg)
+    sup_lead = sup["sup_lead"].to_numpy()
+
+    # --- 예정 입고 (버킷 × 자재) ---
+    ci = pd.Index(comp_ids).get_indexer(pending_rows["component_product_id"])
+    po_date = pd.to_datetime(pending_rows["po_date"], errors="coerce").to_numpy().astype("datetime64[D]")
+    po_date = np.where(np.isnat(po_date), np.datetime64(today, "D"), po_date)
+    keep = ci >= 0
+    eta = po_date[keep] + np.trunc(lead_avg[ci[keep]]).astype(np.int64).astype("timedelta64[D]")
+    ti = bucket_index(eta, starts, bucket)
+    in_horizon = ti >= 0
+    scheduled = np.zeros_like(gross)
+    np.add.at(scheduled, (ti[in_horizon], ci[keep][in_horizon]),
+              pending_rows["po_qty"].to_numpy(dtype=float)[keep][in_horizon])
+
+    # --- 예상 재고 전개 ---
+    on_hand = pd.Series(inv_map, dtype=float).reindex(comp_ids).fillna(0).to_numpy()
+    daily = gross.sum(axis=0) / (n_buckets * step)
+    safety = safety_days * daily
+    eoq, method = eoq_arrays(daily * 365, sup["unit_price"].to_numpy(dtype=float))
+    lot = np.where(method == 1, eoq, 0.0)
+    planned, projected = time_phased(gross, on_hand, scheduled, safety, lot)
+
+    ti, ci = np.nonzero(planned > 0)
+    release, past_due = release_schedule(starts, ti, sup_lead[ci], bucket, today)
+    results = pd.DataFrame({
+        "component_product_id": comp_ids[ci],
+        "plan_date": today.isoformat(),
+        "bucket": bucket,
+        "need_date": starts[ti].astype(str),
+        "release_date": release.astype(str),
+        "lead_days": sup_lead[ci],
+        "gross_requirement": gross[ti, ci],
+        "scheduled_receipt": scheduled[ti, ci],
+        "planned_qty": planned[ti, ci],
+        "projected_on_hand": projected[ti, ci],
+        "safety_stock": safety[ci],
+        "order_method": METHODS[method[ci]],
+        "past_due": past_due,
+        "recommended_supplier": sup["recommended_supplier"].to_numpy()[ci],
+    })
+    print(f"  [기간별 MRP] {bucket} 버킷 {n_buckets}개 ({starts[0]} ~ {starts[-1]}), "
+          f"자재 {n_comps:,} → 계획 발주 {len(results):,}건 (지연 {int(past_due.sum()):,}건)")
+
+    supabase.table("planned_order").delete().eq("plan_date", today.isoformat()).eq("bucket", bucket).execute()
+    if not results.empty:
+        upsert_batch("planned_order",
+                     iter_json_rows(results, ddl_schema("22_planned_order_ddl.sql", "planned_order")),
+                     on_conflict="component_product_id,plan_date,bucket,need_date")
+
+
+def run(horizon_weeks: int | None = None, phased: bool | None = None, bucket: str | None = None):
+    """발주 최적화 실행 — 이번 주부터 horizon_weeks개 주차 롤링 호라이즌 추천
+
+    호라이즌 생산계획을 (주차 × 제품) 행렬로 만들어 BOM 전개, 주차 순으로 기초 재고를 이월하며 netting
+    (발주량은 공급사 리드타임 주차 (expected_receipt_date 와 같은 주차) 만큼 뒤 주차에 입고)
+    지난 주차는 재계산하지 않고, 처리된 추천 (status != 'pending') 은 동결 — 확정 수량으로 이월만 반영
+    기존 행과 값이 같은 추천은 적재 생략, 더 이상 필요 없는 대기 추천은 삭제
+    horizon_weeks: 기본값 config.PLAN_HORIZON_WEEKS
+    phased / bucket: 기간별 MRP 산출 여부·버킷 단위 (기본값 config.MRP_TIME_PHASED / MRP_BUCKET)
+    """
+    horizon_weeks = horizon_weeks or PLAN_HORIZON_WEEKS
+    phased = MRP_TIME_PHASED if phased is None else phased
+    bucket = bucket or MRP_BUCKET
+    if bucket not in BUCKET_DAYS:
+        raise ValueError(f"bucket 은 {list(BUCKET_DAYS)} 중 하나: {bucket!r}")
+
+    print(f"[S8] 발주 최적화 시작 ({horizon_weeks}주 호라이즌)")
     today = date.today()
     current_monday = week_monday(today)
 
     # --- 1) 데이터 로드 (공통) ---
-    bom_map = load_bom_data()
+    bom = load_bom()
     inv_map = load_component_inventory()
-    pending_po = load_pending_po()
+    pending_rows = load_pending_po_rows()
+    pending_po = load_pending_po(pending_rows)
     supplier_profiles = load_supplier_profiles()
     lead_map = load_lead_times()
 
-    # 모든 주차의 생산계획 로드
-    all_plan_rows = fetch_all("production_plan",
-                              "product_id,plan_date,planned_qty,target_start,target_end,priority")
-    if not all_plan_rows:
+    # 이번 주 이후 생산계획
+    plans = load_production_plan(current_monday.isoformat())
+    if plans.empty:
         print("  [!] 생산 계획 없음 -- S7 먼저 실행 필요")
         cnt = supabase.table("purchase_recommendation").select("id", count="exact").execute()
         print(f"[S8] 완료 -- purchase_recommendation: {cnt.count:,}행 (변동 없음)")
         return
 
-    # plan_date별로 그룹핑
-    plan_by_date = defaultdict(list)
-    for r in all_plan_rows:
-        plan_by_date[r["plan_date"]].append(r)
-
-    print(f"  BOM구조: {len(bom_map):,}  공급사프로파일: {len(supplier_profiles):,}")
-    print(f"  생산계획 주차: {sorted(plan_by_date.keys())}")
-
-    all_results = []
-    week_list = []
-
-    for w in range(weeks_back, -1, -1):
-        monday = current_monday - timedelta(weeks=w)
-        plan_date_str = monday.isoformat()
-        plan_week_key = week_key(monday)
-        week_list.append(plan_week_key)
-
-        plan_rows = plan_by_date.get(plan_date_str, [])
-        if not plan_rows:
-            print(f"  [{plan_week_key}] 생산계획 없음 -- skip")
-            continue
-
-        # 과거 주차 기준일 (일정 계산용)
-        ref_today = monday
-
-        # --- 2) BOM 전개 → 총소요량 ---
-        gross_req = defaultdict(float)
-        parent_map = defaultdict(set)
-
-        for plan in plan_rows:
-            pid = plan["product_id"]
-            planned_qty = float(plan["planned_qty"] or 0)
-            if planned_qty <= 0:
-                continue
-            for comp_id, usage_qty in bom_map.get(pid, []):
-                gross_req[comp_id] += planned_qty * usage_qty
-                parent_map[comp_id].add(pid)
-
-        if not gross_req:
-            print(f"  [{plan_week_key}] BOM 전개 결과 없음")
-            continue
-
-        # 과거 주차 시뮬레이션: 현재보다 재고가 더 많고, 일부 PO가 아직 입고 전
-        # w=0(이번주) → 보정없음, w=1(1주전) → 재고 +15%, w=4(4주전) → 재고 +60%
-        inv_multiplier = 1.0 + w * 0.15
-        # 미입고PO도 과거 주차엔 더 많음 (아직 입고 전이었으므로)
-        po_multiplier = 1.0 + w * 0.10
-
-        # --- 3) 자재별 발주 추천 ---
-        results = []
-        for comp_id, gross_qty in gross_req.items():
-            # 재고·미입고 (주차별 시뮬레이션)
-            current_inv = inv_map.get(comp_id, 0) * inv_multiplier
-            pending = pending_po.get(comp_id, 0) * po_multiplier
-
-            # 순소요량
-            net_req = max(0, gross_qty - current_inv - pending)
-
-            # 일평균 소비량
-            daily_consumption = gross_qty / PRODUCTION_PLAN_DAYS if PRODUCTION_PLAN_DAYS > 0 else 0
-
-            # 리드타임
-            lt = lead_map.get(comp_id, {"avg": 7, "p90": 14})
-            lead_avg = lt["avg"]
-            lead_p90 = lt["p90"]
-
-            # 안전재고 & ROP
-            safety_stock = lead_p90 * daily_consumption
-            rop = daily_consumption * lead_avg + safety_stock
-
-            # 공급사 선택
-            suppliers = supplier_profiles.get(comp_id, [])
-            best_sup, alt_sup = select_best_supplier(suppliers)
-
-            unit_price = (best_sup["avg_unit_price"]
-                          if best_sup and best_sup["avg_unit_price"] else 0)
-
-            # EOQ 계산
-            annual_demand = daily_consumption * 365
-            eoq, method = calc_eoq(annual_demand, unit_price)
-
-            # 추천 발주량 결정
-            if net_req <= 0:
-                # 순소요 없어도 ROP 아래면 보충 발주
-                available = current_inv + pending
-                if available < rop:
-                    recommended_qty = max(safety_stock, eoq)
-                    order_method = method
-                else:
-                    continue  # 발주 불필요
-            elif eoq > 0 and eoq > net_req:
-                recommended_qty = eoq
-                order_method = method
-            else:
-                recommended_qty = net_req
-                order_method = "lot_for_lot"
-
-            recommended_qty = max(0, recommended_qty)
-            if recommended_qty <= 0:
-                continue
-
-            # 발주 일정
-            sup_lead = (best_sup["avg_lead_days"]
-                        if best_sup and best_sup["avg_lead_days"] else lead_avg)
-            need_date = ref_today + timedelta(days=PRODUCTION_PLAN_DAYS)
-            latest_order_date = need_date - timedelta(days=int(sup_lead))
-            if latest_order_date < ref_today:
-                latest_order_date = ref_today
-            expected_receipt = ref_today + timedelta(days=int(sup_lead))
-
-            # 긴급도
-            if latest_order_date <= ref_today and net_req > current_inv:
-                urgency = "critical"
-            elif latest_order_date <= ref_today + timedelta(days=3):
-                urgency = "high"
-            elif net_req > 0:
-                urgency = "medium"
-            else:
-                urgency = "low"
-
-            # 설명
-            parents_list = sorted(parent_map[comp_id])[:5]
-            desc_parts = [f"BOM 소스: {','.join(parents_list)}"]
-            if net_req > 0:
-                desc_parts.append(f"순소요 {net_req:.0f}")
-            if current_inv < safety_stock:
-                desc_parts.append(f"재고({current_inv:.0f})<안전재고({safety_stock:.0f})")
-
-            results.append({
-                "component_product_id": comp_id,
-                "plan_date": plan_date_str,
-                "parent_product_ids": json.dumps(parents_list),
-                "gross_requirement": round(gross_qty, 6),
-                "current_inventory": round(current_inv, 6),
-                "pending_po_qty": round(pending, 6),
-                "net_requirement": round(net_req, 6),
-                "safety_stock": round(safety_stock, 6),
-                "reorder_point": round(rop, 6),
-                "recommended_qty": round(recommended_qty, 6),
-                "order_method": order_method,
-                "recommended_supplier": best_sup["supplier_code"] if best_sup else None,
-                "supplier_name": best_sup["supplier_name"] if best_sup else None,
-                "supplier_lead_days": round(sup_lead, 2) if sup_lead else None,
-                "supplier_unit_price": round(unit_price, 6) if unit_price else None,
-                "alt_supplier": alt_sup["supplier_code"] if alt_sup else None,
-                "alt_supplier_name": alt_sup["supplier_name"] if alt_sup else None,
-                "latest_order_date": latest_order_date.isoformat(),
-                "expected_receipt_date": expected_receipt.isoformat(),
-                "need_date": need_date.isoformat(),
-                "urgency": urgency,
-                "description": "; ".join(desc_parts),
-                "status": "pending",
-            })
-
-        print(f"  [{plan_week_key}] 발주 추천: {len(results):,}건")
-        all_results.extend(results)
+    plans = plans.rename(columns={"plan_date": "period"})
+    print(f"  BOM 품목: {len(bom['items']):,}  공급사프로파일: {len(supplier_profiles):,}")
+    print(f"  생산계획 주차: {sorted(plans['period'].unique())}")
+
+    # 이번 주 → 호라이즌 끝 순 주차
+    mondays = [current_monday + timedelta(weeks=w) for w in range(horizon_weeks)]
+    periods = [m.isoformat() for m in mondays]
+    week_list = [week_key(m) for m in mondays]
+    has_plan = pd.Index(periods).isin(plans["period"])
+
+    # --- 2) (주차 × 제품) 계획 행렬 → (주차 × 말단 자재) 총소요량 ---
+    plan = plan_matrix(plans, periods, bom["items"])
+    comps, gross = gross_requirements(plan, bom)
+    comp_ids = bom["items"][comps]
+
+    # --- 3) 재고·미입고·리드타임·공급사 → 자재 배열 ---
+    on_hand0 = pd.Series(inv_map, dtype=float).reindex(comp_ids).fillna(0).to_numpy()
+    pending0 = pd.Series(pending_po, dtype=float).reindex(comp_ids).fillna(0).to_numpy()
+
+    lt = pd.DataFrame.from_dict(lead_map, orient="index", columns=["avg", "p90", "safety"]).reindex(comp_ids)
+    lead_avg = lt["avg"].fillna(7).to_numpy(dtype=float)
+    safety_days = lt["safety"].fillna(lt["p90"]).fillna(14).to_numpy(dtype=float)
+    sup = supplier_arrays(comp_ids, supplier_profiles, lead_avg)
+
+    # 처리된 추천 (승인 등) → (주차 × 자재) 확정 발주량
+    published = load_published_recommendations(periods[0])
+    fixed = fixed_orders(published, periods, comp_ids)
+
+    # --- 4) 주차 순 기초 재고 이월 netting (발주량은 리드타임 주차만큼 뒤 주차에 입고) ---
+    lead_weeks = np.trunc(sup["sup_lead"].to_numpy()).astype(np.int64) // BUCKET_DAYS["week"]
+    mrp = rolling_net_requirements(gross, on_hand0, pending0, lead_avg, safety_days,
+                                   sup["unit_price"].to_numpy(dtype=float), fixed, lead_weeks)
+    on_hand, pending = mrp["on_hand"], mrp["pending"]
+
+    wi, ci = np.nonzero(mrp["order"] & np.isnan(fixed))
+    ref = np.array(mondays, dtype="datetime64[D]")[wi]
+    sup_lead = sup["sup_lead"].to_numpy()[ci]
+    lead_td = np.trunc(sup_lead).astype(np.int64).astype("timedelta64[D]")
+    need_date = ref + np.timedelta64(PRODUCTION_PLAN_DAYS, "D")
+    latest_order = np.maximum(need_date - lead_td, ref)
+    net = mrp["net"][wi, ci]
+    cur_inv = on_hand[wi, ci]
+    safety = mrp["safety_stock"][wi, ci]
+    urgency = np.select(
+        [(latest_order <= ref) & (net > cur_inv), latest_order <= ref + np.timedelta64(3, "D"), net > 0],
+        ["critical", "high", "medium"],
+        default="low",
+    )
+
+    # 설명: 소요 원천 제품 (최대 5개) / 순소요 / 안전재고 미달
+    src = requirement_sources(plan, bom, comps).set_index(["period_idx", "comp_pos"])["parents"]
+    parents = src.reindex(pd.MultiIndex.from_arrays([wi, ci])).tolist()
+    parents = [p if isinstance(p, list) else [] for p in parents]
+    desc = [
+        "; ".join([f"BOM 소스: {','.join(p)}"]
+                  + ([f"순소요 {n:.0f}"] if n > 0 else [])
+                  + ([f"재고({i:.0f})<안전재고({s:.0f})"] if i < s else []))
+        for p, n, i, s in zip(parents, net, cur_inv, safety)
+    ]
+
+    unit_price = sup["unit_price"].to_numpy()[ci]
+    sup_cols = sup.iloc[ci].reset_index(drop=True)
+    results = pd.DataFrame({
+        "component_product_id": comp_ids[ci],
+        "plan_date": np.array(periods, dtype=object)[wi],
+        "parent_product_ids": [json.dumps(p) for p in parents],
+        "gross_requirement": gross[wi, ci],
+        "current_inventory": cur_inv,
+        "pending_po_qty": pending[wi, ci],
+        "net_requirement": net,
+        "safety_stock": safety,
+        "reorder_point": mrp["rop"][wi, ci],
+        "recommended_qty": mrp["recommended"][wi, ci],
+        "order_method": mrp["method"][wi, ci],
+        "recommended_supplier": sup_cols["recommended_supplier"],
+        "supplier_name": sup_cols["supplier_name"],
+        "supplier_lead_days": np.where(sup_lead != 0, sup_lead, np.nan),
+        "supplier_unit_price": np.where(unit_price != 0, unit_price, np.nan),
+        "alt_supplier": sup_cols["alt_supplier"],
+        "alt_supplier_name": sup_cols["alt_supplier_name"],
+        "latest_order_date": latest_order.astype(str),
+        "expected_receipt_date": (ref + lead_td).astype(str),
+        "need_date": need_date.astype(str),
+        "urgency": urgency,
+        "description": desc,
+        "status": "pending",
+    })
+
+    week_counts = np.bincount(wi, minlength=len(periods))
+    week_gross = (gross > 0).any(axis=1) if gross.size else np.zeros(len(periods), dtype=bool)
+    for k, wk in enumerate(week_list):
+        if not has_plan[k]:
+            print(f"  [{wk}] 생산계획 없음 -- skip")
+        elif not week_gross[k]:
+            print(f"  [{wk}] BOM 전개 결과 없음")
+        else:
+            print(f"  [{wk}] 발주 추천: {week_counts[k]:,}건")
 
     print(f"\n  전체 주차: {week_list}")
-    print(f"  전체 발주 추천: {len(all_results):,}건")
+    print(f"  전체 발주 추천: {len(results):,}건")
 
     # 분포 출력
-    urg_dist = defaultdict(int)
-    method_dist = defaultdict(int)
-    for r in all_results:
-        urg_dist[r["urgency"]] += 1
-        method_dist[r["order_method"]] += 1
-    print(f"  긴급도: {dict(sorted(urg_dist.items()))}")
-    print(f"  발주방식: {dict(sorted(method_dist.items()))}")
-
-    # --- 4) DB 적재 ---
-    if all_results:
-        upsert_batch("purchase_recommendation", all_results,
+    print(f"  긴급도: {results['urgency'].value_counts().sort_index().to_dict()}")
+    print(f"  발주방식: {results['order_method'].value_counts().sort_index().to_dict()}")
+
+    # --- 5) DB 적재 (변경된 행만, 사라진 대기 추천 삭제) ---
+    keys = ["component_product_id", "plan_date"]
+    waiting = published[(published["status"].fillna("pending") == "pending")
+                        & published["plan_date"].isin(periods)]
+    stale = stale_pending(published, results, periods)
+    n_rec = len(results)
+    results = results[changed_mask(results, waiting, keys, REC_COLS)]
+    print(f"  적재: {len(results):,}건 (변경 없음 {n_rec - len(results):,}건 생략), "
+          f"삭제: {len(stale):,}건, 확정 동결: {int((~np.isnan(fixed)).sum()):,}건")
+    for i in range(0, len(stale), 500):
+        ids = stale["id"].iloc[i:i + 500].astype(np.int64).tolist()
+        supabase.table("purchase_recommendation").delete().in_("id", ids).execute()
+    if not results.empty:
+        upsert_batch("purchase_recommendation", iter_json_rows(results, REC_COLS),
                      on_conflict="component_product_id,plan_date")
+    if not results.empty or not stale.empty:
+        refresh_latest("purchase_recommendation_latest")
+
+    # --- 6) 기간별 MRP ---
+    if phased:
+        run_phased(plans, bom, inv_map, pending_rows, lead_map, supplier_profiles, today, bucket)
 
     cnt = supabase.table("purchase_recommendation").select("id", count="exact").execute()
     print(f"[S8] 완료 -- purchase_recommendation: {cnt.count:,}행")
+
+
+if __name__ == "__main__":
+    import sys
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    run(horizon_weeks=int(opts["horizon"]) if "horizon" in opts else None,
+        phased=opts["phased"] != "0" if "phased" in opts else None, bucket=opts.get("bucket"))
@@ -0,0 +1,123 @@
+"""
+Step 9: 재고정책 몬테카를로 시뮬레이션 (scenario_engine.py)
+예측 분위 (P10/P50/P90) · 리드타임 통계에서 수요·리드타임 시나리오를 샘플링해
+현행 ROP 규칙 (안전재고 = safety_stock 안전재고 일수 × 일 수요, 없으면 리드타임 P90 일수) 의
+충족률·기대 결품을 제품별로 평가
+  - rop: (r, Q)  r = 일 수요 × 평균 리드타임 + 안전재고,  Q = 주간 수요 (PRODUCTION_PLAN_DAYS)
+  - ss : (s, S)  s = r,  S = r + 주간 수요
+run_pipeline 기본 실행에서 제외 (--step=9 로 실행)
+
+입력 테이블: forecast_result, lead_time_stats, safety_stock, inventory
+출력 테이블: policy_simulation
+실행: python DB/07_pipeline/s9_policy_simulation.py [--scenarios=1000] [--days=28] [--memory=512]
+"""
+
+import sys
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    supabase, upsert_batch,
+    PRODUCTION_PLAN_DAYS, SCENARIO_COUNT, SCENARIO_DAYS, SCENARIO_MEMORY_MB, SCENARIO_SEED,
+)
+from frame_utils import fetch_frame, ddl_schema, iter_json_rows
+from lead_time import load_lead_stats
+from safety_stock import load_forecast_quantiles, safety_days_map
+from scenario_engine import Z90, fit_demand, fit_lead_time, simulate_policies
+
+SIM_TABLE = "policy_simulation"
+SIM_COLS = ddl_schema("24_policy_simulation_ddl.sql", SIM_TABLE)
+DEFAULT_LEAD_AVG = 7.0                  # 리드타임 통계 없는 제품 (s7 / s8 기본값과 동일)
+DEFAULT_LEAD_P90 = 14.0
+
+
+# ─── 데이터 로드 ─────────────────────────────────────────────
+
+def load_latest_inventory() -> pd.Series:
+    """inventory → 제품별 최신 snapshot_date 재고 (다중 창고 합산)"""
+    inv = fetch_frame("inventory", {"snapshot_date": "str", "product_id": "str",
+                                    "inventory_qty": "float64"})
+    inv["inventory_qty"] = inv["inventory_qty"].fillna(0)
+    by_month = inv.groupby(["product_id", "snapshot_date"], as_index=False)["inventory_qty"].sum()
+    latest = by_month.sort_values("snapshot_date").drop_duplicates("product_id", keep="last")
+    return latest.set_index("product_id")["inventory_qty"]
+
+
+# ─── 정책 ───────────────────────────────────────────────────
+
+def current_policies(demand: dict, lead_avg: np.ndarray, safety_days: np.ndarray) -> dict:
+    """현행 ROP 규칙 → {"r", "Q", "S"} (N,) — 일 수요는 적합 분포 평균"""
+    daily = demand["mean"]
+    r = daily * lead_avg + daily * safety_days
+    weekly = daily * PRODUCTION_PLAN_DAYS
+    return {"r": r, "Q": weekly, "S": r + weekly}
+
+
+def run(n_scenarios: int | None = None, n_days: int | None = None,
+        memory_mb: float | None = None):
+    n_scenarios = SCENARIO_COUNT if n_scenarios is None else n_scenarios
+    n_days = SCENARIO_DAYS if n_days is None else n_days
+    memory_mb = SCENARIO_MEMORY_MB if memory_mb is None else memory_mb
+    print(f"[S9] 재고정책 시뮬레이션 시작 (시나리오 {n_scenarios:,} × {n_days}일, "
+          f"메모리 예산 {memory_mb:,.0f} MB)")
+    today_str = date.today().isoformat()
+
+    fc = load_forecast_quantiles()
+    if fc.empty:
+        print("  [!] 예측 결과 없음 — s4 먼저 실행 필요")
+        return
+    products = pd.Index(fc["product_id"])
+    lt = load_lead_stats(0).set_index("product_id").reindex(products)
+    on_hand = load_latest_inventory().reindex(products).fillna(0).to_numpy()
+    print(f"  제품 {len(products):,}개 (리드타임 통계 {lt['med_lead_days'].notna().sum():,}개, "
+          f"horizon별 {fc['horizon_days'].astype(int).value_counts().to_dict()})")
+
+    demand = fit_demand(fc["p10"].to_numpy(), fc["p50"].to_numpy(), fc["p90"].to_numpy(),
+                        fc["horizon_days"].to_numpy())
+    lead = fit_lead_time(lt["med_lead_days"].to_numpy(), lt["p90_lead_days"].to_numpy(),
+                         lt["min_lead_days"].to_numpy(), lt["max_lead_days"].to_numpy())
+    lead_avg = lt["avg_lead_days"].fillna(DEFAULT_LEAD_AVG).to_numpy()
+    safety_days = (safety_days_map().reindex(products)
+                   .fillna(lt["p90_lead_days"]).fillna(DEFAULT_LEAD_P90).to_numpy())
+    pol = current_policies(demand, lead_avg, safety_days)
+
+    frames = []
+    for name, kwargs in (("rop", {"Q": pol["Q"]}), ("ss", {"S": pol["S"]})):
+        t0 = time.perf_counter()
+        res = simulate_policies(demand, lead, on_hand, pol["r"], n_scenarios=n_scenarios,
+                                n_days=n_days, memory_mb=memory_mb, seed=SCENARIO_SEED, **kwargs)
+        frames.append(pd.DataFrame({
+            "product_id": products,
+            "policy": name,
+            "sim_date": today_str,
+            "scenarios": n_scenarios,
+            "horizon_days": n_days,
+            "reorder_point": pol["r"],
+            "order_up_to": pol["S"] if name == "ss" else np.nan,
+            "order_qty": pol["Q"] if name == "rop" else np.nan,
+            "on_hand": on_hand,
+            "demand_mean": demand["mean"],
+            "demand_std": demand["std"],
+            "lead_med_days": np.exp(lead["mu"]),
+            "lead_p90_days": np.exp(lead["mu"] + Z90 * lead["sigma"]),
+            **res,
+        }))
+        print(f"  {name:>3}: 평균 충족률 {res['fill_rate'].mean():.3f}, "
+              f"충족률 95% 미만 {int((res['fill_rate'] < 0.95).sum()):,}개, "
+              f"기대 결품 합계 {res['expected_stockout'].sum():,.0f} "
+              f"({time.perf_counter() - t0:.1f}s)")
+
+    out = pd.concat(frames, ignore_index=True)
+    cnt = upsert_batch(SIM_TABLE, iter_json_rows(out, SIM_COLS), on_conflict="product_id,policy")
+    supabase.table(SIM_TABLE).delete().lt("sim_date", today_str).execute()
+    print(f"[S9] 완료 — {SIM_TABLE}: {cnt:,}행")
+
+
+if __name__ == "__main__":
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    run(n_scenarios=int(opts["scenarios"]) if "scenarios" in opts else None,
+        n_days=int(opts["days"]) if "days" in opts else None,
+        memory_mb=float(opts["memory"]) if "memory" in opts else None)
@@ -0,0 +1,165 @@
+"""
+안전재고 엔진 — 서비스 수준 목표 기반 SKU별 안전재고 일괄 산출 + 조회
+s5_risk_score.py 가 매 실행 갱신 (refresh_safety_stock), s5 / s7 / s8 은 safety_stock 테이블 조회만 수행
+
+  SS = z(서비스 수준) × √(L × σ_d² + d² × σ_L²)
+    d, σ_d : 일 수요 평균·표준편차
+             1순위 feature_store_weekly 최신 주차 order_qty_ma13 / order_qty_std13 (주 → 일: ÷ 7, ÷ √7)
+             2순위 예측 분위 폭 (scenario_engine.fit_demand), 둘 다 없으면 기본 변동계수 (SAFETY_DEFAULT_CV)
+    L, σ_L : 리드타임 평균·표준편차 — lead_time_stats 평균, σ_L = (P90 - 중앙값) / z₀.₉
+  안전재고 일수 = SS ÷ d = z × √(L × CV² + σ_L²)
+    → 스텝마다 자기 일 수요 기준 (s5 수주 일평균, s7 일평균 수요, s8 자재 일평균 소요) 에 곱해 사용
+    → 테이블에 없는 SKU 는 기존 규칙 (리드타임 P90 일수) 으로 대체
+
+입력 테이블: feature_store_weekly, forecast_result, lead_time_stats
+출력 테이블: safety_stock
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtri
+
+from config import supabase, upsert_batch, SAFETY_SERVICE_LEVEL, SAFETY_DEFAULT_CV
+from frame_utils import fetch_frame, ddl_schema, iter_json_rows
+from lead_time import load_lead_stats
+from scenario_engine import Z90, fit_demand
+
+SAFETY_TABLE = "safety_stock"
+FORECAST_HORIZONS = (28, 14, 7, 30)     # 일 수요 적합 horizon 우선순위 (긴 누적 예측 우선)
+FEATURE_LOOKBACK_DAYS = 91              # 최신 주차 피처 탐색 범위 (13주)
+DEFAULT_LEAD_AVG = 7.0                  # 리드타임 통계 없는 SKU (s7 / s8 기본값과 동일)
+DEFAULT_LEAD_P90 = 14.0
+
+
+# ─────────────────────────────────────────────────────────────
+# 1) 산출
+# ─────────────────────────────────────────────────────────────
+
+def safety_days(cv: np.ndarray, lead_avg: np.ndarray, lead_std: np.ndarray, z: np.ndarray) -> np.ndarray:
+    """안전재고 일수 = z × √(L × CV² + σ_L²)   (일 수요 1 단위당 안전재고)"""
+    return np.maximum(z, 0) * np.sqrt(np.maximum(lead_avg, 0) * cv ** 2 + lead_std ** 2)
+
+
+def build_safety_stock(products: pd.Index, demand: pd.DataFrame, lead: pd.DataFrame,
+                       service_level: float = SAFETY_SERVICE_LEVEL) -> pd.DataFrame:
+    """SKU 배열 일괄 안전재고
+
+    Args:
+        demand: product_id 인덱스, mean / std (일 단위), source
+        lead: product_id 인덱스, avg_lead_days / med_lead_days / p90_lead_days
+    Returns: DataFrame(product_id, service_level, z_value, demand_mean, demand_std, demand_cv,
+                       demand_source, lead_avg_days, lead_std_days, safety_days, safety_stock)
+    """
+    demand = demand.reindex(products)
+    lead = lead.reindex(products)
+    mean = demand["mean"].to_numpy(dtype=float)
+    std = demand["std"].to_numpy(dtype=float)
+    has_cv = (mean > 0) & (std >= 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cv = np.where(has_cv, std / mean, SAFETY_DEFAULT_CV)
+
+    lead_avg = lead["avg_lead_days"].fillna(DEFAULT_LEAD_AVG).to_numpy(dtype=float)
+    med = lead["med_lead_days"].fillna(lead["avg_lead_days"]).fillna(DEFAULT_LEAD_AVG).to_numpy(dtype=float)
+    p90 = lead["p90_lead_days"].fillna(DEFAULT_LEAD_P90).to_numpy(dtype=float)
+    lead_std = np.maximum(p90 - med, 0) / Z90
+
+    z = float(ndtri(service_level))
+    days = safety_days(cv, lead_avg, lead_std, z)
+    return pd.DataFrame({
+        "product_id": products,
+        "service_level": service_level,
+        "z_value": z,
+        "demand_mean": np.nan_to_num(mean),
+        "demand_std": np.where(has_cv, std, np.nan),
+        "demand_cv": cv,
+        "demand_source": np.where(has_cv, demand["source"].to_numpy(dtype=object), "default"),
+        "lead_avg_days": lead_avg,
+        "lead_std_days": lead_std,
+        "safety_days": days,
+        "safety_stock": days * np.nan_to_num(mean),
+    })
+
+
+# ─────────────────────────────────────────────────────────────
+# 2) 입력 로드
+# ─────────────────────────────────────────────────────────────
+
+def load_forecast_quantiles() -> pd.DataFrame:
+    """forecast_result → 제품별 1행 (우선순위 horizon 의 최신 forecast_date 예측)
+
+    Returns: DataFrame(product_id, horizon_days, p10, p50, p90)
+    """
+    fc = fetch_frame("forecast_result",
+                     {"product_id": "str", "horizon_days": "float64", "forecast_date": "str",
+                      "p10": "float64", "p50": "float64", "p90": "float64"})
+    fc = fc[fc["product_id"].notna() & fc["horizon_days"].isin(FORECAST_HORIZONS)]
+    fc = (fc.sort_values("forecast_date", ascending=False, kind="mergesort")
+            .drop_duplicates(["product_id", "horizon_days"]))
+    fc["prio"] = fc["horizon_days"].map({h: i for i, h in enumerate(FORECAST_HORIZONS)})
+    fc = fc.sort_values(["product_id", "prio"]).drop_duplicates("product_id")
+    return fc.drop(columns=["forecast_date", "prio"]).reset_index(drop=True)
+
+
+def load_feature_demand(today: date) -> pd.DataFrame:
+    """feature_store_weekly 최근 13주 중 제품별 최신 주차 → 일 수요 평균·표준편차 (product_id 인덱스)"""
+    cutoff = (today - timedelta(days=FEATURE_LOOKBACK_DAYS)).isoformat()
+    fs = fetch_frame("feature_store_weekly",
+                     {"product_id": "str", "week_start": "str",
+                      "order_qty_ma13": "float64", "order_qty_std13": "float64"},
+                     filters=[("gte", "week_start", cutoff)])
+    fs = fs.dropna(subset=["order_qty_ma13", "order_qty_std13"])
+    fs = fs.sort_values("week_start").drop_duplicates("product_id", keep="last").set_index("product_id")
+    return pd.DataFrame({
+        "mean": fs["order_qty_ma13"] / 7,
+        "std": fs["order_qty_std13"] / np.sqrt(7),
+        "source": "feature",
+    })
+
+
+def demand_stats(feature: pd.DataFrame, fc: pd.DataFrame) -> pd.DataFrame:
+    """피처 기반 일 수요 통계 우선, 없는 제품은 예측 분위 폭에서 적합한 값"""
+    fit = fit_demand(fc["p10"].to_numpy(), fc["p50"].to_numpy(), fc["p90"].to_numpy(),
+                     fc["horizon_days"].to_numpy())
+    forecast = pd.DataFrame({"mean": fit["mean"], "std": fit["std"], "source": "forecast"},
+                            index=pd.Index(fc["product_id"]))
+    feature = feature[feature["mean"] > 0]
+    return pd.concat([feature, forecast[~forecast.index.isin(feature.index)]])
+
+
+# ─────────────────────────────────────────────────────────────
+# 3) 갱신 · 조회
+# ─────────────────────────────────────────────────────────────
+
+def refresh_safety_stock(today: date | None = None,
+                         service_level: float = SAFETY_SERVICE_LEVEL) -> pd.DataFrame:
+    """safety_stock 현재값 전체 갱신 — 대상: 수요 통계 또는 리드타임 통계가 있는 SKU"""
+    today = today or date.today()
+    today_str = today.isoformat()
+    demand = demand_stats(load_feature_demand(today), load_forecast_quantiles())
+    lead = load_lead_stats(0).set_index("product_id")
+    products = demand.index.union(lead.index)
+    out = build_safety_stock(products, demand, lead, service_level)
+    if out.empty:
+        return out
+
+    out.insert(1, "calc_date", today_str)
+    cnt = upsert_batch(SAFETY_TABLE, iter_json_rows(out, ddl_schema("25_safety_stock_ddl.sql", SAFETY_TABLE)),
+                       on_conflict="product_id")
+    supabase.table(SAFETY_TABLE).delete().lt("calc_date", today_str).execute()
+    by_source = out["demand_source"].value_counts().to_dict()
+    print(f"  {SAFETY_TABLE}: {cnt:,}행 (서비스 수준 {service_level:.0%}, 수요 통계 {by_source})")
+    return out
+
+
+def safety_days_map() -> pd.Series:
+    """safety_stock → {product_id: 안전재고 일수} (테이블 미존재 시 빈 Series — 호출 측 기존 규칙 사용)"""
+    try:
+        df = fetch_frame(SAFETY_TABLE, {"product_id": "str", "safety_days": "float64"})
+    except Exception as e:
+        if "PGRST205" in str(e) or "Could not find" in str(e):
+            print(f"    [!] 테이블 '{SAFETY_TABLE}' 미존재 — 리드타임 P90 안전재고로 진행")
+            return pd.Series(dtype=float)
+        raise
+    return df.dropna(subset=["safety_days"]).set_index("product_id")["safety_days"]
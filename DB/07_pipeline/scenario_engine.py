@@ -0,0 +1,240 @@
+"""
+몬테카를로 수요 시나리오 엔진 — SKU별 수요·리드타임 분포 적합 → (시나리오 × SKU × 일) 재고정책 시뮬레이션
+s9_policy_simulation.py / bench_scenario.py 에서 사용
+
+  - 수요: 예측 분위 (P50/P90, horizon H일 누적) 에 로그정규 적합 → 평균·분산을 일 단위로 환산
+          (일 수요 독립 가정: 평균 ÷ H, 분산 ÷ H) 후 같은 평균·분산의 감마 분포로 일 수요 샘플링
+  - 리드타임: 리드타임 통계 (중앙값·P90·최소·최대) 에 로그정규 적합, [최소, 최대] 절단 후 일 단위 올림
+  - 정책: (s, S) — 재고포지션 ≤ s 이면 S 까지 발주 / (r, Q) ROP — 재고포지션 > r 이 될 때까지 Q 배수 발주
+  - 일자 순 전개 (일자 방향만 루프), 시나리오 × SKU 방향은 벡터 — 결품은 판매 손실 (이월 없음)
+    메모리 배치는 (일 × 시나리오 × SKU) — 일자 슬라이스 연속, 수요 float32 / 리드타임 int16
+  - 메모리 예산 (SCENARIO_MEMORY_MB) 안에서 SKU 청크 단위로 샘플링·전개
+"""
+
+import numpy as np
+
+from config import SCENARIO_COUNT, SCENARIO_DAYS, SCENARIO_MEMORY_MB, SCENARIO_SEED
+
+Z90 = 1.2815515655446004        # 표준정규 0.9 분위수
+MAX_SIGMA = 1.0                 # 수요 로그정규 σ 상한 (분위 교차·P10 ≈ 0 등 비정상 폭 → 평균·분산 폭주 방지)
+DEFAULT_LEAD_MED = 7.0          # 리드타임 통계 없는 SKU 기본값 (일)
+DEFAULT_LEAD_P90 = 14.0
+
+
+# ─────────────────────────────────────────────────────────────
+# 1) 분포 적합
+# ─────────────────────────────────────────────────────────────
+
+def quantile_sigma(p10: np.ndarray, p50: np.ndarray, p90: np.ndarray) -> np.ndarray:
+    """P10/P50/P90 → 로그정규 σ
+
+    결품에 영향을 주는 상단 꼬리 (P90 / P50) 기준 — P90 폭이 없을 때만 하단 꼬리 (P50 / P10) 사용
+    (간헐 수요 제품은 P10 ≈ 0 이라 하단 꼬리 σ 가 과대 추정됨), MAX_SIGMA 로 상한
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        upper = np.log(p90 / p50) / Z90
+        lower = np.log(p50 / p10) / Z90
+    upper = np.where(np.isfinite(upper) & (upper > 0), upper, 0.0)
+    lower = np.where(np.isfinite(lower) & (lower > 0), lower, 0.0)
+    return np.minimum(np.where(upper > 0, upper, lower), MAX_SIGMA)
+
+
+def fit_demand(p10: np.ndarray, p50: np.ndarray, p90: np.ndarray, horizon_days: np.ndarray) -> dict:
+    """horizon 누적 예측 분위 → 일 수요 감마 분포 파라미터
+
+    Returns: {"mean", "std" (일 평균·표준편차), "shape", "scale" (감마)} (N,)
+      P50 ≤ 0 이면 P90 / 2 를 중앙값으로 사용, 둘 다 없으면 수요 0
+      분산 0 (분위 폭 없음) 인 SKU 는 평균 고정값에 수렴하도록 shape 를 크게 둠
+    """
+    p10, p50, p90 = (np.nan_to_num(np.asarray(a, dtype=float)) for a in (p10, p50, p90))
+    h = np.maximum(np.asarray(horizon_days, dtype=float), 1.0)
+    med = np.where(p50 > 0, p50, np.maximum(p90, 0) / 2)
+    sigma = np.where(med > 0, quantile_sigma(p10, med, np.maximum(p90, med)), 0.0)
+
+    mean_h = med * np.exp(sigma ** 2 / 2)
+    var_h = mean_h ** 2 * np.expm1(sigma ** 2)
+    mean, var = mean_h / h, var_h / h
+
+    pos = mean > 0
+    deterministic = pos & (var <= (mean * 1e-3) ** 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shape = np.select([~pos, deterministic], [1.0, 1e6], default=mean ** 2 / var)
+        scale = np.select([~pos, deterministic], [0.0, mean / 1e6], default=var / mean)
+    return {"mean": mean, "std": np.sqrt(var), "shape": shape, "scale": scale}
+
+
+def fit_lead_time(med: np.ndarray, p90: np.ndarray,
+                  lo: np.ndarray | None = None, hi: np.ndarray | None = None) -> dict:
+    """리드타임 통계 → 로그정규 파라미터 (일)
+
+    Returns: {"mu", "sigma", "lo", "hi"} (N,) — 통계 없는 SKU 는 DEFAULT_LEAD_MED / DEFAULT_LEAD_P90
+      lo / hi 는 샘플 절단 범위 (없으면 1 / +inf)
+    """
+    med = np.asarray(med, dtype=float)
+    p90 = np.asarray(p90, dtype=float)
+    missing = ~(med > 0)
+    med = np.where(missing, DEFAULT_LEAD_MED, med)
+    p90 = np.where(missing | np.isnan(p90), np.where(missing, DEFAULT_LEAD_P90, med), p90)
+    sigma = np.log(np.maximum(p90, med) / med) / Z90
+
+    lo = np.ones_like(med) if lo is None else np.nan_to_num(np.asarray(lo, dtype=float), nan=1.0)
+    hi = np.full_like(med, np.inf) if hi is None else np.nan_to_num(np.asarray(hi, dtype=float), nan=np.inf)
+    lo = np.where(missing, 1.0, np.maximum(lo, 1.0))
+    hi = np.where(missing | (hi < lo), np.inf, hi)
+    return {"mu": np.log(med), "sigma": sigma, "lo": lo, "hi": hi}
+
+
+# ─────────────────────────────────────────────────────────────
+# 2) 샘플링 — 배열 배치는 (일 × 시나리오 × SKU): 일자 슬라이스가 연속 메모리
+# ─────────────────────────────────────────────────────────────
+
+def sample_demand(rng: np.random.Generator, demand: dict, idx: np.ndarray,
+                  n_scenarios: int, n_days: int) -> np.ndarray:
+    """SKU 부분집합 idx 의 일 수요 (일 × 시나리오 × SKU, float32)"""
+    shape = demand["shape"][idx].astype(np.float32)
+    out = rng.standard_gamma(np.broadcast_to(shape, (n_days, n_scenarios, len(idx))),
+                             dtype=np.float32)
+    out *= demand["scale"][idx].astype(np.float32)
+    return out
+
+
+def sample_lead(rng: np.random.Generator, lead: dict, idx: np.ndarray,
+                n_scenarios: int, n_days: int) -> np.ndarray:
+    """SKU 부분집합 idx 의 발주일별 리드타임 (일 × 시나리오 × SKU, 정수 일 1 ~ n_days)
+
+    n_days 를 넘는 리드타임은 어차피 기간 내 입고되지 않으므로 n_days 로 절단
+    """
+    days = rng.standard_normal((n_days, n_scenarios, len(idx)), dtype=np.float32)
+    days *= lead["sigma"][idx].astype(np.float32)
+    days += lead["mu"][idx].astype(np.float32)
+    np.exp(days, out=days)
+    np.clip(days, lead["lo"][idx].astype(np.float32),
+            np.minimum(lead["hi"][idx], n_days).astype(np.float32), out=days)
+    return np.ceil(days).astype(np.int16)
+
+
+# ─────────────────────────────────────────────────────────────
+# 3) 정책 시뮬레이션
+# ─────────────────────────────────────────────────────────────
+
+def simulate_chunk(demand: np.ndarray, lead: np.ndarray, on_hand: np.ndarray,
+                   on_order: np.ndarray, s: np.ndarray, S: np.ndarray | None = None,
+                   Q: np.ndarray | None = None) -> dict:
+    """(일 × 시나리오 × SKU) 수요·리드타임 → 정책 전개 결과
+
+    매일: 입고 → 수요 충족 (부족분 판매 손실) → 재고포지션 (재고 + 미입고) 점검 → 발주
+    발주분은 t + 리드타임 일 시작 시 입고 (기간 이후 입고분은 마지막 칸에 모아 무시).
+    on_order 는 t=0 시작 시 입고되는 기발주분.  발주·입고 예약은 발주 발생 칸만 처리.
+    Args:
+        on_hand / on_order / s / S / Q: (N,) — S 가 있으면 (s, S), 없으면 (r=s, Q)
+    Returns: (시나리오 × SKU) 합계 배열 {"demand", "served", "short", "short_days", "inventory", "orders"}
+    """
+    n_days, n_sc, n_sku = demand.shape
+    on_order = np.asarray(on_order, dtype=float)
+    arrivals = np.zeros((n_days + 1, n_sc, n_sku))          # 마지막 칸 = 기간 이후 입고
+    arrivals[0] = on_order
+
+    inv = np.tile(np.asarray(on_hand, dtype=float), (n_sc, 1))
+    pipe = np.tile(on_order, (n_sc, 1))
+    served = np.zeros_like(inv)
+    short_days = np.zeros_like(inv)
+    inv_sum = np.zeros_like(inv)
+    orders = np.zeros_like(inv)
+    fill = np.empty_like(inv)
+    position = np.empty_like(inv)
+
+    for t in range(n_days):
+        inv += arrivals[t]
+        pipe -= arrivals[t]
+        np.minimum(inv, demand[t], out=fill)
+        inv -= fill
+        served += fill
+        short_days += fill < demand[t] - 1e-6
+        inv_sum += inv
+
+        np.add(inv, pipe, out=position)
+        sc, k = np.nonzero(position <= s)
+        pos = position[sc, k]
+        if S is not None:
+            qty = np.maximum(S[k] - pos, 0.0)
+        else:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                qty = np.where(Q[k] > 0, (np.floor((s[k] - pos) / Q[k]) + 1) * Q[k], 0.0)
+        orders[sc, k] += qty > 0
+        pipe[sc, k] += qty
+        arrivals[np.minimum(t + lead[t, sc, k], n_days), sc, k] += qty
+
+    total = demand.sum(axis=0, dtype=float)
+    return {
+        "demand": total,
+        "served": served,
+        "short": total - served,
+        "short_days": short_days,
+        "inventory": inv_sum / max(n_days, 1),
+        "orders": orders,
+    }
+
+
+def chunk_size(n_scenarios: int, n_days: int, memory_mb: float = SCENARIO_MEMORY_MB) -> int:
+    """메모리 예산 내 SKU 청크 크기
+
+    SKU·시나리오당 바이트 추정: 수요 float32 4D + 리드타임 int16 2D + 리드타임 샘플링 임시 float32 8D
+    + 입고 float64 8(D+1) + (시나리오 × SKU) float64 작업 배열 14개
+    """
+    per_sku = n_scenarios * (22 * n_days + 8 + 8 * 14)
+    return max(int(memory_mb * 2 ** 20 // per_sku), 1)
+
+
+def simulate_policies(demand: dict, lead: dict, on_hand: np.ndarray, s: np.ndarray,
+                      S: np.ndarray | None = None, Q: np.ndarray | None = None,
+                      on_order: np.ndarray | None = None,
+                      n_scenarios: int = SCENARIO_COUNT, n_days: int = SCENARIO_DAYS,
+                      memory_mb: float = SCENARIO_MEMORY_MB, seed: int = SCENARIO_SEED) -> dict:
+    """전 SKU 정책 시뮬레이션 — SKU 청크 단위 샘플링·전개 후 시나리오 방향 집계
+
+    Args:
+        demand: fit_demand() 결과, lead: fit_lead_time() 결과 (N,)
+        on_hand / s / S / Q / on_order: (N,)
+    Returns: SKU별 (N,) 배열
+        fill_rate          충족 수량 ÷ 수요 (수요 0 이면 1)
+        expected_stockout  시나리오 평균 결품 (판매 손실) 수량
+        stockout_prob      결품일이 하루라도 있는 시나리오 비율
+        stockout_days      시나리오 평균 결품 일수
+        avg_inventory      시나리오 평균 일말 재고
+        order_count        시나리오 평균 발주 횟수
+        expected_demand    시나리오 평균 총수요
+    """
+    n = len(on_hand)
+    on_hand = np.maximum(np.nan_to_num(np.asarray(on_hand, dtype=float)), 0.0)
+    on_order = np.zeros(n) if on_order is None else np.nan_to_num(np.asarray(on_order, dtype=float))
+    s = np.asarray(s, dtype=float)
+    S = None if S is None else np.maximum(np.asarray(S, dtype=float), s)
+    Q = None if Q is None else np.asarray(Q, dtype=float)
+
+    rng = np.random.default_rng(seed)
+    step = chunk_size(n_scenarios, n_days, memory_mb)
+    out = {k: np.zeros(n) for k in ("demand", "served", "short", "stockout_prob",
+                                    "short_days", "inventory", "orders")}
+    for start in range(0, n, step):
+        idx = np.arange(start, min(start + step, n))
+        sim = simulate_chunk(
+            sample_demand(rng, demand, idx, n_scenarios, n_days),
+            sample_lead(rng, lead, idx, n_scenarios, n_days),
+            on_hand[idx], on_order[idx], s[idx],
+            None if S is None else S[idx], None if Q is None else Q[idx],
+        )
+        for k in ("demand", "served", "short", "short_days", "inventory", "orders"):
+            out[k][idx] = sim[k].mean(axis=0)
+        out["stockout_prob"][idx] = (sim["short_days"] > 0).mean(axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fill = np.where(out["demand"] > 0, out["served"] / out["demand"], 1.0)
+    return {
+        "fill_rate": fill,
+        "expected_stockout": out["short"],
+        "stockout_prob": out["stockout_prob"],
+        "stockout_days": out["short_days"],
+        "avg_inventory": out["inventory"],
+        "order_count": out["orders"],
+        "expected_demand": out["demand"],
+    }
@@ -0,0 +1,192 @@
+"""
+파이프라인 스텝 계측 — 단계별 시간 (fetch / compute / write), 읽기·쓰기 행 수, HTTP 왕복·전송 바이트, 최대 RSS
+run_pipeline 스텝 프로세스에서 install() → reset() → 스텝 실행 → summary() 로 스텝 지표 dict
+
+  - HTTP: httpx.Client.send (supabase-py / postgrest 전송 계층) 를 감싸 요청 단위 집계 — 스텝 코드 수정 없음
+          GET / HEAD → fetch, POST / PATCH / PUT / DELETE → write (RPC 호출 포함)
+          읽기 행 수 = 응답 Content-Range 범위, 쓰기 행 수 = 요청 본문 JSON 배열 길이
+          (PATCH / DELETE 는 응답 Content-Range 범위, RPC 는 행 수 제외)
+  - compute = 스텝 소요 - fetch - write (HTTP 대기 외 시간, 스레드 동시 요청 시 0 하한)
+  - 최대 RSS: 스텝 프로세스 ru_maxrss (스텝 내부 워커 프로세스의 요청·메모리는 제외)
+  - 프로파일 (선택): cProfile → .prof + 누적 시간 상위 함수 출력 / pyinstrument (설치 시) → .html
+  - 저장: 실행 단위 JSON 파일 (run_metrics/<run_id>.json) + pipeline_run_metrics 테이블
+
+DDL: 29_pipeline_run_metrics_ddl.sql
+"""
+
+import json
+import os
+import threading
+import time
+
+from config import supabase
+from frame_utils import ddl_schema, peak_rss_mb
+
+METRICS_TABLE = "pipeline_run_metrics"
+METRICS_COLS = [c for c in ddl_schema("29_pipeline_run_metrics_ddl.sql", METRICS_TABLE)
+                if c not in ("id", "created_at")]
+METRICS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "run_metrics")
+PROFILE_TOP = 15                         # cProfile 누적 시간 상위 출력 함수 수
+
+_lock = threading.Lock()
+_counters = {}
+_installed = False
+
+
+def _is_missing_table(e: Exception) -> bool:
+    return "PGRST205" in str(e) or "Could not find" in str(e)
+
+
+def reset():
+    """카운터 초기화 — 스텝 실행 직전 호출 (지문 비교 등 실행기 요청 제외)"""
+    with _lock:
+        _counters.clear()
+        if not _installed:
+            return                          # 계측 미설치: HTTP 지표 없음 (0 으로 기록하지 않음)
+        _counters.update({
+            "fetch_sec": 0.0, "write_sec": 0.0, "fetch_calls": 0, "write_calls": 0,
+            "rows_read": 0, "rows_written": 0, "bytes_sent": 0, "bytes_received": 0,
+        })
+
+
+def _range_rows(response) -> int | None:
+    """Content-Range '0-999/5000' → 1000 ('*/0' · 헤더 없음 → None)"""
+    span = response.headers.get("content-range", "").split("/")[0]
+    if "-" not in span:
+        return None
+    start, end = span.split("-", 1)
+    return int(end) - int(start) + 1 if start.isdigit() and end.isdigit() else None
+
+
+def _body_rows(content: bytes) -> int:
+    """요청 본문 JSON → 행 수 (배열 길이, 단건 객체 1)"""
+    if not content:
+        return 0
+    if content.lstrip()[:1] != b"[":
+        return 1
+    return len(json.loads(content))
+
+
+def install() -> bool:
+    """httpx 전송 계층 계측 설치 (httpx 미설치 시 False — HTTP 지표 없이 진행)"""
+    global _installed
+    try:
+        import httpx
+    except ImportError:
+        print("  [!] httpx 미설치 — HTTP 왕복·행 수·전송량 계측 생략")
+        return False
+    _installed = True
+    if getattr(httpx.Client.send, "_step_metrics", False):
+        return True
+    send = httpx.Client.send
+
+    def measured_send(self, request, *args, **kwargs):
+        start = time.perf_counter()
+        response = send(self, request, *args, **kwargs)
+        secs = time.perf_counter() - start
+        phase = "fetch" if request.method in ("GET", "HEAD") else "write"
+        rows = None if "/rpc/" in request.url.path else _range_rows(response)
+        if phase == "write" and request.method in ("POST", "PUT") and "/rpc/" not in request.url.path:
+            rows = _body_rows(request.content)
+        received = getattr(response, "num_bytes_downloaded", 0) or len(response.content)
+        with _lock:
+            if _counters:
+                _counters[f"{phase}_sec"] += secs
+                _counters[f"{phase}_calls"] += 1
+                _counters["rows_read" if phase == "fetch" else "rows_written"] += rows or 0
+                _counters["bytes_sent"] += len(request.content)
+                _counters["bytes_received"] += received
+        return response
+
+    measured_send._step_metrics = True
+    httpx.Client.send = measured_send
+    return True
+
+
+def summary(run_sec: float) -> dict:
+    """스텝 실행 구간 지표 (reset() 이후 누적) — compute = run_sec - fetch - write
+    (계측 미설치·스텝 미실행 시 최대 RSS 만)"""
+    with _lock:
+        m = dict(_counters)
+    if m:
+        m["compute_sec"] = max(run_sec - m["fetch_sec"] - m["write_sec"], 0.0)
+    m["peak_rss_mb"] = peak_rss_mb()
+    return {k: round(v, 3) if isinstance(v, float) else v for k, v in m.items()}
+
+
+# ─── 프로파일 ────────────────────────────────────────────────
+
+def run_profiled(fn, mode: str | None, path_stem: str):
+    """fn() 실행 — mode: None (프로파일 없음) | "cprofile" | "pyinstrument" → (반환값, 프로파일 파일 경로)"""
+    if not mode:
+        return fn(), None
+    os.makedirs(os.path.dirname(path_stem), exist_ok=True)
+
+    if mode == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("  [!] pyinstrument 미설치 — cProfile 로 대체")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                return fn(), path_stem + ".html"
+            finally:
+                profiler.stop()
+                with open(path_stem + ".html", "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+                print(f"  프로파일: {path_stem}.html")
+
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return fn(), path_stem + ".prof"
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path_stem + ".prof")
+        print(f"  프로파일: {path_stem}.prof (누적 시간 상위 {PROFILE_TOP}개)")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(PROFILE_TOP)
+
+
+# ─── 저장 · 이전 실행 비교 ───────────────────────────────────
+
+def previous_totals(step_keys: list) -> dict:
+    """스텝별 직전 성공 실행 소요 시간 {step_key: total_sec} (테이블 미존재 시 빈 dict)"""
+    try:
+        resp = (supabase.table(METRICS_TABLE).select("step_key,total_sec")
+                .in_("step_key", list(step_keys)).eq("status", "ok")
+                .order("id", desc=True).limit(20 * len(step_keys)).execute())
+    except Exception as e:
+        if _is_missing_table(e):
+            return {}
+        raise
+    prev = {}
+    for r in resp.data or []:
+        prev.setdefault(r["step_key"], float(r["total_sec"]))
+    return prev
+
+
+def save_metrics(run: dict, steps: list) -> str:
+    """실행 지표 저장 → JSON 파일 경로
+
+    run: {run_id, started_at, elapsed_sec, jobs, ...} 실행 단위 정보
+    steps: [{step_key, status, total_sec, ...지표}, ...]
+    """
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = os.path.join(METRICS_DIR, f"{run['run_id']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({**run, "steps": steps}, f, ensure_ascii=False, indent=2, default=str)
+
+    # 일괄 UPSERT 는 행마다 같은 키 필요 — 지표 없는 스텝 (건너뜀·비정상 종료) 은 NULL
+    rows = [{c: ({"run_id": run["run_id"], **s}).get(c) for c in METRICS_COLS} for s in steps]
+    try:
+        supabase.table(METRICS_TABLE).upsert(rows, on_conflict="run_id,step_key").execute()
+    except Exception as e:
+        if not _is_missing_table(e):
+            raise
+        print(f"  [!] 테이블 '{METRICS_TABLE}' 미존재 — JSON 파일만 저장 (29_pipeline_run_metrics_ddl.sql)")
+    return path
@@ -0,0 +1,266 @@
+"""
+공급사 스코어카드 — purchase_order → (자재 × 공급사) 누적 합계·건수 + 자재 내 순위
+s8_purchase_optimization.py 가 실행 시 증분 갱신 후 조회, 구매 추천 API 는 supplier_scorecard 조회만 수행
+
+증분 갱신 (pipeline_watermark 'scorecard.*'):
+  - 단가·발주 건수: purchase_order.id > 워터마크 인 신규 발주분만 합산
+  - 리드타임·납기 준수: 완료건(status='F') 중 입고일이 전일 이전인 입고분 — 두 경로로 나눠 중복 없이 합산
+      · 신규 발주 (id > id 워터마크): 발주 증분과 같은 조회에서 입고일 ≤ 전일 전체
+        (실행 후 늦게 적재된 과거 입고일 건·CSV 소급 적재분 포함)
+      · 기존 발주 (id ≤ id 워터마크): receipt_date 가 (입고일 워터마크, 전일] 인 입고분
+    (당일 입고는 다음 실행에서 반영 — 같은 입고일 건이 나뉘어 누락되지 않도록)
+  - 정합성 검사 (매 실행): 발주 행 수·최대 id·완료 입고 건수를 저장된 건수 + 이번 증분과 비교,
+    다르면 자동 전체 재구축 — 적재 스크립트의 삭제 후 재적재 (전 행 새 id), 행 삭제,
+    기존 발주의 제자리 UPDATE 입고 (입고일 ≤ 워터마크) 등 증분으로 잡히지 않는 변경
+  - 단가 등 그 외 제자리 정정은 건수에 드러나지 않으므로 --full 로 재구축
+점수: 자재 내 min-max 정규화 (리드타임 짧을수록·단가 낮을수록 우수) + 납기 준수율, SUPPLIER_WEIGHTS 가중합
+      값 없는 요소는 0.5, 갱신분이 있는 자재만 재산출
+순위: 점수 내림차순, 동점은 최초 발주 순 (1 = 추천, 2 = 대체)
+
+입력 테이블: purchase_order, supplier
+출력 테이블: supplier_scorecard
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from config import supabase, upsert_batch, SUPPLIER_WEIGHTS
+from cache_utils import get_watermarks, save_watermarks, table_fingerprint
+from frame_utils import fetch_frame, ddl_schema, iter_json_rows
+from lead_time import ON_TIME_DAYS, po_leads
+
+SCORECARD_TABLE = "supplier_scorecard"
+WM_PO_ID = "scorecard.purchase_order.id"
+WM_RECEIPT = "scorecard.purchase_order.receipt_date"
+WM_ROWS = "scorecard.purchase_order.rows"                # 합산한 발주 행 수 (max_id 컬럼에 저장)
+WM_DONE = "scorecard.purchase_order.done"                # 합산한 완료 입고 행 수 (입고일 워터마크 이하)
+
+KEYS = ["component_product_id", "supplier_code"]
+SUM_COLS = ["po_count", "price_sum", "price_count", "lead_sum", "lead_count", "on_time_count"]
+SCHEMA = {
+    "component_product_id": "str", "supplier_code": "str", "supplier_name": "str",
+    "first_po_id": "float64",
+    **{c: "float64" for c in SUM_COLS},
+    "avg_unit_price": "float64", "avg_lead_days": "float64", "on_time_rate": "float64",
+    "score": "float64", "score_rank": "float64",
+}
+
+
+# ─────────────────────────────────────────────────────────────
+# 1) 증분 합계
+# ─────────────────────────────────────────────────────────────
+
+def _lead_sums(po: pd.DataFrame) -> pd.DataFrame:
+    """완료 발주 → (자재, 공급사)별 리드타임 합계·건수·준수 건수"""
+    leads, _ = po_leads(po)
+    leads = leads[leads["supplier_code"] != ""]
+    out = (leads.assign(on_time=(leads["lead_days"] <= ON_TIME_DAYS).astype(int))
+           .rename(columns={"product_id": "component_product_id"})
+           .groupby(KEYS, sort=False)
+           .agg(lead_sum=("lead_days", "sum"), lead_count=("lead_days", "size"),
+                on_time_count=("on_time", "sum")))
+    return out.reset_index()
+
+
+def _is_done(po: pd.DataFrame, until: date) -> pd.Series:
+    """완료건 (status='F') 중 receipt_date < until 인 행"""
+    return (po["status"] == "F") & po["receipt_date"].notna() & (po["receipt_date"] < until.isoformat())
+
+
+def done_count(until: date) -> int:
+    """purchase_order 완료건 중 receipt_date < until 행 수 (정합성 검사용, 서버 측 count)"""
+    resp = (supabase.table("purchase_order").select("id", count="exact")
+            .eq("status", "F").lt("receipt_date", until.isoformat()).limit(1).execute())
+    return resp.count or 0
+
+
+def order_deltas(after_id: int, until: date) -> tuple:
+    """id > after_id 발주 → (발주 증분, 입고 증분, 조회 행 수, 그중 완료 입고 행 수)
+        발주 증분: (자재, 공급사)별 발주 건수·단가 합계·최초 id·발주서 공급사명
+        입고 증분: 그중 완료건 · receipt_date < until 의 리드타임 합계 (적재 시점과 무관하게 입고일 기준)
+    """
+    schema = {"id": "int64", "component_product_id": "str", "cd_partner": "str",
+              "supplier_name": "str", "unit_price": "float64",
+              "status": "str", "po_date": "str", "receipt_date": "str"}
+    po = fetch_frame("purchase_order", schema, filters=[("gt", "id", after_id)] if after_id else None)
+    n_rows, n_done = len(po), int(_is_done(po, until).sum())
+    po = po[po["component_product_id"].notna() & po["cd_partner"].notna()
+            & (po["component_product_id"] != "") & (po["cd_partner"] != "")]
+    priced = po["unit_price"].notna() & (po["unit_price"] != 0)
+    g = po.assign(
+        price_sum=po["unit_price"].where(priced, 0.0),
+        price_count=priced.astype(int),
+    ).rename(columns={"cd_partner": "supplier_code"}).groupby(KEYS, sort=False)
+    out = g.agg(po_count=("id", "size"), price_sum=("price_sum", "sum"),
+                price_count=("price_count", "sum"), first_po_id=("id", "min"),
+                po_supplier_name=("supplier_name", "last"), max_id=("id", "max"))
+    return out.reset_index(), _lead_sums(po[_is_done(po, until)]), n_rows, n_done
+
+
+def receipt_deltas(after: str | None, until: date, max_id: int) -> tuple:
+    """기존 발주 (id ≤ max_id) 완료건 중 receipt_date ∈ (after, until) → ((자재, 공급사)별 리드타임 합계, 조회 행 수)"""
+    schema = {"component_product_id": "str", "cd_partner": "str",
+              "po_date": "str", "receipt_date": "str"}
+    filters = [("eq", "status", "F"), ("lte", "id", max_id), ("lt", "receipt_date", until.isoformat())]
+    if after:
+        filters.append(("gt", "receipt_date", after))
+    po = fetch_frame("purchase_order", schema, filters=filters)
+    return _lead_sums(po), len(po)
+
+
+def merge_deltas(card: pd.DataFrame, orders: pd.DataFrame, receipts: pd.DataFrame) -> pd.DataFrame:
+    """기존 스코어카드 + 증분 → 누적 합계 갱신 (신규 (자재, 공급사) 는 행 추가)"""
+    delta = (pd.concat([orders.drop(columns="max_id"), receipts], ignore_index=True)
+             .groupby(KEYS, sort=False)
+             .agg({**{c: "sum" for c in SUM_COLS}, "first_po_id": "min", "po_supplier_name": "last"}))
+    merged = card.set_index(KEYS).reindex(card.set_index(KEYS).index.union(delta.index, sort=False))
+    merged[SUM_COLS] = merged[SUM_COLS].fillna(0).add(delta[SUM_COLS].reindex(merged.index).fillna(0))
+    merged["first_po_id"] = np.fmin(merged["first_po_id"].astype(float),
+                                    delta["first_po_id"].reindex(merged.index).astype(float))
+    merged["po_supplier_name"] = delta["po_supplier_name"].reindex(merged.index)
+    return merged.reset_index()
+
+
+# ─────────────────────────────────────────────────────────────
+# 2) 점수·순위
+# ─────────────────────────────────────────────────────────────
+
+def _minmax_score(values: pd.Series, comp: pd.Series) -> pd.Series:
+    """자재 내 1 - (x - min) / (max - min)  (범위 0 → 1로 나눔, 값 없음 → 0.5)"""
+    lo = values.groupby(comp).transform("min")
+    hi = values.groupby(comp).transform("max")
+    span = (hi - lo).where(hi != lo, 1.0)
+    return (1 - (values - lo) / span).fillna(0.5)
+
+
+def score_suppliers(card: pd.DataFrame, weights: dict = SUPPLIER_WEIGHTS) -> pd.DataFrame:
+    """누적 합계 → 평균 단가·리드타임·준수율 (DDL 자릿수 반올림) + 자재 내 점수·순위
+
+    단가·리드타임 모두 없는 공급사는 순위 제외 (score / score_rank = NaN)
+    """
+    card = card.copy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        card["avg_unit_price"] = (card["price_sum"] / card["price_count"].where(card["price_count"] > 0)).round(6)
+        card["avg_lead_days"] = (card["lead_sum"] / card["lead_count"].where(card["lead_count"] > 0)).round(2)
+        card["on_time_rate"] = (card["on_time_count"] / card["lead_count"].where(card["lead_count"] > 0)).round(4)
+
+    ranked = card["avg_unit_price"].notna() | card["avg_lead_days"].notna()
+    r = card[ranked]
+    comp = r["component_product_id"]
+    score = (weights["lead_time"] * _minmax_score(r["avg_lead_days"], comp)
+             + weights["unit_price"] * _minmax_score(r["avg_unit_price"], comp)
+             + weights["reliability"] * r["on_time_rate"].fillna(0.5))
+    order = (pd.DataFrame({"comp": comp, "neg": -score, "first": r["first_po_id"]})
+             .sort_values(["comp", "neg", "first"], kind="mergesort"))
+    rank = order.groupby("comp", sort=False).cumcount() + 1
+
+    card["score"] = score.reindex(card.index)
+    card["score_rank"] = rank.reindex(card.index)
+    return card
+
+
+# ─────────────────────────────────────────────────────────────
+# 3) 갱신 / 조회
+# ─────────────────────────────────────────────────────────────
+
+def load_scorecard(max_rank: int | None = None) -> pd.DataFrame:
+    """supplier_scorecard 조회 — max_rank 지정 시 순위 이내 행만 (테이블 미존재 시 빈 DataFrame)"""
+    filters = [("lte", "score_rank", max_rank)] if max_rank else None
+    try:
+        return fetch_frame(SCORECARD_TABLE, SCHEMA, filters=filters)
+    except Exception as e:
+        if "PGRST205" in str(e) or "Could not find" in str(e):
+            print(f"    [!] 테이블 '{SCORECARD_TABLE}' 미존재 — 23_supplier_scorecard_ddl.sql 실행 필요")
+            return pd.DataFrame(columns=list(SCHEMA))
+        raise
+
+
+def refresh_scorecard(full: bool = False, today: date | None = None) -> int:
+    """신규 발주·입고분을 누적 합계에 반영하고 갱신된 자재의 점수·순위 재산출 → 적재 행 수
+
+    워터마크 없음 (최초 실행·워터마크 테이블 미존재), 정합성 검사 불일치 또는 full=True 면 전체 재구축
+    """
+    today = today or date.today()
+    marks = get_watermarks("scorecard.")
+    full = full or not marks or any(k not in marks for k in (WM_PO_ID, WM_ROWS, WM_DONE))
+    after_id = 0 if full else int(marks[WM_PO_ID]["max_id"] or 0)
+    after_rcpt = None if full else marks.get(WM_RECEIPT, {}).get("max_value")
+
+    if not full:
+        # 현재 발주 지문 (조회 전 시점) — 저장 건수 + 이번 증분과 다르면 증분 경로가 놓친 변경
+        fp = table_fingerprint("purchase_order")
+        done_now = done_count(today)
+    orders, new_receipts, n_rows, n_done = order_deltas(after_id, today)
+    # 기존 발주의 입고분 (전체 재구축 시 기존 발주 없음 — 모두 신규 발주 경로에서 합산)
+    old_receipts, n_old_done = ((pd.DataFrame(columns=KEYS + ["lead_sum", "lead_count", "on_time_count"]), 0)
+                                if full else receipt_deltas(after_rcpt, today, after_id))
+    if not full:
+        rows = int(marks[WM_ROWS]["max_id"] or 0) + n_rows
+        done = int(marks[WM_DONE]["max_id"] or 0) + n_done + n_old_done
+        if fp["count"] != rows or done_now != done or (fp["max_id"] or 0) < after_id:
+            print(f"    [!] 공급사 스코어카드: 발주 {fp['count']:,}행 / 완료 입고 {done_now:,}건 — "
+                  f"누적 기준 ({rows:,}행 / {done:,}건) 과 불일치 (재적재·삭제·기존 발주 입고 수정) → 전체 재구축")
+            return refresh_scorecard(full=True, today=today)
+    else:
+        rows, done = n_rows, n_done
+    receipts = pd.concat([new_receipts, old_receipts], ignore_index=True)
+    if not full and orders.empty and receipts.empty:
+        print("    공급사 스코어카드: 신규 발주·입고 없음 — 갱신 생략")
+        return 0
+
+    card = pd.DataFrame(columns=list(SCHEMA)) if full else load_scorecard()
+    card = merge_deltas(card.drop(columns=["score", "score_rank"]), orders, receipts)
+
+    # 신규 (자재, 공급사) 또는 공급사명 변경 반영: 마스터명 > 발주서 공급사명 > 코드
+    sup = fetch_frame("supplier", {"customer_code": "str", "customer_name": "str"},
+                      order_col="customer_code")
+    name_map = dict(zip(sup["customer_code"], sup["customer_name"]))
+    names = card["supplier_code"].map(name_map)
+    card["supplier_name"] = (names.fillna(card["po_supplier_name"])
+                             .fillna(card["supplier_name"]).fillna(card["supplier_code"]))
+
+    touched = pd.concat([orders["component_product_id"], receipts["component_product_id"]]).unique()
+    card = card[card["component_product_id"].isin(touched)]
+    card = score_suppliers(card.drop(columns="po_supplier_name"))
+    card["updated_at"] = pd.Timestamp.now(tz="UTC").isoformat()
+
+    if full:
+        supabase.table(SCORECARD_TABLE).delete().gte("id", 0).execute()
+    n = upsert_batch(SCORECARD_TABLE,
+                     iter_json_rows(card, ddl_schema("23_supplier_scorecard_ddl.sql", SCORECARD_TABLE)),
+                     on_conflict="component_product_id,supplier_code")
+
+    max_id = int(orders["max_id"].max()) if not orders.empty else after_id
+    save_watermarks({
+        WM_PO_ID: {"max_id": max_id, "max_value": None},
+        WM_RECEIPT: {"max_id": None, "max_value": (today - timedelta(days=1)).isoformat()},
+        WM_ROWS: {"max_id": rows, "max_value": None},
+        WM_DONE: {"max_id": done, "max_value": None},
+    })
+    print(f"    공급사 스코어카드: {'전체 재구축' if full else '증분'} — 자재 {len(touched):,}, "
+          f"(자재, 공급사) {n:,}행 갱신")
+    return n
+
+
+def supplier_profiles(card: pd.DataFrame) -> dict:
+    """순위 있는 스코어카드 행 → {component_product_id: [공급사 dict, … (순위 순)]}"""
+    card = card.dropna(subset=["score_rank"]).sort_values(["component_product_id", "score_rank"])
+    result = {}
+    for r in card.itertuples(index=False):
+        result.setdefault(r.component_product_id, []).append({
+            "supplier_code": r.supplier_code,
+            "supplier_name": r.supplier_name,
+            "avg_lead_days": None if pd.isna(r.avg_lead_days) else r.avg_lead_days,
+            "avg_unit_price": None if pd.isna(r.avg_unit_price) else r.avg_unit_price,
+            "sample_count": int(r.lead_count or 0),
+            "on_time_rate": None if pd.isna(r.on_time_rate) else r.on_time_rate,
+            "score": r.score,
+        })
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+    refresh_scorecard(full="--full" in sys.argv)
@@ -0,0 +1,72 @@
+"""
+frame_utils 회귀 검증 — compact_frame 결과 dtype
+─────────────────────────────────────────
+합성 피처 프레임 (DB 불필요):
+  - ID 컬럼 (product_id / year_week / year_month) 을 object · pandas 문자열 dtype 두 경우로 생성
+    (pandas 3 은 문자열 컬럼 기본 dtype 이 str — object 비교만으로는 category 변환 누락)
+  - 캘린더·카운트 정수 (NULL 없음 → 다운캐스트, NULL 포함 → 유지), 불리언, float32 지정 컬럼
+─────────────────────────────────────────
+실행:
+  cd DB/07_pipeline && python validate_frame_utils.py
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from frame_utils import compact_frame
+
+
+def make_frame(id_dtype) -> pd.DataFrame:
+    """ID 컬럼 dtype 만 다른 합성 피처 프레임 (4행)"""
+    ids = {
+        "product_id": ["P001", "P002", "P001", "P003"],
+        "year_week": ["2026-W01", "2026-W01", "2026-W02", "2026-W02"],
+        "year_month": ["2026-01", "2026-01", "2026-01", "2026-01"],
+    }
+    df = pd.DataFrame({c: pd.Series(v, dtype=id_dtype) for c, v in ids.items()})
+    df["week_num"] = [1.0, 1.0, 2.0, 2.0]
+    df["month"] = [1.0, 1.0, 1.0, np.nan]
+    df["order_qty_nonzero_4w"] = [0.0, 3.0, 4.0, 1.0]
+    df["is_holiday_week"] = [0, 1, 0, 0]
+    df["order_qty_lag1"] = ["1.5", "2", None, "4"]
+    return df
+
+
+EXPECTED = {
+    "product_id": "category",
+    "year_week": "category",
+    "year_month": "category",
+    "week_num": "int8",
+    "month": "float64",                 # NULL 포함 → 다운캐스트 생략
+    "order_qty_nonzero_4w": "int16",
+    "is_holiday_week": "bool",
+    "order_qty_lag1": "float32",
+}
+
+
+def validate(name: str, id_dtype) -> int:
+    """compact_frame 후 컬럼별 dtype 을 EXPECTED 와 비교 → 불일치 컬럼 수"""
+    df = compact_frame(make_frame(id_dtype), float_cols=["order_qty_lag1"])
+    bad = {c: str(df[c].dtype) for c, dt in EXPECTED.items() if str(df[c].dtype) != dt}
+    if df["product_id"].astype(str).tolist() != ["P001", "P002", "P001", "P003"]:
+        bad["product_id 값"] = df["product_id"].astype(str).tolist()
+    print(f"  ID {name}: {'일치' if not bad else f'불일치 {bad}'}")
+    return len(bad)
+
+
+def main():
+    print("=" * 60)
+    print("  compact_frame dtype 검증 (object · 문자열 dtype ID 컬럼)")
+    print("=" * 60)
+    total = validate("object", object) + validate("string", "string") + validate("str (기본)", str)
+    print(f"\n  결과: {'일치' if total == 0 else f'불일치 {total:,}건'}")
+    sys.exit(1 if total else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+MRP 롤링 netting 회귀 검증 — mrp_engine.rolling_net_requirements vs 자재별 스칼라 기준 구현
+─────────────────────────────────────────
+고정 시드 합성 픽스처 (DB 불필요):
+  - 수기 계산 사례: 리드타임 0주 (발주 주차 입고) / 1주 (다음 주차 입고), 확정 발주 포함
+  - 무작위 (주차 × 자재): 총소요 0 포함, 리드타임 0~3주 (호라이즌 밖 입고 포함), 미입고·확정 발주 혼재
+  - 일부 주차만 처리된 호라이즌 재실행 (s8 흐름): 처리된 추천은 확정 수량으로 동결·이월,
+    대기 추천 중 더 이상 필요 없는 행만 id 로 삭제 대상 (fixed_orders / stale_pending)
+reference_rolling() 은 자재별로 입고 예정 큐를 돌리는 기준 구현.
+─────────────────────────────────────────
+실행:
+  cd DB/07_pipeline && python validate_mrp.py
+  python validate_mrp.py --seeds=0,1,2 --comps=500
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from config import PLAN_HORIZON_WEEKS
+from mrp_engine import net_requirements, rolling_net_requirements
+from s8_purchase_optimization import fixed_orders, stale_pending
+
+CHECK_KEYS = ["recommended", "on_hand", "pending", "net", "order"]
+
+
+# ─────────────────────────────────────────────────────────────
+# 1) 기준 구현 (자재별 스칼라 루프)
+# ─────────────────────────────────────────────────────────────
+
+def reference_rolling(gross, on_hand, pending, lead_avg, safety_days, unit_price, fixed, lead_weeks) -> dict:
+    """자재별 주차 루프 — 발주량은 lead_weeks 뒤 주차 입고 큐에 적재, netting 은 이후 입고분까지 포함"""
+    n_periods, n_comps = gross.shape
+    out = {k: np.zeros(gross.shape) for k in CHECK_KEYS}
+    for k in range(n_comps):
+        inv, arrivals = float(on_hand[k]), {0: float(pending[k])}
+        for w in range(n_periods):
+            pend = sum(q for t, q in arrivals.items() if t >= w)
+            m = net_requirements(gross[w:w + 1, k:k + 1], np.array([[inv]]), np.array([[pend]]),
+                                 lead_avg[k:k + 1], safety_days[k:k + 1], unit_price[k:k + 1])
+            rec = float(m["recommended"][0, 0]) if np.isnan(fixed[w, k]) else float(fixed[w, k])
+            for key, v in (("recommended", rec), ("on_hand", inv), ("pending", pend),
+                           ("net", m["net"][0, 0]), ("order", rec > 0)):
+                out[key][w, k] = v
+            t = w + int(lead_weeks[k])
+            arrivals[t] = arrivals.get(t, 0.0) + rec
+            inv = max(inv + arrivals.get(w, 0.0) - gross[w, k], 0.0)
+    return out
+
+
+def diff_count(got: dict, ref: dict) -> int:
+    """CHECK_KEYS 배열 불일치 칸 수"""
+    return sum(int((~np.isclose(np.asarray(got[k], dtype=float), ref[k], atol=1e-9)).sum()) for k in CHECK_KEYS)
+
+
+# ─────────────────────────────────────────────────────────────
+# 2) 수기 계산 사례
+# ─────────────────────────────────────────────────────────────
+
+def check_hand() -> int:
+    """1자재 4주차, 주간 총소요 70 (일 10), 리드타임 7일, 안전재고·단가 0 (lot-for-lot, ROP 70)
+
+    - 0주: 발주 주차 입고 → 매주 70 발주, 재고 0 유지
+    - 1주: 0주 발주 70 은 1주차 입고 → 1주차는 입고 예정으로 충족, 2주차 재발주
+    - 1주 + 1주차 확정 100: 2주차 입고 → 2주차 발주 없음, 3주차 기초 재고 30 → 부족분 40 발주
+    """
+    gross = np.full((4, 1), 70.0)
+    args = (np.zeros(1), np.zeros(1), np.array([7.0]), np.zeros(1), np.zeros(1))
+    fixed = np.full((4, 1), np.nan)
+    fixed[1, 0] = 100.0
+    cases = [
+        ("리드타임 0주", None, None, [70, 70, 70, 70], [0, 0, 0, 0], [0, 0, 0, 0]),
+        ("리드타임 1주", None, [1], [70, 0, 70, 0], [0, 0, 0, 0], [0, 70, 0, 70]),
+        ("리드타임 1주 + 확정", fixed, [1], [70, 100, 0, 40], [0, 0, 0, 30], [0, 70, 100, 0]),
+    ]
+    bad = 0
+    for name, fx, lw, rec, inv, pend in cases:
+        m = rolling_net_requirements(gross, *args, fx, None if lw is None else np.array(lw))
+        got = [m["recommended"][:, 0], m["on_hand"][:, 0], m["pending"][:, 0]]
+        ok = all(np.allclose(g, e) for g, e in zip(got, [rec, inv, pend]))
+        bad += not ok
+        print(f"  {name}: {'일치' if ok else '불일치'}"
+              + ("" if ok else f" — 추천 {got[0].tolist()} 재고 {got[1].tolist()} 입고 {got[2].tolist()}"))
+    return bad
+
+
+# ─────────────────────────────────────────────────────────────
+# 3) 무작위 픽스처 · 부분 확정 재실행
+# ─────────────────────────────────────────────────────────────
+
+def make_fixture(n_comps: int, seed: int, horizon: int) -> dict:
+    """고정 시드 합성 (주차 × 자재) 입력 — s8 배열 형식과 동일"""
+    rng = np.random.default_rng(seed)
+    gross = rng.gamma(1.5, 80.0, (horizon, n_comps)) * (rng.random((horizon, n_comps)) < 0.7)
+    return {
+        "gross": gross,
+        "on_hand": rng.choice([0.0, 50.0, 400.0], n_comps) * rng.random(n_comps),
+        "pending": np.where(rng.random(n_comps) < 0.3, rng.uniform(0, 300, n_comps), 0.0),
+        "lead_avg": rng.uniform(1, 30, n_comps),
+        "safety_days": rng.choice([0.0, 3.0, 14.0], n_comps),
+        "unit_price": np.where(rng.random(n_comps) < 0.2, 0.0, rng.uniform(100, 50000, n_comps)),
+        "lead_weeks": rng.integers(0, 4, n_comps),
+        "rng": rng,
+    }
+
+
+def publish(mrp: dict, fixed: np.ndarray, periods: list, comp_ids: np.ndarray, start_id: int) -> pd.DataFrame:
+    """이번 실행 결과 → 대기 추천 행 (s8 적재 형식 일부: id, 자재, 주차, 수량, 상태)"""
+    wi, ci = np.nonzero(mrp["order"] & np.isnan(fixed))
+    return pd.DataFrame({
+        "id": np.arange(start_id, start_id + len(wi)),
+        "component_product_id": comp_ids[ci],
+        "plan_date": np.array(periods, dtype=object)[wi],
+        "recommended_qty": mrp["recommended"][wi, ci],
+        "status": "pending",
+    })
+
+
+def validate(n_comps: int, seed: int, horizon: int = PLAN_HORIZON_WEEKS) -> int:
+    """무작위 픽스처 기준 구현 비교 + 앞 2주차 일부 승인 후 재실행 (동결·이월·삭제 대상) 확인"""
+    fx = make_fixture(n_comps, seed, horizon)
+    rng = fx.pop("rng")
+    base = [fx[k] for k in ("gross", "on_hand", "pending", "lead_avg", "safety_days", "unit_price")]
+    periods = [f"2026-W{w + 1:02d}" for w in range(horizon)]
+    comp_ids = np.array([f"M{k:05d}" for k in range(n_comps)], dtype=object)
+
+    # 1차 실행 (확정 없음) — 리드타임 미지정은 발주 주차 입고 (기존 동작)
+    free = np.full(fx["gross"].shape, np.nan)
+    first = rolling_net_requirements(*base, free, fx["lead_weeks"])
+    bad_first = diff_count(first, reference_rolling(*base, free, fx["lead_weeks"]))
+    bad_lag0 = diff_count(rolling_net_requirements(*base),
+                          reference_rolling(*base, free, np.zeros(n_comps, dtype=np.int64)))
+
+    # 앞 2주차 추천 일부 승인 (수량 조정), 호라이즌 밖·BOM 밖 처리 행과 삭제될 대기 행 추가
+    published = publish(first, free, periods, comp_ids, 1)
+    approve = published["plan_date"].isin(periods[:2]).to_numpy() & (rng.random(len(published)) < 0.5)
+    published.loc[approve, "status"] = rng.choice(["approved", "ordered"], int(approve.sum()))
+    published.loc[approve, "recommended_qty"] *= rng.uniform(0.5, 1.5, int(approve.sum()))
+    extra = pd.DataFrame({
+        "id": [-1, -2, -3], "component_product_id": ["M99999", comp_ids[0], comp_ids[0]],
+        "plan_date": [periods[0], "2025-W01", periods[-1]], "recommended_qty": [10.0, 10.0, 0.0],
+        "status": ["approved", "approved", "pending"],
+    })
+    published = pd.concat([published, extra], ignore_index=True)
+
+    # 2차 실행 — 확정 수량 동결·이월
+    fixed = fixed_orders(published, periods, comp_ids)
+    second = rolling_net_requirements(*base, fixed, fx["lead_weeks"])
+    bad_second = diff_count(second, reference_rolling(*base, fixed, fx["lead_weeks"]))
+    held = ~np.isnan(fixed)
+    bad_frozen = int((~np.isclose(second["recommended"][held], fixed[held])).sum())
+    bad_fixed = int(held.sum() != approve.sum())
+
+    # 삭제 대상: 결과에 없는 대기 행만, 처리된 행은 제외
+    results = publish(second, fixed, periods, comp_ids, 10 ** 6)
+    stale = stale_pending(published, results, periods)
+    keys = ["component_product_id", "plan_date"]
+    res_keys = set(map(tuple, results[keys].to_numpy()))
+    waiting = published[published["status"] == "pending"]
+    expect = {i for i, k in zip(waiting["id"], map(tuple, waiting[keys].to_numpy())) if k not in res_keys}
+    bad_stale = len(set(stale["id"]) ^ expect) + int((stale["status"] != "pending").sum())
+    bad_overlap = int(pd.MultiIndex.from_frame(results[keys]).isin(
+        pd.MultiIndex.from_frame(published.loc[published["status"] != "pending", keys])).sum())
+
+    bad = bad_first + bad_lag0 + bad_second + bad_frozen + bad_fixed + bad_stale + bad_overlap
+    print(f"  seed={seed} 자재 {n_comps:,} × {horizon}주: 1차 불일치 {bad_first}, 리드타임 0 불일치 {bad_lag0}, "
+          f"재실행 불일치 {bad_second}, 확정 {int(held.sum()):,}건 (변경 {bad_frozen}, 건수 {bad_fixed}), "
+          f"삭제 {len(stale):,}건 (불일치 {bad_stale}), 확정과 겹치는 추천 {bad_overlap}")
+    return bad
+
+
+def main():
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    seeds = [int(s) for s in opts.get("seeds", "0,1,2").split(",")]
+    n_comps = int(opts.get("comps", "300"))
+
+    print("=" * 60)
+    print("  MRP 롤링 netting 회귀 검증 (rolling_net_requirements vs 자재별 기준 구현)")
+    print("=" * 60)
+    total = check_hand() + sum(validate(n_comps, seed) for seed in seeds)
+    print(f"\n  결과: {'일치' if total == 0 else f'불일치 {total:,}건'}")
+    sys.exit(1 if total else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+생산계획 회귀 검증 — s7 배열 계산 (plan_inputs / plan_week) vs 제품별 스칼라 기준 구현
+─────────────────────────────────────────
+고정 시드 합성 픽스처 (DB 불필요):
+  - 예측 horizon 조합: 7/28, 7/14/28/30, 28만, 30만, 예측 없음 (일평균수요 대체)
+  - 리스크 등급 NULL·점수 NULL·리스크 없음, 캐파 없음, 긴급수주 (납기 경과·주차 내·호라이즌 밖·날짜 오류)
+  - 확정 계획 (status != 'draft') 일부 동결, 안전재고 일수 (safety_stock) 유무 혼재
+reference_week() 는 배열화 이전 s7 제품 루프를 그대로 옮긴 기준 구현.
+호라이즌 전 주차를 예상 재고 이월하며 적재 형식 (iter_json_rows) 행 단위로 완전 일치 확인,
+LP 입력 (r50 / r90 / 긴급수주) 도 비교.
+LP 해 (합성 라인, 확정 계획 포함) 는 제약 확인 — 확정 수량 유지, 확정 + 초안 라인 부하 ≤ 캐파
+(확정분만으로 초과한 라인은 초안 0), 라인 없는 제품 ≤ greedy 자체 캐파 (max_cap)
+─────────────────────────────────────────
+실행:
+  cd DB/07_pipeline && python validate_production_plan.py
+  python validate_production_plan.py --seeds=0,1,2 --products=2000
+"""
+
+import sys
+import os
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from config import PRODUCTION_PLAN_DAYS, PRODUCTION_CAPACITY_BUFFER, PLAN_HORIZON_WEEKS
+from frame_utils import iter_json_rows
+from production_lp import solve_plan
+from s7_production_plan import (
+    PLAN_COLS, WEEKLY_HORIZONS, plan_inputs, plan_week, build_description, week_monday, week_key,
+)
+
+
+# ─────────────────────────────────────────────────────────────
+# 1) 픽스처
+# ─────────────────────────────────────────────────────────────
+
+def make_fixture(n_products: int, seed: int, today: date) -> dict:
+    """고정 시드 합성 입력 — s7 로더 반환 형식과 동일"""
+    rng = np.random.default_rng(seed)
+    products = [f"P{i:05d}" for i in range(n_products)]
+    horizon_sets = [(7, 28), (7, 14, 28, 30), (28,), (30,), ()]
+
+    fc_rows = []
+    for pid in products:
+        for h in horizon_sets[rng.integers(len(horizon_sets))]:
+            p50 = float(rng.gamma(2.0, 40.0)) * h / 7 * rng.choice([1.0, 1.0, 0.0])
+            fc_rows.append((pid, float(h), p50, p50 * float(rng.uniform(0.8, 2.0))))
+    fc = pd.DataFrame(fc_rows, columns=["product_id", "horizon_days", "p50", "p90"])
+
+    def pick(frac):
+        return [p for p in products if rng.random() < frac]
+
+    inv_map = {p: float(rng.choice([0.0, 5.0, 50.0, rng.uniform(0, 800)])) for p in pick(0.8)}
+    capacity = {p: {"daily_avg": float(rng.uniform(0, 60)), "daily_max": 0.0, "active_days": 1}
+                for p in pick(0.7)}
+    risk_data = {}
+    for p in pick(0.9):
+        risk_data[p] = {
+            "risk_grade": rng.choice(["A", "B", "C", "D", "F", None]),
+            "stockout_risk": None if rng.random() < 0.05 else float(rng.uniform(0, 100)),
+            "excess_risk": float(rng.uniform(0, 100)),
+        }
+    lead_times = {p: {"avg": float(rng.integers(3, 30)), "p90": float(rng.integers(7, 40)),
+                      "safety": float(rng.uniform(1, 25)) if rng.random() < 0.5 else None}
+                  for p in pick(0.6)}
+    for p in pick(0.1):                                  # 안전재고만 있는 제품 (리드타임 기본값)
+        lead_times.setdefault(p, {"avg": 7.0, "p90": 14.0, "safety": float(rng.uniform(1, 25))})
+    daily_demand = {p: float(rng.uniform(0, 30)) for p in pick(0.85)}
+
+    orders = []
+    for _ in range(n_products * 3):
+        offset = int(rng.integers(-20, 45))
+        delivery = (today + timedelta(days=offset)).isoformat() if rng.random() > 0.02 else "bad-date"
+        orders.append((products[rng.integers(n_products)], delivery, float(rng.choice([1, 10, 100]))))
+    orders = pd.DataFrame(orders, columns=["product_id", "delivery", "qty"])
+    return {
+        "fc": fc, "inv_map": inv_map, "capacity": capacity, "risk_data": risk_data,
+        "lead_times": lead_times, "daily_demand": daily_demand, "orders": orders,
+    }
+
+
+# ─────────────────────────────────────────────────────────────
+# 2) 기준 구현 (제품별 스칼라 루프)
+# ─────────────────────────────────────────────────────────────
+
+def reference_forecast(fc: dict, week: int, days: int = PRODUCTION_PLAN_DAYS) -> tuple:
+    """{horizon_days: {p50, p90}} → week 번째 주차 수요 (누적 곡선 구간 증분)"""
+    points = sorted(h for h in fc if h in WEEKLY_HORIZONS) or sorted(fc)
+    if not points:
+        return 0.0, 0.0
+    xs = np.array([0] + points, dtype=float)
+    t = np.array([week * days, (week + 1) * days], dtype=float)
+    out = []
+    for q in ("p50", "p90"):
+        ys = np.maximum.accumulate(np.array([0.0] + [fc[h][q] for h in points]))
+        slope = (ys[-1] - ys[-2]) / (xs[-1] - xs[-2])
+        cum = np.where(t <= xs[-1], np.interp(t, xs, ys), ys[-1] + slope * (t - xs[-1]))
+        out.append(float(cum[1] - cum[0]))
+    return tuple(out)
+
+
+def reference_priority(risk_grade, stockout_risk: float, excess_risk: float) -> str:
+    if risk_grade == "F" or stockout_risk >= 80:
+        return "critical"
+    if risk_grade == "D" or stockout_risk >= 60 or excess_risk >= 80:
+        return "high"
+    if risk_grade == "C" or stockout_risk >= 40 or excess_risk >= 60:
+        return "medium"
+    return "low"
+
+
+def reference_plan_type(planned_qty: float, recent_avg: float) -> str:
+    if recent_avg <= 0:
+        return "new" if planned_qty > 0 else "maintain"
+    ratio = planned_qty / recent_avg
+    if ratio > 1.15:
+        return "increase"
+    if ratio < 0.85:
+        return "decrease"
+    return "maintain"
+
+
+def reference_week(fx: dict, fc_map: dict, open_orders: dict, products: list,
+                   week: int, monday: date, proj_inv: dict) -> tuple:
+    """배열화 이전 s7 주차 루프 → (행 list, LP 입력 list)"""
+    target_start = monday
+    target_end = monday + timedelta(days=PRODUCTION_PLAN_DAYS - 1)
+    results, lp_rows = [], []
+    for pid in products:
+        demand_p50, demand_p90 = reference_forecast(fc_map.get(pid, {}), week)
+        if demand_p50 <= 0:
+            avg_d = fx["daily_demand"].get(pid, 0)
+            demand_p50 = avg_d * PRODUCTION_PLAN_DAYS
+            demand_p90 = demand_p50 * 1.5
+
+        inv_qty = proj_inv[pid]
+        lt = fx["lead_times"].get(pid, {"avg": 7, "p90": 14})
+        avg_d = fx["daily_demand"].get(pid, 0)
+        safety_days = lt.get("safety")
+        safety_stock = (lt["p90"] if safety_days is None else safety_days) * avg_d
+
+        net_req = max(0, demand_p50 + safety_stock - inv_qty)
+        net_req_max = max(0, demand_p90 + safety_stock - inv_qty)
+
+        urgent_qty = 0
+        for o in open_orders.get(pid, []):
+            try:
+                dd = date.fromisoformat(o["delivery"])
+                if dd <= target_end and (week == 0 or dd >= target_start):
+                    urgent_qty += o["qty"]
+            except (ValueError, TypeError):
+                pass
+        if urgent_qty > 0:
+            net_req = max(net_req, urgent_qty - inv_qty)
+
+        cap = fx["capacity"].get(pid, {})
+        daily_cap = cap.get("daily_avg", 0) * PRODUCTION_CAPACITY_BUFFER
+        max_cap = (daily_cap * PRODUCTION_PLAN_DAYS) if daily_cap > 0 else float("inf")
+
+        risk = fx["risk_data"].get(pid, {})
+        risk_grade = risk.get("risk_grade", "A")
+        stockout_risk = float(risk.get("stockout_risk") or 0)
+        excess_risk = float(risk.get("excess_risk") or 0)
+
+        if risk_grade in ("D", "F") and stockout_risk > 60:
+            planned_qty = min(net_req_max, max_cap) if max_cap < float("inf") else net_req_max
+        elif risk_grade in ("D", "F") and excess_risk > 60:
+            planned_qty = max(0, net_req * 0.9)
+        else:
+            planned_qty = min(net_req, max_cap) if max_cap < float("inf") else net_req
+        planned_qty = max(0, planned_qty)
+
+        priority = reference_priority(risk_grade, stockout_risk, excess_risk)
+        recent_prod_avg = cap.get("daily_avg", 0) * PRODUCTION_PLAN_DAYS
+        near_cap = max_cap < float("inf") and planned_qty >= max_cap * 0.9
+        lp_rows.append((net_req, max(net_req_max, net_req), urgent_qty))
+        results.append({
+            "product_id": pid,
+            "plan_date": monday.isoformat(),
+            "plan_horizon": week_key(monday),
+            "target_start": target_start.isoformat(),
+            "target_end": target_end.isoformat(),
+            "demand_p50": round(demand_p50, 6),
+            "demand_p90": round(demand_p90, 6),
+            "current_inventory": round(inv_qty, 6),
+            "safety_stock": round(safety_stock, 6),
+            "daily_capacity": round(daily_cap, 6) if daily_cap > 0 else None,
+            "max_capacity": round(max_cap, 6) if max_cap < float("inf") else None,
+            "planned_qty": round(planned_qty, 6),
+            "min_qty": round(max(0, net_req * 0.8), 6),
+            "max_qty": round(net_req_max, 6),
+            "priority": priority,
+            "plan_type": reference_plan_type(planned_qty, recent_prod_avg),
+            "risk_grade": risk_grade,
+            "description": build_description(stockout_risk, excess_risk, urgent_qty,
+                                             "캐파한계근접" if near_cap else None),
+            "status": "draft",
+        })
+    return results, lp_rows
+
+
+# ─────────────────────────────────────────────────────────────
+# 3) 비교
+# ─────────────────────────────────────────────────────────────
+
+def make_lines(products: list, r50: np.ndarray, rng) -> tuple:
+    """합성 공유 라인 — 제품 80% 를 라인 (≈ 제품 수 / 40) 1~2개에 배정, 캐파 = 배정 제품 r50 합의 60%"""
+    n_lines = max(len(products) // 40, 1)
+    pairs = [(p, f"L{rng.integers(n_lines):03d}") for p in products if rng.random() < 0.8
+             for _ in range(rng.integers(1, 3))]
+    pairs = pd.DataFrame(pairs, columns=["product_id", "line_id"]).drop_duplicates()
+    demand = pd.Series(r50, index=products).reindex(pairs["product_id"]).to_numpy()
+    caps = pd.Series(demand, index=pairs["line_id"].to_numpy()).groupby(level=0).sum() * 0.6 + 1.0
+    return caps, pairs
+
+
+def check_lp(P: dict, lp: dict, fq: np.ndarray, lines: tuple) -> int:
+    """LP 해 제약 위반 제품·라인 수 (확정 수량, 라인 캐파 선차감, 가상 라인 자체 캐파 상한)"""
+    caps, pairs = lines
+    sol = solve_plan(P["products"], lp["r50"], lp["r90"], pairs, caps,
+                     fixed_qty=fq, max_qty=P["max_cap"])
+    frozen = ~np.isnan(fq)
+    sol_fixed = solve_plan(P["products"], np.zeros(len(fq)), np.zeros(len(fq)), pairs, caps, fixed_qty=fq)
+    fixed_load = sol_fixed["line_load"]
+    over = (sol["line_load"] > np.maximum(caps, fixed_load) + 1e-6).sum()
+    lineless = ~P["products"].isin(pairs["product_id"])
+    over_cap = (lineless & ~frozen & (sol["qty"] > P["max_cap"] + 1e-6)).sum()
+    bad_fixed = (frozen & (np.abs(sol["qty"] - np.nan_to_num(fq)) > 1e-9)).sum()
+    return int(over + over_cap + bad_fixed)
+
+
+def validate(n_products: int, seed: int, horizon: int = PLAN_HORIZON_WEEKS) -> int:
+    """호라이즌 전 주차 비교 → 불일치 행 수"""
+    today = date.today()
+    current_monday = week_monday(today)
+    fx = make_fixture(n_products, seed, today)
+    products = sorted(set(fx["fc"]["product_id"]) | set(fx["daily_demand"]))
+
+    # 기준 구현 입력 (s7 이전 로더 형식)
+    fc_map = {}
+    for pid, h, p50, p90 in fx["fc"].itertuples(index=False):
+        fc_map.setdefault(pid, {})[int(h)] = {"p50": p50, "p90": p90}
+    open_orders = {}
+    for pid, delivery, qty in fx["orders"].itertuples(index=False):
+        open_orders.setdefault(pid, []).append({"delivery": delivery, "qty": qty})
+
+    # 배열 구현 입력 (load_open_orders 형식)
+    delivery = pd.to_datetime(fx["orders"]["delivery"], format="%Y-%m-%d", errors="coerce")
+    orders = pd.DataFrame({"product_id": fx["orders"]["product_id"],
+                           "delivery": delivery.to_numpy().astype("datetime64[D]"),
+                           "qty": fx["orders"]["qty"]})[delivery.notna().to_numpy()]
+    P = plan_inputs(pd.Index(products), fx["fc"], fx["inv_map"], fx["capacity"], fx["risk_data"],
+                    fx["lead_times"], orders.reset_index(drop=True), fx["daily_demand"])
+
+    rng = np.random.default_rng(seed + 1000)
+    frozen = {(p, w): float(rng.uniform(0, 500)) for p in products for w in range(horizon)
+              if rng.random() < 0.05}
+
+    proj_inv = {pid: fx["inv_map"].get(pid, 0) for pid in products}
+    inv = P["inventory"]
+    lines = None
+    mismatches = 0
+    for w in range(horizon):
+        monday = current_monday + timedelta(weeks=w)
+        ref_rows, ref_lp = reference_week(fx, fc_map, open_orders, products, w, monday, proj_inv)
+        df, lp = plan_week(P, w, monday, inv)
+
+        ref = pd.DataFrame(ref_rows)[list(df.columns)]
+        a = list(iter_json_rows(ref, PLAN_COLS))
+        b = list(iter_json_rows(df, PLAN_COLS))
+        bad = [i for i, (x, y) in enumerate(zip(a, b)) if x != y]
+        ref_lp = np.array(ref_lp, dtype=float).reshape(-1, 3)
+        lp_bad = np.flatnonzero(~(ref_lp == np.column_stack([lp["r50"], lp["r90"], lp["urgent"]])).all(axis=1))
+        fq = np.array([frozen.get((p, w), np.nan) for p in products])
+        lines = lines or make_lines(products, lp["r50"], rng)
+        lp_violations = check_lp(P, lp, fq, lines)
+        mismatches += len(bad) + len(lp_bad) + lp_violations
+        print(f"  [seed {seed}] {week_key(monday)}: 제품 {len(products):,}, "
+              f"행 불일치 {len(bad):,}, LP 입력 불일치 {len(lp_bad):,}, LP 제약 위반 {lp_violations:,}")
+        for i in bad[:3]:
+            diff = {k: (a[i][k], b[i][k]) for k in a[i] if a[i][k] != b[i][k]}
+            print(f"      {a[i]['product_id']}: {diff}")
+
+        # 예상 재고 이월 (확정 계획은 확정 수량)
+        for pid, r in zip(products, ref_rows):
+            q = frozen.get((pid, w), r["planned_qty"])
+            proj_inv[pid] = max(0.0, r["current_inventory"] + q - r["demand_p50"])
+        planned = np.where(np.isnan(fq), df["planned_qty"].to_numpy(), fq)
+        inv = np.maximum(0.0, df["current_inventory"].to_numpy() + planned - df["demand_p50"].to_numpy())
+    return mismatches
+
+
+def main():
+    opts = dict(a[2:].split("=", 1) for a in sys.argv[1:] if a.startswith("--") and "=" in a)
+    seeds = [int(s) for s in opts.get("seeds", "0,1,2").split(",")]
+    n_products = int(opts.get("products", "2000"))
+
+    print("=" * 60)
+    print("  생산계획 배열 계산 회귀 검증 (plan_week vs 제품별 기준 구현)")
+    print("=" * 60)
+    total = sum(validate(n_products, seed) for seed in seeds)
+    print(f"\n  결과: {'일치' if total == 0 else f'불일치 {total:,}건'}")
+    sys.exit(1 if total else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,25 +17,7 @@ import statistics
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from collections import defaultdict
-from config import supabase, RISK_WEIGHTS, RISK_GRADE_BOUNDS, get_risk_grade
-
-
-def fetch_all(table: str, select: str) -> list:
-    all_rows, offset, ps = [], 0, 1000
-    while True:
-        try:
-            resp = supabase.table(table).select(select).range(offset, offset + ps - 1).execute()
-        except Exception as e:
-            if "PGRST205" in str(e) or "Could not find" in str(e):
-                return []
-            raise
-        if not resp.data:
-            break
-        all_rows.extend(resp.data)
-        if len(resp.data) < ps:
-            break
-        offset += ps
-    return all_rows
+from config import fetch_all, RISK_WEIGHTS, RISK_GRADE_BOUNDS, get_risk_grade
 
 
 def print_section(title: str):
@@ -57,19 +39,19 @@ def print_bar(label: str, count: int, total: int, width: int = 30):
 def analyze_risk_scores():
     print_section("1. risk_score 테이블 실데이터 분석")
 
-    rows = fetch_all("risk_score", "*")
+    # 제품별 최신 eval_date만 (risk_score_latest, 뷰 미존재 시 전체 이력에서 선택)
+    rows = fetch_all("risk_score_latest", "*")
+    if not rows:
+        latest = {}
+        for r in fetch_all("risk_score", "*"):
+            pid = r["product_id"]
+            if pid not in latest or r["eval_date"] > latest[pid]["eval_date"]:
+                latest[pid] = r
+        rows = list(latest.values())
     if not rows:
         print("  [!] risk_score 테이블이 비어있음 — 먼저 S5를 실행하세요")
         return None
 
-    # 최신 eval_date만
-    latest = {}
-    for r in rows:
-        pid = r["product_id"]
-        if pid not in latest or r["eval_date"] > latest[pid]["eval_date"]:
-            latest[pid] = r
-    rows = list(latest.values())
-
     eval_dates = set(r["eval_date"] for r in rows)
     print(f"  eval_date(s): {sorted(eval_dates)}")
     print(f"  총 제품 수: {len(rows):,}")
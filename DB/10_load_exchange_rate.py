@@ -413,6 +413,15 @@ def main():
     print(f"소요시간: {elapsed:.1f}s")
     print("=" * 60)
 
+    if total > 0:
+        # 외부지표 패널 캐시 무효화 (07_pipeline/external_panel.py) — 파이프라인 설정·import 실패도 적재 결과 유지
+        try:
+            sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "07_pipeline"))
+            from external_panel import invalidate_panel
+            invalidate_panel()
+        except (Exception, SystemExit) as e:    # config.py 는 .env 누락 시 sys.exit
+            print(f"[!] 외부지표 패널 캐시 무효화 생략 ({type(e).__name__}: {e})")
+
 
 if __name__ == "__main__":
     main()
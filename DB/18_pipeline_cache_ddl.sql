@@ -0,0 +1,117 @@
+-- =============================================================
+-- 18. 파이프라인 캐시 테이블 DDL
+-- 실행: Supabase SQL Editor에서 실행
+-- 의존: 03_external_ddl.sql, 08_aggregation_ddl.sql, 09_exchange_rate_ddl.sql 선행 실행 필요
+-- =============================================================
+
+-- 1. 파이프라인 산출물 메타 (Pipeline Artifact)
+--    사전 집계 산출물별 소스 테이블 지문(fingerprint) — 변경 시에만 재생성
+CREATE TABLE IF NOT EXISTS pipeline_artifact (
+    artifact_key    VARCHAR(50)    PRIMARY KEY,     -- 예: 'external_indicator_panel'
+    fingerprint     VARCHAR(64),                     -- 소스 테이블 지문 (NULL이면 무효화 상태)
+    row_count       INT,                             -- 산출 행 수
+    built_at        TIMESTAMPTZ    DEFAULT NOW()
+);
+
+COMMENT ON TABLE pipeline_artifact IS '파이프라인 산출물 메타 — 소스 지문 기반 재생성 판단';
+
+
+-- 2. 외부지표 패널 (External Indicator Panel)
+--    economic_indicator + exchange_rate + trade_statistics → 주간/월간 와이드 패널
+--    s3(주간) / s3m(월간) 피처 스토어가 공통으로 조회
+CREATE TABLE IF NOT EXISTS external_indicator_panel (
+    id                      BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    grain                   VARCHAR(10)     NOT NULL
+                            CHECK (grain IN ('weekly', 'monthly')),
+    period_key              VARCHAR(8)      NOT NULL,       -- '2025-W08' | '2025-02'
+
+    -- G: 반도체 시장 지표
+    sox_index               NUMERIC(12,4),
+    dram_price              NUMERIC(12,4),
+    nand_price              NUMERIC(12,4),
+    silicon_wafer_price     NUMERIC(12,4),
+    baltic_dry_index        NUMERIC(12,4),                  -- 주간 전용
+    copper_lme              NUMERIC(12,4),                  -- 주간 전용
+
+    -- H: 환율
+    usd_krw                 NUMERIC(12,4),
+    jpy_krw                 NUMERIC(12,4),
+    eur_krw                 NUMERIC(12,4),
+    cny_krw                 NUMERIC(12,4),
+
+    -- I: 거시경제
+    fed_funds_rate          NUMERIC(8,4),
+    wti_price               NUMERIC(12,4),
+    indpro_index            NUMERIC(12,4),
+    ipman_index             NUMERIC(12,4),
+    kr_base_rate            NUMERIC(8,4),
+    kr_ipi_mfg              NUMERIC(12,4),
+    kr_bsi_mfg              NUMERIC(12,4),
+    cn_pmi_mfg              NUMERIC(12,4),
+
+    -- J: 무역
+    semi_export_amt         NUMERIC(18,2),
+    semi_import_amt         NUMERIC(18,2),
+    semi_trade_balance      NUMERIC(18,2),
+    semi_export_roc         NUMERIC(12,6),
+
+    created_at              TIMESTAMPTZ     DEFAULT NOW(),
+    UNIQUE (grain, period_key)
+);
+
+COMMENT ON TABLE external_indicator_panel
+    IS '외부지표 패널 — 주간/월간 리샘플 + forward-fill 완료된 공용 외부 피처';
+
+CREATE INDEX IF NOT EXISTS idx_eip_grain ON external_indicator_panel(grain);
+
+
+-- 3. 고객 집중도 (Customer Concentration)
+--    weekly/monthly_customer_summary → (grain, product_id, period_key) 별 HHI, top1/3 비중
+--    S0 기록 변경 기간 (pipeline_watermark 's0.<table>.changed_from')·소스 지문 ('concentration.<grain>') 기준 최초 변경 기간부터만 재계산, 바뀐 제품×기간만 UPSERT·사라진 행 삭제 — s3 / s3m 공용
+CREATE TABLE IF NOT EXISTS customer_concentration (
+    id                      BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    grain                   VARCHAR(10)     NOT NULL
+                            CHECK (grain IN ('weekly', 'monthly')),
+    product_id              VARCHAR(20)     NOT NULL,
+    period_key              VARCHAR(8)      NOT NULL,       -- '2025-W08' | '2025-02'
+    top1_customer_pct       NUMERIC(5,2),
+    top3_customer_pct       NUMERIC(5,2),
+    customer_hhi            NUMERIC(8,4),
+    created_at              TIMESTAMPTZ     DEFAULT NOW(),
+    UNIQUE (grain, product_id, period_key)
+);
+
+COMMENT ON TABLE customer_concentration
+    IS '고객 집중도 — 제품×기간별 HHI / 상위 1·3 거래처 비중 (증분 갱신)';
+
+CREATE INDEX IF NOT EXISTS idx_cc_grain_period ON customer_concentration(grain, period_key);
+
+
+-- 4. 파이프라인 워터마크 (Pipeline Watermark)
+--    증분 처리 스텝별 소스 테이블 처리 위치 — 다음 실행은 max_id 초과 행만 변경분으로 간주
+--    watermark_key 예: 's1.dense.daily_production', 's1.dense.range_end'
+CREATE TABLE IF NOT EXISTS pipeline_watermark (
+    watermark_key   VARCHAR(80)    PRIMARY KEY,
+    max_id          BIGINT,                          -- 처리 완료한 최대 id
+    max_value       VARCHAR(40),                     -- 날짜 범위 등 값 워터마크
+    updated_at      TIMESTAMPTZ    DEFAULT NOW()
+);
+
+COMMENT ON TABLE pipeline_watermark IS '파이프라인 워터마크 — 증분 재계산 기준 위치';
+
+
+-- 5. 파이프라인 산출물 값 (Pipeline Artifact Value)
+--    제품 단위 중간 산출물 (s5 일평균 수요·BOM 원가 등) — pipeline_artifact 지문이 같으면 재사용
+--    artifact_key 예: 's5.daily_avg_demand', 's5.bom_cost'
+CREATE TABLE IF NOT EXISTS pipeline_artifact_value (
+    id              BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    artifact_key    VARCHAR(50)    NOT NULL,
+    product_id      VARCHAR(20)    NOT NULL,
+    ref_date        DATE,                            -- 날짜별 값 (예: 미처리 수주 납기일), 없으면 NULL
+    metric_value    NUMERIC(18,6),
+    created_at      TIMESTAMPTZ    DEFAULT NOW()
+);
+
+COMMENT ON TABLE pipeline_artifact_value IS '파이프라인 산출물 값 — 소스 지문 기반 제품 단위 중간 산출물 캐시';
+
+CREATE INDEX IF NOT EXISTS idx_pav_key ON pipeline_artifact_value(artifact_key);
@@ -0,0 +1,27 @@
+-- =============================================================
+-- 19. 일간 추정 재고 구간 테이블 DDL
+-- 실행: Supabase SQL Editor에서 실행
+-- 의존: 06_analytics_ddl.sql 선행 실행 필요
+-- =============================================================
+
+-- 1. 일간 추정 재고 구간 (Daily Inventory Interval)
+--    daily_inventory_estimated 의 변화점 표현 — 값이 같은 연속 일자를 [valid_from, valid_to] 한 행으로 저장
+--    (제품, 월) 세그먼트 시작일 + 생산/출하 발생일만 행 생성
+--    특정 일자 재고: valid_from <= 일자 AND 일자 <= valid_to
+CREATE TABLE IF NOT EXISTS daily_inventory_interval (
+    id              BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    product_id      VARCHAR(20)    NOT NULL,
+    valid_from      DATE           NOT NULL,
+    valid_to        DATE           NOT NULL,
+    snapshot_base   NUMERIC(18,6)  DEFAULT 0,     -- 월초 스냅샷 기준값
+    cumul_produced  NUMERIC(18,6)  DEFAULT 0,     -- 월초~valid_from 누적 생산
+    cumul_shipped   NUMERIC(18,6)  DEFAULT 0,     -- 월초~valid_from 누적 출하(=매출)
+    estimated_qty   NUMERIC(18,6)  NOT NULL,       -- snapshot_base + cumul_produced - cumul_shipped
+    created_at      TIMESTAMPTZ    DEFAULT NOW(),
+    UNIQUE (product_id, valid_from),
+    CHECK (valid_from <= valid_to)
+);
+
+COMMENT ON TABLE daily_inventory_interval IS '일간 추정 재고 구간 — 변화점 기반 희소 표현 (s1 interval 모드)';
+
+CREATE INDEX IF NOT EXISTS idx_dii_product_range ON daily_inventory_interval(product_id, valid_from, valid_to);
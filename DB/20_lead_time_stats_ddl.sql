@@ -0,0 +1,32 @@
+-- =============================================================
+-- 20. 리드타임 통계 (현재값) 테이블 DDL
+-- 실행: Supabase SQL Editor에서 실행
+-- 의존: 01_ddl.sql, 06_analytics_ddl.sql 선행 실행 필요
+-- =============================================================
+
+-- 1. 리드타임 통계 (Lead Time Stats)
+--    purchase_order 완료건(status='F') receipt_date - po_date → 제품(×공급사)별 통계
+--    s2가 매 실행 전체 갱신 — s3 / s3m / s5 / s7 / s8 은 purchase_order 대신 이 테이블 조회
+--    supplier_code = '*'  : 전체 공급사 합산 (제품 단위)
+--    window_days   = 0    : 전체 기간, 90/180/365 : window_end 기준 최근 N일 입고분
+CREATE TABLE IF NOT EXISTS lead_time_stats (
+    id              BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    product_id      VARCHAR(20)    NOT NULL,
+    supplier_code   VARCHAR(10)    NOT NULL,        -- '*' = 전체 공급사
+    window_days     SMALLINT       NOT NULL,        -- 0 = 전체 기간
+    window_end      DATE,                           -- 윈도우 기준일 (최신 입고일)
+    calc_date       DATE           NOT NULL,        -- 산출일
+    avg_lead_days   NUMERIC(8,2),
+    med_lead_days   NUMERIC(8,2),
+    p90_lead_days   NUMERIC(8,2),                   -- 90분위 (정렬 후 int(n×0.9)번째)
+    min_lead_days   NUMERIC(8,2),
+    max_lead_days   NUMERIC(8,2),
+    on_time_rate    NUMERIC(5,4),                   -- 리드타임 30일 이내 비율
+    sample_count    INT,
+    created_at      TIMESTAMPTZ    DEFAULT NOW(),
+    UNIQUE (product_id, supplier_code, window_days)
+);
+
+COMMENT ON TABLE lead_time_stats IS '리드타임 통계 현재값 — 제품/제품×공급사, 전체·최근 90/180/365일';
+
+CREATE INDEX IF NOT EXISTS idx_lts_supplier_window ON lead_time_stats(supplier_code, window_days);
@@ -0,0 +1,17 @@
+-- =============================================================
+-- 21. 파이프라인 조회 인덱스 DDL
+-- 실행: Supabase SQL Editor에서 실행
+-- 의존: 01_ddl.sql 선행 실행 필요
+-- =============================================================
+
+-- 1. 일별수주 (daily_order)
+--    s5 / s7 서버 측 조건 조회
+--      최근 수주: order_date >= cutoff  → idx_order_date (01_ddl.sql) 범위 스캔
+--      미처리 수주: status = 'R'         → 부분 인덱스 (미처리 건만 색인, 완료 이력 증가와 무관)
+CREATE INDEX IF NOT EXISTS idx_order_open
+    ON daily_order(product_id, expected_delivery_date)
+    WHERE status = 'R';
+
+-- 최근 수주 조회 컬럼(product_id, order_qty)을 인덱스에 포함 → 힙 접근 없이 index-only scan
+CREATE INDEX IF NOT EXISTS idx_order_date_cover
+    ON daily_order(order_date) INCLUDE (product_id, order_qty);
@@ -0,0 +1,36 @@
+-- =============================================================
+-- 22. 기간별 계획 발주 (Time-phased MRP) DDL
+-- 실행: Supabase SQL Editor에서 실행
+-- 의존: 16_optimization_ddl.sql 선행 실행 필요
+-- =============================================================
+
+-- 1. 계획 발주 (Planned Order)
+--    s8 기간별 MRP: 버킷(일/주)별 총소요 → 예상 재고 전개 → 리드타임 역산 발주일
+--    같은 plan_date·bucket 재실행 시 기존 행 삭제 후 재적재
+CREATE TABLE IF NOT EXISTS planned_order (
+    id                    BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    component_product_id  VARCHAR(20)    NOT NULL,        -- 자재(부품) 코드
+    plan_date             DATE           NOT NULL,         -- MRP 실행 기준일
+    bucket                VARCHAR(4)     NOT NULL
+                          CHECK (bucket IN ('day', 'week')),
+    need_date             DATE           NOT NULL,         -- 입고 필요 버킷 시작일 (= 계획 입고일)
+    release_date          DATE           NOT NULL,         -- 계획 발주일 (리드타임 역산, 기준일 이전이면 기준일)
+    lead_days             NUMERIC(8,2),                    -- 적용 리드타임 (추천 공급사 또는 자재 평균)
+    -- 버킷 수량
+    gross_requirement     NUMERIC(18,6)  DEFAULT 0,        -- 버킷 총소요량
+    scheduled_receipt     NUMERIC(18,6)  DEFAULT 0,        -- 기발주 예정 입고
+    planned_qty           NUMERIC(18,6)  NOT NULL,         -- 계획 입고량 (핵심 출력)
+    projected_on_hand     NUMERIC(18,6),                   -- 계획 입고 반영 후 예상 재고
+    safety_stock          NUMERIC(18,6)  DEFAULT 0,
+    order_method          VARCHAR(20)    NOT NULL
+                          CHECK (order_method IN ('eoq', 'lot_for_lot')),
+    past_due              BOOLEAN        DEFAULT FALSE,    -- 리드타임상 발주 시점이 이미 지남
+    recommended_supplier  VARCHAR(10),
+    created_at            TIMESTAMPTZ    DEFAULT NOW(),
+    UNIQUE (component_product_id, plan_date, bucket, need_date)
+);
+
+COMMENT ON TABLE planned_order IS '계획 발주 — 기간별 MRP 리드타임 역산 발주·입고 일정';
+
+CREATE INDEX IF NOT EXISTS idx_po_plan_bucket  ON planned_order(plan_date, bucket);
+CREATE INDEX IF NOT EXISTS idx_po_release      ON planned_order(release_date);
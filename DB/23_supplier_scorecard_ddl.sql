@@ -0,0 +1,38 @@
+-- =============================================================
+-- 23. 공급사 스코어카드 DDL
+-- 실행: Supabase SQL Editor에서 실행
+-- 의존: 01_ddl.sql, 18_pipeline_cache_ddl.sql (pipeline_watermark) 선행 실행 필요
+-- =============================================================
+
+-- 1. 공급사 스코어카드 (Supplier Scorecard)
+--    purchase_order → (자재 × 공급사) 누적 합계·건수, s8 실행 시 신규 발주·입고분만 증분 합산
+--      단가·발주 건수: 워터마크 id 이후 신규 발주 / 리드타임·납기 준수: 워터마크 입고일 이후 ~ 전일 완료건
+--      매 실행 발주 행 수·완료 입고 건수를 누적 기준과 비교 — 불일치 (재적재·삭제·기존 발주 입고 수정) 시 자동 전체 재구축
+--    평균값은 합계 ÷ 건수, score·score_rank 는 갱신분이 있는 자재만 재산출
+--    s8 (score_rank ≤ 2: 추천·대체) 과 구매 추천 API 가 자재별 순위 조회에 사용
+CREATE TABLE IF NOT EXISTS supplier_scorecard (
+    id                    BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    component_product_id  VARCHAR(20)    NOT NULL,
+    supplier_code         VARCHAR(10)    NOT NULL,
+    supplier_name         VARCHAR(200),
+    first_po_id           BIGINT,                          -- 최초 발주 id (동점 시 순위 기준)
+    -- 누적 합계·건수
+    po_count              INT            DEFAULT 0,
+    price_sum             NUMERIC(20,6)  DEFAULT 0,        -- 단가 있는 발주의 단가 합계
+    price_count           INT            DEFAULT 0,
+    lead_sum              NUMERIC(12,2)  DEFAULT 0,        -- 완료건 리드타임 합계 (일)
+    lead_count            INT            DEFAULT 0,
+    on_time_count         INT            DEFAULT 0,        -- 리드타임 30일 이내 완료건
+    -- 파생 지표
+    avg_unit_price        NUMERIC(18,6),
+    avg_lead_days         NUMERIC(8,2),
+    on_time_rate          NUMERIC(5,4),
+    score                 NUMERIC(8,6),                    -- SUPPLIER_WEIGHTS 가중 점수 (0~1)
+    score_rank            SMALLINT,                        -- 자재 내 순위 (1 = 추천), 단가·리드타임 모두 없으면 NULL
+    updated_at            TIMESTAMPTZ    DEFAULT NOW(),
+    UNIQUE (component_product_id, supplier_code)
+);
+
+COMMENT ON TABLE supplier_scorecard IS '공급사 스코어카드 — 자재×공급사 누적 단가·리드타임·납기 준수 + 자재 내 순위';
+
+CREATE INDEX IF NOT EXISTS idx_scorecard_rank ON supplier_scorecard(component_product_id, score_rank);
@@ -0,0 +1,45 @@
+-- =============================================================
+-- 24. 재고정책 몬테카를로 시뮬레이션 DDL
+-- 실행: Supabase SQL Editor에서 실행
+-- 의존: 06_analytics_ddl.sql, 20_lead_time_stats_ddl.sql 선행 실행 필요
+-- =============================================================
+
+-- 1. 정책 시뮬레이션 결과 (Policy Simulation)
+--    s9: 예측 분위 → 일 수요 감마 분포, lead_time_stats → 리드타임 로그정규 분포
+--        (시나리오 × 제품 × 일) 전개로 현행 ROP 규칙의 서비스 수준 평가 (결품 = 판매 손실)
+--    policy = 'rop' : (r, Q) 재고포지션 ≤ r 이면 Q 배수 발주
+--             'ss'  : (s, S) 재고포지션 ≤ s 이면 S 까지 발주
+--    현재값 테이블 — 매 실행 전체 갱신 (이번 실행에 없는 제품은 삭제)
+CREATE TABLE IF NOT EXISTS policy_simulation (
+    id                  BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    product_id          VARCHAR(20)    NOT NULL,
+    policy              VARCHAR(4)     NOT NULL
+                        CHECK (policy IN ('rop', 'ss')),
+    sim_date            DATE           NOT NULL,        -- 시뮬레이션 실행일
+    scenarios           INT            NOT NULL,        -- 시나리오 수
+    horizon_days        SMALLINT       NOT NULL,        -- 시뮬레이션 기간 (일)
+    -- 정책 파라미터
+    reorder_point       NUMERIC(18,6),                  -- r / s
+    order_up_to         NUMERIC(18,6),                  -- S ('ss' 만)
+    order_qty           NUMERIC(18,6),                  -- Q ('rop' 만)
+    on_hand             NUMERIC(18,6),                  -- 시작 재고
+    -- 적합 분포
+    demand_mean         NUMERIC(18,6),                  -- 일 수요 평균
+    demand_std          NUMERIC(18,6),                  -- 일 수요 표준편차
+    lead_med_days       NUMERIC(8,2),                   -- 리드타임 중앙값 (통계 없으면 기본값)
+    lead_p90_days       NUMERIC(8,2),
+    -- 시뮬레이션 결과 (시나리오 평균)
+    fill_rate           NUMERIC(7,6),                   -- 충족 수량 ÷ 수요
+    expected_stockout   NUMERIC(18,6),                  -- 결품 (판매 손실) 수량
+    stockout_prob       NUMERIC(5,4),                   -- 결품일이 있는 시나리오 비율
+    stockout_days       NUMERIC(8,2),                   -- 결품 일수
+    avg_inventory       NUMERIC(18,6),                  -- 일말 재고
+    order_count         NUMERIC(8,2),                   -- 발주 횟수
+    expected_demand     NUMERIC(18,6),                  -- 기간 총수요
+    created_at          TIMESTAMPTZ    DEFAULT NOW(),
+    UNIQUE (product_id, policy)
+);
+
+COMMENT ON TABLE policy_simulation IS '재고정책 시뮬레이션 — 제품×정책별 몬테카를로 충족률·기대 결품';
+
+CREATE INDEX IF NOT EXISTS idx_ps_policy_fill ON policy_simulation(policy, fill_rate);
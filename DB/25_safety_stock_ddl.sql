@@ -0,0 +1,35 @@
+-- =============================================================
+-- 25. 안전재고 (서비스 수준 기반) DDL
+-- 실행: Supabase SQL Editor에서 실행
+-- 의존: 13_feature_store_weekly_ddl.sql, 20_lead_time_stats_ddl.sql 선행 실행 필요
+-- =============================================================
+
+-- 1. 안전재고 (Safety Stock)
+--    SS = z(서비스 수준) × √(L × σ_d² + d² × σ_L²)  — safety_stock.py, s5 가 매 실행 전체 갱신
+--    safety_days = SS ÷ d : s5 / s7 / s8 이 각 스텝의 일 수요 기준에 곱해 안전재고로 사용
+--    demand_source = 'feature'  : feature_store_weekly 최신 주차 13주 평균·표준편차
+--                    'forecast' : 예측 분위 (P50/P90) 폭 적합
+--                    'default'  : 수요 통계 없음 (SAFETY_DEFAULT_CV)
+CREATE TABLE IF NOT EXISTS safety_stock (
+    id              BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    product_id      VARCHAR(20)    NOT NULL,
+    calc_date       DATE           NOT NULL,        -- 산출일
+    service_level   NUMERIC(5,4)   NOT NULL,        -- 목표 서비스 수준 (사이클 결품 없음 확률)
+    z_value         NUMERIC(6,4),
+    -- 일 수요
+    demand_mean     NUMERIC(18,6),
+    demand_std      NUMERIC(18,6),
+    demand_cv       NUMERIC(10,6),                  -- 변동계수 (σ_d ÷ d)
+    demand_source   VARCHAR(10)
+                    CHECK (demand_source IN ('feature', 'forecast', 'default')),
+    -- 리드타임
+    lead_avg_days   NUMERIC(8,2),
+    lead_std_days   NUMERIC(8,2),                   -- (P90 - 중앙값) ÷ 1.2816
+    -- 결과
+    safety_days     NUMERIC(10,4),                  -- 일 수요 1 단위당 안전재고 (일)
+    safety_stock    NUMERIC(18,6),                  -- safety_days × demand_mean
+    created_at      TIMESTAMPTZ    DEFAULT NOW(),
+    UNIQUE (product_id)
+);
+
+COMMENT ON TABLE safety_stock IS '안전재고 현재값 — 서비스 수준·수요 변동·리드타임 변동 기반 제품별 안전재고';
@@ -0,0 +1,29 @@
+-- =============================================================
+-- 26. 조치 큐 변경분 동기화 DDL
+-- 실행: Supabase SQL Editor에서 실행
+-- 의존: 06_analytics_ddl.sql 선행 실행 필요
+-- =============================================================
+
+-- 1. 제품별 최신 리스크 스코어 인덱스
+--    s6: 전체 이력 대신 제품당 1행 (최신 eval_date) 조회 — risk_score_latest (27_latest_views_ddl.sql)
+--    (product_id, eval_date DESC) 인덱스 → DISTINCT ON 이 정렬 없이 인덱스 순서로 제품별 첫 행 선택
+CREATE INDEX IF NOT EXISTS idx_rs_product_latest
+    ON risk_score(product_id, eval_date DESC);
+
+-- 2. 조치 큐 자연키 (product_id, risk_type, action_type, eval_date)
+--    s6: 자연키 기준 비교 후 신규 INSERT · pending 변경분 UPDATE (UPSERT on_conflict)
+--        · 해소된 pending 조치 종료 (status → 'dismissed')
+--    기존 전체 삭제·재적재 방식에서 생긴 중복 키 정리: 담당자 처리 상태 (pending 외) 행 우선, 그다음 최신 id 유지
+DELETE FROM action_queue a
+USING (
+    SELECT id,
+           ROW_NUMBER() OVER (
+               PARTITION BY product_id, risk_type, action_type, eval_date
+               ORDER BY (status = 'pending'), id DESC
+           ) AS rn
+    FROM action_queue
+) d
+WHERE a.id = d.id AND d.rn > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_aq_natural_key
+    ON action_queue(product_id, risk_type, action_type, eval_date);
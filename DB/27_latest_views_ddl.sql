@@ -0,0 +1,77 @@
+-- =============================================================
+-- 27. 최신 행 머티리얼라이즈드 뷰 DDL
+-- 실행: Supabase SQL Editor에서 실행
+-- 의존: 06_analytics_ddl.sql, 16_optimization_ddl.sql, 26_action_queue_sync_ddl.sql 선행 실행 필요
+-- =============================================================
+
+-- 이력 테이블 (실행일마다 행 추가) 의 키별 최신 행 — 조회 측은 키당 1행만 내려받음
+--   갱신: 생산 스텝 적재 완료 후 refresh_latest_view() RPC (latest_views.refresh_latest)
+--         s5 → risk_score_latest, s7 → production_plan_latest, s8 → purchase_recommendation_latest
+--   CONCURRENTLY 갱신 (조회 중단 없음) 을 위해 키 UNIQUE 인덱스 필수
+--   생산 스텝 밖의 원본 수정 (계획 승인 등 status 변경) 은 다음 스텝 실행 시 반영
+
+-- 이전 버전 (26) 일반 뷰 → 머티리얼라이즈드 뷰로 교체
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_views WHERE schemaname = 'public' AND viewname = 'risk_score_latest') THEN
+        DROP VIEW risk_score_latest;
+    END IF;
+END $$;
+
+-- 1. 제품별 최신 리스크 스코어 (s6 조치 큐, s7 생산 우선순위, validate_risk)
+CREATE MATERIALIZED VIEW IF NOT EXISTS risk_score_latest AS
+SELECT DISTINCT ON (product_id) *
+FROM risk_score
+ORDER BY product_id, eval_date DESC;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_rsl_product ON risk_score_latest(product_id);
+
+COMMENT ON MATERIALIZED VIEW risk_score_latest IS '제품별 최신 eval_date 리스크 스코어 — s5 적재 후 갱신';
+
+-- 2. 제품별 최신 생산 계획 (s6 조치 큐 suggested_qty)
+--    s7 / s8 은 이번 주 + 이후 주차 (롤링 호라이즌) 를 적재 → 미래 주차 제외, 이번 주 월요일 이하 최신 plan_date
+--    기준 주는 갱신 시점 (s7 / s8 실행) — s6 는 이번 주 행을 원본에서 직접 조회하고 이 뷰는 이번 주 행 없는 키에만 사용
+--    정의 변경 반영을 위해 재생성 (DROP 후 CREATE)
+DROP MATERIALIZED VIEW IF EXISTS production_plan_latest;
+DROP MATERIALIZED VIEW IF EXISTS purchase_recommendation_latest;
+
+CREATE INDEX IF NOT EXISTS idx_pp_product_latest
+    ON production_plan(product_id, plan_date DESC, id DESC);
+
+CREATE MATERIALIZED VIEW production_plan_latest AS
+SELECT DISTINCT ON (product_id) *
+FROM production_plan
+WHERE plan_date <= date_trunc('week', CURRENT_DATE)::date
+ORDER BY product_id, plan_date DESC, id DESC;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_ppl_product ON production_plan_latest(product_id);
+
+COMMENT ON MATERIALIZED VIEW production_plan_latest IS '제품별 최신 plan_date (이번 주 이하) 생산 계획 — s7 적재 후 갱신';
+
+-- 3. 자재별 최신 발주 추천 (s6 조치 큐 suggested_qty)
+CREATE INDEX IF NOT EXISTS idx_pr_component_latest
+    ON purchase_recommendation(component_product_id, plan_date DESC);
+
+CREATE MATERIALIZED VIEW purchase_recommendation_latest AS
+SELECT DISTINCT ON (component_product_id) *
+FROM purchase_recommendation
+WHERE plan_date <= date_trunc('week', CURRENT_DATE)::date
+ORDER BY component_product_id, plan_date DESC;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_prl_component ON purchase_recommendation_latest(component_product_id);
+
+COMMENT ON MATERIALIZED VIEW purchase_recommendation_latest IS '자재별 최신 plan_date (이번 주 이하) 발주 추천 — s8 적재 후 갱신';
+
+-- 4. 갱신 함수 (PostgREST RPC: supabase.rpc("refresh_latest_view", {"view_name": ...}))
+--    허용 목록 외 이름 거부 — 임의 뷰 갱신 방지
+CREATE OR REPLACE FUNCTION refresh_latest_view(view_name TEXT)
+RETURNS VOID AS $$
+BEGIN
+    IF view_name NOT IN ('risk_score_latest', 'production_plan_latest', 'purchase_recommendation_latest') THEN
+        RAISE EXCEPTION 'unknown latest view: %', view_name;
+    END IF;
+    EXECUTE format('REFRESH MATERIALIZED VIEW CONCURRENTLY %I', view_name);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION refresh_latest_view(TEXT) FROM PUBLIC, anon, authenticated;
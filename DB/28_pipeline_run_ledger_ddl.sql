@@ -0,0 +1,33 @@
+-- =============================================================
+-- 28. 파이프라인 실행 원장 DDL
+-- 실행: Supabase SQL Editor에서 실행
+-- 의존: 없음 (run_pipeline.py 가 조회·기록, 미존재 시 모든 스텝 매번 실행)
+-- =============================================================
+
+-- 1. 스텝 실행 원장 (Pipeline Run Ledger)
+--    run_pipeline 스텝 1회 실행당 1행 — 입력 지문이 마지막 성공 실행과 같으면 스텝 건너뜀 (status = 'cached')
+--    fingerprint = 입력 테이블별 (행 수, 최신 타임스탬프, 최대 키) + 코드 버전
+--                  + 입력 테이블을 출력하는 스텝의 최근 성공 시각 (제자리 UPSERT 갱신 감지)
+--                  + 실행일 (산출 행이 실행일 기준인 스텝만)
+--    code_version = 스텝 모듈 + 파이프라인 내부 import 모듈 소스 SHA-1
+CREATE TABLE IF NOT EXISTS pipeline_run_ledger (
+    id              BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    run_id          VARCHAR(20)    NOT NULL,        -- run_pipeline 실행 단위 (시작 시각 'YYYYMMDDTHHMMSS')
+    step_key        VARCHAR(5)     NOT NULL,        -- '0' ~ '9', '3m', '4m'
+    status          VARCHAR(10)    NOT NULL
+                    CHECK (status IN ('ok', 'cached', 'error')),
+    fingerprint     VARCHAR(40),                    -- 입력 지문 (지문 산출 실패 시 NULL → 다음 실행에서 재실행)
+    code_version    VARCHAR(40),
+    forced          BOOLEAN        DEFAULT FALSE,   -- --force 로 지문 비교 없이 실행
+    started_at      TIMESTAMPTZ,
+    finished_at     TIMESTAMPTZ    DEFAULT NOW(),
+    duration_sec    NUMERIC(10,2),
+    error_message   TEXT
+);
+
+COMMENT ON TABLE pipeline_run_ledger IS '파이프라인 스텝 실행 원장 — 입력 지문 기반 변경 없는 스텝 건너뜀';
+
+-- 스텝별 최근 성공 실행 조회 (지문 비교 · 선행 스텝 갱신 시각)
+CREATE INDEX IF NOT EXISTS idx_prl_step_ok
+    ON pipeline_run_ledger(step_key, id DESC) WHERE status = 'ok';
+CREATE INDEX IF NOT EXISTS idx_prl_run ON pipeline_run_ledger(run_id);
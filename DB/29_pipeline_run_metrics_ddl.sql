@@ -0,0 +1,41 @@
+-- =============================================================
+-- 29. 파이프라인 스텝 계측 DDL
+-- 실행: Supabase SQL Editor에서 실행
+-- 의존: 없음 (run_pipeline.py 가 실행 종료 시 기록, 미존재 시 JSON 파일만 저장)
+-- =============================================================
+
+-- 1. 스텝 실행 지표 (Pipeline Run Metrics)
+--    run_pipeline 실행 1회 × 스텝 1행 — step_metrics.py (httpx 전송 계층 계측 + 스텝 프로세스 RSS)
+--    total_sec   = check_sec (입력 지문 비교) + fetch_sec + compute_sec + write_sec
+--    fetch / write = GET·HEAD / POST·PATCH·PUT·DELETE 요청 대기 시간 합, compute = 나머지
+--    실행 간 같은 스텝 비교로 병목 구간 회귀 추적 (run_pipeline 결과 요약의 '이전 대비')
+CREATE TABLE IF NOT EXISTS pipeline_run_metrics (
+    id              BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    run_id          VARCHAR(20)    NOT NULL,        -- pipeline_run_ledger.run_id
+    step_key        VARCHAR(5)     NOT NULL,
+    status          VARCHAR(10)    NOT NULL
+                    CHECK (status IN ('ok', 'cached', 'error', 'skipped')),
+    start_sec       NUMERIC(10,2),                  -- 실행 시작 기준 스텝 시작 시점
+    total_sec       NUMERIC(10,3),
+    check_sec       NUMERIC(10,3),
+    fetch_sec       NUMERIC(10,3),
+    compute_sec     NUMERIC(10,3),
+    write_sec       NUMERIC(10,3),
+    -- HTTP
+    fetch_calls     INT,
+    write_calls     INT,
+    rows_read       BIGINT,
+    rows_written    BIGINT,
+    bytes_sent      BIGINT,
+    bytes_received  BIGINT,
+    -- 메모리 · 프로파일
+    peak_rss_mb     NUMERIC(10,1),
+    profile_path    TEXT,                           -- --profile 실행 시 .prof / .html 경로
+    created_at      TIMESTAMPTZ    DEFAULT NOW(),
+    UNIQUE (run_id, step_key)
+);
+
+COMMENT ON TABLE pipeline_run_metrics IS '파이프라인 스텝 실행 지표 — 단계별 시간·행 수·HTTP 왕복·전송량·최대 RSS';
+
+-- 스텝별 최근 실행 조회 (이전 실행 대비 소요 시간)
+CREATE INDEX IF NOT EXISTS idx_prm_step ON pipeline_run_metrics(step_key, id DESC);
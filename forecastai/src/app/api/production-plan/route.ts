@@ -40,6 +40,14 @@ function planDateToWeekLabel(dateStr: string): string {
   return `${fmt(d)} ~ ${fmt(end)}`
 }
 
+/* ─── helper: 이번 주 월요일 (YYYY-MM-DD) — 롤링 호라이즌 미래 주차 대신 기본 선택 ─── */
+function currentMonday(): string {
+  const d = new Date()
+  d.setDate(d.getDate() - ((d.getDay() + 6) % 7))
+  const pad = (n: number) => String(n).padStart(2, '0')
+  return `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())}`
+}
+
 /* ─── GET: 생산 권고 목록 (주차 기반) ─── */
 export async function GET(request: Request) {
   try {
@@ -73,7 +81,7 @@ export async function GET(request: Request) {
       ? requestedWeek
       : (requestedDate && availableDates.includes(requestedDate))
         ? requestedDate
-        : availableDates[0]
+        : availableDates.find(d => d <= currentMonday()) ?? availableDates[availableDates.length - 1]
 
     // 2) 해당 주차 데이터 전체 조회 (페이지네이션)
     const plans: any[] = []
@@ -9,6 +9,17 @@ function planDateToWeekLabel(dateStr: string): string {
   return `${fmt(d)} ~ ${fmt(end)}`
 }
 
+/* ─── helper: 이번 주 월요일 (YYYY-MM-DD) — 롤링 호라이즌 미래 주차 대신 기본 선택 ─── */
+function currentMonday(): string {
+  const d = new Date()
+  d.setDate(d.getDate() - ((d.getDay() + 6) % 7))
+  const pad = (n: number) => String(n).padStart(2, '0')
+  return `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())}`
+}
+
+/* 공급사 스코어카드 순위 조회 상한 (자재별) */
+const SCORECARD_TOP_N = 3
+
 /* ─── GET: 구매 권고 목록 (주차 기반) ─── */
 export async function GET(request: Request) {
   try {
@@ -42,7 +53,7 @@ export async function GET(request: Request) {
       ? requestedWeek
       : (requestedDate && availableDates.includes(requestedDate))
         ? requestedDate
-        : availableDates[0]
+        : availableDates.find(d => d <= currentMonday()) ?? availableDates[availableDates.length - 1]
 
     // 2) 해당 주차 데이터 조회 (페이지네이션 — Supabase 기본 1000건 제한 회피)
     const allRecs: any[] = []
@@ -80,6 +91,31 @@ export async function GET(request: Request) {
       for (const m of (masters ?? [])) masterMap[m.product_code] = m
     }
 
+    // 3-1) 공급사 스코어카드 — 자재별 순위 상위 공급사 (idx_scorecard_rank 인덱스 조회)
+    const scorecardMap: Record<string, any[]> = {}
+    for (let i = 0; i < componentIds.length; i += BATCH) {
+      const batch = componentIds.slice(i, i + BATCH)
+      const { data: cards } = await supabase
+        .from('supplier_scorecard')
+        .select('component_product_id,supplier_code,supplier_name,avg_unit_price,avg_lead_days,on_time_rate,score,score_rank')
+        .in('component_product_id', batch)
+        .lte('score_rank', SCORECARD_TOP_N)
+        .order('component_product_id', { ascending: true })
+        .order('score_rank', { ascending: true })
+      for (const c of (cards ?? [])) {
+        if (!scorecardMap[c.component_product_id]) scorecardMap[c.component_product_id] = []
+        scorecardMap[c.component_product_id].push({
+          rank: c.score_rank,
+          supplier: c.supplier_code,
+          supplierName: c.supplier_name ?? c.supplier_code,
+          unitPrice: c.avg_unit_price == null ? null : Number(c.avg_unit_price),
+          leadDays: c.avg_lead_days == null ? null : Number(c.avg_lead_days),
+          onTimeRate: c.on_time_rate == null ? null : Number(c.on_time_rate),
+          score: Number(c.score ?? 0),
+        })
+      }
+    }
+
     // 4) items 변환
     const urgencyOrder: Record<string, number> = { critical: 0, high: 1, medium: 2, low: 3 }
     const items = recs.map(r => {
@@ -107,6 +143,7 @@ export async function GET(request: Request) {
         orderAmount: recQty * unitPrice,
         altSupplier: r.alt_supplier ?? '-',
         altSupplierName: r.alt_supplier_name ?? '-',
+        rankedSuppliers: scorecardMap[r.component_product_id] ?? [],
         latestOrderDate: r.latest_order_date ?? '-',
         expectedReceiptDate: r.expected_receipt_date ?? '-',
         needDate: r.need_date ?? '-',
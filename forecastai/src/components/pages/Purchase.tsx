@@ -14,9 +14,14 @@ type PurchaseItem = {
   recommendedQty: number; orderMethod: string;
   supplier: string; supplierName: string; leadDays: number; unitPrice: number; orderAmount: number;
   altSupplier: string; altSupplierName: string;
+  rankedSuppliers?: RankedSupplier[];
   latestOrderDate: string; expectedReceiptDate: string; needDate: string;
   urgency: string; description: string; status: string;
 }
+type RankedSupplier = {
+  rank: number; supplier: string; supplierName: string;
+  unitPrice: number | null; leadDays: number | null; onTimeRate: number | null; score: number;
+}
 type UrgDist = { name: string; value: number; color: string }
 type SupChart = { supplier: string; amount: number }
 
@@ -726,6 +731,32 @@ export default function PagePurchase() {
                   <div style={{ fontSize:11, color:T.text3 }}>코드: {drawerItem.altSupplier}</div>
                 </div>
               </div>
+              {(drawerItem.rankedSuppliers ?? []).length > 0 && (
+                <table style={{ width:'100%', fontSize:11, borderCollapse:'collapse', marginTop:12 }}>
+                  <thead>
+                    <tr style={{ borderBottom:`1px solid ${T.border}`, color:T.text3 }}>
+                      {['순위', '공급사', '평균단가', '리드타임', '납기준수', '점수'].map(h => (
+                        <th key={h} style={{ padding:'6px 8px', fontWeight:600, textAlign: h === '공급사' ? 'left' : 'right' }}>{h}</th>
+                      ))}
+                    </tr>
+                  </thead>
+                  <tbody>
+                    {(drawerItem.rankedSuppliers ?? []).map(s => {
+                      const isRec = s.supplier === drawerItem.supplier
+                      return (
+                        <tr key={s.supplier} style={{ borderBottom:`1px solid ${T.border}`, color: isRec ? T.blue : T.text2, fontWeight: isRec ? 700 : 400 }}>
+                          <td style={{ padding:'6px 8px', textAlign:'right' }}>{s.rank}</td>
+                          <td style={{ padding:'6px 8px' }}>{s.supplierName}</td>
+                          <td style={{ padding:'6px 8px', textAlign:'right', fontFamily:"'IBM Plex Mono',monospace" }}>{s.unitPrice == null ? '-' : `₩${fmt(Math.round(s.unitPrice))}`}</td>
+                          <td style={{ padding:'6px 8px', textAlign:'right', fontFamily:"'IBM Plex Mono',monospace" }}>{s.leadDays == null ? '-' : `${s.leadDays.toFixed(1)}일`}</td>
+                          <td style={{ padding:'6px 8px', textAlign:'right', fontFamily:"'IBM Plex Mono',monospace" }}>{s.onTimeRate == null ? '-' : `${(s.onTimeRate * 100).toFixed(0)}%`}</td>
+                          <td style={{ padding:'6px 8px', textAlign:'right', fontFamily:"'IBM Plex Mono',monospace" }}>{s.score.toFixed(3)}</td>
+                        </tr>
+                      )
+                    })}
+                  </tbody>
+                </table>
+              )}
             </div>
 
             {/* schedule timeline */}